@@ -2,7 +2,7 @@
 API v1 router configuration
 """
 from fastapi import APIRouter
-from app.api.v1.endpoints import documents, auth, workflows, websockets, collaboration, presence, collaborative_placeholders, notifications, document_comparison, templates, workflow_conditions, security, api_enhancements, cache, assets, external_integrations, database, scaling, intro_page, services
+from app.api.v1.endpoints import documents, auth, workflows, websockets, collaboration, presence, collaborative_placeholders, notifications, document_comparison, templates, workflow_conditions, security, api_enhancements, cache, assets, external_integrations, database, scaling, intro_page, services, digital_signatures
 
 api_router = APIRouter()
 
@@ -42,6 +42,9 @@ api_router.include_router(workflow_conditions.router, prefix="/workflow-conditio
 # Include security routes (2FA, SSO, Audit)
 api_router.include_router(security.router, prefix="/security", tags=["Security"])
 
+# Include digital signature routes
+api_router.include_router(digital_signatures.router, prefix="/digital-signatures", tags=["Digital Signatures"])
+
 # Include API enhancements routes (GraphQL, Webhooks, API Keys, Rate Limiting)
 api_router.include_router(api_enhancements.router, prefix="/api-enhancements", tags=["API Enhancements"])
 
@@ -1,7 +1,6 @@
 """
 API enhancement endpoints for webhooks, API keys, and rate limiting
 """
-import secrets
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
@@ -9,10 +8,11 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
+from app.core.security import generate_api_key, hash_api_key
 from app.models.user import User
 from app.models.external_integration import APIKey, Webhook, WebhookDelivery, RateLimitRule
 from app.schemas.external_integration import (
-    APIKeyCreate, APIKeyResponse, APIKeyUpdate,
+    APIKeyCreate, APIKeyCreatedResponse, APIKeyResponse, APIKeyUpdate,
     WebhookCreate, WebhookResponse, WebhookUpdate, WebhookDeliveryResponse,
     RateLimitRuleCreate, RateLimitRuleResponse, RateLimitRuleUpdate,
     WEBHOOK_EVENTS, API_PERMISSIONS
@@ -23,7 +23,7 @@ router = APIRouter()
 
 
 # API Key endpoints
-@router.post("/api-keys", response_model=APIKeyResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/api-keys", response_model=APIKeyCreatedResponse, status_code=status.HTTP_201_CREATED)
 async def create_api_key(
     api_key_data: APIKeyCreate,
     current_user: User = Depends(get_current_user),
@@ -38,14 +38,13 @@ async def create_api_key(
         )
 
     # Generate API key
-    key_value = secrets.token_urlsafe(32)
-    key_prefix = key_value[:8]
+    key_value, key_prefix = generate_api_key()
 
-    # Create API key record
+    # Create API key record; only the key's hash is stored
     api_key = APIKey(
         name=api_key_data.name,
-        key_value=key_value,
         key_prefix=key_prefix,
+        key_hash=hash_api_key(key_value),
         permissions=api_key_data.permissions,
         is_active=True,
         created_by=current_user.id,
@@ -57,9 +56,9 @@ async def create_api_key(
     db.refresh(api_key)
 
     # Return response with full key value only once
-    response = APIKeyResponse.from_orm(api_key)
-    response.key_value = key_value  # Only shown on creation
-    return response
+    return APIKeyCreatedResponse(
+        **APIKeyResponse.model_validate(api_key).model_dump(), key_value=key_value
+    )
 
 
 @router.get("/api-keys", response_model=List[APIKeyResponse])
@@ -4,13 +4,14 @@ Compliance API endpoints for GDPR/CCPA features
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
 from app.api.deps import get_current_user, get_db
 from app.models.user import User
 from app.models.compliance import (
-    UserConsent, DataRetentionPolicy, DataDeletionRequest,
+    UserConsent, DataRetentionPolicy, DataDeletionRequest, DataExportJob,
     PrivacyImpactAssessment, ComplianceReport, DataProcessingActivity
 )
 from app.schemas.compliance import (
@@ -26,7 +27,7 @@ from app.schemas.compliance import (
     ComplianceReportCreate, ComplianceReportUpdate,
     DataProcessingActivity as DataProcessingActivitySchema,
     DataProcessingActivityCreate, DataProcessingActivityUpdate,
-    UserDataExportRequest, UserDataExport,
+    UserDataExportRequest, UserDataExport, DataExportJob as DataExportJobSchema,
     ConsentBatchOperation, ConsentBatchResult,
     ComplianceMetrics, ComplianceDashboard
 )
@@ -35,6 +36,7 @@ from app.services.compliance_service import (
     ComplianceMetricsService
 )
 from app.services.pia_service import PIAWorkflowService
+from app.services.user_data_export import DataExporter, run_export_job
 from app.core.logging import logger
 
 router = APIRouter()
@@ -199,12 +201,12 @@ async def preview_retention_policy(
         raise HTTPException(status_code=404, detail="Policy not found")
 
     service = DataRetentionService(db)
-    expired_items = service.get_expired_data(policy.data_category, policy.resource_type)
+    expired_items = service.get_expired_data(policy.data_category, policy.resource_type, limit=20)  # Limit preview
 
     return {
         "policy": policy,
-        "expired_items_count": len(expired_items),
-        "expired_items": expired_items[:20],  # Limit preview
+        "expired_items_count": service.count_expired_data(policy.data_category, policy.resource_type),
+        "expired_items": expired_items,
         "preview_generated_at": datetime.utcnow()
     }
 
@@ -273,7 +275,16 @@ async def update_deletion_request(
 
 
 # Data Export Endpoints (GDPR Right to Portability)
-@router.post("/data-export", response_model=UserDataExport)
+def _get_export_job(db: Session, export_id: str, current_user: User) -> DataExportJob:
+    job = db.query(DataExportJob).get(export_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job.user_id != current_user.id and not current_user.has_permission("admin"):
+        raise HTTPException(status_code=403, detail="Can only access your own exports")
+    return job
+
+
+@router.post("/data-export", response_model=DataExportJobSchema)
 async def request_data_export(
     export_request: UserDataExportRequest,
     background_tasks: BackgroundTasks,
@@ -285,22 +296,70 @@ async def request_data_export(
     if export_request.user_id != current_user.id and not current_user.has_permission("admin"):
         raise HTTPException(status_code=403, detail="Can only export your own data")
 
-    service = DataExportService(db)
+    if not db.query(User).get(export_request.user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        job = DataExporter(db).create_job(
+            user_id=export_request.user_id,
+            format=export_request.format,
+            data_categories=export_request.data_categories,
+            include_metadata=export_request.include_metadata,
+            anonymize_sensitive=export_request.anonymize_sensitive,
+            requested_by=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Process export in background to avoid timeout
-    return service.export_user_data(export_request)
+    background_tasks.add_task(run_export_job, job.id)
+    return job
+
+
+@router.get("/data-export/{export_id}", response_model=DataExportJobSchema)
+async def get_data_export(
+    export_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status and progress of a data export"""
+    return _get_export_job(db, export_id, current_user)
+
 
+@router.post("/data-export/{export_id}/resume", response_model=DataExportJobSchema)
+async def resume_data_export(
+    export_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Resume a failed or interrupted data export from its last checkpoint"""
+    job = _get_export_job(db, export_id, current_user)
+    if job.status == "completed":
+        raise HTTPException(status_code=409, detail="Export already completed")
 
-@router.get("/data-export/{export_id}")
+    background_tasks.add_task(run_export_job, job.id)
+    return job
+
+
+@router.get("/data-export/{export_id}/download")
 async def download_data_export(
     export_id: str,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Download exported data file"""
-    # In a real implementation, this would return the actual file
-    # For now, return export metadata
-    return {"message": "Export download endpoint", "export_id": export_id}
+    job = _get_export_job(db, export_id, current_user)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}")
+    if job.expires_at and job.expires_at.replace(tzinfo=None) < datetime.utcnow():
+        raise HTTPException(status_code=410, detail="Export has expired")
+
+    job.download_count += 1
+    job.last_downloaded = datetime.utcnow()
+    db.commit()
+
+    return FileResponse(job.file_path, media_type="application/zip", filename=f"user_data_export_{job.id}.zip")
 
 
 # Privacy Impact Assessment Endpoints
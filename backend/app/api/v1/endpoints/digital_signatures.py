@@ -1,9 +1,13 @@
 """
 API endpoints for digital signature management
 """
+import asyncio
+import base64
+import binascii
+import json
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends, Query, Body, Header
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -14,6 +18,7 @@ from app.core.dependencies import (
     require_admin
 )
 from app.services.digital_signature_service import DigitalSignatureService
+from app.services.digital_signature.batch_signing import BatchDocument, BatchResult, BatchSigningService
 from app.schemas.digital_signature import (
     DigitalSignatureProviderCreate,
     DigitalSignatureProviderUpdate,
@@ -30,10 +35,15 @@ from app.schemas.digital_signature import (
     SignatureStatistics,
     SignatureProviderStats,
     SignatureCallbackData,
-    ComplianceFramework
+    ComplianceFramework,
+    BatchDocumentItem,
+    BatchSignRequest,
+    BatchVerifyRequest,
+    BatchItemResponse,
+    BatchSignatureResponse
 )
 from app.models.user import User
-from app.models.digital_signature import SignatureStatus
+from app.models.digital_signature import SignatureStatus, ComplianceFramework as ModelComplianceFramework
 
 router = APIRouter()
 
@@ -355,6 +365,126 @@ async def revoke_certificate(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _batch_documents(items: List[BatchDocumentItem]) -> List[BatchDocument]:
+    try:
+        return [
+            BatchDocument(item.document_id, base64.b64decode(item.content, validate=True), item.title)
+            for item in items
+        ]
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Document content must be base64 encoded")
+
+
+def _batch_response(batch: BatchResult) -> BatchSignatureResponse:
+    return BatchSignatureResponse(
+        batch_id=batch.batch_id,
+        total=batch.progress.total,
+        succeeded=batch.progress.succeeded,
+        failed=batch.progress.failed,
+        compliance_validations=batch.compliance_validations,
+        results=[
+            BatchItemResponse(
+                document_id=result.document_id,
+                success=result.success,
+                request_id=result.request_id,
+                signed_content=base64.b64encode(result.signed_content).decode() if result.signed_content else None,
+                signature_intact=result.signature_intact,
+                error=result.error
+            )
+            for result in batch.results
+        ]
+    )
+
+
+async def _run_batch(run, stream: bool):
+    """
+    Run a batch; with stream, respond with NDJSON progress lines as documents
+    complete, followed by a result (or error) line
+    """
+    if not stream:
+        try:
+            return _batch_response(await run(None))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def on_progress(progress, result):
+        queue.put_nowait({
+            "event": "progress",
+            "completed": progress.completed,
+            "total": progress.total,
+            "document_id": result.document_id,
+            "success": result.success,
+            "error": result.error
+        })
+
+    async def lines():
+        task = asyncio.create_task(run(on_progress))
+        while not (task.done() and queue.empty()):
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait([getter, task], return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield json.dumps(getter.result()) + "\n"
+            else:
+                getter.cancel()
+        try:
+            yield json.dumps({"event": "result", **_batch_response(task.result()).model_dump()}) + "\n"
+        except ValueError as e:
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post("/batch/sign", response_model=BatchSignatureResponse)
+async def sign_document_batch(
+    batch_data: BatchSignRequest,
+    stream: bool = Query(False, description="Stream NDJSON progress as documents are signed"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_verified_user)
+):
+    """Sign a batch of documents with one of the user's certificates"""
+    documents = _batch_documents(batch_data.documents)
+    batch_service = BatchSigningService(db)
+
+    async def run(progress):
+        return await batch_service.sign_batch(
+            provider_id=batch_data.provider_id,
+            certificate_id=batch_data.certificate_id,
+            private_key_password=batch_data.private_key_password,
+            documents=documents,
+            user=current_user,
+            reason=batch_data.reason,
+            location=batch_data.location,
+            message=batch_data.message,
+            legal_notice=batch_data.legal_notice,
+            compliance_framework=ModelComplianceFramework(batch_data.compliance_framework.value),
+            authentication_required=batch_data.authentication_required,
+            progress=progress
+        )
+
+    return await _run_batch(run, stream)
+
+
+@router.post("/batch/verify", response_model=BatchSignatureResponse)
+async def verify_document_batch(
+    batch_data: BatchVerifyRequest,
+    stream: bool = Query(False, description="Stream NDJSON progress as documents are verified"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_verified_user)
+):
+    """Verify the signatures of a batch of documents against one of the user's certificates"""
+    documents = _batch_documents(batch_data.documents)
+    batch_service = BatchSigningService(db)
+
+    async def run(progress):
+        return await batch_service.verify_batch(
+            batch_data.certificate_id, documents, current_user, progress=progress
+        )
+
+    return await _run_batch(run, stream)
+
+
 @router.post("/compliance/validate")
 async def validate_compliance(
     request_data: dict = Body(...),
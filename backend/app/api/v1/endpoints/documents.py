@@ -20,11 +20,13 @@ from app.core.dependencies import (
     require_delete
 )
 from app.services.document_service import DocumentService
+from app.services.document_metrics_service import get_document_metrics
 from app.schemas.document import (
     DocumentCreate, 
     DocumentUpdate, 
     DocumentResponse, 
     DocumentList,
+    DocumentMetricsResponse,
     DocumentSearchQuery,
     DocumentSearchResponse,
     AdvancedSearchQuery,
@@ -295,6 +297,22 @@ def get_document(document_id: str, db: Session = Depends(get_db)):
     return DocumentResponse.model_validate(document)
 
 
+@router.get("/{document_id}/metrics", response_model=DocumentMetricsResponse)
+def get_document_metrics_endpoint(document_id: str, db: Session = Depends(get_db)):
+    """Get content metrics for the current version of a document"""
+    service = DocumentService(db)
+    document = service.get_document(document_id)
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return DocumentMetricsResponse(
+        document_id=document.id,
+        version=document.version,
+        **get_document_metrics(document).to_dict()
+    )
+
+
 @router.post("/", response_model=DocumentResponse)
 def create_document(
     document: DocumentCreate, 
@@ -314,15 +332,20 @@ def create_document(
 
 
 @router.put("/{document_id}", response_model=DocumentResponse)
-def update_document(document_id: str, document_update: DocumentUpdate, db: Session = Depends(get_db)):
-    """Update a document"""
+def update_document(
+    document_id: str,
+    document_update: DocumentUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_update)
+):
+    """Update a document (requires authentication and update permission)"""
     service = DocumentService(db)
     
     # Extract placeholders from content if provided and not already set
     if document_update.content and not document_update.placeholders:
         document_update.placeholders = service.extract_placeholders_from_content(document_update.content)
     
-    updated_document = service.update_document(document_id, document_update)
+    updated_document = service.update_document(document_id, document_update, updated_by=current_user.id)
     
     if not updated_document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -331,11 +354,15 @@ def update_document(document_id: str, document_update: DocumentUpdate, db: Sessi
 
 
 @router.delete("/{document_id}")
-def delete_document(document_id: str, db: Session = Depends(get_db)):
-    """Delete a document"""
+def delete_document(
+    document_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_delete)
+):
+    """Delete a document (requires authentication and delete permission)"""
     service = DocumentService(db)
     
-    if not service.delete_document(document_id):
+    if not service.delete_document(document_id, deleted_by=current_user.id):
         raise HTTPException(status_code=404, detail="Document not found")
     
     return {"message": "Document deleted successfully"}
@@ -263,32 +263,28 @@ def create_bulk_notifications(
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     service = NotificationService(db)
-    created_count = 0
-    failed_count = 0
-    notification_ids = []
-    errors = []
     
-    for user_id in bulk_data.user_ids:
-        try:
-            notification = service.create_notification(
-                user_id=user_id,
-                template_name=bulk_data.template_name,
-                template_variables=bulk_data.template_variables,
-                notification_type=bulk_data.notification_type,
-                priority=bulk_data.priority,
-                scheduled_at=bulk_data.scheduled_at,
-                context_data=bulk_data.context_data
-            )
-            
-            if notification:
-                created_count += 1
-                notification_ids.append(notification.id)
-            else:
-                failed_count += 1
-                
-        except Exception as e:
-            failed_count += 1
-            errors.append(f"User {user_id}: {str(e)}")
+    try:
+        results = service.create_notifications_bulk(
+            user_ids=bulk_data.user_ids,
+            template_name=bulk_data.template_name,
+            template_variables=bulk_data.template_variables,
+            notification_type=bulk_data.notification_type,
+            priority=bulk_data.priority,
+            scheduled_at=bulk_data.scheduled_at,
+            context_data=bulk_data.context_data
+        )
+    except ValueError as e:
+        results = {
+            "notifications": [],
+            "skipped": [],
+            "errors": [f"User {user_id}: {str(e)}" for user_id in bulk_data.user_ids]
+        }
+    
+    notification_ids = [notification.id for notification in results["notifications"]]
+    created_count = len(notification_ids)
+    errors = results["errors"]
+    failed_count = len(results["skipped"]) + len(errors)
     
     return BulkNotificationResponse(
         created_count=created_count,
@@ -322,6 +318,9 @@ def get_notification_stats(
     pending_notifications = query.filter(Notification.status == NotificationStatus.PENDING).count()
     sent_notifications = query.filter(Notification.status == NotificationStatus.SENT).count()
     failed_notifications = query.filter(Notification.status == NotificationStatus.FAILED).count()
+    coalesced_notifications, digests = query.filter(
+        Notification.status == NotificationStatus.COALESCED
+    ).with_entities(func.count(Notification.id), func.count(func.distinct(Notification.digest_id))).one()
     
     # Calculate delivery rate
     delivery_rate = 0.0
@@ -333,7 +332,9 @@ def get_notification_stats(
         pending_notifications=pending_notifications,
         sent_notifications=sent_notifications,
         failed_notifications=failed_notifications,
-        delivery_rate=round(delivery_rate, 2)
+        delivery_rate=round(delivery_rate, 2),
+        coalesced_notifications=coalesced_notifications,
+        sends_saved=coalesced_notifications - digests
     )
 
 
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
+from app.models.user import User
 from app.services.template_service import TemplateService
 from app.schemas.document_template import (
     DocumentTemplateCreate,
@@ -25,6 +26,8 @@ from app.schemas.document_template import (
     CreateTemplateFromDocumentRequest,
     TemplateInstanceRequest,
     TemplateInstanceResponse,
+    TemplateMergeRequest,
+    TemplateMergeResponse,
     BulkTemplateAction,
     BulkTemplateResponse,
     TemplateExportRequest,
@@ -208,7 +211,13 @@ async def publish_template(
     """Publish a template"""
     template_service = TemplateService(db)
     
-    template = template_service.publish_template(template_id, current_user["id"])
+    try:
+        template = template_service.publish_template(template_id, current_user["id"])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     if not template:
         raise HTTPException(
@@ -337,7 +346,13 @@ async def create_document_from_template(
     request.template_id = template_id
     
     # Get processed document data from template
-    template_result = template_service.create_document_from_template(request, current_user["id"])
+    try:
+        template_result = template_service.create_document_from_template(request, current_user["id"])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     if not template_result:
         raise HTTPException(
@@ -358,6 +373,56 @@ async def create_document_from_template(
     )
 
 
+@router.post("/{template_id}/merge", response_model=TemplateMergeResponse, status_code=status.HTTP_201_CREATED)
+async def merge_template(
+    template_id: str,
+    request: TemplateMergeRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create one document per row of field values (mail merge)"""
+    template_service = TemplateService(db)
+    
+    try:
+        result = template_service.merge_documents(
+            template_id,
+            request.field_rows(),
+            current_user.id,
+            document_type=request.document_type,
+            title_pattern=request.title_pattern
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Template not found or access denied"
+        )
+    
+    created_at = datetime.utcnow()
+    documents = [
+        TemplateInstanceResponse(
+            document_id=document.id,
+            document_title=document.title,
+            template_id=result["template_id"],
+            template_name=result["template_name"],
+            created_at=created_at
+        )
+        for document in result["documents"]
+    ]
+    
+    return TemplateMergeResponse(
+        template_id=result["template_id"],
+        template_name=result["template_name"],
+        documents=documents,
+        total_created=len(documents)
+    )
+
+
 @router.post("/from-document", response_model=DocumentTemplate, status_code=status.HTTP_201_CREATED)
 async def create_template_from_document(
     request: CreateTemplateFromDocumentRequest,
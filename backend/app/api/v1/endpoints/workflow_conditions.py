@@ -13,17 +13,20 @@ from app.models.workflow_conditions import (
     EscalationRule, EscalationInstance, ConditionEvaluation, ActionExecution,
     ConditionType, OperatorType, ActionType, LogicalOperator
 )
-from app.models.workflow import WorkflowInstance, WorkflowStepInstance
+from app.models.workflow import WorkflowInstance, WorkflowStepInstance, BusinessCalendar
 from app.schemas.workflow_conditions import (
     WorkflowConditionGroupCreate, WorkflowConditionGroupUpdate, WorkflowConditionGroupResponse,
     WorkflowConditionCreate, WorkflowConditionUpdate, WorkflowConditionResponse,
     WorkflowConditionalActionCreate, WorkflowConditionalActionUpdate, WorkflowConditionalActionResponse,
     EscalationRuleCreate, EscalationRuleUpdate, EscalationRuleResponse,
+    BusinessCalendarCreate, BusinessCalendarUpdate, BusinessCalendarResponse,
     EscalationInstanceResponse, ConditionEvaluationResponse, ActionExecutionResponse,
     WorkflowConditionEvaluationRequest, WorkflowConditionEvaluationResponse
 )
 from app.services.workflow_condition_service import WorkflowConditionService
 from app.services.escalation_service import EscalationService
+from app.services.escalation_scheduler import EscalationScheduler
+from app.services.business_calendar_service import CompiledCalendar, BusinessCalendarError
 from app.core.dependencies import get_current_user
 from app.models.user import User
 import logging
@@ -394,10 +397,106 @@ async def update_escalation_rule(
     db.commit()
     db.refresh(escalation_rule)
     
+    EscalationScheduler(db).reschedule_open_steps(escalation_rule.workflow_id, escalation_rule.step_id)
+    
     logger.info(f"Updated escalation rule {rule_id} by user {current_user.id}")
     return escalation_rule
 
 
+# =========================================================================
+# Business Calendar Endpoints
+# =========================================================================
+
+def _validate_business_calendar(calendar: BusinessCalendar) -> None:
+    """Compile a calendar definition, rejecting invalid hours, dates or time zones"""
+    try:
+        CompiledCalendar.from_model(calendar)
+    except (BusinessCalendarError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid business calendar: {str(e)}"
+        )
+
+
+def _clear_other_default_calendars(db: Session, calendar: BusinessCalendar) -> None:
+    if calendar.is_default:
+        db.query(BusinessCalendar).filter(
+            BusinessCalendar.id != calendar.id,
+            BusinessCalendar.is_default == True
+        ).update({"is_default": False}, synchronize_session=False)
+
+
+@router.post("/business-calendars", response_model=BusinessCalendarResponse, status_code=status.HTTP_201_CREATED)
+async def create_business_calendar(
+    calendar_data: BusinessCalendarCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create a business calendar"""
+    
+    business_calendar = BusinessCalendar(**calendar_data.dict(), created_by=current_user.id)
+    _validate_business_calendar(business_calendar)
+    
+    db.add(business_calendar)
+    db.flush()
+    _clear_other_default_calendars(db, business_calendar)
+    db.commit()
+    db.refresh(business_calendar)
+    
+    if business_calendar.is_default:
+        EscalationScheduler(db).reschedule_open_steps()
+    
+    logger.info(f"Created business calendar {business_calendar.id} by user {current_user.id}")
+    return business_calendar
+
+
+@router.get("/business-calendars", response_model=List[BusinessCalendarResponse])
+async def list_business_calendars(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List business calendars"""
+    
+    return db.query(BusinessCalendar).order_by(BusinessCalendar.name).all()
+
+
+@router.put("/business-calendars/{calendar_id}", response_model=BusinessCalendarResponse)
+async def update_business_calendar(
+    calendar_id: str,
+    calendar_data: BusinessCalendarUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update a business calendar and reschedule escalations that count on it"""
+    
+    business_calendar = db.query(BusinessCalendar).filter(
+        BusinessCalendar.id == calendar_id
+    ).first()
+    
+    if not business_calendar:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Business calendar not found"
+        )
+    
+    # Update fields
+    for field, value in calendar_data.dict(exclude_unset=True).items():
+        setattr(business_calendar, field, value)
+    _validate_business_calendar(business_calendar)
+    
+    business_calendar.updated_at = datetime.utcnow()
+    _clear_other_default_calendars(db, business_calendar)
+    
+    db.commit()
+    db.refresh(business_calendar)
+    
+    # Due dates already assigned keep their deadline; pending escalations move
+    EscalationScheduler(db).reschedule_open_steps()
+    
+    logger.info(f"Updated business calendar {calendar_id} by user {current_user.id}")
+    return business_calendar
+
+
 # =========================================================================
 # Workflow Evaluation Endpoints
 # =========================================================================
@@ -18,6 +18,9 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # API keys are stored as HMAC-SHA256 digests under this secret
+    API_KEY_HASH_SECRET: str = "dev-api-key-secret-change-in-production"
+
     # Encryption for sensitive data (2FA secrets, etc.)
     ENCRYPTION_KEY: Optional[str] = None
 
@@ -33,6 +36,88 @@ class Settings(BaseSettings):
     CDN_BASE_URL: Optional[str] = None
     STATIC_CDN_ENABLED: bool = False
 
+    # Security audit log writer
+    AUDIT_LOG_SYNC_SEVERITY: str = "critical"  # Events at or above this severity are committed before log_audit_event returns
+    AUDIT_LOG_BUFFER_SIZE: int = 10000  # Callers flush inline once this many events are waiting
+    AUDIT_LOG_BATCH_SIZE: int = 500  # Rows per multi-row INSERT
+    AUDIT_LOG_FLUSH_INTERVAL_SECONDS: float = 0.5
+    AUDIT_USER_CACHE_SIZE: int = 10000  # Email and role of recently audited users
+    AUDIT_USER_CACHE_TTL_SECONDS: int = 300
+
+    # Workflow condition evaluation audit: "none", "groups" or "full"
+    CONDITION_AUDIT_LEVEL: str = "full"
+    CONDITION_AUDIT_SAMPLE_RATE: float = 1.0  # Fraction of error-free evaluations recorded
+    WORKFLOW_CONDITION_PLAN_TTL_SECONDS: int = 60  # Bounds how long a condition edited by another process takes to apply here
+
+    # Email delivery
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_TLS: bool = False
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_FROM_EMAIL: str = "noreply@ca-dms.local"
+    SMTP_POOL_SIZE: int = 4  # Persistent connections per SMTP server
+    SMTP_TIMEOUT_SECONDS: int = 30
+
+    # Notification delivery worker
+    NOTIFICATION_WORKER_ENABLED: bool = False  # Run the delivery worker inside the API process
+    NOTIFICATION_BATCH_SIZE: int = 100
+    NOTIFICATION_RETRY_BASE_SECONDS: int = 60  # Doubled on every failed attempt
+    NOTIFICATION_RETRY_MAX_SECONDS: int = 3600
+    NOTIFICATION_CLAIM_TIMEOUT_SECONDS: int = 300  # Claims older than this are released to other workers
+    NOTIFICATION_DIGEST_WINDOW_SECONDS: int = 900  # Low/normal priority topic notifications wait this long to be coalesced; 0 disables
+
+    # Webhook delivery worker
+    WEBHOOK_WORKER_ENABLED: bool = False  # Run the webhook dispatcher inside the API process
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_HTTP2: bool = True
+    WEBHOOK_MAX_CONNECTIONS: int = 100  # Shared HTTP client pool across all endpoints
+    WEBHOOK_ENDPOINT_CONCURRENCY: int = 4  # In-flight requests per webhook
+    WEBHOOK_MAX_ATTEMPTS: int = 6
+    WEBHOOK_RETRY_BASE_SECONDS: int = 30  # Doubled on every failed attempt
+    WEBHOOK_RETRY_MAX_SECONDS: int = 3600
+    WEBHOOK_CLAIM_TIMEOUT_SECONDS: int = 300
+    WEBHOOK_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open an endpoint's circuit
+    WEBHOOK_CIRCUIT_RESET_SECONDS: int = 60  # Open circuits allow a trial request after this long
+    WEBHOOK_INDEX_MAX_AGE_SECONDS: int = 300  # Subscription index reload interval, for changes made by other processes
+
+    # Certificate-based signing
+    CERTIFICATE_CACHE_SIZE: int = 256  # Parsed certificates, chains and unlocked keys held in memory
+    CERTIFICATE_CACHE_TTL_SECONDS: int = 900
+    CERTIFICATE_KEY_CACHE_ENABLED: bool = False  # Keep decrypted private keys in memory between signatures
+    CERTIFICATE_KEY_CACHE_TTL_SECONDS: int = 300
+    SIGNATURE_BATCH_MAX_DOCUMENTS: int = 100
+    SIGNATURE_BATCH_WORKERS: int = 4  # Processes for batch signing crypto; 0 signs on a thread in the API process
+    SIGNATURE_BATCH_MIN_PARALLEL: int = 4  # Smaller batches skip the process pool
+
+    # Signature audit log
+    SIGNATURE_AUDIT_BATCH_SIZE: int = 100  # Buffered events written per insert
+    SIGNATURE_AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0  # Upper bound on how long an event waits in the buffer
+    SIGNATURE_AUDIT_CHECKPOINT_INTERVAL: int = 256  # Chain events per Merkle checkpoint
+    SIGNATURE_AUDIT_HEAD_CACHE_SIZE: int = 10000  # Request chain heads kept in memory
+
+    # Data retention
+    PARTITION_PRECREATE_MONTHS: int = 3  # Monthly partitions created ahead of the current month (PostgreSQL)
+    RETENTION_DELETE_CHUNK_SIZE: int = 1000  # Rows per DELETE ... WHERE id IN (...) batch, each committed
+
+    # GDPR data export
+    DATA_EXPORT_DIR: str = "/tmp/exports"
+    DATA_EXPORT_PAGE_SIZE: int = 500  # Records per keyset page; progress is checkpointed after each
+    DATA_EXPORT_EXPIRY_DAYS: int = 30  # Archives can be downloaded for this long
+    DATA_EXPORT_STALE_SECONDS: int = 300  # Running jobs without progress for this long are resumed
+
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # Bounds how long a change made by another process takes to apply here
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    API_KEY_USAGE_FLUSH_SECONDS: float = 30  # API key usage counters are written this often
+
+    # Compliance metrics
+    COMPLIANCE_METRICS_CACHE_TTL_SECONDS: int = 300  # Upper bound on how stale audit log and export counters get
+
+    # Document templates
+    COMPILED_TEMPLATE_CACHE_SIZE: int = 500  # Compiled templates kept per database
+    TEMPLATE_MERGE_MAX_ROWS: int = 500  # Documents one mail merge may create
+
     # Development
     DEBUG: bool = True
     
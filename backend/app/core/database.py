@@ -25,7 +25,8 @@ def init_db():
     try:
         from app.models import (  # noqa
             user, document, workflow, notification, security, compliance,
-            document_template, external_integration, digital_signature
+            document_template, external_integration, digital_signature, signature, activity,
+            workflow_metrics
         )
     except ImportError as e:
         print(f"Warning: Could not import some models: {e}")
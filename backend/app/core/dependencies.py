@@ -1,6 +1,7 @@
 """
 FastAPI dependencies for authentication and authorization
 """
+from datetime import datetime
 from typing import Optional, List
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -8,11 +9,32 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import verify_token
 from app.models.user import User, UserRole
+from app.services.principal_cache import Principal, principal_cache
 from app.services.user_service import UserService
 
 security = HTTPBearer(auto_error=False)
 
 
+def _user_for_token(token: str, db: Session) -> Optional[User]:
+    """The user a bearer token belongs to, from the principal cache when it was verified recently"""
+    principal = principal_cache.get(db, token)
+    if principal is not None:
+        return principal.user(db)
+
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+
+    user = UserService(db).get_user(user_id)
+    if user is not None and user.is_active:
+        expires_at = datetime.utcfromtimestamp(payload["exp"]) if "exp" in payload else None
+        principal_cache.put(db, token, Principal.from_rows(user), expires_at)
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -24,22 +46,10 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        token = credentials.credentials
-        payload = verify_token(token)
-        
-        if payload is None:
-            raise credentials_exception
-        
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        
-    except Exception:
+    if credentials is None:
         raise credentials_exception
     
-    user_service = UserService(db)
-    user = user_service.get_user(user_id)
+    user = _user_for_token(credentials.credentials, db)
     
     if user is None:
         raise credentials_exception
@@ -124,18 +134,7 @@ async def get_optional_current_user(
         return None
     
     try:
-        token = credentials.credentials
-        payload = verify_token(token)
-        
-        if payload is None:
-            return None
-        
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-        
-        user_service = UserService(db)
-        user = user_service.get_user(user_id)
+        user = _user_for_token(credentials.credentials, db)
         
         if user and user.is_active:
             return user
@@ -60,6 +60,13 @@ def apply_migration(engine, migration_file: Path):
     
     # Apply migration
     with engine.connect() as conn:
+        # Secrets a migration needs are passed as transaction-local settings
+        if engine.dialect.name == "postgresql":
+            conn.execute(
+                text("SELECT set_config('cadms.api_key_hash_secret', :secret, true)"),
+                {"secret": settings.API_KEY_HASH_SECRET}
+            )
+
         # Execute migration
         conn.execute(text(migration_sql))
         
@@ -1,8 +1,11 @@
 """
 Security utilities for authentication and password handling
 """
+import hashlib
+import hmac
+import secrets
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from app.core.config import settings
@@ -93,4 +96,34 @@ def verify_email_token(token: str, token_type: str = "verification") -> Optional
         
         return payload.get("email")
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+# Hex characters of a generated key's public prefix; 64 random bits keep collisions
+# under the unique index negligible, and fit api_keys.key_prefix
+API_KEY_PREFIX_LENGTH = 16
+
+
+def generate_api_key() -> Tuple[str, str]:
+    """Create an API key; returns the key, shown once, and its public prefix"""
+    prefix = secrets.token_hex(API_KEY_PREFIX_LENGTH // 2)
+    return f"{prefix}.{secrets.token_urlsafe(32)}", prefix
+
+
+def api_key_prefix(api_key: str) -> str:
+    """The indexed prefix an API key is looked up by"""
+    prefix, separator, _ = api_key.partition(".")
+    if separator and len(prefix) == API_KEY_PREFIX_LENGTH:
+        return prefix
+    # Keys issued before hashing have no prefix of their own (see migration 012)
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def hash_api_key(api_key: str) -> str:
+    """HMAC-SHA256 of an API key, the only form in which keys are stored"""
+    return hmac.new(settings.API_KEY_HASH_SECRET.encode("utf-8"), api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify_api_key(api_key: str, key_hash: str) -> bool:
+    """Constant-time check of a presented API key against its stored hash"""
+    return hmac.compare_digest(hash_api_key(api_key), key_hash)
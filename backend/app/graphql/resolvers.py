@@ -8,6 +8,7 @@ from fastapi import Depends, HTTPException
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
+from app.core.security import generate_api_key, hash_api_key
 from app.models.document import Document as DocumentModel
 from app.models.document_template import DocumentTemplate as TemplateModel
 from app.models.workflow import Workflow as WorkflowModel, WorkflowInstance as WorkflowInstanceModel
@@ -464,14 +465,12 @@ class Mutation:
         db: Session = info.context["db"]
         current_user = info.context["user"]
 
-        import secrets
-        key_value = secrets.token_urlsafe(32)
-        key_prefix = key_value[:8]
+        key_value, key_prefix = generate_api_key()
 
         api_key = APIKeyModel(
             name=input.name,
-            key_value=key_value,
             key_prefix=key_prefix,
+            key_hash=hash_api_key(key_value),
             permissions=input.permissions,
             is_active=True,
             created_by=current_user.id,
@@ -9,6 +9,17 @@ from app.core.database import get_db
 from app.core.notification_templates import create_default_templates
 from app.services.cache_service import cache_service
 from app.services.cache_monitoring_service import cache_monitoring_service
+from app.services.notification_delivery import start_background_delivery, stop_background_delivery
+from app.services.webhook_delivery import start_background_dispatch, stop_background_dispatch
+from app.services.digital_signature.batch_signing import shutdown_signing_pool
+from app.services.webhook_subscriptions import load_webhook_subscriptions
+from app.services.signature_security_monitor import stop_security_monitor
+from app.services.signature_audit_log import start_audit_flusher, stop_audit_flusher
+from app.services.audit_log_writer import stop_audit_writers
+from app.services.principal_cache import stop_api_key_usage
+from app.services.table_partitions import ensure_table_partitions
+from app.services.user_data_export import start_export_resume
+from app.services.workflow_metrics_service import backfill_workflow_metrics
 from app.middleware.rate_limiting import rate_limit_middleware, init_rate_limiting
 import os
 
@@ -373,16 +384,42 @@ async def startup_event():
     # Create default notification templates
     db = next(get_db())
     create_default_templates(db)
+    # Build the webhook subscription index before the first event fires
+    load_webhook_subscriptions(db)
+    # Monthly partitions for the audit tables, ahead of the rows that will need them
+    ensure_table_partitions(db)
+    # Workflow metric rollups for history recorded before they existed
+    backfill_workflow_metrics(db)
     db.close()
 
     # Start cache monitoring
     cache_monitoring_service.start_background_monitoring()
 
+    # Deliver queued notifications in the background
+    if settings.NOTIFICATION_WORKER_ENABLED:
+        start_background_delivery()
+
+    if settings.WEBHOOK_WORKER_ENABLED:
+        start_background_dispatch()
+
+    # Write buffered signature audit events at least every flush interval
+    start_audit_flusher()
+
+    # Finish data exports interrupted by a restart
+    start_export_resume()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on application shutdown"""
     cache_monitoring_service.stop_background_monitoring()
+    await stop_background_delivery()
+    await stop_background_dispatch()
+    shutdown_signing_pool()
+    await stop_security_monitor()
+    await stop_audit_flusher()
+    stop_audit_writers()
+    stop_api_key_usage()
     await cache_service.disconnect()
 
 
@@ -8,9 +8,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.security import api_key_prefix, verify_api_key
 from app.models.external_integration import APIKey
 from app.models.user import User
-from app.services.cache_service import cache_service
+from app.services.principal_cache import Principal, api_key_usage, principal_cache
 
 
 class APIKeyBearer(HTTPBearer):
@@ -47,32 +48,16 @@ async def get_api_key_user(
 
     api_key_value = credentials.credentials
 
-    # Try cache first
-    cache_key = f"api_key_auth:{api_key_value[:8]}"
-    cached_data = await cache_service.get_json(cache_key)
-
-    if cached_data:
-        # Verify cache is still valid
-        if datetime.fromisoformat(cached_data["expires_at"]) > datetime.utcnow():
-            # Get full objects from database
-            api_key = db.query(APIKey).filter(APIKey.id == cached_data["api_key_id"]).first()
-            user = db.query(User).filter(User.id == cached_data["user_id"]).first()
-
-            if api_key and user and api_key.is_active and user.is_active:
-                # Update last used timestamp
-                api_key.last_used_at = datetime.utcnow()
-                api_key.usage_count += 1
-                db.commit()
-
-                return user, api_key
-
-    # Lookup in database
-    api_key = db.query(APIKey).filter(
-        APIKey.key_value == api_key_value,
-        APIKey.is_active == True
-    ).first()
+    # Try the principal cache first; revoked when the key or its user changes
+    principal = principal_cache.get(db, api_key_value)
+    if principal is not None:
+        api_key_usage.record(db, principal.api_key_id)
+        return principal.user(db), principal.api_key(db)
+
+    # One indexed lookup by prefix, then a constant-time comparison of the hash
+    api_key = db.query(APIKey).filter(APIKey.key_prefix == api_key_prefix(api_key_value)).first()
 
-    if not api_key:
+    if not api_key or not api_key.is_active or not verify_api_key(api_key_value, api_key.key_hash):
         return None
 
     # Check expiration
@@ -88,19 +73,9 @@ async def get_api_key_user(
     if not user:
         return None
 
-    # Update usage statistics
-    api_key.last_used_at = datetime.utcnow()
-    api_key.usage_count += 1
-    db.commit()
-
-    # Cache the result for future lookups
-    cache_data = {
-        "api_key_id": str(api_key.id),
-        "user_id": str(user.id),
-        "expires_at": (api_key.expires_at or datetime(2099, 12, 31)).isoformat(),
-        "permissions": api_key.permissions
-    }
-    await cache_service.set_json(cache_key, cache_data, ttl=1800)  # 30 minutes
+    # Usage statistics are written in batches by the background flusher
+    api_key_usage.record(db, api_key.id)
+    principal_cache.put(db, api_key_value, Principal.from_rows(user, api_key), api_key.expires_at)
 
     return user, api_key
 
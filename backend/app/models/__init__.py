@@ -2,7 +2,10 @@
 from .user import User, UserRole
 from .document import Document
 from .document_history import DocumentHistory
-from .workflow import Workflow, WorkflowStep, WorkflowInstance, WorkflowStepInstance, WorkflowStatus
+from .workflow import Workflow, WorkflowStep, WorkflowInstance, WorkflowStepInstance, WorkflowStatus, BusinessCalendar
+from .activity import ActivityEvent, ActivityFeedEntry
+from .workflow_metrics import WorkflowMetricRollup, WorkflowMetricSketchBin
+from . import signature  # noqa: F401 - registers SignatureRequest for Document.signature_requests
 from .external_integration import (
     ExternalIntegration, IntegrationSyncLog, IntegrationWebhook,
     IntegrationType, IntegrationStatus, APIKey, Webhook, WebhookDelivery,
@@ -18,6 +21,6 @@ from .security import (
 )
 from .compliance import (
     UserConsent, ConsentType, ConsentStatus, ConsentMethod,
-    DataRetentionPolicy, DataDeletionRequest, PrivacyImpactAssessment,
+    DataRetentionPolicy, DataDeletionRequest, DataExportJob, PrivacyImpactAssessment,
     ComplianceReport, DataProcessingActivity
 )
\ No newline at end of file
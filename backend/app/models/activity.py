@@ -0,0 +1,67 @@
+"""
+Activity event log and materialized per-user feeds
+"""
+from sqlalchemy import Column, String, Boolean, DateTime, Text, JSON, ForeignKey, Index
+from sqlalchemy.orm import relationship
+import uuid
+from datetime import datetime
+from app.core.database import Base
+
+
+class ActivityEvent(Base):
+    """Append-only record of something that happened in the system"""
+    __tablename__ = "activity_events"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    activity_type = Column(String(50), nullable=False, index=True)  # e.g. document_created, workflow_completed
+    actor_id = Column(String, nullable=True, index=True)  # User who performed the action (None for system events)
+
+    # Subject of the activity
+    object_type = Column(String(50), nullable=True)  # document, workflow_instance, signature_request, user
+    object_id = Column(String, nullable=True, index=True)
+    document_id = Column(String, nullable=True, index=True)
+    workflow_instance_id = Column(String, nullable=True, index=True)
+
+    # Display data captured at write time so feeds never join back to source tables
+    title = Column(String(255), nullable=True)
+    description = Column(Text, nullable=True)
+    details = Column(JSON, nullable=True)
+    is_private = Column(Boolean, default=False, nullable=False)
+
+    # Fan-out-on-read audience for events addressed to a role ("*" = every user)
+    audience_role = Column(String(50), nullable=True)
+
+    # Set in Python so cursor values round-trip exactly across databases
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False, index=True)
+
+    # Relationships
+    feed_entries = relationship("ActivityFeedEntry", back_populates="event", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('ix_activity_events_audience_created', 'audience_role', 'created_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<ActivityEvent(id={self.id}, type={self.activity_type}, actor_id={self.actor_id})>"
+
+
+class ActivityFeedEntry(Base):
+    """Materialized feed row linking a recipient to an activity event (fan-out-on-write)"""
+    __tablename__ = "activity_feed_entries"
+
+    user_id = Column(String, primary_key=True)
+    event_id = Column(String, ForeignKey("activity_events.id", ondelete="CASCADE"), primary_key=True)
+
+    # Denormalized from the event so feed pages are served from this table's index
+    activity_type = Column(String(50), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Relationships
+    event = relationship("ActivityEvent", back_populates="feed_entries")
+
+    __table_args__ = (
+        Index('ix_activity_feed_entries_user_created', 'user_id', 'created_at', 'event_id'),
+    )
+
+    def __repr__(self):
+        return f"<ActivityFeedEntry(user_id={self.user_id}, event_id={self.event_id})>"
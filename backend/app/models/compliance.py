@@ -1,7 +1,7 @@
 """
 Compliance models for GDPR/CCPA and privacy management
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Enum as SQLEnum, JSON, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Enum as SQLEnum, JSON, Text, Integer, BigInteger, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -172,6 +172,47 @@ class DataDeletionRequest(Base):
         return f"<DataDeletionRequest(id={self.id}, email={self.email}, status={self.status})>"
 
 
+class DataExportJob(Base):
+    """Background GDPR data export (Right to Data Portability), resumable per category"""
+    __tablename__ = "data_export_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: uuid.uuid4().hex)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    requested_by = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    # Request
+    format = Column(String(20), nullable=False, default="json")  # NDJSON ("json") or CSV members
+    data_categories = Column(JSON, nullable=False)  # Categories to export, in archive order
+    include_metadata = Column(Boolean, default=True, nullable=False)
+    anonymize_sensitive = Column(Boolean, default=False, nullable=False)
+
+    # Processing
+    status = Column(String(50), default="pending", nullable=False)  # pending, running, completed, failed
+    progress = Column(JSON, nullable=True)  # Per category: last exported key, records and bytes written
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Result
+    file_path = Column(String(500), nullable=True)
+    file_size = Column(BigInteger, nullable=True)
+    file_hash = Column(String(64), nullable=True)  # SHA-256 of the archive
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    download_count = Column(Integer, default=0, nullable=False)
+    last_downloaded = Column(DateTime(timezone=True), nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('ix_data_export_jobs_status', 'status', 'updated_at'),  # Resuming stalled jobs
+    )
+
+    def __repr__(self):
+        return f"<DataExportJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
+
+
 class PrivacyImpactAssessment(Base):
     """Privacy Impact Assessments (PIAs) for high-risk processing"""
     __tablename__ = "privacy_impact_assessments"
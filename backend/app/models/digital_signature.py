@@ -1,7 +1,7 @@
 """
 Digital Signature models for CA-DMS
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, JSON, ForeignKey, Enum as SQLEnum, LargeBinary
+from sqlalchemy import Column, String, Boolean, Date, DateTime, Integer, Text, JSON, ForeignKey, Enum as SQLEnum, LargeBinary, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -117,7 +117,7 @@ class DigitalSignatureRequest(Base):
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
     # Audit fields
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     created_by = Column(String, ForeignKey("users.id"), nullable=False)
 
@@ -218,6 +218,11 @@ class SignatureEvent(Base):
     # Timestamp
     occurred_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
+    # Hash chain, assigned per request by the audit log appender (NULL for events written directly)
+    sequence = Column(Integer, nullable=True)
+    previous_hash = Column(String(64), nullable=True)
+    event_hash = Column(String(64), nullable=True)
+
     # Audit fields
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -226,10 +231,59 @@ class SignatureEvent(Base):
     signature = relationship("DigitalSignature", back_populates="events")
     user = relationship("User")
 
+    __table_args__ = (
+        Index('ix_signature_events_request_sequence', 'request_id', 'sequence', unique=True),
+        Index('ix_signature_events_framework_occurred', 'legal_framework_applied', 'occurred_at'),
+    )
+
     def __repr__(self):
         return f"<SignatureEvent(id={self.id}, type={self.event_type}, occurred_at={self.occurred_at})>"
 
 
+class SignatureAuditCheckpoint(Base):
+    """Merkle root over a segment of a request's audit hash chain"""
+    __tablename__ = "signature_audit_checkpoints"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    request_id = Column(String, nullable=False)
+
+    # Segment of the chain covered, inclusive
+    first_sequence = Column(Integer, nullable=False)
+    last_sequence = Column(Integer, nullable=False)
+
+    merkle_root = Column(String(64), nullable=False)
+    chain_hash = Column(String(64), nullable=False)  # event_hash at last_sequence
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('ix_signature_audit_checkpoints_request_sequence', 'request_id', 'last_sequence', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<SignatureAuditCheckpoint(request_id={self.request_id}, last_sequence={self.last_sequence})>"
+
+
+
+class SignatureStatisticsRollup(Base):
+    """
+    One day of signature statistics, stored the first time a report covers the day.
+
+    scope/scope_key identify what is being measured:
+      requests -> "*" (requests created that day), compliance -> framework (audit events that day)
+    """
+    __tablename__ = "signature_statistics_rollups"
+
+    scope = Column(String(20), primary_key=True)
+    scope_key = Column(String, primary_key=True)
+    bucket_date = Column(Date, primary_key=True)
+
+    metrics = Column(JSON, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<SignatureStatisticsRollup(scope={self.scope}, key={self.scope_key}, date={self.bucket_date})>"
+
 class SignatureCertificate(Base):
     """Digital certificates for certificate-based signing"""
     __tablename__ = "signature_certificates"
@@ -1,7 +1,7 @@
 """
 External Integration Models for third-party service connections
 """
-from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, JSON, Integer
+from sqlalchemy import Column, String, Text, Boolean, DateTime, ForeignKey, JSON, Integer, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -138,8 +138,8 @@ class APIKey(Base):
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(255), nullable=False)
-    key_value = Column(String(255), nullable=False, unique=True)
-    key_prefix = Column(String(10), nullable=False)  # First 8 chars for display
+    key_prefix = Column(String(16), nullable=False, unique=True, index=True)  # Public part of the key, for lookup and display
+    key_hash = Column(String(64), nullable=False)  # HMAC-SHA256 of the full key; the key itself is not stored
     permissions = Column(JSON, nullable=False, default=list)  # List of allowed endpoints/actions
     is_active = Column(Boolean, default=True, nullable=False)
     created_by = Column(String, nullable=False)
@@ -175,20 +175,39 @@ class Webhook(Base):
         return f"<Webhook {self.name} -> {self.url}>"
 
 
+class WebhookDeliveryStatus(str, Enum):
+    """Webhook delivery outbox states"""
+    PENDING = "pending"        # Queued or waiting for a retry
+    DELIVERED = "delivered"
+    FAILED = "failed"          # Rejected by the endpoint or out of attempts
+
+
 class WebhookDelivery(Base):
-    """Webhook delivery log for tracking webhook calls"""
+    """Webhook delivery outbox entry and log of its attempts"""
     __tablename__ = "webhook_deliveries"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     webhook_id = Column(String, nullable=False)
     event_type = Column(String(100), nullable=False)
     payload = Column(JSON, nullable=False)
+    body = Column(Text, nullable=True)  # Serialized request body, signed and sent as-is
+    status = Column(String(20), default=WebhookDeliveryStatus.PENDING.value, nullable=False)
+    attempt_count = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String(64), nullable=True)  # Dispatch worker holding the delivery
+    claimed_at = Column(DateTime, nullable=True)
     response_status = Column(Integer, nullable=True)
     response_body = Column(Text, nullable=True)
     error_message = Column(Text, nullable=True)
-    delivered_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Queued
+    delivered_at = Column(DateTime, nullable=True)  # Set once the endpoint accepts the delivery
     duration_ms = Column(Integer, nullable=True)  # Response time in milliseconds
 
+    __table_args__ = (
+        Index("ix_webhook_deliveries_outbox", "status", "next_attempt_at"),
+        Index("ix_webhook_deliveries_webhook", "webhook_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<WebhookDelivery {self.event_type} -> {self.response_status}>"
 
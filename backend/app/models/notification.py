@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -19,6 +19,7 @@ class NotificationStatus(enum.Enum):
     DELIVERED = "delivered"
     FAILED = "failed"
     CANCELLED = "cancelled"
+    COALESCED = "coalesced"  # Folded into a digest notification (see digest_id)
 
 
 class NotificationPriority(enum.Enum):
@@ -113,14 +114,27 @@ class Notification(Base):
     retry_count = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
     
+    # Delivery worker claim (see NotificationDeliveryWorker)
+    claimed_by = Column(String(64))
+    claimed_at = Column(DateTime)
+    
+    # Digest coalescing (see NotificationCoalescer): user/channel/topic group and the digest that replaced this row
+    digest_key = Column(String(255))
+    digest_id = Column(Integer, ForeignKey("notifications.id"))
+    
     # Timestamps
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=func.now(), nullable=False, index=True)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     # Relationships
     template = relationship("NotificationTemplate", back_populates="notifications")
     user = relationship("User", back_populates="notifications")
 
+    __table_args__ = (
+        Index("ix_notifications_outbox", "status", "scheduled_at"),
+        Index("ix_notifications_digest", "digest_key", "status"),
+    )
+
 
 class NotificationLog(Base):
     """Audit log for notification events"""
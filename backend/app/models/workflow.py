@@ -59,6 +59,7 @@ class Workflow(Base):
     # Workflow metadata
     version = Column(Integer, default=1, nullable=False)
     is_default = Column(Boolean, default=False, index=True)  # Default workflow for document type
+    business_calendar_id = Column(String, ForeignKey("business_calendars.id"), nullable=True, index=True)  # Working time for due dates and escalations
     
     # Audit fields
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -69,11 +70,35 @@ class Workflow(Base):
     # Relationships
     steps = relationship("WorkflowStep", back_populates="workflow", cascade="all, delete-orphan", order_by="WorkflowStep.step_order")
     instances = relationship("WorkflowInstance", back_populates="workflow")
+    business_calendar = relationship("BusinessCalendar")
 
     def __repr__(self):
         return f"<Workflow(id={self.id}, name={self.name}, status={self.status.value})>"
 
 
+class BusinessCalendar(Base):
+    """Working hours, holidays and time zone used for workflow SLA timing"""
+    __tablename__ = "business_calendars"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    name = Column(String(255), nullable=False, unique=True)
+    description = Column(Text, nullable=True)
+    
+    # Calendar definition
+    timezone = Column(String(64), nullable=False, default="UTC")  # IANA time zone name
+    working_hours = Column(JSON, nullable=True)  # {"mon": [["09:00", "17:00"]], ...}; None means Mon-Fri 9-5
+    holidays = Column(JSON, nullable=True)  # ["2025-12-25", ...] in the calendar's local dates
+    is_default = Column(Boolean, default=False, index=True)  # Used by workflows without a calendar
+    
+    # Audit fields
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    created_by = Column(String, ForeignKey("users.id"), nullable=True)
+
+    def __repr__(self):
+        return f"<BusinessCalendar(id={self.id}, name={self.name}, timezone={self.timezone})>"
+
+
 class WorkflowStep(Base):
     """Individual step in a workflow"""
     __tablename__ = "workflow_steps"
@@ -172,7 +197,7 @@ class WorkflowStepInstance(Base):
     # Execution metadata
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
-    due_date = Column(DateTime(timezone=True), nullable=True)
+    due_date = Column(DateTime(timezone=True), nullable=True, index=True)
     
     # Approval data
     decision = Column(String(20), nullable=True)  # "approved", "rejected", "delegated"
@@ -189,6 +214,7 @@ class WorkflowStepInstance(Base):
     escalated = Column(Boolean, default=False)
     escalated_at = Column(DateTime(timezone=True), nullable=True)
     escalated_to = Column(String, ForeignKey("users.id"), nullable=True)
+    next_escalation_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Next escalation check, see EscalationScheduler
     
     # Audit fields
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
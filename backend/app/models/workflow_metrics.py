@@ -0,0 +1,63 @@
+"""
+Daily workflow metric rollups maintained incrementally on workflow transitions
+"""
+from sqlalchemy import Column, String, Date, Integer, Float, Index
+from app.core.database import Base
+
+
+class WorkflowMetricRollup(Base):
+    """
+    Per-day counters for one workflow, step, user or hour-of-day.
+
+    scope/scope_key identify what is being measured:
+      workflow -> workflow id, step -> step id, user -> assignee id, hour -> "0".."23"
+    Durations are hours from start to decision (steps, users) or completion (workflows).
+    """
+    __tablename__ = "workflow_metric_rollups"
+
+    scope = Column(String(20), primary_key=True)
+    scope_key = Column(String, primary_key=True)
+    bucket_date = Column(Date, primary_key=True)
+
+    workflow_id = Column(String, nullable=True, index=True)
+    label = Column(String(255), nullable=True)  # Step name for step rollups
+
+    # Counters
+    started_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+    approved_count = Column(Integer, default=0, nullable=False)
+    rejected_count = Column(Integer, default=0, nullable=False)
+    escalated_count = Column(Integer, default=0, nullable=False)
+
+    # Duration aggregates
+    duration_count = Column(Integer, default=0, nullable=False)
+    duration_sum_hours = Column(Float, default=0.0, nullable=False)
+    duration_min_hours = Column(Float, nullable=True)
+    duration_max_hours = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index('ix_workflow_metric_rollups_scope_date', 'scope', 'bucket_date'),
+    )
+
+    def __repr__(self):
+        return f"<WorkflowMetricRollup(scope={self.scope}, key={self.scope_key}, date={self.bucket_date})>"
+
+
+class WorkflowMetricSketchBin(Base):
+    """
+    One bin of a mergeable log-bucketed duration sketch for a rollup row.
+
+    Bins from any set of days can be summed to answer quantile queries with
+    bounded relative error.
+    """
+    __tablename__ = "workflow_metric_sketch_bins"
+
+    scope = Column(String(20), primary_key=True)
+    scope_key = Column(String, primary_key=True)
+    bucket_date = Column(Date, primary_key=True)
+    bin = Column(Integer, primary_key=True)
+
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<WorkflowMetricSketchBin(scope={self.scope}, key={self.scope_key}, bin={self.bin})>"
@@ -178,11 +178,11 @@ class PrivacyImpactAssessmentBase(BaseModel):
     individual_rights_impact: Optional[str] = None
     safeguards_implemented: Optional[List[str]] = None
     identified_risks: List[Dict[str, Any]]
-    risk_likelihood: str = Field(..., regex="^(low|medium|high)$")
-    risk_impact: str = Field(..., regex="^(low|medium|high)$")
-    overall_risk_level: str = Field(..., regex="^(low|medium|high)$")
+    risk_likelihood: str = Field(..., pattern="^(low|medium|high)$")
+    risk_impact: str = Field(..., pattern="^(low|medium|high)$")
+    overall_risk_level: str = Field(..., pattern="^(low|medium|high)$")
     mitigation_measures: List[Dict[str, Any]]
-    residual_risk_level: str = Field(..., regex="^(low|medium|high)$")
+    residual_risk_level: str = Field(..., pattern="^(low|medium|high)$")
     dpo_consulted: bool = False
     dpo_consultation_date: Optional[datetime] = None
     dpo_opinion: Optional[str] = None
@@ -211,11 +211,11 @@ class PrivacyImpactAssessmentUpdate(BaseModel):
     individual_rights_impact: Optional[str] = None
     safeguards_implemented: Optional[List[str]] = None
     identified_risks: Optional[List[Dict[str, Any]]] = None
-    risk_likelihood: Optional[str] = Field(None, regex="^(low|medium|high)$")
-    risk_impact: Optional[str] = Field(None, regex="^(low|medium|high)$")
-    overall_risk_level: Optional[str] = Field(None, regex="^(low|medium|high)$")
+    risk_likelihood: Optional[str] = Field(None, pattern="^(low|medium|high)$")
+    risk_impact: Optional[str] = Field(None, pattern="^(low|medium|high)$")
+    overall_risk_level: Optional[str] = Field(None, pattern="^(low|medium|high)$")
     mitigation_measures: Optional[List[Dict[str, Any]]] = None
-    residual_risk_level: Optional[str] = Field(None, regex="^(low|medium|high)$")
+    residual_risk_level: Optional[str] = Field(None, pattern="^(low|medium|high)$")
     dpo_consulted: Optional[bool] = None
     dpo_consultation_date: Optional[datetime] = None
     dpo_opinion: Optional[str] = None
@@ -354,7 +354,7 @@ class DataProcessingActivity(DataProcessingActivityBase):
 class UserDataExportRequest(BaseModel):
     user_id: str
     data_categories: Optional[List[str]] = None  # If None, export all data
-    format: str = Field("json", regex="^(json|csv|xml)$")
+    format: str = Field("json", pattern="^(json|csv|xml)$")
     include_metadata: bool = True
     anonymize_sensitive: bool = False
 
@@ -373,9 +373,32 @@ class UserDataExport(BaseModel):
     last_downloaded: Optional[datetime] = None
 
 
+class DataExportJob(BaseModel):
+    id: str
+    user_id: str
+    format: str
+    data_categories: List[str]
+    include_metadata: bool
+    anonymize_sensitive: bool
+    status: str
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    file_size: Optional[int] = None
+    file_hash: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    download_count: int
+    last_downloaded: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # Consent management batch operations
 class ConsentBatchOperation(BaseModel):
-    operation: str = Field(..., regex="^(grant|deny|withdraw|update)$")
+    operation: str = Field(..., pattern="^(grant|deny|withdraw|update)$")
     consent_types: List[ConsentTypeEnum]
     user_ids: Optional[List[str]] = None  # If None, applies to all users
     reason: Optional[str] = None
@@ -401,6 +424,7 @@ class ComplianceMetrics(BaseModel):
     data_exports: Dict[str, Any]
     audit_summary: Dict[str, Any]
     generated_at: datetime
+    computed_at: Optional[datetime] = None  # When the cached aggregates were computed
 
 
 # Compliance dashboard summary
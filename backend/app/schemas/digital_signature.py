@@ -293,6 +293,8 @@ class SignatureStatistics(BaseModel):
     declined_requests: int
     expired_requests: int
     average_completion_time_hours: Optional[float] = None
+    median_completion_time_hours: Optional[float] = None
+    p90_completion_time_hours: Optional[float] = None
     completion_rate: float
 
 
@@ -319,4 +321,46 @@ class SignatureCallbackData(BaseModel):
     success: bool
     request_id: str
     message: Optional[str] = None
-    redirect_url: Optional[str] = None
\ No newline at end of file
+    redirect_url: Optional[str] = None
+
+# Batch Signing Schemas
+class BatchDocumentItem(BaseModel):
+    document_id: str = Field(..., min_length=1)
+    content: str = Field(..., min_length=1, description="PDF content, base64 encoded")
+    title: Optional[str] = Field(None, max_length=500)
+
+
+class BatchSignRequest(BaseModel):
+    provider_id: str = Field(..., min_length=1)
+    certificate_id: str = Field(..., min_length=1)
+    private_key_password: Optional[str] = None
+    reason: str = Field("Document approval", max_length=255)
+    location: str = Field("CA-DMS", max_length=255)
+    message: Optional[str] = None
+    legal_notice: Optional[str] = None
+    compliance_framework: ComplianceFramework = ComplianceFramework.ESIGN_ACT
+    authentication_required: bool = True
+    documents: List[BatchDocumentItem] = Field(..., min_length=1)
+
+
+class BatchVerifyRequest(BaseModel):
+    certificate_id: str = Field(..., min_length=1)
+    documents: List[BatchDocumentItem] = Field(..., min_length=1)
+
+
+class BatchItemResponse(BaseModel):
+    document_id: str
+    success: bool
+    request_id: Optional[str] = None
+    signed_content: Optional[str] = None  # Base64 encoded
+    signature_intact: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class BatchSignatureResponse(BaseModel):
+    batch_id: str
+    total: int
+    succeeded: int
+    failed: int
+    compliance_validations: int = 0
+    results: List[BatchItemResponse] = []
@@ -47,6 +47,16 @@ class DocumentList(BaseModel):
     limit: int
 
 
+class DocumentMetricsResponse(BaseModel):
+    """Schema for document content metrics"""
+    document_id: str
+    version: int
+    content_length: int
+    word_count: int
+    placeholder_count: int
+    complexity_score: int
+
+
 class PlaceholderMetadata(BaseModel):
     """Schema for placeholder metadata"""
     signatures: List[Dict[str, Any]] = Field(default_factory=list)
@@ -1,9 +1,11 @@
 """
 Pydantic schemas for document templates
 """
+import csv
+import io
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, validator, Field
+from pydantic import BaseModel, validator, model_validator, Field
 from app.models.document_template import TemplateCategory, TemplateAccessLevel, TemplateStatus
 
 
@@ -269,6 +271,35 @@ class TemplateInstanceResponse(BaseModel):
     created_at: datetime
 
 
+class TemplateMergeRequest(BaseModel):
+    """Field values for a mail merge, as JSON rows or CSV text with a header row"""
+    rows: Optional[List[Dict[str, Any]]] = None
+    csv_data: Optional[str] = None
+    title_pattern: Optional[str] = Field(None, max_length=255)  # Defaults to the template's title pattern
+    document_type: str = "governance"
+
+    @model_validator(mode="after")
+    def check_one_source(self):
+        if (self.rows is None) == (self.csv_data is None):
+            raise ValueError("Provide either rows or csv_data")
+        return self
+
+    def field_rows(self) -> List[Dict[str, Any]]:
+        if self.rows is not None:
+            return self.rows
+        return [
+            {field: value for field, value in row.items() if field is not None}  # Drops cells past the header
+            for row in csv.DictReader(io.StringIO(self.csv_data))
+        ]
+
+
+class TemplateMergeResponse(BaseModel):
+    template_id: str
+    template_name: str
+    documents: List[TemplateInstanceResponse]
+    total_created: int
+
+
 # Batch Operations
 
 class BulkTemplateAction(BaseModel):
@@ -268,6 +268,11 @@ class APIKeyResponse(BaseModel):
     usage_count: int
 
 
+class APIKeyCreatedResponse(APIKeyResponse):
+    """Schema for a newly created API key, the only response that includes the key"""
+    key_value: str
+
+
 class APIKeyUpdate(BaseModel):
     """Schema for updating API keys"""
     name: Optional[str] = None
@@ -322,10 +327,14 @@ class WebhookDeliveryResponse(BaseModel):
     webhook_id: str
     event_type: str
     payload: Dict[str, Any]
+    status: str = "delivered"
+    attempt_count: int = 0
+    next_attempt_at: Optional[datetime] = None
     response_status: Optional[int] = None
     response_body: Optional[str] = None
     error_message: Optional[str] = None
-    delivered_at: datetime
+    created_at: datetime
+    delivered_at: Optional[datetime] = None
     duration_ms: Optional[int] = None
 
 
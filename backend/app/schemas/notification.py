@@ -158,6 +158,8 @@ class NotificationStatsResponse(BaseModel):
     sent_notifications: int
     failed_notifications: int
     delivery_rate: float
+    coalesced_notifications: int = 0
+    sends_saved: int = 0  # Coalesced notifications minus the digests that replaced them
 
 
 class UserNotificationPreferencesUpdate(BaseModel):
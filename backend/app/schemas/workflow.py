@@ -71,6 +71,7 @@ class WorkflowBase(BaseModel):
     trigger_conditions: Optional[Dict[str, Any]] = None
     status: WorkflowStatus = WorkflowStatus.DRAFT
     is_default: bool = False
+    business_calendar_id: Optional[str] = None
 
 
 class WorkflowCreate(WorkflowBase):
@@ -86,6 +87,7 @@ class WorkflowUpdate(BaseModel):
     trigger_conditions: Optional[Dict[str, Any]] = None
     status: Optional[WorkflowStatus] = None
     is_default: Optional[bool] = None
+    business_calendar_id: Optional[str] = None
 
 
 class WorkflowResponse(WorkflowBase):
@@ -318,6 +318,40 @@ class EscalationRuleResponse(EscalationRuleBase):
         from_attributes = True
 
 
+class BusinessCalendarBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255, description="Name of the business calendar")
+    description: Optional[str] = Field(None, description="Description of the business calendar")
+    timezone: str = Field("UTC", max_length=64, description="IANA time zone of the working hours")
+    working_hours: Optional[Dict[str, List[List[str]]]] = Field(
+        None, description='Working spans per weekday, e.g. {"mon": [["09:00", "17:00"]]}; defaults to Mon-Fri 9-5'
+    )
+    holidays: Optional[List[str]] = Field(None, description="Non-working dates (YYYY-MM-DD)")
+    is_default: bool = Field(False, description="Use for workflows without their own calendar")
+
+
+class BusinessCalendarCreate(BusinessCalendarBase):
+    pass
+
+
+class BusinessCalendarUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=255)
+    description: Optional[str] = None
+    timezone: Optional[str] = Field(None, max_length=64)
+    working_hours: Optional[Dict[str, List[List[str]]]] = None
+    holidays: Optional[List[str]] = None
+    is_default: Optional[bool] = None
+
+
+class BusinessCalendarResponse(BusinessCalendarBase):
+    id: str
+    created_at: datetime
+    updated_at: datetime
+    created_by: Optional[str]
+    
+    class Config:
+        from_attributes = True
+
+
 # =========================================================================
 # Evaluation and Execution Schemas
 # =========================================================================
@@ -2,18 +2,90 @@
 Activity Feed Service
 Business logic for user activity feed aggregation, timeline management, and real-time updates
 """
+import base64
 import logging
 import json
 import hashlib
+import uuid
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List, Union
-from sqlalchemy import text, create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Dict, Any, Optional, List, Union, Iterable, Tuple
+from sqlalchemy import create_engine, and_, or_
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from app.core.config import settings
+from app.core.database import Base
+from app.models.activity import ActivityEvent, ActivityFeedEntry
+from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+# Audience value for events every user should see
+BROADCAST_AUDIENCE = "*"
+
+# Recipient lists larger than this are logged; address such audiences by role instead
+FANOUT_ON_WRITE_LIMIT = 500
+
+
+def record_activity(db: Session, activity_type: str, actor_id: Optional[str] = None,
+                    recipients: Optional[Iterable[str]] = None, audience_role: Optional[str] = None,
+                    object_type: Optional[str] = None, object_id: Optional[str] = None,
+                    document_id: Optional[str] = None, workflow_instance_id: Optional[str] = None,
+                    title: Optional[str] = None, description: Optional[str] = None,
+                    details: Optional[Dict[str, Any]] = None, is_private: bool = False) -> Optional[ActivityEvent]:
+    """
+    Append an activity event and fan it out to recipient feeds
+
+    Rows are added to the caller's session without committing, so the event
+    is written in the same transaction as the change it describes. Named
+    recipients (plus the actor) get a feed entry each; large audiences should
+    be addressed with ``audience_role`` (a role value or ``BROADCAST_AUDIENCE``)
+    and are merged into feeds at read time instead.
+
+    Returns:
+        The pending ActivityEvent, or None if it could not be recorded
+    """
+    try:
+        event = ActivityEvent(
+            id=str(uuid.uuid4()),
+            activity_type=activity_type,
+            actor_id=actor_id,
+            object_type=object_type,
+            object_id=object_id,
+            document_id=document_id,
+            workflow_instance_id=workflow_instance_id,
+            title=title[:255] if title else title,
+            description=description,
+            details=details,
+            is_private=is_private,
+            audience_role=audience_role,
+            created_at=datetime.utcnow()
+        )
+        user_ids = {user_id for user_id in (recipients or []) if user_id}
+        if actor_id:
+            user_ids.add(actor_id)
+        if len(user_ids) > FANOUT_ON_WRITE_LIMIT:
+            logger.warning(
+                f"Activity {activity_type} fanned out to {len(user_ids)} feeds; "
+                f"consider addressing this audience by role"
+            )
+
+        entries = [
+            ActivityFeedEntry(
+                user_id=user_id,
+                event_id=event.id,
+                activity_type=activity_type,
+                created_at=event.created_at
+            )
+            for user_id in sorted(user_ids)
+        ]
+
+        db.add_all([event] + entries)
+        return event
+
+    except Exception as e:
+        logger.error(f"Failed to record activity {activity_type}: {e}")
+        return None
+
 
 class ActivityFeedService:
     """Service for managing user activity feeds and timeline aggregation"""
@@ -28,6 +100,14 @@ class ActivityFeedService:
         )
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
 
+        # Ensure the activity log tables exist on this engine
+        try:
+            Base.metadata.create_all(
+                bind=self.engine, tables=[ActivityEvent.__table__, ActivityFeedEntry.__table__]
+            )
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not create activity tables: {e}")
+
         # Cache configuration
         self.cache = {}  # Simple in-memory cache (could be replaced with Redis)
         self.cache_ttl = {
@@ -50,7 +130,10 @@ class ActivityFeedService:
             'user_login': '🔑',
             'user_profile_updated': '👥',
             'system_backup': '💾',
-            'system_maintenance': '🔧'
+            'system_maintenance': '🔧',
+            'signature_requested': '✍️',
+            'signature_completed': '🖋️',
+            'signature_declined': '🚫'
         }
 
         self.activity_colors = {
@@ -65,7 +148,10 @@ class ActivityFeedService:
             'user_login': '#3F51B5',
             'user_profile_updated': '#795548',
             'system_backup': '#009688',
-            'system_maintenance': '#FF5722'
+            'system_maintenance': '#FF5722',
+            'signature_requested': '#673AB7',
+            'signature_completed': '#4CAF50',
+            'signature_declined': '#F44336'
         }
 
     async def get_user_activity_feed(self, user_id: str, limit: int = 25, page_token: Optional[str] = None,
@@ -75,10 +161,13 @@ class ActivityFeedService:
         """
         Get comprehensive activity feed for a specific user
 
+        Reads the user's materialized feed merged with role/broadcast events,
+        using a (timestamp, event id) cursor so each page costs O(limit).
+
         Args:
             user_id: User ID to get activity feed for
             limit: Maximum number of activities to return
-            page_token: Token for pagination
+            page_token: Cursor returned as next_page_token by the previous page
             activity_types: Filter by specific activity types
             start_date: Start date for filtering activities
             end_date: End date for filtering activities
@@ -107,49 +196,40 @@ class ActivityFeedService:
             return self.cache[cache_key]['data']
 
         try:
-            # Get activities from different sources
-            document_activities = await self.get_document_activities(
-                user_id, limit=limit//2, activity_types=activity_types,
-                start_date=start_date, end_date=end_date
-            )
-
-            workflow_activities = await self.get_workflow_activities(
-                user_id, limit=limit//3, activity_types=activity_types,
-                start_date=start_date, end_date=end_date
-            )
+            cursor = self._decode_page_token(page_token) if page_token else None
 
-            system_activities = await self.get_system_activities(
-                user_id, limit=limit//6, activity_types=activity_types,
-                start_date=start_date, end_date=end_date
-            )
-
-            # Combine and sort all activities
-            all_activities = document_activities + workflow_activities + system_activities
-
-            # Sort by timestamp (most recent first)
-            all_activities.sort(key=lambda x: x.get('timestamp', datetime.min), reverse=True)
+            db = self.SessionLocal()
+            try:
+                # Fetch one extra row to learn whether another page exists
+                events = self._read_feed(
+                    db, user_id, limit + 1, cursor=cursor, activity_types=activity_types,
+                    start_date=start_date, end_date=end_date
+                )
+            finally:
+                db.close()
 
-            # Apply pagination
-            offset = self._decode_page_token(page_token) if page_token else 0
-            paginated_activities = all_activities[offset:offset + limit]
+            has_more = len(events) > limit
+            page_events = events[:limit]
 
             # Format activities
             formatted_activities = [
-                self.format_activity_item(activity) for activity in paginated_activities
+                self.format_activity_item(self._event_to_activity(event)) for event in page_events
             ]
 
             # Aggregate similar activities if requested
             if aggregate_similar:
                 formatted_activities = self._aggregate_similar_activities(formatted_activities)
 
-            # Generate next page token
-            has_more = len(all_activities) > offset + limit
-            next_page_token = self._encode_page_token(offset + limit) if has_more else None
+            # Generate next page token from the last event on this page
+            next_page_token = None
+            if has_more and page_events:
+                last_event = page_events[-1]
+                next_page_token = self._encode_page_token(last_event.created_at, last_event.id)
 
             activity_feed = {
                 'user_id': user_id,
                 'activities': formatted_activities,
-                'total_count': len(all_activities),
+                'total_count': len(page_events),  # Items on this page; feeds are not counted in full
                 'has_more': has_more,
                 'next_page_token': next_page_token,
                 'last_updated': datetime.utcnow().isoformat(),
@@ -188,96 +268,9 @@ class ActivityFeedService:
         Returns:
             List of document activity items
         """
-        cache_key = f"document_activities_{user_id}_{limit}"
-
-        # Check cache first
-        if not (start_date or end_date or activity_types) and self._is_cache_valid(cache_key):
-            return self.cache[cache_key]['data']
-
-        try:
-            db = self.SessionLocal()
-            try:
-                # Build activity type filter
-                type_filter = ""
-                if activity_types:
-                    doc_types = [t for t in activity_types if t.startswith('document_')]
-                    if doc_types:
-                        quoted_types = ','.join([f"'{t}'" for t in doc_types])
-                        type_filter = f"AND activity_type IN ({quoted_types})"
-
-                # Build date filter
-                date_filter = ""
-                if start_date:
-                    date_filter += f" AND datetime(timestamp) >= datetime('{start_date.isoformat()}')"
-                if end_date:
-                    date_filter += f" AND datetime(timestamp) <= datetime('{end_date.isoformat()}')"
-
-                # Query document activities
-                activities = db.execute(text(f"""
-                    SELECT
-                        'doc_' || d.id || '_' || strftime('%s', d.updated_at) as activity_id,
-                        CASE
-                            WHEN d.created_at = d.updated_at THEN 'document_created'
-                            WHEN d.status = 'published' THEN 'document_published'
-                            ELSE 'document_updated'
-                        END as activity_type,
-                        d.id as document_id,
-                        d.title as document_title,
-                        d.document_type,
-                        d.created_by as user_id,
-                        d.updated_at as timestamp,
-                        json_object(
-                            'document_type', d.document_type,
-                            'status', d.status,
-                            'version', COALESCE(d.version, 1)
-                        ) as metadata
-                    FROM documents d
-                    WHERE (d.created_by = :user_id OR d.id IN (
-                        SELECT DISTINCT wi.document_id
-                        FROM workflow_instances wi
-                        JOIN workflow_step_instances wsi ON wsi.workflow_instance_id = wi.id
-                        WHERE wsi.assigned_to = :user_id
-                    ))
-                    {type_filter}
-                    {date_filter}
-                    ORDER BY d.updated_at DESC
-                    LIMIT :limit
-                """), {"user_id": user_id, "limit": limit}).fetchall()
-
-                document_activities = []
-                for activity in activities:
-                    try:
-                        metadata = json.loads(activity.metadata) if activity.metadata else {}
-                    except (json.JSONDecodeError, TypeError):
-                        metadata = {}
-
-                    document_activities.append({
-                        'activity_id': activity.activity_id,
-                        'activity_type': activity.activity_type,
-                        'document_id': activity.document_id,
-                        'document_title': activity.document_title,
-                        'document_type': activity.document_type,
-                        'user_id': activity.user_id,
-                        'timestamp': activity.timestamp,
-                        'metadata': metadata,
-                        'is_private': False  # Document activities are generally visible
-                    })
-
-                # Cache the result (only if no filters)
-                if not (start_date or end_date or activity_types):
-                    self._cache_data(cache_key, document_activities)
-
-                return document_activities
-
-            finally:
-                db.close()
-
-        except SQLAlchemyError as e:
-            logger.error(f"Database error getting document activities for user {user_id}: {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Unexpected error getting document activities for user {user_id}: {e}")
-            return []
+        return self._get_category_activities(
+            'document_activities', 'document', user_id, limit, activity_types, start_date, end_date
+        )
 
     async def get_workflow_activities(self, user_id: str, limit: int = 10,
                                     activity_types: Optional[List[str]] = None,
@@ -296,101 +289,9 @@ class ActivityFeedService:
         Returns:
             List of workflow activity items
         """
-        cache_key = f"workflow_activities_{user_id}_{limit}"
-
-        # Check cache first
-        if not (start_date or end_date or activity_types) and self._is_cache_valid(cache_key):
-            return self.cache[cache_key]['data']
-
-        try:
-            db = self.SessionLocal()
-            try:
-                # Build activity type filter
-                type_filter = ""
-                if activity_types:
-                    wf_types = [t for t in activity_types if t.startswith('workflow_')]
-                    if wf_types:
-                        quoted_types = ','.join([f"'{t}'" for t in wf_types])
-                        type_filter = f"AND activity_type IN ({quoted_types})"
-
-                # Build date filter
-                date_filter = ""
-                if start_date:
-                    date_filter += f" AND datetime(timestamp) >= datetime('{start_date.isoformat()}')"
-                if end_date:
-                    date_filter += f" AND datetime(timestamp) <= datetime('{end_date.isoformat()}')"
-
-                # Query workflow activities
-                activities = db.execute(text(f"""
-                    SELECT
-                        'wf_' || wi.id || '_' || strftime('%s', wi.updated_at) as activity_id,
-                        CASE
-                            WHEN wi.status = 'completed' THEN 'workflow_completed'
-                            WHEN wi.status = 'rejected' THEN 'workflow_rejected'
-                            WHEN wi.created_at = wi.updated_at THEN 'workflow_started'
-                            ELSE 'workflow_updated'
-                        END as activity_type,
-                        wi.id as workflow_instance_id,
-                        wi.workflow_id,
-                        d.title as document_title,
-                        d.document_type,
-                        wi.initiated_by as user_id,
-                        wi.updated_at as timestamp,
-                        wsi.step_name,
-                        wsi.assigned_to,
-                        json_object(
-                            'workflow_name', w.name,
-                            'status', wi.status,
-                            'step_count', (SELECT COUNT(*) FROM workflow_step_instances WHERE workflow_instance_id = wi.id)
-                        ) as metadata
-                    FROM workflow_instances wi
-                    JOIN documents d ON d.id = wi.document_id
-                    JOIN workflows w ON w.id = wi.workflow_id
-                    LEFT JOIN workflow_step_instances wsi ON wsi.workflow_instance_id = wi.id AND wsi.assigned_to = :user_id
-                    WHERE wi.initiated_by = :user_id OR wsi.assigned_to = :user_id
-                    {type_filter}
-                    {date_filter}
-                    ORDER BY wi.updated_at DESC
-                    LIMIT :limit
-                """), {"user_id": user_id, "limit": limit}).fetchall()
-
-                workflow_activities = []
-                for activity in activities:
-                    try:
-                        metadata = json.loads(activity.metadata) if activity.metadata else {}
-                    except (json.JSONDecodeError, TypeError):
-                        metadata = {}
-
-                    workflow_activities.append({
-                        'activity_id': activity.activity_id,
-                        'activity_type': activity.activity_type,
-                        'workflow_instance_id': activity.workflow_instance_id,
-                        'workflow_id': activity.workflow_id,
-                        'document_title': activity.document_title,
-                        'document_type': activity.document_type,
-                        'user_id': activity.user_id,
-                        'timestamp': activity.timestamp,
-                        'step_name': activity.step_name,
-                        'assigned_to': activity.assigned_to,
-                        'metadata': metadata,
-                        'is_private': False  # Workflow activities are visible to participants
-                    })
-
-                # Cache the result (only if no filters)
-                if not (start_date or end_date or activity_types):
-                    self._cache_data(cache_key, workflow_activities)
-
-                return workflow_activities
-
-            finally:
-                db.close()
-
-        except SQLAlchemyError as e:
-            logger.error(f"Database error getting workflow activities for user {user_id}: {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Unexpected error getting workflow activities for user {user_id}: {e}")
-            return []
+        return self._get_category_activities(
+            'workflow_activities', 'workflow', user_id, limit, activity_types, start_date, end_date
+        )
 
     async def get_system_activities(self, user_id: str, limit: int = 5,
                                   activity_types: Optional[List[str]] = None,
@@ -409,102 +310,155 @@ class ActivityFeedService:
         Returns:
             List of system activity items
         """
-        cache_key = f"system_activities_{user_id}_{limit}"
+        return self._get_category_activities(
+            'system_activities', 'system', user_id, limit, activity_types, start_date, end_date
+        )
+
+    def _get_category_activities(self, cache_prefix: str, category: str, user_id: str, limit: int,
+                                 activity_types: Optional[List[str]], start_date: Optional[datetime],
+                                 end_date: Optional[datetime]) -> List[Dict[str, Any]]:
+        """Read one category (document/workflow/system) of a user's feed"""
+        cache_key = f"{cache_prefix}_{user_id}_{limit}"
+        unfiltered = not (start_date or end_date or activity_types)
 
         # Check cache first
-        if not (start_date or end_date or activity_types) and self._is_cache_valid(cache_key):
+        if unfiltered and self._is_cache_valid(cache_key):
             return self.cache[cache_key]['data']
 
         try:
             db = self.SessionLocal()
             try:
-                # Build activity type filter
-                type_filter = ""
-                if activity_types:
-                    sys_types = [t for t in activity_types if not t.startswith(('document_', 'workflow_'))]
-                    if sys_types:
-                        quoted_types = ','.join([f"'{t}'" for t in sys_types])
-                        type_filter = f"AND activity_type IN ({quoted_types})"
-
-                # Build date filter
-                date_filter = ""
-                if start_date:
-                    date_filter += f" AND datetime(timestamp) >= datetime('{start_date.isoformat()}')"
-                if end_date:
-                    date_filter += f" AND datetime(timestamp) <= datetime('{end_date.isoformat()}')"
-
-                # Query system activities (simulated from user activities)
-                activities = db.execute(text(f"""
-                    SELECT
-                        'sys_' || u.id || '_' || strftime('%s', u.last_login) as activity_id,
-                        'user_login' as activity_type,
-                        u.id as user_id,
-                        u.last_login as timestamp,
-                        'User logged in' as description,
-                        json_object(
-                            'ip_address', 'xxx.xxx.xxx.xxx',
-                            'user_agent', 'Browser'
-                        ) as metadata
-                    FROM users u
-                    WHERE u.id = :user_id
-                    AND u.last_login IS NOT NULL
-                    {type_filter}
-                    {date_filter}
-
-                    UNION ALL
-
-                    SELECT
-                        'sys_profile_' || u.id || '_' || strftime('%s', u.updated_at) as activity_id,
-                        'user_profile_updated' as activity_type,
-                        u.id as user_id,
-                        u.updated_at as timestamp,
-                        'Profile updated' as description,
-                        json_object(
-                            'fields_updated', 'profile'
-                        ) as metadata
-                    FROM users u
-                    WHERE u.id = :user_id
-                    AND u.updated_at != u.created_at
-                    {type_filter}
-                    {date_filter}
-
-                    ORDER BY timestamp DESC
-                    LIMIT :limit
-                """), {"user_id": user_id, "limit": limit}).fetchall()
-
-                system_activities = []
-                for activity in activities:
-                    try:
-                        metadata = json.loads(activity.metadata) if activity.metadata else {}
-                    except (json.JSONDecodeError, TypeError):
-                        metadata = {}
-
-                    system_activities.append({
-                        'activity_id': activity.activity_id,
-                        'activity_type': activity.activity_type,
-                        'user_id': activity.user_id,
-                        'timestamp': activity.timestamp,
-                        'description': activity.description,
-                        'metadata': metadata,
-                        'is_private': True  # System activities are private to the user
-                    })
-
-                # Cache the result (only if no filters)
-                if not (start_date or end_date or activity_types):
-                    self._cache_data(cache_key, system_activities)
-
-                return system_activities
-
+                events = self._read_feed(
+                    db, user_id, limit, activity_types=activity_types, start_date=start_date,
+                    end_date=end_date, category=category
+                )
             finally:
                 db.close()
 
+            activities = [self._event_to_activity(event) for event in events]
+
+            # Cache the result (only if no filters)
+            if unfiltered:
+                self._cache_data(cache_key, activities)
+
+            return activities
+
         except SQLAlchemyError as e:
-            logger.error(f"Database error getting system activities for user {user_id}: {e}")
+            logger.error(f"Database error getting {category} activities for user {user_id}: {e}")
             return []
         except Exception as e:
-            logger.error(f"Unexpected error getting system activities for user {user_id}: {e}")
+            logger.error(f"Unexpected error getting {category} activities for user {user_id}: {e}")
             return []
 
+    def _audiences_for_user(self, db: Session, user_id: str) -> List[str]:
+        """Broadcast plus the user's role; broadcast only if the role cannot be read"""
+        audiences = [BROADCAST_AUDIENCE]
+        try:
+            # Savepoint, so a failed lookup does not abort the feed's transaction
+            with db.begin_nested():
+                role = db.query(User.role).filter(User.id == user_id).scalar()
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not read role of user {user_id}, showing broadcast activity only: {e}")
+            return audiences
+        if role is not None:
+            audiences.append(role.value if hasattr(role, 'value') else str(role))
+        return audiences
+
+    def _read_feed(self, db: Session, user_id: str, limit: int,
+                   cursor: Optional[Tuple[datetime, str]] = None,
+                   activity_types: Optional[List[str]] = None,
+                   start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None,
+                   category: Optional[str] = None) -> List[ActivityEvent]:
+        """
+        Read up to ``limit`` events for a user, newest first.
+
+        Merges two keyset-paginated index scans: the user's materialized feed
+        entries (fan-out-on-write) and events addressed to the user's role or
+        to everyone (fan-out-on-read).
+        """
+        # Materialized feed entries
+        entry_query = db.query(ActivityEvent).join(
+            ActivityFeedEntry, ActivityFeedEntry.event_id == ActivityEvent.id
+        ).filter(ActivityFeedEntry.user_id == user_id)
+        entry_query = self._apply_feed_filters(
+            entry_query, ActivityFeedEntry.created_at, ActivityFeedEntry.event_id,
+            ActivityFeedEntry.activity_type, cursor, activity_types, start_date, end_date, category
+        )
+        events = entry_query.order_by(
+            ActivityFeedEntry.created_at.desc(), ActivityFeedEntry.event_id.desc()
+        ).limit(limit).all()
+
+        # Role and broadcast events
+        audiences = self._audiences_for_user(db, user_id)
+        audience_query = db.query(ActivityEvent).filter(ActivityEvent.audience_role.in_(audiences))
+        audience_query = self._apply_feed_filters(
+            audience_query, ActivityEvent.created_at, ActivityEvent.id,
+            ActivityEvent.activity_type, cursor, activity_types, start_date, end_date, category
+        )
+        events.extend(
+            audience_query.order_by(ActivityEvent.created_at.desc(), ActivityEvent.id.desc()).limit(limit).all()
+        )
+
+        # Merge both streams, dropping events that reached the user through both paths
+        merged = {event.id: event for event in events}
+        ordered = sorted(merged.values(), key=lambda e: (e.created_at, e.id), reverse=True)
+        return ordered[:limit]
+
+    def _apply_feed_filters(self, query, created_col, id_col, type_col,
+                            cursor: Optional[Tuple[datetime, str]],
+                            activity_types: Optional[List[str]],
+                            start_date: Optional[datetime],
+                            end_date: Optional[datetime],
+                            category: Optional[str]):
+        """Apply cursor, type, category and date filters to a feed query"""
+        if cursor:
+            cursor_time, cursor_id = cursor
+            query = query.filter(or_(
+                created_col < cursor_time,
+                and_(created_col == cursor_time, id_col < cursor_id)
+            ))
+
+        if category == 'system':
+            query = query.filter(and_(~type_col.like('document_%'), ~type_col.like('workflow_%')))
+        elif category:
+            query = query.filter(type_col.like(f"{category}_%"))
+
+        if activity_types:
+            query = query.filter(type_col.in_(activity_types))
+        if start_date:
+            query = query.filter(created_col >= start_date)
+        if end_date:
+            query = query.filter(created_col <= end_date)
+
+        return query
+
+    def _event_to_activity(self, event: ActivityEvent) -> Dict[str, Any]:
+        """Convert a stored activity event into the raw activity dictionary"""
+        details = event.details or {}
+        activity = {
+            'activity_id': event.id,
+            'activity_type': event.activity_type,
+            'user_id': event.actor_id,
+            'timestamp': event.created_at,
+            'description': event.description,
+            'metadata': details,
+            'is_private': event.is_private
+        }
+
+        if event.document_id:
+            activity['document_id'] = event.document_id
+            activity['document_title'] = event.title
+            activity['document_type'] = details.get('document_type')
+
+        if event.workflow_instance_id:
+            activity['workflow_instance_id'] = event.workflow_instance_id
+            activity['workflow_id'] = details.get('workflow_id')
+            activity['step_name'] = details.get('step_name')
+            activity['assigned_to'] = details.get('assigned_to')
+
+        return activity
+
     def format_activity_item(self, activity: Dict[str, Any]) -> Dict[str, Any]:
         """
         Format activity item for display
@@ -561,6 +515,8 @@ class ActivityFeedService:
             return f"Started workflow for '{activity.get('document_title', 'Untitled')}'"
         elif activity_type == 'workflow_completed':
             return f"Completed workflow for '{activity.get('document_title', 'Untitled')}'"
+        elif activity_type == 'workflow_rejected':
+            return f"Workflow rejected for '{activity.get('document_title', 'Untitled')}'"
         elif activity_type == 'workflow_assigned':
             return f"Assigned to '{activity.get('step_name', 'Unknown Step')}'"
         elif activity_type == 'user_login':
@@ -625,18 +581,17 @@ class ActivityFeedService:
         param_hash = hashlib.md5(param_str.encode()).hexdigest()[:8]
         return f"{prefix}_{user_id}_{param_hash}"
 
-    def _encode_page_token(self, offset: int) -> str:
-        """Encode pagination offset as token"""
-        import base64
-        return base64.b64encode(str(offset).encode()).decode()
+    def _encode_page_token(self, created_at: datetime, event_id: str) -> str:
+        """Encode the (timestamp, event id) position of the last item as a cursor token"""
+        return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{event_id}".encode()).decode()
 
-    def _decode_page_token(self, token: str) -> int:
-        """Decode pagination token to offset"""
+    def _decode_page_token(self, token: str) -> Optional[Tuple[datetime, str]]:
+        """Decode a cursor token; invalid tokens restart from the newest item"""
         try:
-            import base64
-            return int(base64.b64decode(token.encode()).decode())
-        except (ValueError, TypeError):
-            return 0
+            created_at, event_id = base64.urlsafe_b64decode(token.encode()).decode().split('|', 1)
+            return datetime.fromisoformat(created_at), event_id
+        except (ValueError, TypeError, UnicodeDecodeError):
+            return None
 
     def _is_cache_valid(self, cache_key: str) -> bool:
         """Check if cached data is still valid"""
@@ -0,0 +1,252 @@
+"""
+Buffered writer for security audit logs
+
+SecurityService.log_audit_event hands rows to the writer for its database
+instead of committing on the request's session. A background thread writes
+the buffer with multi-row INSERTs on a connection of its own. Events at or
+above AUDIT_LOG_SYNC_SEVERITY are committed before the caller returns, as is
+everything queued ahead of them; a full buffer is also flushed by the caller
+rather than dropping events.
+
+The module also holds the two lookups the audit path used to query for on
+every event: recently audited users' email and role, and sliding-window
+counters for the security pattern checks.
+"""
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.security import AuditLog, AuditSeverity
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {
+    AuditSeverity.LOW: 0,
+    AuditSeverity.MEDIUM: 1,
+    AuditSeverity.HIGH: 2,
+    AuditSeverity.CRITICAL: 3,
+}
+
+
+def is_synchronous(severity: AuditSeverity) -> bool:
+    """Whether an event of this severity must be durable before log_audit_event returns"""
+    threshold = AuditSeverity(settings.AUDIT_LOG_SYNC_SEVERITY.lower())
+    return SEVERITY_ORDER.get(severity, 0) >= SEVERITY_ORDER[threshold]
+
+
+class AuditLogWriter:
+    """Bounded buffer of audit rows for one database, written on a dedicated connection"""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._connection = None
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def append(self, row: Dict[str, Any], synchronous: bool = False) -> None:
+        """Queue a row; flushes inline for synchronous rows or when the buffer is full"""
+        with self._buffer_lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= settings.AUDIT_LOG_BUFFER_SIZE
+        if synchronous or full:
+            self.flush()
+        else:
+            _ensure_flusher()
+
+    def flush(self) -> int:
+        """Write every queued row; raises if they could not be written"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows, self._buffer = self._buffer, []
+            written = 0
+            try:
+                batch_size = settings.AUDIT_LOG_BATCH_SIZE
+                for start in range(0, len(rows), batch_size):
+                    self._write(rows[start:start + batch_size])
+                    written = start + batch_size
+            except Exception:
+                self.failed_flushes += 1
+                self._close_connection()
+                with self._buffer_lock:
+                    self._buffer[:0] = rows[written:]
+                raise
+            return len(rows)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        if self._connection is None or self._connection.closed:
+            self._connection = self.bind.connect()
+        with self._connection.begin():
+            self._connection.execute(insert(AuditLog.__table__), rows)
+
+    def _close_connection(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def close(self) -> None:
+        with self._flush_lock:
+            self._close_connection()
+
+
+# One writer per database engine
+_writers: "weakref.WeakKeyDictionary[Any, AuditLogWriter]" = weakref.WeakKeyDictionary()
+_writers_lock = threading.Lock()
+
+
+def get_audit_writer(db: Session) -> AuditLogWriter:
+    bind = db.get_bind()
+    with _writers_lock:
+        writer = _writers.get(bind)
+        if writer is None:
+            writer = _writers[bind] = AuditLogWriter(bind)
+    return writer
+
+
+def flush_audit_writers() -> int:
+    with _writers_lock:
+        writers = list(_writers.values())
+    written = 0
+    for writer in writers:
+        if not len(writer):
+            continue
+        try:
+            written += writer.flush()
+        except Exception as e:
+            logger.critical(f"SECURITY AUDIT FAILURE: buffered audit events not written, will retry: {e}")
+    return written
+
+
+# Background flusher shared by all writers
+_flusher: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+_flusher_lock = threading.Lock()
+
+
+def _run_flusher() -> None:
+    while not _flusher_stop.wait(settings.AUDIT_LOG_FLUSH_INTERVAL_SECONDS):
+        flush_audit_writers()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher_stop.clear()
+            _flusher = threading.Thread(target=_run_flusher, name="audit-log-flusher", daemon=True)
+            _flusher.start()
+
+
+def stop_audit_writers() -> None:
+    """Stop the flusher, write what is left and release the dedicated connections"""
+    global _flusher
+    _flusher_stop.set()
+    if _flusher is not None:
+        _flusher.join(timeout=10)
+        _flusher = None
+    flush_audit_writers()
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
+
+
+class UserInfoCache:
+    """Email and role of recently audited users, per database"""
+
+    def __init__(self):
+        self._entries: "weakref.WeakKeyDictionary[Any, OrderedDict[str, Tuple[float, str, Optional[str]]]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: str) -> Tuple[str, Optional[str]]:
+        bind = db.get_bind()
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(bind)
+            cached = entries.get(user_id) if entries is not None else None
+            if cached is not None and cached[0] > now:
+                entries.move_to_end(user_id)
+                return cached[1], cached[2]
+
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            return f"user_id_{user_id}_not_found", None  # Not cached: the user may be created later
+        email = getattr(user, 'email', 'unknown')
+        role = getattr(user.role, 'value', None) if getattr(user, 'role', None) else 'unknown'
+
+        with self._lock:
+            entries = self._entries.setdefault(bind, OrderedDict())
+            entries[user_id] = (now + settings.AUDIT_USER_CACHE_TTL_SECONDS, email, role)
+            entries.move_to_end(user_id)
+            while len(entries) > settings.AUDIT_USER_CACHE_SIZE:
+                entries.popitem(last=False)
+        return email, role
+
+    def invalidate(self, bind, user_id: str) -> None:
+        with self._lock:
+            entries = self._entries.get(bind)
+            if entries is not None:
+                entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_info_cache = UserInfoCache()
+
+
+def _invalidate_user(mapper, connection, target) -> None:
+    user_info_cache.invalidate(connection.engine, target.id)
+
+
+for _event_name in ("after_update", "after_delete"):
+    event.listen(User, _event_name, _invalidate_user)
+
+
+class SlidingWindowCounter:
+    """Per-key event counts over a trailing window, kept in process memory"""
+
+    def __init__(self, window_seconds: float, max_keys: int = 100000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._events: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, now: Optional[float] = None) -> int:
+        """Record one event for key; returns the events for key inside the window"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                events = self._events[key] = deque()
+                if len(self._events) > self.max_keys:
+                    self._events.popitem(last=False)
+            else:
+                self._events.move_to_end(key)
+            events.append(now)
+            while events and events[0] <= now - self.window_seconds:
+                events.popleft()
+            return len(events)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
@@ -0,0 +1,282 @@
+"""
+Business calendar service
+
+Compiles a BusinessCalendar (working hours, holidays, time zone) into a
+sorted index of working intervals with cumulative working seconds, so that
+"N business hours after T" and "business hours between A and B" are binary
+searches instead of hour-by-hour walks. Used for step due dates and
+escalation timing.
+"""
+import weakref
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.workflow import BusinessCalendar, Workflow
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+DEFAULT_WORKING_HOURS = {day: [["09:00", "17:00"]] for day in WEEKDAYS[:5]}
+
+# Years of working intervals indexed around the first lookup; extended on demand
+INDEX_SPAN_DAYS = 366
+
+# Compiled calendars per database engine: {engine: {key: CompiledCalendar or calendar id}}
+_calendar_cache: "weakref.WeakKeyDictionary[Any, Dict[Tuple, Any]]" = weakref.WeakKeyDictionary()
+
+
+def invalidate_business_calendars(db: Session) -> None:
+    """Drop compiled calendars so the next lookup recompiles them"""
+    _calendar_cache.pop(db.get_bind(), None)
+
+
+def _invalidate_on_change(mapper, connection, target) -> None:
+    _calendar_cache.pop(connection.engine, None)
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(BusinessCalendar, _event_name, _invalidate_on_change)
+event.listen(Workflow, "after_update", _invalidate_on_change)
+
+
+class BusinessCalendarError(Exception):
+    """Exception raised for invalid calendar definitions"""
+    pass
+
+
+def _parse_minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= 24 * 60:
+        raise BusinessCalendarError(f"Invalid time of day: {value}")
+    return total
+
+
+def _parse_holiday(value: Any) -> date:
+    if isinstance(value, dict):
+        value = value.get("date")
+    return date.fromisoformat(str(value))
+
+
+def _to_timestamp(moment: datetime) -> float:
+    # Naive datetimes are UTC throughout the application
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _from_timestamp(timestamp: float, like: datetime) -> datetime:
+    moment = datetime.fromtimestamp(timestamp, timezone.utc)
+    return moment if like.tzinfo is not None else moment.replace(tzinfo=None)
+
+
+class CompiledCalendar:
+    """
+    Working-time index for one calendar.
+
+    Working time is stored as sorted, non-overlapping UTC intervals with the
+    working seconds accumulated before each one, built for a window of days
+    that grows when a lookup falls outside it.
+    """
+
+    def __init__(
+        self,
+        timezone_name: str = "UTC",
+        working_hours: Optional[Dict[str, Sequence[Sequence[str]]]] = None,
+        holidays: Iterable[Any] = ()
+    ):
+        try:
+            self.timezone = ZoneInfo(timezone_name or "UTC")
+        except Exception as e:
+            raise BusinessCalendarError(f"Unknown time zone: {timezone_name}") from e
+
+        working_hours = DEFAULT_WORKING_HOURS if working_hours is None else working_hours
+        self.day_spans: List[List[Tuple[int, int]]] = [[] for _ in WEEKDAYS]
+        for day, spans in working_hours.items():
+            if day not in WEEKDAYS:
+                raise BusinessCalendarError(f"Unknown weekday: {day}")
+            parsed = sorted((_parse_minutes(start), _parse_minutes(end)) for start, end in spans)
+            if any(start >= end for start, end in parsed):
+                raise BusinessCalendarError(f"Working hours for {day} must end after they start")
+            self.day_spans[WEEKDAYS.index(day)] = parsed
+
+        if not any(self.day_spans):
+            raise BusinessCalendarError("Calendar has no working hours")
+
+        self.holidays = frozenset(_parse_holiday(h) for h in holidays or ())
+
+        self._first_day: Optional[date] = None
+        self._last_day: Optional[date] = None
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+        self._cumulative: List[float] = []      # Working seconds before each interval
+        self._cumulative_end: List[float] = []  # Working seconds up to the end of each interval
+        self._full_days: Optional[CompiledCalendar] = None
+
+    @classmethod
+    def from_model(cls, calendar: BusinessCalendar) -> "CompiledCalendar":
+        return cls(calendar.timezone, calendar.working_hours, calendar.holidays or ())
+
+    def full_working_days(self) -> "CompiledCalendar":
+        """Calendar counting whole working days (weekends and holidays skipped)"""
+        if self._full_days is None:
+            self._full_days = CompiledCalendar(
+                self.timezone.key,
+                {WEEKDAYS[i]: [["00:00", "24:00"]] for i, spans in enumerate(self.day_spans) if spans},
+                self.holidays
+            )
+        return self._full_days
+
+    # Index construction
+    def _day_intervals(self, day: date) -> List[Tuple[float, float]]:
+        if day in self.holidays:
+            return []
+        midnight = datetime.combine(day, time(), tzinfo=self.timezone)
+        intervals = []
+        for start, end in self.day_spans[day.weekday()]:
+            # Wall-clock offsets from local midnight, resolved through the zone for DST days
+            start_at = (midnight.replace(tzinfo=None) + timedelta(minutes=start)).replace(tzinfo=self.timezone)
+            end_at = (midnight.replace(tzinfo=None) + timedelta(minutes=end)).replace(tzinfo=self.timezone)
+            intervals.append((start_at.timestamp(), end_at.timestamp()))
+        return intervals
+
+    def _build(self, first_day: date, last_day: date) -> None:
+        starts, ends = [], []
+        day = first_day
+        while day <= last_day:
+            for start, end in self._day_intervals(day):
+                if ends and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)  # Merge spans that touch across midnight
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            day += timedelta(days=1)
+
+        cumulative, cumulative_end, total = [], [], 0.0
+        for start, end in zip(starts, ends):
+            cumulative.append(total)
+            total += end - start
+            cumulative_end.append(total)
+
+        self._first_day, self._last_day = first_day, last_day
+        self._starts, self._ends = starts, ends
+        self._cumulative, self._cumulative_end = cumulative, cumulative_end
+
+    def _ensure_covers(self, timestamp: float) -> None:
+        day = datetime.fromtimestamp(timestamp, self.timezone).date()
+        if self._first_day is None:
+            self._build(day - timedelta(days=INDEX_SPAN_DAYS), day + timedelta(days=INDEX_SPAN_DAYS))
+        elif day <= self._first_day or day >= self._last_day:
+            self._build(
+                min(self._first_day, day - timedelta(days=INDEX_SPAN_DAYS)),
+                max(self._last_day, day + timedelta(days=INDEX_SPAN_DAYS))
+            )
+
+    def _offset(self, timestamp: float) -> float:
+        """Working seconds between the start of the index and timestamp"""
+        i = bisect_right(self._starts, timestamp) - 1
+        if i < 0:
+            return 0.0
+        return self._cumulative[i] + min(timestamp, self._ends[i]) - self._starts[i]
+
+    # Lookups
+    def is_working_time(self, moment: datetime) -> bool:
+        timestamp = _to_timestamp(moment)
+        self._ensure_covers(timestamp)
+        i = bisect_right(self._starts, timestamp) - 1
+        return i >= 0 and timestamp < self._ends[i]
+
+    def next_working_time(self, moment: datetime) -> datetime:
+        """Earliest time at or after moment that falls in working hours"""
+        timestamp = _to_timestamp(moment)
+        self._ensure_covers(timestamp)
+        while True:
+            i = bisect_right(self._starts, timestamp) - 1
+            if i >= 0 and timestamp < self._ends[i]:
+                return moment
+            if i + 1 < len(self._starts):
+                return _from_timestamp(self._starts[i + 1], moment)
+            self._ensure_covers(_to_timestamp(datetime.combine(self._last_day, time(), tzinfo=self.timezone)))
+
+    def add_hours(self, moment: datetime, hours: float) -> datetime:
+        """The moment `hours` working hours after moment"""
+        if hours <= 0:
+            return moment
+
+        timestamp = _to_timestamp(moment)
+        self._ensure_covers(timestamp)
+        while True:
+            target = self._offset(timestamp) + hours * 3600
+            if self._cumulative_end and target <= self._cumulative_end[-1]:
+                break
+            # Past the indexed window; grow it and retry
+            self._ensure_covers(_to_timestamp(datetime.combine(self._last_day, time(), tzinfo=self.timezone)))
+
+        j = bisect_left(self._cumulative_end, target)
+        return _from_timestamp(self._starts[j] + target - self._cumulative[j], moment)
+
+    def hours_between(self, start: datetime, end: datetime) -> float:
+        """Working hours elapsed from start to end (negative if end precedes start)"""
+        start_ts, end_ts = _to_timestamp(start), _to_timestamp(end)
+        self._ensure_covers(start_ts)
+        self._ensure_covers(end_ts)
+        return (self._offset(end_ts) - self._offset(start_ts)) / 3600
+
+
+OFFICE_HOURS = CompiledCalendar()
+
+
+class BusinessCalendarService:
+    """Resolves the calendar a workflow runs on and caches compiled calendars"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _cache(self) -> Dict[Tuple, Any]:
+        return _calendar_cache.setdefault(self.db.get_bind(), {})
+
+    def get_calendar(self, calendar_id: str) -> Optional[CompiledCalendar]:
+        cache = self._cache()
+        key = ("calendar", calendar_id)
+        if key not in cache:
+            calendar = self.db.query(BusinessCalendar).filter(BusinessCalendar.id == calendar_id).first()
+            cache[key] = CompiledCalendar.from_model(calendar) if calendar else None
+        return cache[key]
+
+    def workflow_calendar(self, workflow_id: str) -> Optional[CompiledCalendar]:
+        """
+        Calendar configured for a workflow.
+
+        Returns:
+            The workflow's own calendar, else the default calendar, else None
+            when no calendar has been configured at all
+        """
+        cache = self._cache()
+        key = ("workflow", workflow_id)
+        if key not in cache:
+            calendar_id = self.db.query(Workflow.business_calendar_id).filter(
+                Workflow.id == workflow_id
+            ).scalar()
+            if not calendar_id:
+                calendar_id = self.db.query(BusinessCalendar.id).filter(
+                    BusinessCalendar.is_default == True
+                ).order_by(BusinessCalendar.created_at).limit(1).scalar()
+            cache[key] = calendar_id
+        return self.get_calendar(cache[key]) if cache[key] else None
+
+    def business_calendar(self, workflow_id: str) -> CompiledCalendar:
+        """Calendar for business-hours rules, falling back to Mon-Fri 9-5 UTC"""
+        return self.workflow_calendar(workflow_id) or OFFICE_HOURS
+
+    def due_date(self, workflow_id: str, start: datetime, hours: float) -> datetime:
+        """Deadline `hours` after start, counted in working hours when the workflow has a calendar"""
+        calendar = self.workflow_calendar(workflow_id)
+        if calendar is None:
+            return start + timedelta(hours=hours)
+        return calendar.add_hours(start, hours)
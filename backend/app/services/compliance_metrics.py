@@ -0,0 +1,185 @@
+"""
+Compliance metrics from grouped SQL aggregates
+
+The metrics take two statements: consents grouped by type and status, and one
+row of counts from the users, policies, PIA, deletion request, export job and
+audit log tables, each aggregated in its own subquery. Results are cached per
+database. Writes through the ORM to consents, users, policies, PIAs and
+deletion requests drop the cache; audit log and export counters are allowed to
+trail by at most COMPLIANCE_METRICS_CACHE_TTL_SECONDS, since audit rows are
+written by the buffered writer rather than the ORM.
+"""
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, distinct, event, func, select, true
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.compliance import (
+    ConsentStatus, ConsentType, DataDeletionRequest, DataExportJob, DataRetentionPolicy,
+    PrivacyImpactAssessment, UserConsent
+)
+from app.models.security import AuditLog, AuditSeverity
+from app.models.user import User
+
+RECENT_WINDOW = timedelta(days=30)
+COMPLIANCE_RESOURCE_TYPES = ("consent", "data_export", "retention_policy")
+_STALE_KEY = "compliance_metrics_stale"
+
+# Per database: (computed_at, monotonic expiry, metrics)
+_cache: "weakref.WeakKeyDictionary[Any, Tuple[datetime, float, Dict[str, Any]]]" = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _consent_statistics(db: Session, since: datetime) -> Dict[str, Any]:
+    consent_by_type = {
+        consent_type.value: {"granted": 0, "denied": 0, "total": 0} for consent_type in ConsentType
+    }
+    recent_withdrawals = 0
+    rows = db.query(
+        UserConsent.consent_type,
+        UserConsent.status,
+        func.count(UserConsent.id),
+        _count_where(UserConsent.withdrawn_at >= since)
+    ).group_by(UserConsent.consent_type, UserConsent.status)
+
+    for consent_type, status, count, withdrawn_recently in rows:
+        if status in (ConsentStatus.GRANTED, ConsentStatus.DENIED):
+            counts = consent_by_type[consent_type.value]
+            counts[status.value] = count
+            counts["total"] += count
+        elif status == ConsentStatus.WITHDRAWN:
+            recent_withdrawals += withdrawn_recently
+
+    return {"consent_by_type": consent_by_type, "recent_withdrawals": recent_withdrawals}
+
+
+def _counts(db: Session, now: datetime, since: datetime) -> Dict[str, Any]:
+    """Every other counter, one single-row subquery per table, cross joined into one statement"""
+    consents = select(func.count(distinct(UserConsent.user_id)).label("users_with_consent")).subquery()
+    users = select(func.count(User.id).label("total_users")).where(User.is_active == True).subquery()
+    policies = select(func.count(DataRetentionPolicy.id).label("active_policies")).where(
+        DataRetentionPolicy.is_active == True
+    ).subquery()
+    pias = select(
+        func.count(PrivacyImpactAssessment.id).label("total_pias"),
+        _count_where(PrivacyImpactAssessment.status == "draft").label("draft"),
+        _count_where(PrivacyImpactAssessment.status == "approved").label("approved"),
+        _count_where(PrivacyImpactAssessment.next_review_due < now).label("overdue_reviews")
+    ).subquery()
+    deletions = select(
+        _count_where(DataDeletionRequest.status.in_(("pending", "verified"))).label("pending_deletions"),
+        _count_where(
+            (DataDeletionRequest.status == "completed") & (DataDeletionRequest.processing_completed_at >= since)
+        ).label("completed_deletions")
+    ).subquery()
+    exports = select(
+        func.count(DataExportJob.id).label("export_requests"),
+        func.avg(DataExportJob.file_size).label("average_export_size")
+    ).where(DataExportJob.created_at >= since).subquery()
+    audit = select(
+        func.count(AuditLog.id).label("audit_events"),
+        _count_where(AuditLog.severity.in_((AuditSeverity.HIGH, AuditSeverity.CRITICAL))).label("security_events"),
+        _count_where(AuditLog.resource_type.in_(COMPLIANCE_RESOURCE_TYPES)).label("compliance_events")
+    ).where(AuditLog.created_at >= since).subquery()
+
+    joined = consents
+    for subquery in (users, policies, pias, deletions, exports, audit):
+        joined = joined.join(subquery, true())
+    row = db.execute(select(consents, users, policies, pias, deletions, exports, audit).select_from(joined)).one()
+    return dict(row._mapping)
+
+
+def compute_compliance_metrics(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Metric sections in the shape of the ComplianceMetrics schema"""
+    now = now or datetime.utcnow()
+    since = now - RECENT_WINDOW
+    consents = _consent_statistics(db, since)
+    counts = _counts(db, now, since)
+    average_export_size = counts["average_export_size"]
+
+    return {
+        "consent_statistics": {
+            "total_users": counts["total_users"],
+            "users_with_consent": counts["users_with_consent"],
+            "consent_by_type": consents["consent_by_type"],
+            "recent_withdrawals": consents["recent_withdrawals"]
+        },
+        "retention_compliance": {
+            "active_policies": counts["active_policies"],
+            "items_pending_deletion": 0,  # Would need to calculate based on policies
+            "automated_deletions_last_30_days": 0  # Would track in audit logs
+        },
+        "pia_status": {
+            "total_pias": counts["total_pias"],
+            "draft": counts["draft"],
+            "approved": counts["approved"],
+            "overdue_reviews": counts["overdue_reviews"]
+        },
+        "deletion_requests": {
+            "pending": counts["pending_deletions"],
+            "completed_last_30_days": counts["completed_deletions"],
+            "average_processing_time_days": 0  # Would calculate from completed requests
+        },
+        "data_exports": {
+            "requests_last_30_days": counts["export_requests"],
+            "average_export_size_mb": round(float(average_export_size) / (1024 * 1024), 2) if average_export_size else 0,
+            "most_requested_categories": []
+        },
+        "audit_summary": {
+            "total_events_last_30_days": counts["audit_events"],
+            "security_events_last_30_days": counts["security_events"],
+            "compliance_events_last_30_days": counts["compliance_events"]
+        }
+    }
+
+
+def get_compliance_metrics(db: Session) -> Tuple[datetime, Dict[str, Any]]:
+    """Cached metrics for the session's database and when they were computed"""
+    bind = db.get_bind()
+    with _cache_lock:
+        cached = _cache.get(bind)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0], cached[2]
+
+    computed_at = datetime.utcnow()
+    metrics = compute_compliance_metrics(db, computed_at)
+    with _cache_lock:
+        _cache[bind] = (computed_at, time.monotonic() + settings.COMPLIANCE_METRICS_CACHE_TTL_SECONDS, metrics)
+    return computed_at, metrics
+
+
+def invalidate_compliance_metrics(bind=None) -> None:
+    with _cache_lock:
+        if bind is None:
+            _cache.clear()
+        else:
+            _cache.pop(bind, None)
+
+
+def _invalidate(mapper, connection, target) -> None:
+    invalidate_compliance_metrics(connection.engine)
+    # Again once committed, in case another session recomputed from the old rows meanwhile
+    session = object_session(target)
+    if session is not None:
+        session.info[_STALE_KEY] = connection.engine
+
+
+def _invalidate_after_commit(session) -> None:
+    bind = session.info.pop(_STALE_KEY, None)
+    if bind is not None:
+        invalidate_compliance_metrics(bind)
+
+
+for _model in (UserConsent, User, DataRetentionPolicy, PrivacyImpactAssessment, DataDeletionRequest):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate)
+event.listen(Session, "after_commit", _invalidate_after_commit)
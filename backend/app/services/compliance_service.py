@@ -1,13 +1,9 @@
 """
 Compliance service for GDPR/CCPA features and data retention automation
 """
-import json
-import zipfile
-import tempfile
-import hashlib
+import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any, Tuple
-from pathlib import Path
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, text
 from fastapi import HTTPException
@@ -21,11 +17,24 @@ from app.models.document import Document
 from app.models.security import AuditLog, AuditEventType, AuditSeverity
 from app.models.workflow import WorkflowInstance
 from app.models.notification import Notification
+from app.models.digital_signature import SignatureEvent
 from app.schemas.compliance import (
     UserDataExportRequest, UserDataExport, ConsentBatchOperation,
     ConsentBatchResult, ComplianceMetrics, ComplianceDashboard
 )
-from app.core.logging import logger
+from app.core.config import settings
+from app.services.compliance_metrics import get_compliance_metrics
+from app.services.table_partitions import PartitionManager
+from app.services.user_data_export import DataExporter
+
+logger = logging.getLogger(__name__)
+
+# Resource types retention can delete, beyond audit logs
+_RETENTION_MODELS = {
+    "documents": Document,
+    "notifications": Notification,
+    "signature_events": SignatureEvent,
+}
 
 
 class DataRetentionService:
@@ -59,61 +68,76 @@ class DataRetentionService:
         min_days = min(policy.retention_period_days for policy in policies)
         return created_at + timedelta(days=min_days)
 
-    def get_expired_data(self, data_category: str, resource_type: str) -> List[Dict[str, Any]]:
-        """Get data that has exceeded its retention period"""
-        policies = self.get_applicable_policies(data_category, resource_type)
-
-        if not policies:
-            return []
-
-        # Calculate cutoff date
+    def _retention_cutoff(self, policies: List[DataRetentionPolicy]) -> datetime:
         max_retention_days = max(policy.retention_period_days + policy.grace_period_days
                                for policy in policies)
-        cutoff_date = datetime.utcnow() - timedelta(days=max_retention_days)
-
-        expired_items = []
-
-        if resource_type == "documents":
-            expired_docs = self.db.query(Document).filter(
-                Document.created_at < cutoff_date
-            ).all()
-            expired_items.extend([{
-                'id': doc.id,
-                'type': 'document',
-                'title': doc.title,
-                'created_at': doc.created_at,
-                'retention_date': self.calculate_retention_date(doc.created_at, policies)
-            } for doc in expired_docs])
-
-        elif resource_type == "audit_logs":
-            # Handle audit logs with their own retention_until field
-            expired_logs = self.db.query(AuditLog).filter(
-                or_(
-                    and_(AuditLog.retention_until.is_(None), AuditLog.created_at < cutoff_date),
-                    AuditLog.retention_until < datetime.utcnow()
-                )
-            ).all()
-            expired_items.extend([{
-                'id': log.id,
+        return datetime.utcnow() - timedelta(days=max_retention_days)
+
+    def _expired_filter(self, resource_type: str, cutoff_date: datetime):
+        """The model, time column and expiry condition for a resource type"""
+        if resource_type == "audit_logs":
+            # Audit logs carry their own retention_until
+            return AuditLog, AuditLog.created_at, or_(
+                and_(AuditLog.retention_until.is_(None), AuditLog.created_at < cutoff_date),
+                AuditLog.retention_until < datetime.utcnow()
+            )
+        model = _RETENTION_MODELS.get(resource_type)
+        if model is None:
+            return None
+        column = model.occurred_at if model is SignatureEvent else model.created_at
+        return model, column, column < cutoff_date
+
+    def get_expired_data(self, data_category: str, resource_type: str,
+                         limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get data that has exceeded its retention period, oldest first"""
+        policies = self.get_applicable_policies(data_category, resource_type)
+        target = self._expired_filter(resource_type, self._retention_cutoff(policies)) if policies else None
+        if target is None:
+            return []
+        model, column, condition = target
+
+        if resource_type == "audit_logs":
+            rows = self.db.query(
+                AuditLog.id, AuditLog.event_type, AuditLog.created_at, AuditLog.retention_until
+            ).filter(condition).order_by(column).limit(limit).all()
+            return [{
+                'id': row.id,
                 'type': 'audit_log',
-                'event_type': log.event_type.value,
-                'created_at': log.created_at,
-                'retention_date': log.retention_until or self.calculate_retention_date(log.created_at, policies)
-            } for log in expired_logs])
-
-        elif resource_type == "notifications":
-            expired_notifications = self.db.query(Notification).filter(
-                Notification.created_at < cutoff_date
-            ).all()
-            expired_items.extend([{
-                'id': notif.id,
-                'type': 'notification',
-                'title': notif.title,
-                'created_at': notif.created_at,
-                'retention_date': self.calculate_retention_date(notif.created_at, policies)
-            } for notif in expired_notifications])
-
-        return expired_items
+                'event_type': row.event_type.value,
+                'created_at': row.created_at,
+                'retention_date': row.retention_until or self.calculate_retention_date(row.created_at, policies)
+            } for row in rows]
+
+        if resource_type == "signature_events":
+            rows = self.db.query(
+                SignatureEvent.id, SignatureEvent.event_type, SignatureEvent.occurred_at
+            ).filter(condition).order_by(column).limit(limit).all()
+            return [{
+                'id': row.id,
+                'type': 'signature_event',
+                'event_type': row.event_type,
+                'created_at': row.occurred_at,
+                'retention_date': self.calculate_retention_date(row.occurred_at, policies)
+            } for row in rows]
+
+        rows = self.db.query(model.id, model.title, model.created_at).filter(condition) \
+            .order_by(column).limit(limit).all()
+        return [{
+            'id': row.id,
+            'type': 'document' if model is Document else 'notification',
+            'title': row.title,
+            'created_at': row.created_at,
+            'retention_date': self.calculate_retention_date(row.created_at, policies)
+        } for row in rows]
+
+    def count_expired_data(self, data_category: str, resource_type: str) -> int:
+        """Number of rows get_expired_data would return"""
+        policies = self.get_applicable_policies(data_category, resource_type)
+        target = self._expired_filter(resource_type, self._retention_cutoff(policies)) if policies else None
+        if target is None:
+            return 0
+        model, _, condition = target
+        return self.db.query(func.count(model.id)).filter(condition).scalar()
 
     def create_retention_notification(self, expired_items: List[Dict[str, Any]],
                                     policy: DataRetentionPolicy) -> bool:
@@ -141,44 +165,63 @@ class DataRetentionService:
         return True
 
     def execute_automated_deletion(self, policy: DataRetentionPolicy) -> Dict[str, Any]:
-        """Execute automated deletion based on retention policy"""
+        """
+        Execute automated deletion based on retention policy.
+
+        Months of a partitioned table that lie wholly before the cutoff, and
+        hold nothing retention must keep, are dropped as partitions. Remaining
+        expired rows are deleted in committed chunks of RETENTION_DELETE_CHUNK_SIZE,
+        so an interrupted run keeps its progress and the next run resumes.
+        """
         if not policy.auto_delete_enabled:
             return {"status": "skipped", "reason": "Auto-delete not enabled"}
 
-        expired_items = self.get_expired_data(policy.data_category, policy.resource_type)
-
-        if not expired_items:
+        policies = self.get_applicable_policies(policy.data_category, policy.resource_type)
+        cutoff_date = self._retention_cutoff(policies) if policies else None
+        target = self._expired_filter(policy.resource_type, cutoff_date) if cutoff_date else None
+        if target is None:
             return {"status": "completed", "deleted_count": 0}
+        model, column, condition = target
+
+        if model is AuditLog:
+            # Don't delete sensitive logs without review
+            condition = and_(condition, AuditLog.is_sensitive == False)
+            protected = or_(AuditLog.is_sensitive == True, AuditLog.retention_until >= datetime.utcnow())
+        else:
+            protected = None
 
         deleted_count = 0
-        errors = []
+        dropped_partitions = []
+        chunks = 0
 
         try:
-            for item in expired_items:
-                try:
-                    if item['type'] == 'document':
-                        doc = self.db.query(Document).get(item['id'])
-                        if doc:
-                            self.db.delete(doc)
-                            deleted_count += 1
-
-                    elif item['type'] == 'audit_log':
-                        log = self.db.query(AuditLog).get(item['id'])
-                        if log and not log.is_sensitive:  # Don't delete sensitive logs without review
-                            self.db.delete(log)
-                            deleted_count += 1
-
-                    elif item['type'] == 'notification':
-                        notif = self.db.query(Notification).get(item['id'])
-                        if notif:
-                            self.db.delete(notif)
-                            deleted_count += 1
-
-                except Exception as e:
-                    errors.append(f"Failed to delete {item['type']} {item['id']}: {str(e)}")
-                    logger.error(f"Retention deletion error: {e}")
-
-            self.db.commit()
+            partitions = PartitionManager(self.db)
+            partitions.ensure_partitions(model.__tablename__)
+            for partition in partitions.partitions(model.__tablename__):
+                if datetime.combine(partition.end, datetime.min.time()) > cutoff_date:
+                    break
+                if protected is not None and self.db.query(model.id).filter(
+                    column >= partition.start, column < partition.end, protected
+                ).first() is not None:
+                    continue
+                deleted_count += partitions.drop_partition(partition)
+                dropped_partitions.append(partition.name)
+
+            chunk_size = settings.RETENTION_DELETE_CHUNK_SIZE
+            while True:
+                ids = [row.id for row in self.db.query(model.id).filter(condition).order_by(column).limit(chunk_size)]
+                if not ids:
+                    break
+                if model is Document:
+                    # Documents go through the ORM so their history and signature requests cascade
+                    for doc in self.db.query(Document).filter(Document.id.in_(ids)):
+                        self.db.delete(doc)
+                else:
+                    self.db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                self.db.commit()
+                deleted_count += len(ids)
+                chunks += 1
+                logger.info(f"Retention policy {policy.name}: {deleted_count} {model.__tablename__} rows deleted")
 
             # Create audit log for deletion
             audit_log = AuditLog(
@@ -190,8 +233,8 @@ class DataRetentionService:
                 details={
                     "policy_name": policy.name,
                     "deleted_count": deleted_count,
-                    "error_count": len(errors),
-                    "errors": errors[:10]  # Limit error details
+                    "dropped_partitions": dropped_partitions,
+                    "delete_chunks": chunks
                 }
             )
             self.db.add(audit_log)
@@ -200,8 +243,9 @@ class DataRetentionService:
             return {
                 "status": "completed",
                 "deleted_count": deleted_count,
-                "error_count": len(errors),
-                "errors": errors
+                "dropped_partitions": dropped_partitions,
+                "error_count": 0,
+                "errors": []
             }
 
         except Exception as e:
@@ -407,190 +451,46 @@ class DataExportService:
         self.db = db
 
     def export_user_data(self, request: UserDataExportRequest) -> UserDataExport:
-        """Export all user data for GDPR compliance"""
+        """Export all user data for GDPR compliance, waiting for the archive"""
         user = self.db.query(User).get(request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Generate export ID
-        export_id = hashlib.sha256(f"{request.user_id}_{datetime.utcnow().isoformat()}".encode()).hexdigest()[:16]
-
-        # Create temporary directory for export
-        with tempfile.TemporaryDirectory() as temp_dir:
-            export_data = {}
-            data_categories = []
-
-            # Export user profile data
-            if not request.data_categories or "profile" in request.data_categories:
-                export_data["profile"] = {
-                    "id": user.id,
-                    "email": user.email,
-                    "username": user.username,
-                    "full_name": user.full_name,
-                    "title": user.title,
-                    "phone": user.phone,
-                    "role": user.role.value,
-                    "is_active": user.is_active,
-                    "is_verified": user.is_verified,
-                    "created_at": user.created_at.isoformat(),
-                    "updated_at": user.updated_at.isoformat(),
-                    "last_login": user.last_login.isoformat() if user.last_login else None,
-                    "verified_at": user.verified_at.isoformat() if user.verified_at else None
-                }
-                data_categories.append("profile")
-
-            # Export user documents
-            if not request.data_categories or "documents" in request.data_categories:
-                documents = self.db.query(Document).filter(Document.created_by == user.id).all()
-                export_data["documents"] = []
-                for doc in documents:
-                    doc_data = {
-                        "id": doc.id,
-                        "title": doc.title,
-                        "document_type": doc.document_type,
-                        "version": doc.version,
-                        "created_at": doc.created_at.isoformat(),
-                        "updated_at": doc.updated_at.isoformat(),
-                        "created_by": doc.created_by,
-                        "updated_by": doc.updated_by
-                    }
-                    if request.include_metadata:
-                        doc_data["content"] = doc.content
-                        doc_data["placeholders"] = doc.placeholders
-                    export_data["documents"].append(doc_data)
-                data_categories.append("documents")
-
-            # Export consent records
-            if not request.data_categories or "consents" in request.data_categories:
-                consents = self.db.query(UserConsent).filter(UserConsent.user_id == user.id).all()
-                export_data["consents"] = []
-                for consent in consents:
-                    consent_data = {
-                        "id": consent.id,
-                        "consent_type": consent.consent_type.value,
-                        "status": consent.status.value,
-                        "method": consent.method.value,
-                        "purpose": consent.purpose,
-                        "data_categories": consent.data_categories,
-                        "processing_activities": consent.processing_activities,
-                        "legal_basis": consent.legal_basis,
-                        "consent_version": consent.consent_version,
-                        "granted_at": consent.granted_at.isoformat() if consent.granted_at else None,
-                        "withdrawn_at": consent.withdrawn_at.isoformat() if consent.withdrawn_at else None,
-                        "expires_at": consent.expires_at.isoformat() if consent.expires_at else None,
-                        "created_at": consent.created_at.isoformat(),
-                        "updated_at": consent.updated_at.isoformat()
-                    }
-                    if request.include_metadata:
-                        consent_data["consent_metadata"] = consent.consent_metadata
-                        consent_data["ip_address"] = consent.ip_address if not request.anonymize_sensitive else "***"
-                        consent_data["user_agent"] = consent.user_agent if not request.anonymize_sensitive else "***"
-                    export_data["consents"].append(consent_data)
-                data_categories.append("consents")
-
-            # Export audit logs (limited to user's own actions)
-            if not request.data_categories or "audit_logs" in request.data_categories:
-                audit_logs = self.db.query(AuditLog).filter(AuditLog.user_id == user.id).all()
-                export_data["audit_logs"] = []
-                for log in audit_logs:
-                    log_data = {
-                        "id": log.id,
-                        "event_type": log.event_type.value,
-                        "severity": log.severity.value,
-                        "message": log.message,
-                        "resource_type": log.resource_type,
-                        "resource_id": log.resource_id,
-                        "resource_name": log.resource_name,
-                        "created_at": log.created_at.isoformat()
-                    }
-                    if request.include_metadata:
-                        log_data["details"] = log.details
-                        log_data["ip_address"] = log.ip_address if not request.anonymize_sensitive else "***"
-                        log_data["user_agent"] = log.user_agent if not request.anonymize_sensitive else "***"
-                    export_data["audit_logs"].append(log_data)
-                data_categories.append("audit_logs")
-
-            # Create export file
-            export_filename = f"user_data_export_{export_id}.{request.format}"
-            export_path = Path(temp_dir) / export_filename
-
-            if request.format == "json":
-                with open(export_path, 'w', encoding='utf-8') as f:
-                    json.dump(export_data, f, indent=2, ensure_ascii=False)
-
-            elif request.format == "csv":
-                # Create a zip file with separate CSV files for each data category
-                import csv
-                zip_path = export_path.with_suffix('.zip')
-                with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for category, data in export_data.items():
-                        if isinstance(data, list) and data:
-                            csv_filename = f"{category}.csv"
-                            csv_path = Path(temp_dir) / csv_filename
-
-                            # Get all unique keys for CSV header
-                            all_keys = set()
-                            for item in data:
-                                if isinstance(item, dict):
-                                    all_keys.update(item.keys())
-
-                            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-                                writer = csv.DictWriter(csvfile, fieldnames=sorted(all_keys))
-                                writer.writeheader()
-                                for item in data:
-                                    if isinstance(item, dict):
-                                        writer.writerow(item)
-
-                            zipf.write(csv_path, csv_filename)
-                export_path = zip_path
-
-            # Calculate file size and hash
-            file_size = export_path.stat().st_size
-            file_hash = hashlib.sha256()
-            with open(export_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    file_hash.update(chunk)
-
-            # Move file to final location (in a real app, this would be cloud storage)
-            final_export_path = f"/tmp/exports/{export_filename}"
-            Path("/tmp/exports").mkdir(exist_ok=True)
-            export_path.rename(final_export_path)
-
-            # Create audit log
-            audit_log = AuditLog(
-                event_type=AuditEventType.USER_UPDATED,
-                severity=AuditSeverity.MEDIUM,
-                message=f"User data exported for GDPR compliance",
-                user_id=user.id,
-                resource_type="data_export",
-                resource_id=export_id,
-                details={
-                    "export_format": request.format,
-                    "data_categories": data_categories,
-                    "file_size": file_size,
-                    "anonymized": request.anonymize_sensitive
-                }
-            )
-            self.db.add(audit_log)
-            self.db.commit()
-
-            return UserDataExport(
+        exporter = DataExporter(self.db)
+        try:
+            job = exporter.create_job(
                 user_id=user.id,
-                export_id=export_id,
                 format=request.format,
-                file_path=final_export_path,
-                file_size=file_size,
-                data_categories=data_categories,
-                export_summary={
-                    "total_records": sum(len(data) if isinstance(data, list) else 1 for data in export_data.values()),
-                    "categories": data_categories,
-                    "file_hash": file_hash.hexdigest(),
-                    "anonymized": request.anonymize_sensitive,
-                    "include_metadata": request.include_metadata
-                },
-                created_at=datetime.utcnow(),
-                expires_at=datetime.utcnow() + timedelta(days=30)  # Export files expire after 30 days
+                data_categories=request.data_categories,
+                include_metadata=request.include_metadata,
+                anonymize_sensitive=request.anonymize_sensitive
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        job = exporter.run(job.id)
+        if job.status != "completed":
+            raise HTTPException(status_code=500, detail=f"Data export failed: {job.error}")
+
+        records = {name: job.progress[name]["records"] for name in job.data_categories}
+        return UserDataExport(
+            user_id=user.id,
+            export_id=job.id,
+            format=request.format,
+            file_path=job.file_path,
+            file_size=job.file_size,
+            data_categories=job.data_categories,
+            export_summary={
+                "total_records": sum(records.values()),
+                "records": records,
+                "categories": job.data_categories,
+                "file_hash": job.file_hash,
+                "anonymized": request.anonymize_sensitive,
+                "include_metadata": request.include_metadata
+            },
+            created_at=job.created_at,
+            expires_at=job.expires_at
+        )
 
 
 class ComplianceMetricsService:
@@ -601,107 +501,8 @@ class ComplianceMetricsService:
 
     def generate_compliance_metrics(self) -> ComplianceMetrics:
         """Generate comprehensive compliance metrics"""
-        current_time = datetime.utcnow()
-
-        # Consent statistics
-        consent_stats = {
-            "total_users": self.db.query(User).filter(User.is_active == True).count(),
-            "users_with_consent": self.db.query(UserConsent.user_id).distinct().count(),
-            "consent_by_type": {},
-            "recent_withdrawals": self.db.query(UserConsent).filter(
-                and_(
-                    UserConsent.status == "withdrawn",
-                    UserConsent.withdrawn_at >= current_time - timedelta(days=30)
-                )
-            ).count()
-        }
-
-        # Consent by type statistics
-        for consent_type in ["data_processing", "marketing", "analytics", "third_party_sharing", "cookies", "notifications"]:
-            granted = self.db.query(UserConsent).filter(
-                and_(UserConsent.consent_type == consent_type, UserConsent.status == "granted")
-            ).count()
-            denied = self.db.query(UserConsent).filter(
-                and_(UserConsent.consent_type == consent_type, UserConsent.status == "denied")
-            ).count()
-            consent_stats["consent_by_type"][consent_type] = {
-                "granted": granted,
-                "denied": denied,
-                "total": granted + denied
-            }
-
-        # Retention compliance
-        retention_stats = {
-            "active_policies": self.db.query(DataRetentionPolicy).filter(
-                DataRetentionPolicy.is_active == True
-            ).count(),
-            "items_pending_deletion": 0,  # Would need to calculate based on policies
-            "automated_deletions_last_30_days": 0  # Would track in audit logs
-        }
-
-        # PIA status
-        pia_stats = {
-            "total_pias": self.db.query(PrivacyImpactAssessment).count(),
-            "draft": self.db.query(PrivacyImpactAssessment).filter(
-                PrivacyImpactAssessment.status == "draft"
-            ).count(),
-            "approved": self.db.query(PrivacyImpactAssessment).filter(
-                PrivacyImpactAssessment.status == "approved"
-            ).count(),
-            "overdue_reviews": self.db.query(PrivacyImpactAssessment).filter(
-                PrivacyImpactAssessment.next_review_due < current_time
-            ).count()
-        }
-
-        # Deletion requests
-        deletion_stats = {
-            "pending": self.db.query(DataDeletionRequest).filter(
-                DataDeletionRequest.status.in_(["pending", "verified"])
-            ).count(),
-            "completed_last_30_days": self.db.query(DataDeletionRequest).filter(
-                and_(
-                    DataDeletionRequest.status == "completed",
-                    DataDeletionRequest.processing_completed_at >= current_time - timedelta(days=30)
-                )
-            ).count(),
-            "average_processing_time_days": 0  # Would calculate from completed requests
-        }
-
-        # Data exports (GDPR)
-        export_stats = {
-            "requests_last_30_days": 0,  # Would track export requests
-            "average_export_size_mb": 0,  # Would calculate from export logs
-            "most_requested_categories": []
-        }
-
-        # Audit summary
-        audit_stats = {
-            "total_events_last_30_days": self.db.query(AuditLog).filter(
-                AuditLog.created_at >= current_time - timedelta(days=30)
-            ).count(),
-            "security_events_last_30_days": self.db.query(AuditLog).filter(
-                and_(
-                    AuditLog.severity.in_(["high", "critical"]),
-                    AuditLog.created_at >= current_time - timedelta(days=30)
-                )
-            ).count(),
-            "compliance_events_last_30_days": self.db.query(AuditLog).filter(
-                and_(
-                    AuditLog.resource_type.in_(["consent", "data_export", "retention_policy"]),
-                    AuditLog.created_at >= current_time - timedelta(days=30)
-                )
-            ).count()
-        }
-
-        return ComplianceMetrics(
-            consent_statistics=consent_stats,
-            retention_compliance=retention_stats,
-            pia_status=pia_stats,
-            deletion_requests=deletion_stats,
-            data_exports=export_stats,
-            audit_summary=audit_stats,
-            generated_at=current_time
-        )
+        computed_at, metrics = get_compliance_metrics(self.db)
+        return ComplianceMetrics(**metrics, generated_at=datetime.utcnow(), computed_at=computed_at)
 
     def generate_compliance_dashboard(self) -> ComplianceDashboard:
         """Generate compliance dashboard with metrics and recommendations"""
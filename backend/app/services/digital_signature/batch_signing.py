@@ -0,0 +1,493 @@
+"""
+Batch signing and verification for certificate-based providers
+
+Signs or verifies many documents with one certificate. The CPU-bound
+cryptography runs on a shared process pool; compliance validation runs once
+per distinct set of inputs rather than once per document; the resulting
+signature requests and signatures are written in a single transaction and
+their events in one batch through the hash-chained audit log. A progress
+callback is invoked as each document completes.
+
+Private keys never cross the process boundary unencrypted: jobs carry the
+stored (Fernet-encrypted) key and the password, and each worker process keeps
+its most recently unlocked key for a short time.
+"""
+import asyncio
+import io
+import multiprocessing
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cryptography import x509
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import serialization
+from PyPDF2 import PdfReader
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.digital_signature import (
+    ComplianceFramework,
+    DigitalSignature,
+    DigitalSignatureProvider,
+    DigitalSignatureRequest,
+    SignatureCertificate,
+    SignatureProviderType,
+    SignatureStatus
+)
+from app.models.document import Document
+from app.models.user import User
+from app.services.digital_signature.certificate_cache import certificate_version, password_digest
+from app.services.digital_signature.certificate_service import CertificateSignatureService
+from app.services.digital_signature.compliance_service import (
+    ComplianceLevel, LegalComplianceService, ValidationResult
+)
+from app.services.digital_signature.pdf_signing import IncrementalPdf, verify_incremental_signature
+from app.services.signature_audit_log import get_audit_log
+
+logger = logging.getLogger(__name__)
+
+CERTIFICATE_PROVIDER_TYPES = (SignatureProviderType.CERTIFICATE_BASED, SignatureProviderType.INTERNAL)
+
+
+@dataclass
+class BatchDocument:
+    """A document to sign or verify"""
+    document_id: str
+    content: bytes
+    title: Optional[str] = None
+
+
+@dataclass
+class BatchItemResult:
+    document_id: str
+    success: bool
+    request_id: Optional[str] = None
+    signed_content: Optional[bytes] = None
+    signature_intact: Optional[bool] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchProgress:
+    total: int
+    completed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+
+    def record(self, result: BatchItemResult) -> None:
+        self.completed += 1
+        if result.success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+
+@dataclass
+class BatchResult:
+    batch_id: str
+    progress: BatchProgress
+    results: List[BatchItemResult] = field(default_factory=list)
+    compliance_validations: int = 0
+
+
+ProgressCallback = Callable[[BatchProgress, BatchItemResult], Any]
+
+
+# Jobs and the functions run in pool workers (must stay picklable and module-level)
+
+@dataclass
+class SignJob:
+    key_id: Tuple[str, str, str]
+    private_key_encrypted: bytes
+    private_key_password: Optional[str]
+    document: bytes
+    signers: Tuple[Tuple[str, str], ...]
+    info: Dict[str, str]
+
+
+# Most recently unlocked key in this process: (key_id, expires_at, private_key)
+_worker_key: Optional[Tuple[Tuple[str, str, str], float, Any]] = None
+_worker_key_lock = threading.Lock()
+
+
+def _unlock_worker_key(job: SignJob):
+    global _worker_key
+    with _worker_key_lock:
+        if _worker_key and _worker_key[0] == job.key_id and _worker_key[1] > time.monotonic():
+            return _worker_key[2]
+
+    private_key_pem = Fernet(settings.ENCRYPTION_KEY.encode()).decrypt(job.private_key_encrypted)
+    private_key = serialization.load_pem_private_key(
+        private_key_pem,
+        password=job.private_key_password.encode() if job.private_key_password else None
+    )
+    with _worker_key_lock:
+        _worker_key = (job.key_id, time.monotonic() + settings.CERTIFICATE_KEY_CACHE_TTL_SECONDS, private_key)
+    return private_key
+
+
+def _sign(job: SignJob, private_key) -> bytes:
+    pdf = IncrementalPdf(job.document)
+    pdf.add_signature_fields(SimpleNamespace(signer_email=email, signer_name=name) for email, name in job.signers)
+    return pdf.sign(private_key, job.info).to_bytes()
+
+
+def sign_in_worker(job: SignJob) -> bytes:
+    """Pool entry point: unlock the job's key (once per worker) and sign"""
+    return _sign(job, _unlock_worker_key(job))
+
+
+@lru_cache(maxsize=8)
+def _public_key(certificate_der: bytes):
+    return x509.load_der_x509_certificate(certificate_der).public_key()
+
+
+def verify_in_worker(document: bytes, certificate_der: bytes) -> Optional[bool]:
+    """Pool entry point: check an incremental signature against a certificate"""
+    return verify_incremental_signature(document, _public_key(certificate_der), PdfReader(io.BytesIO(document)))
+
+
+# Shared process pool
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_signing_pool() -> Optional[ProcessPoolExecutor]:
+    """Process pool for batch crypto, or None when SIGNATURE_BATCH_WORKERS is 0"""
+    global _pool
+    if settings.SIGNATURE_BATCH_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit the API process's threads and open connections
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.SIGNATURE_BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown_signing_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_jobs(
+    jobs: List[Tuple[Any, Callable, Callable, tuple]],
+    progress: BatchProgress,
+    on_result: Callable[[Any, Any, Optional[str]], BatchItemResult],
+    callback: Optional[ProgressCallback]
+) -> None:
+    """
+    Run (tag, pool_fn, inline_fn, args) jobs, reporting each as it completes.
+
+    Batches of SIGNATURE_BATCH_MIN_PARALLEL or more go to the process pool;
+    smaller ones run inline on a worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_signing_pool() if len(jobs) >= settings.SIGNATURE_BATCH_MIN_PARALLEL else None
+
+    async def run(tag, pool_fn, inline_fn, args):
+        try:
+            if pool is not None:
+                return tag, await loop.run_in_executor(pool, pool_fn, *args), None
+            return tag, await asyncio.to_thread(inline_fn, *args), None
+        except Exception as e:
+            return tag, None, str(e) or type(e).__name__
+
+    for finished in asyncio.as_completed([run(*job) for job in jobs]):
+        tag, value, error = await finished
+        result = on_result(tag, value, error)
+        progress.record(result)
+        if callback:
+            callback(progress, result)
+
+
+class BatchSigningService:
+    """Signs and verifies batches of documents with one certificate"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.compliance_service = LegalComplianceService()
+
+    @staticmethod
+    def _check_size(documents: List[BatchDocument]) -> None:
+        if not documents:
+            raise ValueError("Batch contains no documents")
+        if len(documents) > settings.SIGNATURE_BATCH_MAX_DOCUMENTS:
+            raise ValueError(f"Batch exceeds {settings.SIGNATURE_BATCH_MAX_DOCUMENTS} documents")
+
+    def _get_documents(self, documents: List[BatchDocument]) -> Dict[str, Document]:
+        """Documents of the batch in one query"""
+        ids = {d.document_id for d in documents}
+        found = {doc.id: doc for doc in self.db.query(Document).filter(Document.id.in_(ids)).all()}
+        missing = sorted(ids - set(found))
+        if missing:
+            raise ValueError(f"Documents not found: {', '.join(missing)}")
+        return found
+
+    def _get_provider(self, provider_id: str) -> DigitalSignatureProvider:
+        provider = self.db.query(DigitalSignatureProvider).filter(
+            DigitalSignatureProvider.id == provider_id,
+            DigitalSignatureProvider.is_active == True
+        ).first()
+        if not provider:
+            raise ValueError("Provider not found or inactive")
+        if provider.provider_type not in CERTIFICATE_PROVIDER_TYPES:
+            raise ValueError("Batch signing requires a certificate-based provider")
+        return provider
+
+    def _get_certificate(self, certificate_id: str, user: User) -> SignatureCertificate:
+        certificate = self.db.query(SignatureCertificate).filter(
+            SignatureCertificate.id == certificate_id,
+            SignatureCertificate.user_id == user.id
+        ).first()
+        if not certificate:
+            raise ValueError("Certificate not found")
+        return certificate
+
+    async def _validate_compliance(
+        self,
+        pairs: List[Tuple[DigitalSignatureRequest, DigitalSignature]]
+    ) -> Tuple[Dict[str, ValidationResult], int]:
+        """Compliance result per request id, validating each distinct input once"""
+        results: Dict[Tuple[Any, ...], ValidationResult] = {}
+        by_request: Dict[str, ValidationResult] = {}
+        for request, signature in pairs:
+            key = self.compliance_service.validation_key(request, [signature], ComplianceLevel.STANDARD)
+            if key not in results:
+                results[key] = await self.compliance_service.validate_signature_request(
+                    request, [signature], ComplianceLevel.STANDARD
+                )
+            by_request[request.id] = results[key]
+        return by_request, len(results)
+
+    async def sign_batch(
+        self,
+        provider_id: str,
+        certificate_id: str,
+        private_key_password: Optional[str],
+        documents: List[BatchDocument],
+        user: User,
+        reason: str = "Document approval",
+        location: str = "CA-DMS",
+        message: Optional[str] = None,
+        legal_notice: Optional[str] = None,
+        compliance_framework: ComplianceFramework = ComplianceFramework.ESIGN_ACT,
+        authentication_required: bool = True,
+        progress: Optional[ProgressCallback] = None
+    ) -> BatchResult:
+        """
+        Sign every document with the user's certificate.
+
+        Raises ValueError for problems with the batch as a whole (unknown
+        documents, provider or certificate, wrong key password); failures of
+        individual documents are reported in their results.
+        """
+        self._check_size(documents)
+        found = self._get_documents(documents)
+        provider = self._get_provider(provider_id)
+        certificate = self._get_certificate(certificate_id, user)
+        if certificate.is_revoked:
+            raise ValueError("Certificate has been revoked")
+        if not certificate.private_key_encrypted:
+            raise ValueError("No private key available for certificate")
+
+        # Parse and unlock once up front; fails fast on a wrong password
+        cert_service = CertificateSignatureService(provider)
+        cert = cert_service._load_certificate(certificate)
+        try:
+            private_key = cert_service._unlock_private_key(certificate, private_key_password)
+        except Exception as e:
+            raise ValueError(f"Failed to unlock private key: {str(e)}") from e
+
+        batch_id = f"batch_{uuid.uuid4()}"
+        now = datetime.utcnow()
+        signer_name = user.full_name or user.username
+
+        pairs: List[Tuple[DigitalSignatureRequest, DigitalSignature]] = []
+        for item in documents:
+            request = DigitalSignatureRequest(
+                id=str(uuid.uuid4()),
+                document_id=item.document_id,
+                provider_id=provider.id,
+                title=item.title or found[item.document_id].title,
+                message=message,
+                legal_notice=legal_notice,
+                compliance_framework=compliance_framework,
+                authentication_required=authentication_required,
+                require_all_signatures=True,
+                expiration_days=30,
+                reminder_frequency_days=3,
+                external_request_id=batch_id,
+                requested_at=now,
+                expires_at=now + timedelta(days=30),
+                created_by=user.id
+            )
+            signature = DigitalSignature(
+                id=str(uuid.uuid4()),
+                request_id=request.id,
+                signer_name=signer_name,
+                signer_email=user.email,
+                signer_role="signer",
+                signing_order=1,
+                authentication_method="certificate"
+            )
+            pairs.append((request, signature))
+
+        compliance, validations = await self._validate_compliance(pairs)
+
+        key_id = (certificate.id, certificate_version(certificate), password_digest(private_key_password))
+        info = {
+            "/Signature": "Digital Signature Applied",
+            "/SignatureTime": now.isoformat(),
+            "/SignerName": cert.subject.rfc4514_string(),
+            "/SignatureReason": reason,
+            "/SignatureLocation": location,
+            "/SignatureMethod": "Certificate-based",
+            "/SignatureBatch": batch_id
+        }
+
+        def sign_inline(job: SignJob) -> bytes:
+            # Small batches sign in this process with the key unlocked above
+            return _sign(job, private_key)
+
+        jobs = []
+        for (request, signature), item in zip(pairs, documents):
+            job = SignJob(
+                key_id=key_id,
+                private_key_encrypted=certificate.private_key_encrypted,
+                private_key_password=private_key_password,
+                document=item.content,
+                signers=((signature.signer_email, signature.signer_name),),
+                info=info
+            )
+            jobs.append(((request, signature), sign_in_worker, sign_inline, (job,)))
+
+        batch = BatchResult(batch_id=batch_id, progress=BatchProgress(total=len(documents)),
+                            compliance_validations=validations)
+        events: List[Dict[str, Any]] = []
+        certificate_der = certificate.certificate_data
+
+        def on_result(tag, signed: Optional[bytes], error: Optional[str]) -> BatchItemResult:
+            request, signature = tag
+            completed_at = datetime.utcnow()
+            if error is None:
+                request.status = signature.status = SignatureStatus.SIGNED
+                request.completed_at = signature.signed_at = signature.signature_timestamp = completed_at
+                signature.signature_certificate = certificate_der
+            else:
+                request.status = signature.status = SignatureStatus.ERROR
+            events.append(dict(
+                request_id=request.id,
+                signature_id=signature.id,
+                event_type="document_signed" if error is None else "signing_failed",
+                event_description=(
+                    f"Signed in batch {batch_id} with certificate {certificate.id}" if error is None
+                    else f"Signing failed in batch {batch_id}: {error}"
+                ),
+                user_id=user.id,
+                legal_framework_applied=compliance_framework.value,
+                external_event_data={"batch_id": batch_id, "certificate_id": certificate.id}
+            ))
+            result = BatchItemResult(
+                document_id=request.document_id,
+                success=error is None,
+                request_id=request.id,
+                signed_content=signed,
+                error=error
+            )
+            batch.results.append(result)
+            return result
+
+        await _run_jobs(jobs, batch.progress, on_result, progress)
+
+        for request, signature in pairs:
+            result = compliance[request.id]
+            events.append(dict(
+                request_id=request.id,
+                signature_id=None,
+                event_type="compliance_validation",
+                event_description=(
+                    f"Compliance validation completed: {result.framework.value} - Score: {result.score:.2f}"
+                ),
+                user_id=user.id,
+                legal_framework_applied=None,
+                external_event_data={
+                    "compliance_score": result.score,
+                    "is_compliant": result.is_compliant,
+                    "violations": result.violations,
+                    "requirements_met": result.requirements_met,
+                    "batch_id": batch_id
+                }
+            ))
+
+        # One transaction for the batch's requests and signatures
+        try:
+            self.db.add_all([request for request, _ in pairs])
+            self.db.flush()
+            self.db.add_all([signature for _, signature in pairs])
+            certificate.usage_count = (certificate.usage_count or 0) + batch.progress.succeeded
+            certificate.last_used_at = now
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # Then one hash-chained audit log write for all of their events
+        audit_log = get_audit_log(self.db)
+        for values in events:
+            audit_log.append(**values)
+        audit_log.flush()
+
+        logger.info(
+            f"Signature batch {batch_id}: {batch.progress.succeeded}/{batch.progress.total} documents signed "
+            f"with certificate {certificate.id} ({validations} compliance validations)"
+        )
+        return batch
+
+    async def verify_batch(
+        self,
+        certificate_id: str,
+        documents: List[BatchDocument],
+        user: User,
+        progress: Optional[ProgressCallback] = None
+    ) -> BatchResult:
+        """Check the signature of every document against one of the user's certificates"""
+        self._check_size(documents)
+        certificate = self._get_certificate(certificate_id, user)
+
+        batch = BatchResult(batch_id=f"verify_{uuid.uuid4()}", progress=BatchProgress(total=len(documents)))
+        jobs = [
+            (item.document_id, verify_in_worker, verify_in_worker, (item.content, certificate.certificate_data))
+            for item in documents
+        ]
+
+        def on_result(document_id, intact: Optional[bool], error: Optional[str]) -> BatchItemResult:
+            if error is None and intact is None:
+                error = "Document is not signed"
+            elif error is None and intact is False:
+                error = "Document was modified after signing"
+            result = BatchItemResult(
+                document_id=document_id,
+                success=error is None,
+                signature_intact=intact,
+                error=error
+            )
+            batch.results.append(result)
+            return result
+
+        await _run_jobs(jobs, batch.progress, on_result, progress)
+        return batch
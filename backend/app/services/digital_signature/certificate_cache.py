@@ -0,0 +1,132 @@
+"""
+Certificate material cache for certificate-based signing
+
+Parsed certificates, certificate chains and (when CERTIFICATE_KEY_CACHE_ENABLED
+is set) decrypted private keys are kept in a bounded, TTL-limited LRU so that
+signing or verifying many documents with one certificate parses and decrypts
+it once. Entries are keyed by certificate id and version: any change to the
+certificate record yields a new key, and revoked certificates are evicted and
+never cached.
+
+Unlocked keys are additionally keyed by a keyed digest of the password they
+were unlocked with, so a cached key is only returned for the same password.
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.models.digital_signature import SignatureCertificate
+
+CERTIFICATE = "certificate"
+CHAIN = "chain"
+PRIVATE_KEY = "private_key"
+
+# Per-process secret for password digests; never persisted
+_PASSWORD_PEPPER = os.urandom(32)
+
+
+def certificate_version(certificate: SignatureCertificate) -> str:
+    """Version of a certificate record: its last update plus a digest of the key material"""
+    digest = hashlib.sha256(certificate.certificate_data or b"")
+    digest.update(certificate.private_key_encrypted or b"")
+    updated_at = certificate.updated_at.isoformat() if certificate.updated_at else ""
+    return f"{updated_at}:{digest.hexdigest()}"
+
+
+def password_digest(password: Optional[str]) -> str:
+    return hmac.new(_PASSWORD_PEPPER, (password or "").encode(), hashlib.sha256).hexdigest()
+
+
+class CertificateCache:
+    """Bounded LRU of certificate material with per-entry expiry"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, key: Tuple[Hashable, ...]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key: Tuple[Hashable, ...], value: Any, ttl_seconds: int) -> None:
+        max_size = self.max_size if self.max_size is not None else settings.CERTIFICATE_CACHE_SIZE
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_load(
+        self,
+        kind: str,
+        certificate: SignatureCertificate,
+        loader: Callable[[], Any],
+        *extra: Hashable,
+        ttl_seconds: Optional[int] = None
+    ) -> Any:
+        """
+        Cached value of kind for the certificate's current version, loading it on a miss.
+
+        Revoked or unsaved certificates are loaded without caching.
+        """
+        if certificate.is_revoked or certificate.id is None:
+            if certificate.id is not None:
+                self.evict(certificate.id)
+            return loader()
+
+        key = (certificate.id, certificate_version(certificate), kind) + extra
+        value = self._get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self._put(key, value, settings.CERTIFICATE_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds)
+        return value
+
+    def private_key(self, certificate: SignatureCertificate, password: Optional[str], loader: Callable[[], Any]) -> Any:
+        """Unlocked private key; only cached when CERTIFICATE_KEY_CACHE_ENABLED is set"""
+        if not settings.CERTIFICATE_KEY_CACHE_ENABLED:
+            return loader()
+        return self.get_or_load(
+            PRIVATE_KEY, certificate, loader, password_digest(password),
+            ttl_seconds=settings.CERTIFICATE_KEY_CACHE_TTL_SECONDS
+        )
+
+    def evict(self, certificate_id: str) -> int:
+        """Drop every entry of a certificate; returns the number removed"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == certificate_id]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self.hits = self.misses = 0
+
+
+# Shared by every CertificateSignatureService in the process
+certificate_cache = CertificateCache()
@@ -2,18 +2,17 @@
 Certificate-based digital signature service for CA-DMS
 """
 import base64
-import os
-from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from cryptography import x509
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.fernet import Fernet
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfReader
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 import io
-import tempfile
 
 from app.core.config import settings
 from app.models.digital_signature import (
@@ -25,17 +24,43 @@ from app.models.digital_signature import (
     SignatureStatus
 )
 from app.schemas.digital_signature import SignatureWebhookPayload
+from app.services.digital_signature.certificate_cache import CERTIFICATE, CHAIN, certificate_cache
+from app.services.digital_signature.pdf_signing import IncrementalPdf, verify_incremental_signature
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _fernet(key: str) -> Fernet:
+    return Fernet(key.encode())
+
+
 class CertificateSignatureService:
     """Certificate-based digital signature service"""
 
     def __init__(self, provider: DigitalSignatureProvider):
         self.provider = provider
         self.certificate_storage_path = provider.certificate_storage_path or "/app/certificates"
+        self.cache = certificate_cache
+
+    def _load_certificate(self, certificate: SignatureCertificate) -> x509.Certificate:
+        """Parsed X.509 certificate, cached per certificate version"""
+        return self.cache.get_or_load(
+            CERTIFICATE, certificate, lambda: x509.load_der_x509_certificate(certificate.certificate_data)
+        )
+
+    def _unlock_private_key(self, certificate: SignatureCertificate, private_key_password: Optional[str]):
+        """Decrypted private key; cached only when the key cache is enabled"""
+        def unlock():
+            fernet = _fernet(settings.ENCRYPTION_KEY)
+            private_key_pem = fernet.decrypt(certificate.private_key_encrypted)
+            return serialization.load_pem_private_key(
+                private_key_pem,
+                password=private_key_password.encode() if private_key_password else None
+            )
+
+        return self.cache.private_key(certificate, private_key_password, unlock)
 
     async def create_signature_request(
         self,
@@ -58,16 +83,15 @@ class CertificateSignatureService:
                     return False, None, f"No valid certificate found for signer: {signer.signer_email}"
 
             # Prepare document for signing
-            prepared_doc_path = await self._prepare_document_for_signing(
+            prepared_document = await self._prepare_document_for_signing(
                 document_content,
                 request.title,
                 signers
             )
 
-            if not prepared_doc_path:
+            if not prepared_document:
                 return False, None, "Failed to prepare document for signing"
 
-            # Store the prepared document path in the request
             request_id = f"cert_request_{datetime.utcnow().timestamp()}"
 
             logger.info(f"Certificate-based signature request created: {request_id}")
@@ -94,45 +118,20 @@ class CertificateSignatureService:
         document_content: bytes,
         title: str,
         signers: List[DigitalSignature]
-    ) -> Optional[str]:
+    ) -> Optional[bytes]:
         """
         Prepare PDF document with signature fields
 
-        Returns: Path to prepared document
+        The fields are appended as an incremental update; the original bytes
+        are kept as they are.
+
+        Returns: Prepared document bytes
         """
         try:
-            # Create temporary file for the prepared document
-            temp_dir = tempfile.mkdtemp()
-            prepared_path = os.path.join(temp_dir, f"prepared_{title}.pdf")
-
-            # Read the original PDF
-            pdf_reader = PdfReader(io.BytesIO(document_content))
-            pdf_writer = PdfWriter()
-
-            # Copy all pages
-            for page in pdf_reader.pages:
-                pdf_writer.add_page(page)
-
-            # Add signature fields for each signer
-            for idx, signer in enumerate(signers):
-                # Add signature field metadata
-                # In a real implementation, you would add actual PDF form fields
-                # For demo purposes, we'll just note the signer positions
-                field_name = f"signature_{idx + 1}_{signer.signer_email}"
-
-                # Add to PDF metadata
-                pdf_writer.add_metadata({
-                    f"/SignatureField{idx + 1}": field_name,
-                    f"/SignerEmail{idx + 1}": signer.signer_email,
-                    f"/SignerName{idx + 1}": signer.signer_name
-                })
-
-            # Write the prepared PDF
-            with open(prepared_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-
-            logger.info(f"Document prepared for signing: {prepared_path}")
-            return prepared_path
+            prepared = IncrementalPdf(document_content).add_signature_fields(signers).to_bytes()
+
+            logger.info(f"Document prepared for signing: {title}")
+            return prepared
 
         except Exception as e:
             logger.error(f"Failed to prepare document for signing: {str(e)}")
@@ -140,45 +139,37 @@ class CertificateSignatureService:
 
     async def sign_document(
         self,
-        document_path: str,
+        document: Union[bytes, str],
         certificate: SignatureCertificate,
         private_key_password: str,
         signature_reason: str = "Document approval",
-        signature_location: str = "CA-DMS"
+        signature_location: str = "CA-DMS",
+        signers: Optional[List[DigitalSignature]] = None
     ) -> Tuple[bool, Optional[bytes], Optional[str]]:
         """
         Sign a PDF document with a certificate
 
+        document is the PDF content or a path to it. When signers are given,
+        their signature fields are prepared in the same update as the signature.
+
         Returns: (success, signed_document_bytes, error_message)
         """
         try:
-            # Load certificate and private key
-            cert_data = certificate.certificate_data
-            private_key_data = certificate.private_key_encrypted
-
-            if not private_key_data:
+            if not certificate.private_key_encrypted:
                 return False, None, "No private key available for certificate"
 
-            # Decrypt private key
-            fernet = Fernet(settings.ENCRYPTION_KEY.encode())
-            private_key_pem = fernet.decrypt(private_key_data)
-
-            # Load the private key
-            private_key = serialization.load_pem_private_key(
-                private_key_pem,
-                password=private_key_password.encode() if private_key_password else None
-            )
-
-            # Load the certificate
-            cert = x509.load_der_x509_certificate(cert_data)
+            # Load certificate and private key
+            private_key = self._unlock_private_key(certificate, private_key_password)
+            cert = self._load_certificate(certificate)
 
             # Create signature
             signature_data = await self._create_pdf_signature(
-                document_path,
+                document,
                 private_key,
                 cert,
                 signature_reason,
-                signature_location
+                signature_location,
+                signers
             )
 
             if not signature_data:
@@ -194,55 +185,40 @@ class CertificateSignatureService:
 
     async def _create_pdf_signature(
         self,
-        document_path: str,
+        document: Union[bytes, str],
         private_key,
         certificate: x509.Certificate,
         reason: str,
-        location: str
+        location: str,
+        signers: Optional[List[DigitalSignature]] = None
     ) -> Optional[bytes]:
         """
         Create a digital signature on a PDF document
 
+        The document is parsed once and field preparation plus signature are
+        written as a single incremental update.
+
         Returns: Signed document bytes
         """
         try:
-            # For demo purposes, we'll create a simple signed PDF
-            # In production, you would use a proper PDF signing library like PyPDF2 with cryptography
-
-            # Read the original document
-            with open(document_path, 'rb') as f:
-                original_content = f.read()
-
-            # Create signature metadata
-            signature_time = datetime.utcnow()
-            signer_name = certificate.subject.rfc4514_string()
-
-            # For demo, append signature information to PDF metadata
-            pdf_reader = PdfReader(io.BytesIO(original_content))
-            pdf_writer = PdfWriter()
+            if isinstance(document, str):
+                with open(document, 'rb') as f:
+                    document = f.read()
 
-            # Copy all pages
-            for page in pdf_reader.pages:
-                pdf_writer.add_page(page)
+            pdf = IncrementalPdf(document)
+            if signers:
+                pdf.add_signature_fields(signers)
 
-            # Add signature metadata
-            signature_metadata = {
+            pdf.sign(private_key, {
                 "/Signature": "Digital Signature Applied",
-                "/SignatureTime": signature_time.isoformat(),
-                "/SignerName": signer_name,
+                "/SignatureTime": datetime.utcnow().isoformat(),
+                "/SignerName": certificate.subject.rfc4514_string(),
                 "/SignatureReason": reason,
                 "/SignatureLocation": location,
                 "/SignatureMethod": "Certificate-based"
-            }
-
-            pdf_writer.add_metadata(signature_metadata)
+            })
 
-            # Write signed document
-            output_buffer = io.BytesIO()
-            pdf_writer.write(output_buffer)
-            signed_content = output_buffer.getvalue()
-
-            return signed_content
+            return pdf.to_bytes()
 
         except Exception as e:
             logger.error(f"Failed to create PDF signature: {str(e)}")
@@ -260,14 +236,16 @@ class CertificateSignatureService:
         """
         try:
             # Load certificate
-            cert = x509.load_der_x509_certificate(certificate.certificate_data)
+            cert = self._load_certificate(certificate)
 
             # Extract signature information from PDF
             pdf_reader = PdfReader(io.BytesIO(signed_document))
             metadata = pdf_reader.metadata
 
+            intact = verify_incremental_signature(signed_document, cert.public_key(), pdf_reader)
+
             verification_info = {
-                "is_valid": True,  # Demo value
+                "is_valid": intact is not False,
                 "signer_name": metadata.get("/SignerName", "Unknown"),
                 "signature_time": metadata.get("/SignatureTime"),
                 "signature_reason": metadata.get("/SignatureReason"),
@@ -276,12 +254,15 @@ class CertificateSignatureService:
                 "certificate_issuer": cert.issuer.rfc4514_string(),
                 "certificate_valid_from": cert.not_valid_before.isoformat(),
                 "certificate_valid_until": cert.not_valid_after.isoformat(),
-                "certificate_serial_number": str(cert.serial_number)
+                "certificate_serial_number": str(cert.serial_number),
+                "signature_intact": intact
             }
 
-            # Check certificate validity
+            # Check document integrity, then certificate validity
             now = datetime.utcnow()
-            if cert.not_valid_after < now:
+            if intact is False:
+                verification_info["validation_error"] = "Document was modified after signing"
+            elif cert.not_valid_after < now:
                 verification_info["is_valid"] = False
                 verification_info["validation_error"] = "Certificate has expired"
             elif cert.not_valid_before > now:
@@ -323,7 +304,7 @@ class CertificateSignatureService:
             # Encrypt private key if provided
             encrypted_private_key = None
             if private_key_data:
-                fernet = Fernet(settings.ENCRYPTION_KEY.encode())
+                fernet = _fernet(settings.ENCRYPTION_KEY)
                 encrypted_private_key = fernet.encrypt(private_key_data)
 
             # Extract certificate information
@@ -356,6 +337,9 @@ class CertificateSignatureService:
             # In production, update certificate record in database
             # Mark as revoked with timestamp and reason
 
+            # Revoked material must not be served from memory
+            self.cache.evict(certificate_id)
+
             logger.info(f"Certificate revoked: {certificate_id}, reason: {revocation_reason}")
             return True, None
 
@@ -367,12 +351,11 @@ class CertificateSignatureService:
     async def get_certificate_chain(self, certificate: SignatureCertificate) -> List[x509.Certificate]:
         """Get the full certificate chain for validation"""
         try:
-            # Load the certificate
-            cert = x509.load_der_x509_certificate(certificate.certificate_data)
-
             # In production, you would build the full chain by following the issuer chain
             # For demo, return just the certificate
-            return [cert]
+            return list(self.cache.get_or_load(
+                CHAIN, certificate, lambda: (self._load_certificate(certificate),)
+            ))
 
         except Exception as e:
             logger.error(f"Failed to get certificate chain: {str(e)}")
@@ -52,6 +52,30 @@ class LegalComplianceService:
             ComplianceFramework.CUSTOM: self._validate_custom
         }
 
+    def validation_key(
+        self,
+        request: DigitalSignatureRequest,
+        signers: List[DigitalSignature],
+        compliance_level: ComplianceLevel = ComplianceLevel.STANDARD
+    ) -> Tuple[Any, ...]:
+        """
+        The request and signer attributes the validators read
+
+        Requests with equal keys validate to equal results, so a batch of
+        otherwise identical requests needs a single validation.
+        """
+        title = (request.title or "").lower()
+        return (
+            request.compliance_framework,
+            compliance_level,
+            request.authentication_required,
+            request.legal_notice,
+            request.message,
+            request.expiration_days,
+            "consumer" in title or "personal" in title,
+            tuple((s.signer_email, s.signer_name, s.signer_role) for s in signers)
+        )
+
     async def validate_signature_request(
         self,
         request: DigitalSignatureRequest,
@@ -423,7 +447,7 @@ class LegalComplianceService:
     ):
         """Check witness requirements where applicable"""
         # Check if any signers are designated as witnesses
-        witness_count = sum(1 for signer in signers if "witness" in signer.signer_role.lower() if signer.signer_role else 0)
+        witness_count = sum(1 for signer in signers if signer.signer_role and "witness" in signer.signer_role.lower())
         if witness_count > 0:
             result.requirements_met.append(f"Witness signatures included: {witness_count}")
 
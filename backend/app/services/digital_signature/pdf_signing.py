@@ -0,0 +1,248 @@
+"""
+Incremental PDF signing for certificate-based signatures
+
+A document is parsed once. Signature-field preparation and the signature
+itself are appended to the original bytes as one PDF incremental update (a new
+document information dictionary, cross-reference section and trailer), so the
+original bytes are never re-serialized through a PdfWriter or staged on disk.
+
+The signature covers every byte of the signed file except its own value: the
+document it was applied to and the whole signing update, up to the final
+%%EOF. The covered ranges are recorded under /SignatureByteRange and must
+reach the end of the file, so any later incremental update (which could
+redefine pages or other objects) fails verification.
+"""
+import hashlib
+import io
+from typing import Any, BinaryIO, Dict, Iterable, Optional, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa
+from PyPDF2 import PdfReader
+from PyPDF2.generic import DictionaryObject, IndirectObject, NameObject, NumberObject, TextStringObject
+
+SIGNATURE_VALUE_KEY = "/SignatureValue"
+SIGNATURE_RANGE_KEY = "/SignatureByteRange"
+
+# Hex digits reserved for the signature value (RSA keys up to 8192 bits)
+SIGNATURE_VALUE_LENGTH = 2048
+# Fixed-width byte range written before the offsets are known, then patched in place
+RANGE_PLACEHOLDER = "0 0000000000 0000000000 0000000000"
+
+# Chunk size used when streaming the original bytes to an output file
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+class PdfSigningError(Exception):
+    """Exception raised for documents that cannot be signed incrementally"""
+    pass
+
+
+def _startxref(data: bytes) -> int:
+    """Offset of the last cross-reference section, from the file trailer"""
+    position = data.rfind(b"startxref", max(len(data) - 2048, 0))
+    if position < 0:
+        raise PdfSigningError("Document has no startxref marker")
+    try:
+        return int(data[position + len(b"startxref"):].split(None, 1)[0])
+    except (IndexError, ValueError) as e:
+        raise PdfSigningError("Document has an unreadable startxref marker") from e
+
+
+def _check_signing_key(private_key) -> None:
+    if not isinstance(private_key, (rsa.RSAPrivateKey, ec.EllipticCurvePrivateKey)):
+        raise PdfSigningError(f"Unsupported private key type: {type(private_key).__name__}")
+
+
+def sign_bytes(private_key, data: bytes) -> bytes:
+    """Raw signature over data with an RSA or EC private key"""
+    if isinstance(private_key, rsa.RSAPrivateKey):
+        return private_key.sign(data, padding.PKCS1v15(), hashes.SHA256())
+    if isinstance(private_key, ec.EllipticCurvePrivateKey):
+        return private_key.sign(data, ec.ECDSA(hashes.SHA256()))
+    raise PdfSigningError(f"Unsupported private key type: {type(private_key).__name__}")
+
+
+def verify_bytes(public_key, signature: bytes, data: bytes) -> bool:
+    try:
+        if isinstance(public_key, rsa.RSAPublicKey):
+            public_key.verify(signature, data, padding.PKCS1v15(), hashes.SHA256())
+        elif isinstance(public_key, ec.EllipticCurvePublicKey):
+            public_key.verify(signature, data, ec.ECDSA(hashes.SHA256()))
+        else:
+            return False
+        return True
+    except InvalidSignature:
+        return False
+
+
+class IncrementalPdf:
+    """A parsed PDF plus the document information entries of one pending incremental update"""
+
+    def __init__(self, document: bytes):
+        self.data = bytes(document)
+        self.reader = PdfReader(io.BytesIO(self.data))
+        if self.reader.is_encrypted:
+            raise PdfSigningError("Encrypted documents cannot be signed")
+        self.updates: Dict[str, str] = {}
+        self._signing_key = None
+        self._signed_increment: Optional[bytes] = None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Document information as it will read after the update"""
+        info = dict(self.reader.metadata or {})
+        info.update(self.updates)
+        return info
+
+    def add_signature_fields(self, signers: Iterable[Any]) -> "IncrementalPdf":
+        """Record a signature field entry per signer"""
+        for idx, signer in enumerate(signers):
+            self.updates.update({
+                f"/SignatureField{idx + 1}": f"signature_{idx + 1}_{signer.signer_email}",
+                f"/SignerEmail{idx + 1}": signer.signer_email,
+                f"/SignerName{idx + 1}": signer.signer_name or ""
+            })
+        return self
+
+    def sign(self, private_key, info: Dict[str, str]) -> "IncrementalPdf":
+        """Add signature entries; the update is signed when it is written"""
+        _check_signing_key(private_key)
+        self.updates.update(info)
+        self._signing_key = private_key
+        self._signed_increment = None
+        return self
+
+    def _increment(self) -> bytes:
+        if self._signing_key is None:
+            return self._layout()[0]
+        if self._signed_increment is None:
+            self._signed_increment = self._signed_layout()
+        return self._signed_increment
+
+    def _signed_layout(self) -> bytes:
+        """Lay out the update, fill in its byte range and sign everything outside the value"""
+        increment, range_offset, value_offset = self._layout()
+        increment = bytearray(increment)
+        base = len(self.data)
+        value_end = value_offset + SIGNATURE_VALUE_LENGTH + 2  # Hex string delimiters included
+        byte_range = (
+            f"0 {base + value_offset:010d} {base + value_end:010d} {len(increment) - value_end:010d}"
+        )
+        increment[range_offset:range_offset + len(RANGE_PLACEHOLDER)] = byte_range.encode()
+
+        digest = hashlib.sha256(self.data)
+        digest.update(increment[:value_offset])
+        digest.update(increment[value_end:])
+        signature = sign_bytes(self._signing_key, digest.digest()).hex().encode()
+        if len(signature) > SIGNATURE_VALUE_LENGTH:
+            raise PdfSigningError("Signature does not fit the reserved space")
+        increment[value_offset + 1:value_offset + 1 + len(signature)] = signature
+        return bytes(increment)
+
+    def _layout(self) -> Tuple[bytes, int, int]:
+        """
+        The update's bytes, plus the offsets of the byte range placeholder and
+        the reserved signature value within them (0 when not signing)
+        """
+        trailer = self.reader.trailer
+        info_number = int(trailer["/Size"])
+
+        info = DictionaryObject()
+        existing = trailer.get("/Info")
+        if existing is not None:
+            for key, value in existing.get_object().items():
+                info[NameObject(key)] = value
+        for key, value in self.updates.items():
+            info[NameObject(key)] = TextStringObject(value)
+
+        new_trailer = DictionaryObject({
+            NameObject("/Size"): NumberObject(info_number + 1),
+            NameObject("/Root"): trailer.raw_get("/Root"),
+            NameObject("/Info"): IndirectObject(info_number, 0, self.reader),
+            NameObject("/Prev"): NumberObject(_startxref(self.data)),
+        })
+        if "/ID" in trailer:
+            new_trailer[NameObject("/ID")] = trailer.raw_get("/ID")
+
+        out = io.BytesIO()
+        # Updates start on a fresh line even if the file lacks a trailing newline
+        out.write(b"\n" if not self.data.endswith(b"\n") else b"")
+        info_offset = len(self.data) + out.tell()
+        out.write(f"{info_number} 0 obj\n".encode())
+        range_offset = value_offset = 0
+        if self._signing_key is None:
+            info.write_to_stream(out, None)
+        else:
+            # Written by hand so the placeholders keep a fixed width and known offsets
+            out.write(b"<<\n")
+            for key, value in info.items():
+                if key in (SIGNATURE_RANGE_KEY, SIGNATURE_VALUE_KEY):
+                    continue
+                key.write_to_stream(out, None)
+                out.write(b" ")
+                value.write_to_stream(out, None)
+                out.write(b"\n")
+            out.write(f"{SIGNATURE_RANGE_KEY} [".encode())
+            range_offset = out.tell()
+            out.write(f"{RANGE_PLACEHOLDER}]\n{SIGNATURE_VALUE_KEY} ".encode())
+            value_offset = out.tell()
+            out.write(b"<" + b" " * SIGNATURE_VALUE_LENGTH + b">\n>>")
+        out.write(b"\nendobj\n")
+
+        xref_offset = len(self.data) + out.tell()
+        out.write(f"xref\n0 1\n0000000000 65535 f \n{info_number} 1\n{info_offset:010d} 00000 n \n".encode())
+        out.write(b"trailer\n")
+        new_trailer.write_to_stream(out, None)
+        out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        return out.getvalue(), range_offset, value_offset
+
+    def write(self, output: BinaryIO) -> int:
+        """Stream the original bytes and the update to output; returns bytes written"""
+        view = memoryview(self.data)
+        for start in range(0, len(view), WRITE_CHUNK_SIZE):
+            output.write(view[start:start + WRITE_CHUNK_SIZE])
+        increment = self._increment()
+        output.write(increment)
+        return len(self.data) + len(increment)
+
+    def to_bytes(self) -> bytes:
+        return self.data + self._increment()
+
+
+def verify_incremental_signature(data: bytes, public_key, reader: Optional[PdfReader] = None) -> Optional[bool]:
+    """
+    Check a signature written by IncrementalPdf.sign.
+
+    The signed ranges must start at the first byte and end at the last one, with
+    only the signature value between them; bytes appended after signing fail.
+
+    Returns:
+        True or False for signed documents, None when the document carries no
+        signature value to check
+    """
+    reader = reader or PdfReader(io.BytesIO(data))
+
+    info = reader.metadata or {}
+    if SIGNATURE_VALUE_KEY not in info or SIGNATURE_RANGE_KEY not in info:
+        return None
+
+    try:
+        start, value_start, value_end, tail_length = (int(part) for part in info[SIGNATURE_RANGE_KEY])
+    except (TypeError, ValueError):
+        return False
+    if start != 0 or not 0 < value_start < value_end or value_end + tail_length != len(data):
+        return False
+
+    value = data[value_start:value_end]
+    if not (value.startswith(b"<") and value.endswith(b">")):
+        return False
+    try:
+        signature = bytes.fromhex(value[1:-1].decode("ascii").strip())
+    except ValueError:
+        return False
+
+    digest = hashlib.sha256(memoryview(data)[:value_start])
+    digest.update(memoryview(data)[value_end:])
+    return verify_bytes(public_key, signature, digest.digest())
@@ -12,7 +12,6 @@ from app.models.digital_signature import (
     DigitalSignatureProvider,
     DigitalSignatureRequest,
     DigitalSignature,
-    SignatureEvent,
     SignatureCertificate,
     SignatureProviderType,
     SignatureStatus,
@@ -35,6 +34,10 @@ from app.services.digital_signature.adobe_sign_service import AdobeSignService
 from app.services.digital_signature.certificate_service import CertificateSignatureService
 from app.services.digital_signature.compliance_service import LegalComplianceService, ComplianceLevel
 from app.services.notification_service import NotificationService
+from app.services.activity_feed_service import record_activity
+from app.services.signature_audit_log import get_audit_log
+from app.services.signature_statistics_service import SignatureStatisticsService
+from app.services.workflow_metrics_service import sketch_quantiles
 import logging
 
 logger = logging.getLogger(__name__)
@@ -226,6 +229,18 @@ class DigitalSignatureService:
                 signatures.append(signature)
                 self.db.add(signature)
 
+            record_activity(
+                self.db, "signature_requested", actor_id=user_id,
+                object_type="signature_request", object_id=signature_request.id,
+                document_id=document.id, title=document.title,
+                description=f"Requested signatures for '{request_data.title}'",
+                details={
+                    "signature_request_title": request_data.title,
+                    "document_type": document.document_type,
+                    "signer_count": len(signatures)
+                }
+            )
+
             self.db.commit()
             self.db.refresh(signature_request)
 
@@ -423,6 +438,17 @@ class DigitalSignatureService:
                 external_event_data=event.external_data
             )
 
+            if event.status in (SignatureStatus.SIGNED, SignatureStatus.DECLINED):
+                record_activity(
+                    self.db,
+                    "signature_completed" if event.status == SignatureStatus.SIGNED else "signature_declined",
+                    recipients=[request.created_by],
+                    object_type="signature_request", object_id=request.id,
+                    document_id=request.document_id, title=request.title,
+                    description=f"Signature request '{request.title}' {event.status.value}",
+                    details={"status": event.status.value, "event_type": event.event_type}
+                )
+
             # Send notifications for status changes
             if event.status in [SignatureStatus.SIGNED, SignatureStatus.DECLINED, SignatureStatus.EXPIRED]:
                 await self._send_status_notifications(request, event)
@@ -482,7 +508,8 @@ class DigitalSignatureService:
     ):
         """Log a signature event"""
         try:
-            event = SignatureEvent(
+            # Buffered and hash-chained; written in batches by the audit log
+            get_audit_log(self.db).append(
                 request_id=request_id,
                 signature_id=signature_id,
                 event_type=event_type,
@@ -491,9 +518,6 @@ class DigitalSignatureService:
                 external_event_data=external_event_data
             )
 
-            self.db.add(event)
-            self.db.commit()
-
         except Exception as e:
             logger.error(f"Failed to log signature event: {str(e)}")
 
@@ -505,40 +529,29 @@ class DigitalSignatureService:
     ) -> SignatureStatistics:
         """Get signature statistics"""
         try:
-            query = self.db.query(DigitalSignatureRequest)
-
-            if start_date:
-                query = query.filter(DigitalSignatureRequest.created_at >= start_date)
-            if end_date:
-                query = query.filter(DigitalSignatureRequest.created_at <= end_date)
-
-            all_requests = query.all()
-
-            total_requests = len(all_requests)
-            pending_requests = len([r for r in all_requests if r.status == SignatureStatus.PENDING])
-            completed_requests = len([r for r in all_requests if r.status == SignatureStatus.SIGNED])
-            declined_requests = len([r for r in all_requests if r.status == SignatureStatus.DECLINED])
-            expired_requests = len([r for r in all_requests if r.status == SignatureStatus.EXPIRED])
-
-            # Calculate average completion time
-            completed = [r for r in all_requests if r.completed_at and r.requested_at]
-            avg_completion_time = None
-            if completed:
-                total_hours = sum(
-                    (r.completed_at - r.requested_at).total_seconds() / 3600
-                    for r in completed
-                )
-                avg_completion_time = total_hours / len(completed)
+            metrics = SignatureStatisticsService(self.db).request_statistics(start_date, end_date)
+            statuses = metrics["statuses"]
+
+            total_requests = sum(statuses.values())
+            completed_requests = statuses.get(SignatureStatus.SIGNED.value, 0)
+
+            avg_completion_time = median_completion_time = p90_completion_time = None
+            if metrics["completion_count"]:
+                avg_completion_time = metrics["completion_sum_hours"] / metrics["completion_count"]
+                quantiles = sketch_quantiles(metrics["completion_sketch"], (0.5, 0.9))
+                median_completion_time, p90_completion_time = quantiles[0.5], quantiles[0.9]
 
             completion_rate = completed_requests / total_requests if total_requests > 0 else 0.0
 
             return SignatureStatistics(
                 total_requests=total_requests,
-                pending_requests=pending_requests,
+                pending_requests=statuses.get(SignatureStatus.PENDING.value, 0),
                 completed_requests=completed_requests,
-                declined_requests=declined_requests,
-                expired_requests=expired_requests,
+                declined_requests=statuses.get(SignatureStatus.DECLINED.value, 0),
+                expired_requests=statuses.get(SignatureStatus.EXPIRED.value, 0),
                 average_completion_time_hours=avg_completion_time,
+                median_completion_time_hours=median_completion_time,
+                p90_completion_time_hours=p90_completion_time,
                 completion_rate=completion_rate
             )
 
@@ -556,28 +569,21 @@ class DigitalSignatureService:
     def get_provider_statistics(self) -> List[SignatureProviderStats]:
         """Get statistics for each provider"""
         try:
-            providers = self.get_active_providers()
+            by_provider = SignatureStatisticsService(self.db).provider_statistics()
             stats = []
 
-            for provider in providers:
-                requests = self.db.query(DigitalSignatureRequest).filter(
-                    DigitalSignatureRequest.provider_id == provider.id
-                ).all()
-
-                total_requests = len(requests)
-                successful_requests = len([r for r in requests if r.status == SignatureStatus.SIGNED])
-                success_rate = successful_requests / total_requests if total_requests > 0 else 0.0
-
-                last_used = None
-                if requests:
-                    last_used = max(r.created_at for r in requests)
+            for provider in self.get_active_providers():
+                totals = by_provider.get(provider.id, {})
+                total_requests = totals.get("total_requests", 0)
+                average_hours = totals.get("average_completion_hours")
 
                 stats.append(SignatureProviderStats(
                     provider_id=provider.id,
                     provider_name=provider.name,
                     total_requests=total_requests,
-                    success_rate=success_rate,
-                    last_used=last_used
+                    success_rate=totals["signed_requests"] / total_requests if total_requests > 0 else 0.0,
+                    average_response_time_seconds=average_hours * 3600 if average_hours is not None else None,
+                    last_used=totals.get("last_used")
                 ))
 
             return stats
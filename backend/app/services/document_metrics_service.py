@@ -0,0 +1,108 @@
+"""
+Document content metrics
+
+Computes size and complexity metrics from a document's Quill Delta ops once per
+revision of its content and shares them between workflow conditions, escalation
+triggers and document endpoints.
+"""
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.models.document import Document
+
+
+PLACEHOLDER_EMBEDS = ("signature", "longResponse", "lineSegment", "versionTable")
+
+# Metrics per database engine: {engine: OrderedDict{document_id: ((version, updated_at), DocumentMetrics)}}
+# Content can change without a version bump (collaborative edits), so entries
+# are also stamped with updated_at and dropped whenever content is assigned.
+_metrics_cache: "weakref.WeakKeyDictionary[Any, OrderedDict[str, Tuple[Tuple[int, Optional[datetime]], DocumentMetrics]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+METRICS_CACHE_SIZE = 2048
+
+
+@dataclass(frozen=True)
+class DocumentMetrics:
+    """Size and complexity metrics for one document version"""
+    content_length: int      # Delta length: characters of text plus one per embed
+    word_count: int
+    placeholder_count: int
+    complexity_score: int
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def compute_document_metrics(content: Optional[Dict[str, Any]]) -> DocumentMetrics:
+    """Compute metrics in a single pass over the Delta ops"""
+    content = content or {}
+    ops = content.get("ops") if isinstance(content, dict) else None
+
+    length = 0
+    placeholder_count = 0
+    text_parts = []
+    for op in ops or []:
+        insert = op.get("insert") if isinstance(op, dict) else None
+        if isinstance(insert, str):
+            length += len(insert)
+            text_parts.append(insert)
+        elif isinstance(insert, dict):
+            length += 1
+            text_parts.append(" ")  # Embeds separate words
+            if any(embed in insert for embed in PLACEHOLDER_EMBEDS):
+                placeholder_count += 1
+
+    # Legacy content stored placeholder values alongside the Delta
+    if isinstance(content, dict) and isinstance(content.get("placeholders"), list):
+        placeholder_count += len(content["placeholders"])
+
+    return DocumentMetrics(
+        content_length=length,
+        word_count=len("".join(text_parts).split()),
+        placeholder_count=placeholder_count,
+        complexity_score=length // 100 + placeholder_count * 5
+    )
+
+
+def _invalidate_on_content_change(target: Document, value, oldvalue, initiator) -> None:
+    session = object_session(target)
+    if session is not None and target.id is not None:
+        entries = _metrics_cache.get(session.get_bind())
+        if entries is not None:
+            entries.pop(target.id, None)
+
+
+event.listen(Document.content, "set", _invalidate_on_content_change)
+
+
+def get_document_metrics(document: Document) -> DocumentMetrics:
+    """
+    Return metrics for a document, computing them once per revision of its content.
+
+    Documents not attached to a session (or not yet flushed) are computed
+    without caching.
+    """
+    session = object_session(document)
+    if session is None or document.id is None or document.version is None:
+        return compute_document_metrics(document.content)
+
+    entries = _metrics_cache.setdefault(session.get_bind(), OrderedDict())
+
+    stamp = (document.version, document.updated_at)
+    entry = entries.get(document.id)
+    if entry is not None and entry[0] == stamp:
+        entries.move_to_end(document.id)
+        return entry[1]
+
+    metrics = compute_document_metrics(document.content)
+    entries[document.id] = (stamp, metrics)
+    entries.move_to_end(document.id)
+    if len(entries) > METRICS_CACHE_SIZE:
+        entries.popitem(last=False)
+    return metrics
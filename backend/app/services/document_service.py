@@ -8,6 +8,7 @@ from app.models.document import Document
 from app.models.document_history import DocumentHistory
 from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse
 from app.services.document_comparison_service import DocumentComparisonService
+from app.services.activity_feed_service import record_activity
 import uuid
 
 
@@ -52,6 +53,13 @@ class DocumentService:
             created_by=created_by
         )
         
+        record_activity(
+            self.db, "document_created", actor_id=created_by,
+            object_type="document", object_id=document_id, document_id=document_id,
+            title=document_data.title,
+            details={"document_type": document_data.document_type, "version": 1}
+        )
+        
         # Only commit at the end to reduce I/O overhead
         self.db.commit()
         
@@ -59,6 +67,52 @@ class DocumentService:
         # refresh() causes an additional SELECT query
         return db_document
     
+    def create_documents(
+        self,
+        documents: List[DocumentCreate],
+        created_by: Optional[str] = None,
+        commit: bool = True
+    ) -> List[Document]:
+        """Create several documents with their initial history entries and activity in one transaction"""
+        db_documents = [
+            Document(
+                id=str(uuid.uuid4()),
+                title=document_data.title,
+                content=document_data.content,
+                document_type=document_data.document_type,
+                placeholders=document_data.placeholders,
+                created_by=created_by,
+                version=1
+            )
+            for document_data in documents
+        ]
+        
+        self.db.add_all(db_documents)
+        self.db.flush()
+        
+        for db_document in db_documents:
+            self._create_history_entry(
+                document_id=db_document.id,
+                version_number=1,
+                title=db_document.title,
+                content=db_document.content,
+                document_type=db_document.document_type,
+                placeholders=db_document.placeholders,
+                change_summary="Initial document creation",
+                created_by=created_by
+            )
+            record_activity(
+                self.db, "document_created", actor_id=created_by,
+                object_type="document", object_id=db_document.id, document_id=db_document.id,
+                title=db_document.title,
+                details={"document_type": db_document.document_type, "version": 1}
+            )
+        
+        if commit:
+            self.db.commit()
+        
+        return db_documents
+    
     def get_document(self, document_id: str) -> Optional[Document]:
         """Get a document by ID"""
         return self.db.query(Document).filter(Document.id == document_id).first()
@@ -123,18 +177,34 @@ class DocumentService:
                 parent_version=original_version,
                 created_by=updated_by
             )
+            
+            record_activity(
+                self.db, "document_updated", actor_id=updated_by,
+                recipients=[db_document.created_by],
+                object_type="document", object_id=document_id, document_id=document_id,
+                title=db_document.title,
+                details={"document_type": db_document.document_type, "version": db_document.version}
+            )
         
         self.db.commit()
         self.db.refresh(db_document)
         
         return db_document
     
-    def delete_document(self, document_id: str) -> bool:
+    def delete_document(self, document_id: str, deleted_by: Optional[str] = None) -> bool:
         """Delete a document"""
         db_document = self.get_document(document_id)
         if not db_document:
             return False
         
+        record_activity(
+            self.db, "document_deleted", actor_id=deleted_by,
+            recipients=[db_document.created_by],
+            object_type="document", object_id=document_id, document_id=document_id,
+            title=db_document.title,
+            details={"document_type": db_document.document_type, "version": db_document.version}
+        )
+        
         self.db.delete(db_document)
         self.db.commit()
         
@@ -0,0 +1,203 @@
+"""
+Escalation scheduler
+
+Keeps WorkflowStepInstance.next_escalation_at pointing at the next moment a
+step needs attention from the escalation engine, so each processing tick
+reads only the due steps from an index instead of scanning every open step.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, selectinload
+from app.models.workflow import WorkflowInstance, WorkflowStepInstance, StepInstanceStatus
+from app.models.workflow_conditions import EscalationRule, EscalationInstance
+from app.services.business_calendar_service import BusinessCalendarService, CompiledCalendar
+
+
+OPEN_STEP_STATUSES = (StepInstanceStatus.PENDING, StepInstanceStatus.IN_PROGRESS)
+
+# How often condition-based triggers are re-checked while a step is open
+CONDITION_POLL_INTERVAL = timedelta(minutes=15)
+DEFAULT_NOTIFICATION_INTERVALS = [24, 48, 72]  # Hours between escalation levels
+ESCALATION_BATCH_SIZE = 200
+
+
+class EscalationScheduler:
+    """Computes and stores the next escalation time of workflow steps"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.calendars = BusinessCalendarService(db)
+
+    # Rule clocks
+    def rule_calendar(self, rule: EscalationRule) -> Optional[CompiledCalendar]:
+        """Calendar a rule counts its hours on, or None for wall-clock hours"""
+        if rule.business_hours_only:
+            return self.calendars.business_calendar(rule.workflow_id)
+        if rule.exclude_weekends:
+            return self.calendars.business_calendar(rule.workflow_id).full_working_days()
+        return None
+
+    def hours_after(self, rule: EscalationRule, start: datetime, hours: float) -> datetime:
+        """The moment `hours` rule hours after start"""
+        calendar = self.rule_calendar(rule)
+        return calendar.add_hours(start, hours) if calendar else start + timedelta(hours=hours)
+
+    def hours_between(self, rule: EscalationRule, start: datetime, end: datetime) -> float:
+        """Rule hours elapsed from start to end"""
+        calendar = self.rule_calendar(rule)
+        if calendar:
+            return calendar.hours_between(start, end)
+        return (end - start).total_seconds() / 3600
+
+    # Rule and escalation lookups, batched across steps
+    def rules_for_steps(self, step_instances: Iterable[WorkflowStepInstance]) -> Dict[str, List[EscalationRule]]:
+        """Active escalation rules applicable to each step instance, loaded in one query"""
+        step_instances = list(step_instances)
+        if not step_instances:
+            return {}
+
+        workflow_ids = {si.workflow_instance.workflow_id for si in step_instances}
+        step_ids = {si.step_id for si in step_instances}
+
+        rules = self.db.query(EscalationRule).filter(
+            EscalationRule.is_active == True,
+            or_(
+                and_(EscalationRule.workflow_id.in_(workflow_ids), EscalationRule.step_id.is_(None)),
+                EscalationRule.step_id.in_(step_ids)
+            )
+        ).all()
+
+        workflow_rules: Dict[str, List[EscalationRule]] = {}
+        step_rules: Dict[str, List[EscalationRule]] = {}
+        for rule in rules:
+            if rule.step_id:
+                step_rules.setdefault(rule.step_id, []).append(rule)
+            else:
+                workflow_rules.setdefault(rule.workflow_id, []).append(rule)
+
+        return {
+            si.id: workflow_rules.get(si.workflow_instance.workflow_id, []) + step_rules.get(si.step_id, [])
+            for si in step_instances
+        }
+
+    def active_escalations(self, step_instance_ids: Iterable[str]) -> Dict[str, EscalationInstance]:
+        """Active escalation per step instance, loaded in one query"""
+        step_instance_ids = list(step_instance_ids)
+        if not step_instance_ids:
+            return {}
+
+        return {
+            escalation.step_instance_id: escalation
+            for escalation in self.db.query(EscalationInstance).options(
+                selectinload(EscalationInstance.escalation_rule)
+            ).filter(
+                EscalationInstance.step_instance_id.in_(step_instance_ids),
+                EscalationInstance.status == "active"
+            ).all()
+        }
+
+    # Scheduling
+    def next_escalation_time(
+        self,
+        step_instance: WorkflowStepInstance,
+        rules: List[EscalationRule],
+        active_escalation: Optional[EscalationInstance] = None,
+        now: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        Next time the escalation engine must look at a step.
+
+        Returns:
+            The earliest rule trigger, condition re-check or escalation level
+            time, or None when nothing can happen to the step
+        """
+        now = now or datetime.utcnow()
+
+        if step_instance.status not in OPEN_STEP_STATUSES:
+            # A completed step only needs a visit to resolve its escalation
+            return now if active_escalation else None
+
+        if active_escalation:
+            rule = active_escalation.escalation_rule
+            intervals = rule.notification_intervals or DEFAULT_NOTIFICATION_INTERVALS
+            level = active_escalation.current_level
+            if level >= len(intervals) or not active_escalation.last_escalated_at:
+                return None
+            if level >= rule.max_escalation_levels - 1 and not rule.auto_approve_after_escalation:
+                # Top of the chain: only completing the step changes anything now
+                return None
+            return self.hours_after(rule, active_escalation.last_escalated_at, intervals[level])
+
+        if not step_instance.started_at:
+            return None
+
+        candidates = []
+        for rule in rules:
+            if rule.trigger_after_hours:
+                candidates.append(self.hours_after(rule, step_instance.started_at, rule.trigger_after_hours))
+            if rule.trigger_conditions:
+                candidates.append(now + CONDITION_POLL_INTERVAL)
+
+        return min(candidates) if candidates else None
+
+    def schedule_new_step(self, step_instance: WorkflowStepInstance, workflow_id: str,
+                          now: Optional[datetime] = None) -> None:
+        """Register the first escalation time of a newly created step (caller commits)"""
+        rules = self.db.query(EscalationRule).filter(
+            EscalationRule.is_active == True,
+            or_(
+                and_(EscalationRule.workflow_id == workflow_id, EscalationRule.step_id.is_(None)),
+                EscalationRule.step_id == step_instance.step_id
+            )
+        ).all()
+        step_instance.next_escalation_at = self.next_escalation_time(step_instance, rules, None, now)
+
+    def schedule_steps(self, step_instances: Iterable[WorkflowStepInstance], now: Optional[datetime] = None) -> None:
+        """Recompute next_escalation_at for the given steps (caller commits)"""
+        step_instances = list(step_instances)
+        rules = self.rules_for_steps(step_instances)
+        escalations = self.active_escalations(si.id for si in step_instances)
+
+        for step_instance in step_instances:
+            step_instance.next_escalation_at = self.next_escalation_time(
+                step_instance, rules.get(step_instance.id, []), escalations.get(step_instance.id), now
+            )
+
+    def reschedule_open_steps(self, workflow_id: Optional[str] = None, step_id: Optional[str] = None) -> int:
+        """
+        Recompute schedules for open steps and commit.
+
+        Called with a workflow (and optionally step) after an escalation rule
+        changes, or without arguments to backfill every open step.
+        """
+        query = self.db.query(WorkflowStepInstance).join(WorkflowInstance).filter(
+            WorkflowStepInstance.status.in_(OPEN_STEP_STATUSES)
+        )
+        if workflow_id:
+            query = query.filter(WorkflowInstance.workflow_id == workflow_id)
+        if step_id:
+            query = query.filter(WorkflowStepInstance.step_id == step_id)
+
+        step_instances = query.all()
+        self.schedule_steps(step_instances)
+        self.db.commit()
+        return len(step_instances)
+
+    def due_steps(
+        self,
+        now: datetime,
+        limit: int = ESCALATION_BATCH_SIZE,
+        exclude: Iterable[str] = ()
+    ) -> List[WorkflowStepInstance]:
+        """Steps whose next escalation time has passed, earliest first, skipping `exclude` ids"""
+        query = self.db.query(WorkflowStepInstance).options(
+            selectinload(WorkflowStepInstance.workflow_instance)
+        ).filter(
+            WorkflowStepInstance.next_escalation_at.isnot(None),
+            WorkflowStepInstance.next_escalation_at <= now
+        )
+        exclude = list(exclude)
+        if exclude:
+            query = query.filter(WorkflowStepInstance.id.notin_(exclude))
+        return query.order_by(WorkflowStepInstance.next_escalation_at).limit(limit).all()
@@ -2,7 +2,7 @@
 Escalation Service for CA-DMS
 
 Handles automated escalation of workflow steps with custom triggers and conditions.
-Supports business hours, priority-based escalation, and multi-level escalation chains.
+Supports business calendars, priority-based escalation, and multi-level escalation chains.
 """
 
 import json
@@ -21,6 +21,11 @@ from app.models.workflow import (
 from app.models.user import User
 from app.services.notification_service import NotificationService
 from app.services.workflow_condition_service import WorkflowConditionService
+from app.services.document_metrics_service import get_document_metrics
+from app.services.escalation_scheduler import (
+    EscalationScheduler, OPEN_STEP_STATUSES, CONDITION_POLL_INTERVAL, ESCALATION_BATCH_SIZE,
+    DEFAULT_NOTIFICATION_INTERVALS
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -38,16 +43,22 @@ class EscalationService:
         self.db = db
         self.notification_service = NotificationService(db)
         self.condition_service = WorkflowConditionService(db)
+        self.scheduler = EscalationScheduler(db)
 
     # =========================================================================
     # Main Escalation Processing
     # =========================================================================
 
-    def process_escalations(self) -> Dict[str, Any]:
+    def process_escalations(self, now: Optional[datetime] = None, batch_size: int = ESCALATION_BATCH_SIZE) -> Dict[str, Any]:
         """
-        Process all pending escalations across all workflows.
+        Process the steps whose scheduled escalation time has passed.
         This should be called periodically (e.g., every 15 minutes) by a scheduler.
+        
+        Due steps are read from the next_escalation_at index in batches; rules and
+        active escalations are loaded once per batch and each batch is committed once.
+        Each step is visited at most once per call, even if it is still due afterwards.
         """
+        now = now or datetime.utcnow()
         results = {
             "processed_escalations": 0,
             "new_escalations": 0,
@@ -55,16 +66,51 @@ class EscalationService:
             "errors": []
         }
 
+        processed_ids: List[str] = []
         try:
-            # Find step instances that may need escalation
-            pending_steps = self._get_escalation_candidates()
-            
-            for step_instance in pending_steps:
-                try:
-                    escalation_result = self._evaluate_step_for_escalation(step_instance)
+            while True:
+                due_steps = self.scheduler.due_steps(now, batch_size, exclude=processed_ids)
+                if not due_steps:
+                    break
+                
+                processed_ids.extend(si.id for si in due_steps)
+                self._process_escalation_batch(due_steps, now, results)
+                self.db.commit()
+                
+                if len(due_steps) < batch_size:
+                    break
+
+        except Exception as e:
+            self.db.rollback()
+            error_msg = f"Error in escalation processing: {str(e)}"
+            logger.error(error_msg)
+            results["errors"].append(error_msg)
+
+        return results
+
+    def _process_escalation_batch(
+        self,
+        due_steps: List[WorkflowStepInstance],
+        now: datetime,
+        results: Dict[str, Any]
+    ) -> None:
+        """Evaluate and escalate one batch of due steps, then reschedule them"""
+        
+        rules_by_step = self.scheduler.rules_for_steps(due_steps)
+        escalations = self.scheduler.active_escalations(si.id for si in due_steps)
+        
+        for step_instance in due_steps:
+            rules = rules_by_step.get(step_instance.id, [])
+            try:
+                with self.db.begin_nested():
+                    escalation_result = self._evaluate_step_for_escalation(
+                        step_instance, rules, escalations.get(step_instance.id), now
+                    )
                     
                     if escalation_result["action"] == "escalate":
-                        self._trigger_escalation(step_instance, escalation_result["rule"])
+                        escalations[step_instance.id] = self._trigger_escalation(
+                            step_instance, escalation_result["rule"]
+                        )
                         results["new_escalations"] += 1
                         
                     elif escalation_result["action"] == "continue":
@@ -74,68 +120,54 @@ class EscalationService:
                     elif escalation_result["action"] == "resolve":
                         self._resolve_escalation(escalation_result["instance"])
                         results["resolved_escalations"] += 1
-                        
-                except Exception as e:
-                    error_msg = f"Error processing escalation for step {step_instance.id}: {str(e)}"
-                    logger.error(error_msg)
-                    results["errors"].append(error_msg)
-
-        except Exception as e:
-            error_msg = f"Error in escalation processing: {str(e)}"
-            logger.error(error_msg)
-            results["errors"].append(error_msg)
-
-        return results
-
-    def _get_escalation_candidates(self) -> List[WorkflowStepInstance]:
-        """Get step instances that are candidates for escalation"""
-        
-        # Find step instances that are pending or in progress
-        return self.db.query(WorkflowStepInstance).filter(
-            WorkflowStepInstance.status.in_([StepInstanceStatus.PENDING, StepInstanceStatus.IN_PROGRESS]),
-            WorkflowStepInstance.started_at.isnot(None)  # Only steps that have been started
-        ).all()
-
-    def _evaluate_step_for_escalation(self, step_instance: WorkflowStepInstance) -> Dict[str, Any]:
+                    
+                    escalation = escalations.get(step_instance.id)
+                    if escalation is not None and escalation.status != "active":
+                        escalation = None
+                    step_instance.next_escalation_at = self.scheduler.next_escalation_time(
+                        step_instance, rules, escalation, now
+                    )
+                    
+            except Exception as e:
+                error_msg = f"Error processing escalation for step {step_instance.id}: {str(e)}"
+                logger.error(error_msg)
+                results["errors"].append(error_msg)
+                # Retry on a later tick rather than on every batch of this one
+                step_instance.next_escalation_at = now + CONDITION_POLL_INTERVAL
+
+    def _evaluate_step_for_escalation(
+        self,
+        step_instance: WorkflowStepInstance,
+        escalation_rules: List[EscalationRule],
+        existing_escalation: Optional[EscalationInstance],
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """Evaluate if a step instance needs escalation"""
         
-        # Check for existing active escalation
-        existing_escalation = self.db.query(EscalationInstance).filter(
-            EscalationInstance.step_instance_id == step_instance.id,
-            EscalationInstance.status == "active"
-        ).first()
-
-        # Get escalation rules for this step
-        escalation_rules = self._get_applicable_escalation_rules(step_instance)
-        
         if existing_escalation:
             # Check if escalation should continue
-            return self._evaluate_existing_escalation(existing_escalation)
-        else:
-            # Check if escalation should be triggered
-            for rule in escalation_rules:
-                if self._should_trigger_escalation(step_instance, rule):
-                    return {"action": "escalate", "rule": rule}
+            return self._evaluate_existing_escalation(existing_escalation, now)
+        
+        if step_instance.status not in OPEN_STEP_STATUSES:
+            return {"action": "none"}
+        
+        # Check if escalation should be triggered
+        for rule in escalation_rules:
+            if self._should_trigger_escalation(step_instance, rule, now):
+                return {"action": "escalate", "rule": rule}
                     
         return {"action": "none"}
 
-    def _should_trigger_escalation(self, step_instance: WorkflowStepInstance, rule: EscalationRule) -> bool:
+    def _should_trigger_escalation(
+        self, step_instance: WorkflowStepInstance, rule: EscalationRule, now: Optional[datetime] = None
+    ) -> bool:
         """Determine if escalation should be triggered for a step"""
+        now = now or datetime.utcnow()
         
-        # Time-based trigger
+        # Time-based trigger, counted on the rule's business calendar if it has one
         if rule.trigger_after_hours:
-            time_elapsed = datetime.utcnow() - step_instance.started_at
-            hours_elapsed = time_elapsed.total_seconds() / 3600
-            
+            hours_elapsed = self.scheduler.hours_between(rule, step_instance.started_at, now)
             if hours_elapsed >= rule.trigger_after_hours:
-                # Check business hours restriction
-                if rule.business_hours_only and not self._is_business_hours():
-                    return False
-                    
-                # Check weekend restriction
-                if rule.exclude_weekends and self._is_weekend():
-                    return False
-                    
                 return True
 
         # Condition-based trigger
@@ -143,7 +175,7 @@ class EscalationService:
             workflow_instance = step_instance.workflow_instance
             context = {
                 "step_started_at": step_instance.started_at.isoformat(),
-                "hours_elapsed": (datetime.utcnow() - step_instance.started_at).total_seconds() / 3600,
+                "hours_elapsed": self.scheduler.hours_between(rule, step_instance.started_at, now),
                 "step_status": step_instance.status.value,
                 "assigned_to": step_instance.assigned_to
             }
@@ -178,6 +210,14 @@ class EscalationService:
                 actual_value = self._get_document_field_value(document, field_path)
                 return actual_value == expected_value
                 
+        elif condition_type == "document_metric":
+            metric = trigger_conditions.get("metric", "content_length")
+            threshold = trigger_conditions.get("threshold")
+            
+            if threshold is not None:
+                metrics = get_document_metrics(workflow_instance.document).to_dict()
+                return metrics.get(metric, 0) >= threshold
+                
         elif condition_type == "approval_count":
             required_count = trigger_conditions.get("required_count", 1)
             actual_count = self.db.query(WorkflowStepInstance).filter(
@@ -192,7 +232,7 @@ class EscalationService:
     # Escalation Execution
     # =========================================================================
 
-    def _trigger_escalation(self, step_instance: WorkflowStepInstance, rule: EscalationRule) -> None:
+    def _trigger_escalation(self, step_instance: WorkflowStepInstance, rule: EscalationRule) -> EscalationInstance:
         """Trigger a new escalation for a step instance"""
         
         logger.info(f"Triggering escalation for step {step_instance.id} using rule {rule.name}")
@@ -214,7 +254,7 @@ class EscalationService:
         # Execute first level escalation
         self._execute_escalation_level(escalation_instance, rule)
         
-        self.db.commit()
+        return escalation_instance
 
     def _continue_escalation(self, step_instance: WorkflowStepInstance, escalation_instance: EscalationInstance) -> None:
         """Continue an existing escalation to the next level"""
@@ -225,7 +265,6 @@ class EscalationService:
         if escalation_instance.current_level < rule.max_escalation_levels - 1:
             escalation_instance.current_level += 1
             self._execute_escalation_level(escalation_instance, rule)
-            self.db.commit()
             
             logger.info(f"Escalated step {step_instance.id} to level {escalation_instance.current_level}")
         else:
@@ -389,8 +428,11 @@ class EscalationService:
         
         logger.info(f"Auto-approved step {step_instance.id} after escalation")
 
-    def _evaluate_existing_escalation(self, escalation_instance: EscalationInstance) -> Dict[str, Any]:
+    def _evaluate_existing_escalation(
+        self, escalation_instance: EscalationInstance, now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """Evaluate an existing escalation to determine next action"""
+        now = now or datetime.utcnow()
         
         rule = escalation_instance.escalation_rule
         step_instance = escalation_instance.step_instance
@@ -401,11 +443,11 @@ class EscalationService:
             
         # Check if it's time for next escalation level
         if escalation_instance.last_escalated_at:
-            notification_intervals = rule.notification_intervals or [24, 48, 72]  # Default intervals in hours
+            notification_intervals = rule.notification_intervals or DEFAULT_NOTIFICATION_INTERVALS
             level = escalation_instance.current_level
             
             if level < len(notification_intervals):
-                hours_since_escalation = (datetime.utcnow() - escalation_instance.last_escalated_at).total_seconds() / 3600
+                hours_since_escalation = self.scheduler.hours_between(rule, escalation_instance.last_escalated_at, now)
                 
                 if hours_since_escalation >= notification_intervals[level]:
                     return {"action": "continue", "instance": escalation_instance}
@@ -416,42 +458,15 @@ class EscalationService:
     # Utility Methods
     # =========================================================================
 
-    def _get_applicable_escalation_rules(self, step_instance: WorkflowStepInstance) -> List[EscalationRule]:
-        """Get escalation rules applicable to a step instance"""
-        
-        workflow_instance = step_instance.workflow_instance
-        
-        return self.db.query(EscalationRule).filter(
-            EscalationRule.is_active == True,
-            or_(
-                and_(
-                    EscalationRule.workflow_id == workflow_instance.workflow_id,
-                    EscalationRule.step_id.is_(None)
-                ),
-                EscalationRule.step_id == step_instance.step_id
-            )
-        ).all()
-
-    def _is_business_hours(self) -> bool:
-        """Check if current time is within business hours (9 AM - 5 PM, Mon-Fri UTC)"""
-        now = datetime.utcnow()
-        weekday = now.weekday()  # 0 = Monday, 6 = Sunday
-        hour = now.hour
-        
-        return weekday < 5 and 9 <= hour < 17
-
-    def _is_weekend(self) -> bool:
-        """Check if current day is weekend"""
-        now = datetime.utcnow()
-        weekday = now.weekday()  # 0 = Monday, 6 = Sunday
-        return weekday >= 5
-
     def _get_document_field_value(self, document, field_path: str) -> Any:
         """Get value from document field using path notation"""
         
         if field_path.startswith("metadata."):
             field_name = field_path.split(".", 1)[1]
             return getattr(document, field_name, None)
+        elif field_path.startswith("metrics."):
+            metric_name = field_path.split(".", 1)[1]
+            return get_document_metrics(document).to_dict().get(metric_name)
         elif field_path.startswith("content."):
             content = document.content or {}
             path_parts = field_path.split(".")[1:]
@@ -497,6 +512,8 @@ class EscalationService:
         self.db.add(escalation_rule)
         self.db.commit()
         
+        self.scheduler.reschedule_open_steps(workflow_id, step_id)
+        
         return escalation_rule
 
     def get_escalation_statistics(self, workflow_id: Optional[str] = None) -> Dict[str, Any]:
@@ -0,0 +1,487 @@
+"""
+Notification delivery pipeline for CA-DMS
+
+Pending notifications form an outbox that delivery workers claim in batches.
+Each batch is sent through per-channel async senders (email over a pool of
+persistent SMTP connections) and the outcomes are written back with one bulk
+update. Failed sends are retried with exponential backoff until max_retries.
+Held topic notifications are folded into digests before each claim.
+"""
+import asyncio
+import os
+import queue
+import random
+import smtplib
+import socket
+import threading
+import uuid
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.notification import (
+    Notification, NotificationLog, NotificationStatus, NotificationType, NotificationPriority
+)
+from app.core.config import settings
+from app.services.notification_digest import NotificationCoalescer
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses a worker may (re)send; FAILED rows are retried while retry_count < max_retries
+DELIVERABLE_STATUSES = (NotificationStatus.PENDING, NotificationStatus.FAILED)
+
+PRIORITY_ORDER = case(
+    (Notification.priority == NotificationPriority.URGENT, 0),
+    (Notification.priority == NotificationPriority.HIGH, 1),
+    (Notification.priority == NotificationPriority.LOW, 3),
+    else_=2
+)
+
+
+def retry_delay(retry_count: int) -> timedelta:
+    """Backoff before the next attempt after `retry_count` earlier failures"""
+    seconds = min(
+        settings.NOTIFICATION_RETRY_BASE_SECONDS * (2 ** retry_count),
+        settings.NOTIFICATION_RETRY_MAX_SECONDS
+    )
+    # Jitter spreads retries of a failed batch so they do not all land on one tick
+    return timedelta(seconds=seconds * random.uniform(0.9, 1.1))
+
+
+def build_email_message(subject: Optional[str], content: str, recipient: str, sender: str) -> MIMEMultipart:
+    """MIME message for a notification, HTML when the content looks like markup"""
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject or ""
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg.attach(MIMEText(content, 'html' if content.startswith('<') else 'plain'))
+    return msg
+
+
+# =========================================================================
+# SMTP connection pool
+# =========================================================================
+
+class SMTPConnectionPool:
+    """Thread-safe pool of connected, logged-in SMTP sessions reused across messages"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_tls: bool = False,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 4,
+        timeout: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.connections_opened = 0
+
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._discard(server)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _discard(server: smtplib.SMTP) -> None:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def send_message(self, msg: MIMEMultipart) -> None:
+        """Send one message on a pooled connection, blocking while all connections are busy"""
+        with self._slots:
+            try:
+                server = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                server = self._connect()
+                reused = False
+
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._discard(server)
+                if not reused:
+                    raise
+                # The server dropped an idle connection; retry once on a fresh one
+                server = self._connect()
+                try:
+                    server.send_message(msg)
+                except Exception:
+                    self._discard(server)
+                    raise
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # Rejected message, healthy connection
+                self._idle.put(server)
+                raise
+            except Exception:
+                self._discard(server)
+                raise
+
+            self._idle.put(server)
+
+    def close(self) -> None:
+        """Quit all idle connections"""
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                server.quit()
+            except Exception:
+                self._discard(server)
+
+
+_smtp_pools: Dict[Tuple, SMTPConnectionPool] = {}
+_smtp_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(config: Any = None) -> SMTPConnectionPool:
+    """Shared pool for the configured SMTP server"""
+    config = config or settings
+    key = (config.SMTP_HOST, config.SMTP_PORT, config.SMTP_USERNAME, config.SMTP_TLS)
+    with _smtp_pools_lock:
+        pool = _smtp_pools.get(key)
+        if pool is None:
+            pool = SMTPConnectionPool(
+                host=config.SMTP_HOST,
+                port=config.SMTP_PORT,
+                use_tls=config.SMTP_TLS,
+                username=config.SMTP_USERNAME,
+                password=config.SMTP_PASSWORD,
+                size=config.SMTP_POOL_SIZE,
+                timeout=config.SMTP_TIMEOUT_SECONDS
+            )
+            _smtp_pools[key] = pool
+        return pool
+
+
+def close_smtp_pools() -> None:
+    with _smtp_pools_lock:
+        pools = list(_smtp_pools.values())
+        _smtp_pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+# =========================================================================
+# Channel senders
+# =========================================================================
+
+@dataclass(frozen=True)
+class OutboundMessage:
+    """Session-independent copy of a claimed notification"""
+    notification_id: int
+    type: NotificationType
+    recipient: str
+    subject: Optional[str]
+    content: str
+    retry_count: int
+    max_retries: int
+
+
+@dataclass
+class DeliveryResult:
+    notification_id: int
+    success: bool
+    error: Optional[str] = None
+
+
+class EmailSender:
+    """Sends email notifications concurrently over the SMTP connection pool"""
+
+    channel = NotificationType.EMAIL
+
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None, sender: Optional[str] = None):
+        self.pool = pool or get_smtp_pool()
+        self.sender = sender or settings.SMTP_FROM_EMAIL
+
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[DeliveryResult]:
+        limit = asyncio.Semaphore(self.pool.size)
+
+        async def send(message: OutboundMessage) -> DeliveryResult:
+            async with limit:
+                msg = build_email_message(message.subject, message.content, message.recipient, self.sender)
+                try:
+                    await asyncio.to_thread(self.pool.send_message, msg)
+                    return DeliveryResult(message.notification_id, True)
+                except Exception as e:
+                    logger.error(f"Failed to send email to {message.recipient}: {str(e)}")
+                    return DeliveryResult(message.notification_id, False, str(e))
+
+        return list(await asyncio.gather(*(send(m) for m in messages)))
+
+
+class LoggingSender:
+    """Placeholder channel that logs instead of calling an external API (SMS, Slack, Teams)"""
+
+    def __init__(self, channel: NotificationType):
+        self.channel = channel
+
+    async def send_batch(self, messages: List[OutboundMessage]) -> List[DeliveryResult]:
+        for message in messages:
+            logger.info(
+                f"{self.channel.value} notification would be sent to {message.recipient}: {message.content[:50]}..."
+            )
+        return [DeliveryResult(m.notification_id, True) for m in messages]
+
+
+def default_senders() -> Dict[NotificationType, Any]:
+    return {
+        NotificationType.EMAIL: EmailSender(),
+        NotificationType.SMS: LoggingSender(NotificationType.SMS),
+        NotificationType.SLACK: LoggingSender(NotificationType.SLACK),
+        NotificationType.TEAMS: LoggingSender(NotificationType.TEAMS),
+    }
+
+
+# =========================================================================
+# Delivery worker
+# =========================================================================
+
+@dataclass
+class DeliveryStats:
+    claimed: int = 0
+    sent: int = 0
+    failed: int = 0           # Failed attempts that will be retried
+    exhausted: int = 0        # Failed attempts with no retries left
+    coalesced: int = 0        # Notifications folded into digests before the claim
+    sends_saved: int = 0      # Sends avoided by those digests
+    errors: List[str] = field(default_factory=list)
+
+
+class NotificationDeliveryWorker:
+    """Claims batches of due notifications, delivers them and records the outcomes"""
+
+    def __init__(
+        self,
+        db: Session,
+        worker_id: Optional[str] = None,
+        senders: Optional[Dict[NotificationType, Any]] = None,
+        batch_size: Optional[int] = None,
+        coalesce: bool = True
+    ):
+        self.db = db
+        self.coalescer = NotificationCoalescer(db) if coalesce else None
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.senders = senders if senders is not None else default_senders()
+        self.batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+
+    def claim_batch(self, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[OutboundMessage]:
+        """
+        Claim up to `limit` due notifications for this worker and commit the claim.
+
+        Candidate rows are locked with FOR UPDATE SKIP LOCKED where the database
+        supports it; the claim update re-checks claimability so concurrent
+        workers on other databases cannot claim the same row twice.
+        """
+        now = now or datetime.utcnow()
+        limit = limit or self.batch_size
+        lease_expired = now - timedelta(seconds=settings.NOTIFICATION_CLAIM_TIMEOUT_SECONDS)
+        claimable = (
+            Notification.status.in_(DELIVERABLE_STATUSES),
+            Notification.scheduled_at <= now,
+            Notification.retry_count < Notification.max_retries,
+            or_(Notification.claimed_at.is_(None), Notification.claimed_at < lease_expired)
+        )
+
+        candidate_ids = self.db.execute(
+            select(Notification.id).where(*claimable)
+            .order_by(PRIORITY_ORDER, Notification.scheduled_at, Notification.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not candidate_ids:
+            self.db.rollback()
+            return []
+
+        self.db.execute(
+            update(Notification)
+            .where(Notification.id.in_(candidate_ids), *claimable)
+            .values(claimed_by=self.worker_id, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        rows = self.db.execute(
+            select(
+                Notification.id, Notification.type, Notification.recipient, Notification.subject,
+                Notification.content, Notification.retry_count, Notification.max_retries
+            ).where(
+                Notification.id.in_(candidate_ids),
+                Notification.claimed_by == self.worker_id
+            ).order_by(PRIORITY_ORDER, Notification.scheduled_at, Notification.id)
+        ).all()
+        self.db.commit()
+
+        return [
+            OutboundMessage(
+                notification_id=row.id, type=row.type, recipient=row.recipient, subject=row.subject,
+                content=row.content, retry_count=row.retry_count or 0, max_retries=row.max_retries or 0
+            )
+            for row in rows
+        ]
+
+    async def deliver(self, messages: List[OutboundMessage]) -> List[DeliveryResult]:
+        """Send a batch, all channels concurrently"""
+        by_channel: Dict[NotificationType, List[OutboundMessage]] = {}
+        for message in messages:
+            by_channel.setdefault(message.type, []).append(message)
+
+        results: List[DeliveryResult] = []
+        batches = []
+        for channel, channel_messages in by_channel.items():
+            sender = self.senders.get(channel)
+            if sender is None:
+                results.extend(
+                    DeliveryResult(m.notification_id, False, f"Unsupported notification type: {channel}")
+                    for m in channel_messages
+                )
+            else:
+                batches.append(sender.send_batch(channel_messages))
+
+        for channel_results in await asyncio.gather(*batches):
+            results.extend(channel_results)
+        return results
+
+    def record_results(
+        self,
+        messages: List[OutboundMessage],
+        results: List[DeliveryResult],
+        now: Optional[datetime] = None
+    ) -> DeliveryStats:
+        """Write all outcomes of a batch with one bulk update and one log insert"""
+        now = now or datetime.utcnow()
+        stats = DeliveryStats(claimed=len(messages))
+        by_id = {m.notification_id: m for m in messages}
+
+        updates, logs = [], []
+        for result in results:
+            message = by_id[result.notification_id]
+            if result.success:
+                stats.sent += 1
+                updates.append({
+                    "id": result.notification_id, "status": NotificationStatus.SENT, "sent_at": now,
+                    "error_message": None, "claimed_by": None, "claimed_at": None
+                })
+                logs.append({"notification_id": result.notification_id, "event_type": "sent", "event_data": {}})
+            else:
+                retry_count = message.retry_count + 1
+                if retry_count < message.max_retries:
+                    stats.failed += 1
+                else:
+                    stats.exhausted += 1
+                stats.errors.append(f"Notification {result.notification_id}: {result.error}")
+                updates.append({
+                    "id": result.notification_id, "status": NotificationStatus.FAILED,
+                    "retry_count": retry_count, "error_message": result.error,
+                    "scheduled_at": now + retry_delay(message.retry_count),
+                    "claimed_by": None, "claimed_at": None
+                })
+                logs.append({
+                    "notification_id": result.notification_id, "event_type": "failed",
+                    "event_data": {"error": result.error, "retry_count": retry_count}
+                })
+
+        if updates:
+            self.db.execute(update(Notification), updates)
+            self.db.execute(insert(NotificationLog), logs)
+        self.db.commit()
+        return stats
+
+    async def run_once(self, limit: Optional[int] = None) -> DeliveryStats:
+        """
+        Coalesce due digests, then claim, deliver and record one batch.
+
+        Database work runs in a worker thread so that, inside the API process,
+        claims and lock waits do not block the event loop.
+        """
+        digests = await asyncio.to_thread(self.coalescer.coalesce) if self.coalescer else None
+        messages = await asyncio.to_thread(self.claim_batch, limit)
+        if messages:
+            results = await self.deliver(messages)
+            stats = await asyncio.to_thread(self.record_results, messages, results)
+        else:
+            stats = DeliveryStats()
+        if digests:
+            stats.coalesced, stats.sends_saved = digests.coalesced, digests.sends_saved
+        return stats
+
+    def process_pending(self, limit: Optional[int] = None) -> DeliveryStats:
+        """Synchronous entry point for callers outside an event loop"""
+        return asyncio.run(self.run_once(limit))
+
+    async def run(self, stop_event: asyncio.Event, poll_interval: float = 5.0) -> None:
+        """Deliver batches until stop_event is set, idling while the outbox is empty"""
+        while not stop_event.is_set():
+            try:
+                stats = await self.run_once()
+            except Exception as e:
+                await asyncio.to_thread(self.db.rollback)
+                logger.error(f"Notification delivery batch failed: {str(e)}")
+                stats = DeliveryStats()
+            if stats.claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+# Background worker inside the API process (NOTIFICATION_WORKER_ENABLED)
+_background_stop: Optional[asyncio.Event] = None
+_background_task: Optional["asyncio.Task[None]"] = None
+
+
+async def _run_background_worker(stop_event: asyncio.Event) -> None:
+    from app.core import database
+    if database.SessionLocal is None:
+        database.init_db()
+    db = database.SessionLocal()
+    try:
+        await NotificationDeliveryWorker(db).run(stop_event)
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def start_background_delivery() -> None:
+    global _background_stop, _background_task
+    if _background_task is None:
+        _background_stop = asyncio.Event()
+        _background_task = asyncio.create_task(_run_background_worker(_background_stop))
+
+
+async def stop_background_delivery() -> None:
+    global _background_stop, _background_task
+    if _background_task is not None:
+        _background_stop.set()
+        await _background_task
+        _background_stop, _background_task = None, None
+    close_smtp_pools()
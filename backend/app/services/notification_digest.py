@@ -0,0 +1,200 @@
+"""
+Notification digests for CA-DMS
+
+High-volume notification streams (workflow approvals, delegations, status
+changes) are tagged with a digest topic when created. Low and normal priority
+notifications with a topic are held for the digest window; the coalescer then
+folds each user/channel/topic group into a single digest notification, which
+the delivery worker sends like any other. High and urgent notifications are
+never held.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+from jinja2 import Template
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.notification import (
+    Notification, NotificationLog, NotificationStatus, NotificationType, NotificationPriority
+)
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Priorities that are delivered immediately instead of waiting for a digest
+DIGEST_BYPASS_PRIORITIES = (NotificationPriority.HIGH, NotificationPriority.URGENT)
+
+PRIORITY_RANK = {
+    NotificationPriority.LOW: 0,
+    NotificationPriority.NORMAL: 1,
+    NotificationPriority.HIGH: 2,
+    NotificationPriority.URGENT: 3,
+}
+
+# Upper bound on digest groups folded per coalescing pass
+DIGEST_BATCH_SIZE = 200
+
+DIGEST_SUBJECT = Template("{{ items | length }} {{ topic }} updates")
+
+DIGEST_TEXT = Template(
+    "You have {{ items | length }} new {{ topic }} notifications:\n"
+    "{% for item in items %}\n"
+    "- {{ item.subject or 'Notification' }}\n"
+    "  {{ item.content }}\n"
+    "{% endfor %}"
+)
+
+DIGEST_HTML = Template(
+    "<p>You have {{ items | length }} new {{ topic }} notifications:</p>\n"
+    "<ul>\n"
+    "{% for item in items %}"
+    "<li><strong>{{ item.subject or 'Notification' }}</strong><div>{{ item.content }}</div></li>\n"
+    "{% endfor %}"
+    "</ul>"
+)
+
+
+def digest_key(user_id: Union[str, int], notification_type: NotificationType, topic: str) -> str:
+    """Group key shared by notifications that may be merged into one digest"""
+    return f"{user_id}:{notification_type.value}:{topic}"
+
+
+def digest_hold_until(
+    priority: NotificationPriority,
+    scheduled_at: datetime,
+    window_seconds: Optional[int] = None
+) -> Optional[datetime]:
+    """
+    When a topic notification becomes deliverable on its own.
+
+    Returns:
+        scheduled_at pushed back by the digest window, or None when the
+        notification should not be coalesced (priority bypass or window off)
+    """
+    window_seconds = settings.NOTIFICATION_DIGEST_WINDOW_SECONDS if window_seconds is None else window_seconds
+    if window_seconds <= 0 or priority in DIGEST_BYPASS_PRIORITIES:
+        return None
+    return scheduled_at + timedelta(seconds=window_seconds)
+
+
+def _topic(key: str) -> str:
+    return key.split(":", 2)[-1].replace("_", " ")
+
+
+@dataclass
+class CoalesceStats:
+    groups: int = 0           # Digests created
+    coalesced: int = 0        # Notifications folded into a digest
+
+    @property
+    def sends_saved(self) -> int:
+        return self.coalesced - self.groups
+
+
+class NotificationCoalescer:
+    """Folds held topic notifications into one digest per user, channel and topic"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _due_keys(self, now: datetime, limit: int) -> List[str]:
+        """Digest groups whose oldest held notification has waited out the window"""
+        return self.db.execute(
+            select(Notification.digest_key).where(
+                Notification.digest_key.isnot(None),
+                Notification.status == NotificationStatus.PENDING,
+                Notification.claimed_by.is_(None),
+                Notification.scheduled_at <= now
+            ).group_by(Notification.digest_key).order_by(func.min(Notification.scheduled_at)).limit(limit)
+        ).scalars().all()
+
+    def _members(self, keys: List[str]) -> Dict[Tuple[str, str], List[Notification]]:
+        """Every held notification of the given groups, including ones still inside the window"""
+        groups: Dict[Tuple[str, str], List[Notification]] = {}
+        for notification in self.db.execute(
+            select(Notification).where(
+                Notification.digest_key.in_(keys),
+                Notification.status == NotificationStatus.PENDING,
+                Notification.claimed_by.is_(None)
+            ).order_by(Notification.created_at, Notification.id).with_for_update(skip_locked=True)
+        ).scalars():
+            groups.setdefault((notification.digest_key, notification.recipient), []).append(notification)
+        return groups
+
+    def _digest(self, key: str, members: List[Notification], now: datetime) -> Notification:
+        first = members[0]
+        items = [{"subject": m.subject, "content": m.content} for m in members]
+        topic = _topic(key)
+        html = any(m.content.startswith("<") for m in members)
+        return Notification(
+            user_id=first.user_id,
+            type=first.type,
+            priority=max((m.priority or NotificationPriority.NORMAL for m in members), key=PRIORITY_RANK.get),
+            subject=DIGEST_SUBJECT.render(items=items, topic=topic),
+            content=(DIGEST_HTML if html else DIGEST_TEXT).render(items=items, topic=topic),
+            recipient=first.recipient,
+            context_data={"digest": True, "digest_key": key, "notification_ids": [m.id for m in members]},
+            scheduled_at=now,
+            status=NotificationStatus.PENDING
+        )
+
+    def coalesce(self, now: Optional[datetime] = None, limit: int = DIGEST_BATCH_SIZE) -> CoalesceStats:
+        """
+        Replace each due group of two or more held notifications with a digest and commit.
+
+        Groups of one are left alone; once due they are delivered as they are.
+        """
+        now = now or datetime.utcnow()
+        stats = CoalesceStats()
+
+        keys = self._due_keys(now, limit)
+        if not keys:
+            self.db.rollback()
+            return stats
+
+        for (key, _), members in self._members(keys).items():
+            if len(members) < 2:
+                continue
+            try:
+                with self.db.begin_nested():
+                    digest = self._digest(key, members, now)
+                    self.db.add(digest)
+                    self.db.flush()
+
+                    member_ids = [m.id for m in members]
+                    folded = self.db.execute(
+                        update(Notification).where(
+                            Notification.id.in_(member_ids),
+                            Notification.status == NotificationStatus.PENDING,
+                            Notification.claimed_by.is_(None)
+                        ).values(status=NotificationStatus.COALESCED, digest_id=digest.id)
+                        .execution_options(synchronize_session=False)
+                    ).rowcount
+                    if folded != len(member_ids):
+                        # Another worker claimed part of the group; leave it for the next pass
+                        raise RuntimeError(f"Digest group {key} changed while coalescing")
+
+                    self.db.execute(insert(NotificationLog), [
+                        {"notification_id": digest.id, "event_type": "created",
+                         "event_data": {"digest_key": key, "coalesced": len(member_ids)}}
+                    ] + [
+                        {"notification_id": member_id, "event_type": "coalesced",
+                         "event_data": {"digest_id": digest.id}}
+                        for member_id in member_ids
+                    ])
+                stats.groups += 1
+                stats.coalesced += len(member_ids)
+            except Exception as e:
+                logger.warning(f"Skipped digest group {key}: {str(e)}")
+
+        self.db.commit()
+        if stats.groups:
+            logger.info(
+                f"Coalesced {stats.coalesced} notifications into {stats.groups} digests "
+                f"({stats.sends_saved} sends saved)"
+            )
+        return stats
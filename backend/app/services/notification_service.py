@@ -2,13 +2,11 @@
 Notification service for CA-DMS
 Handles email, SMS, and integration notifications
 """
-import smtplib
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any, Union
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
+from typing import List, Dict, Optional, Any, Tuple, Union
 from jinja2 import Template
 import json
 
@@ -19,10 +17,50 @@ from app.models.notification import (
 )
 from app.models.user import User
 from app.core.config import settings
+from app.services.notification_delivery import (
+    NotificationDeliveryWorker, build_email_message, get_smtp_pool, retry_delay
+)
+from app.services.notification_digest import digest_hold_until, digest_key
 
 logger = logging.getLogger(__name__)
 
 
+# Compiled (subject, content) templates keyed by (template id, updated_at); an edit changes the key
+_compiled_templates: "OrderedDict[Tuple[Any, Any], Tuple[Optional[Template], Template]]" = OrderedDict()
+_compiled_templates_lock = threading.Lock()
+COMPILED_TEMPLATE_CACHE_SIZE = 256
+
+# Preference flag consulted for each event type in context_data
+EVENT_PREFERENCE_FLAGS = {
+    "workflow_assigned": "workflow_assigned",
+    "workflow_completed": "workflow_completed",
+    "workflow_rejected": "workflow_rejected",
+    "document_shared": "document_shared",
+    "document_updated": "document_updated",
+}
+
+
+def compile_notification_template(template: NotificationTemplate) -> Tuple[Optional[Template], Template]:
+    """Compiled subject and content templates, built once per template revision"""
+    key = (template.id, template.updated_at)
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is not None:
+            _compiled_templates.move_to_end(key)
+            return compiled
+
+    compiled = (
+        Template(template.subject_template) if template.subject_template else None,
+        Template(template.content_template)
+    )
+    if template.id is not None:
+        with _compiled_templates_lock:
+            _compiled_templates[key] = compiled
+            if len(_compiled_templates) > COMPILED_TEMPLATE_CACHE_SIZE:
+                _compiled_templates.popitem(last=False)
+    return compiled
+
+
 class NotificationService:
     """Service for handling all notification operations"""
     
@@ -37,9 +75,15 @@ class NotificationService:
         notification_type: NotificationType,
         priority: NotificationPriority = NotificationPriority.NORMAL,
         scheduled_at: Optional[datetime] = None,
-        context_data: Optional[Dict[str, Any]] = None
+        context_data: Optional[Dict[str, Any]] = None,
+        digest_topic: Optional[str] = None
     ) -> Notification:
-        """Create a new notification"""
+        """
+        Create a new notification.
+        
+        Low and normal priority notifications with a digest_topic are held for
+        the digest window so they can be coalesced with others on that topic.
+        """
         
         # Get the template
         template = self.db.query(NotificationTemplate).filter(
@@ -67,6 +111,10 @@ class NotificationService:
         # Determine recipient
         recipient = self._get_recipient_address(user, notification_type)
         
+        scheduled_at, key = self._digest_schedule(
+            user_id, notification_type, priority, scheduled_at or datetime.utcnow(), digest_topic
+        )
+        
         # Create notification record
         notification = Notification(
             template_id=template.id,
@@ -78,7 +126,8 @@ class NotificationService:
             recipient=recipient,
             context_data=context_data,
             template_variables=template_variables,
-            scheduled_at=scheduled_at or datetime.utcnow(),
+            scheduled_at=scheduled_at,
+            digest_key=key,
             status=NotificationStatus.PENDING
         )
         
@@ -91,6 +140,111 @@ class NotificationService:
         
         return notification
     
+    def create_notifications_bulk(
+        self,
+        user_ids: List[Union[str, int]],
+        template_name: str,
+        template_variables: Dict[str, Any],
+        notification_type: NotificationType,
+        priority: NotificationPriority = NotificationPriority.NORMAL,
+        scheduled_at: Optional[datetime] = None,
+        context_data: Optional[Dict[str, Any]] = None,
+        recipient_variables: Optional[Dict[Union[str, int], Dict[str, Any]]] = None,
+        digest_topic: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create one notification per user in a single transaction.
+        
+        The template, users and preferences are each loaded with one query and
+        the template is rendered once unless recipient_variables adds
+        per-user values.
+        
+        Returns:
+            Dict with the created notifications, the user ids skipped by
+            preferences and per-user errors
+        """
+        
+        template = self.db.query(NotificationTemplate).filter(
+            NotificationTemplate.name == template_name,
+            NotificationTemplate.type == notification_type,
+            NotificationTemplate.is_active == True
+        ).first()
+        
+        if not template:
+            raise ValueError(f"Template '{template_name}' not found for type {notification_type}")
+        
+        user_ids = list(dict.fromkeys(user_ids))
+        users = {
+            str(user.id): user
+            for user in self.db.query(User).filter(User.id.in_(user_ids)).all()
+        }
+        preferences: Dict[str, NotificationPreference] = {}
+        for prefs in self.db.query(NotificationPreference).filter(
+            NotificationPreference.user_id.in_(user_ids),
+            NotificationPreference.notification_type == notification_type
+        ).all():
+            # Match _get_recipient_address, which uses the first preference row
+            preferences.setdefault(str(prefs.user_id), prefs)
+        
+        recipient_variables = recipient_variables or {}
+        shared_rendering = self._render_template(template, template_variables)
+        scheduled_at = scheduled_at or datetime.utcnow()
+        
+        results = {"notifications": [], "skipped": [], "errors": []}
+        for user_id in user_ids:
+            user = users.get(str(user_id))
+            if not user:
+                results["errors"].append(f"User {user_id}: User with ID {user_id} not found")
+                continue
+            
+            prefs = preferences.get(str(user_id))
+            if not self._preferences_allow(prefs if prefs and prefs.is_active else None, context_data):
+                results["skipped"].append(user_id)
+                continue
+            
+            variables = template_variables
+            subject, content = shared_rendering
+            if user_id in recipient_variables:
+                variables = {**template_variables, **recipient_variables[user_id]}
+                try:
+                    subject, content = self._render_template(template, variables)
+                except Exception as e:
+                    results["errors"].append(f"User {user_id}: {str(e)}")
+                    continue
+            
+            user_scheduled_at, key = self._digest_schedule(
+                user_id, notification_type, priority, scheduled_at, digest_topic
+            )
+            results["notifications"].append(Notification(
+                template_id=template.id,
+                user_id=user_id,
+                type=notification_type,
+                priority=priority,
+                subject=subject,
+                content=content,
+                recipient=self._address_for(user, prefs, notification_type),
+                context_data=context_data,
+                template_variables=variables,
+                scheduled_at=user_scheduled_at,
+                digest_key=key,
+                status=NotificationStatus.PENDING
+            ))
+        
+        if results["notifications"]:
+            self.db.add_all(results["notifications"])
+            self.db.flush()
+            self.db.add_all([
+                NotificationLog(
+                    notification_id=notification.id,
+                    event_type="created",
+                    event_data={"template": template_name, "bulk": True}
+                )
+                for notification in results["notifications"]
+            ])
+        self.db.commit()
+        
+        return results
+    
     def send_notification(self, notification_id: int) -> bool:
         """Send a specific notification"""
         
@@ -128,6 +282,7 @@ class NotificationService:
                 self._log_notification_event(notification.id, "sent")
             else:
                 notification.status = NotificationStatus.FAILED
+                notification.scheduled_at = datetime.utcnow() + retry_delay(notification.retry_count)
                 notification.retry_count += 1
                 self._log_notification_event(notification.id, "failed", {
                     "retry_count": notification.retry_count
@@ -140,6 +295,7 @@ class NotificationService:
             logger.error(f"Error sending notification {notification_id}: {str(e)}")
             notification.status = NotificationStatus.FAILED
             notification.error_message = str(e)
+            notification.scheduled_at = datetime.utcnow() + retry_delay(notification.retry_count)
             notification.retry_count += 1
             self.db.commit()
             
@@ -151,20 +307,25 @@ class NotificationService:
             return False
     
     def send_pending_notifications(self, limit: int = 100) -> int:
-        """Send all pending notifications"""
-        
-        pending_notifications = self.db.query(Notification).filter(
-            Notification.status == NotificationStatus.PENDING,
-            Notification.scheduled_at <= datetime.utcnow(),
-            Notification.retry_count < Notification.max_retries
-        ).limit(limit).all()
+        """Deliver one batch of due notifications through the delivery worker"""
         
-        sent_count = 0
-        for notification in pending_notifications:
-            if self.send_notification(notification.id):
-                sent_count += 1
-        
-        return sent_count
+        stats = NotificationDeliveryWorker(self.db, batch_size=limit).process_pending(limit)
+        return stats.sent
+    
+    @staticmethod
+    def _digest_schedule(
+        user_id: Union[str, int],
+        notification_type: NotificationType,
+        priority: NotificationPriority,
+        scheduled_at: datetime,
+        digest_topic: Optional[str]
+    ) -> Tuple[datetime, Optional[str]]:
+        """Delivery time and digest key, holding coalescable notifications for the digest window"""
+        if digest_topic:
+            hold_until = digest_hold_until(priority, scheduled_at)
+            if hold_until:
+                return hold_until, digest_key(user_id, notification_type, digest_topic)
+        return scheduled_at, None
     
     def _should_send_notification(
         self, 
@@ -180,24 +341,20 @@ class NotificationService:
             NotificationPreference.is_active == True
         ).first()
         
+        return self._preferences_allow(prefs, context_data)
+    
+    @staticmethod
+    def _preferences_allow(prefs: Optional[NotificationPreference], context_data: Optional[Dict[str, Any]]) -> bool:
+        """Apply active preferences to an event; no preferences means notifications are allowed"""
+        
         if not prefs:
-            # Default to allowing notifications if no preferences set
             return True
         
         # Check specific event preferences based on context
         if context_data:
-            event_type = context_data.get("event_type")
-            if event_type == "workflow_assigned":
-                return prefs.workflow_assigned
-            elif event_type == "workflow_completed":
-                return prefs.workflow_completed
-            elif event_type == "workflow_rejected":
-                return prefs.workflow_rejected
-            elif event_type == "document_shared":
-                return prefs.document_shared
-            elif event_type == "document_updated":
-                return prefs.document_updated
-            # Add more event types as needed
+            flag = EVENT_PREFERENCE_FLAGS.get(context_data.get("event_type"))
+            if flag:
+                return getattr(prefs, flag)
         
         return True
     
@@ -210,6 +367,14 @@ class NotificationService:
             NotificationPreference.notification_type == notification_type
         ).first()
         
+        return self._address_for(user, prefs, notification_type)
+    
+    @staticmethod
+    def _address_for(
+        user: User, prefs: Optional[NotificationPreference], notification_type: NotificationType
+    ) -> str:
+        """Preference override address, else the user's default address for the channel"""
+        
         if prefs:
             if notification_type == NotificationType.EMAIL and prefs.email_address:
                 return prefs.email_address
@@ -232,14 +397,8 @@ class NotificationService:
         """Render template with variables"""
         
         try:
-            # Render subject (for email)
-            subject = ""
-            if template.subject_template:
-                subject_template = Template(template.subject_template)
-                subject = subject_template.render(**variables)
-            
-            # Render content
-            content_template = Template(template.content_template)
+            subject_template, content_template = compile_notification_template(template)
+            subject = subject_template.render(**variables) if subject_template else ""
             content = content_template.render(**variables)
             
             return subject, content
@@ -252,30 +411,12 @@ class NotificationService:
         """Send email notification"""
         
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = notification.subject
-            msg['From'] = settings.SMTP_FROM_EMAIL
-            msg['To'] = notification.recipient
-            
-            # Add content
-            if notification.content.startswith('<'):
-                # HTML content
-                part = MIMEText(notification.content, 'html')
-            else:
-                # Plain text
-                part = MIMEText(notification.content, 'plain')
-            
-            msg.attach(part)
+            msg = build_email_message(
+                notification.subject, notification.content, notification.recipient, settings.SMTP_FROM_EMAIL
+            )
             
-            # Send email
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                if settings.SMTP_TLS:
-                    server.starttls()
-                if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
-                    server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-                
-                server.send_message(msg)
+            # Send on a pooled connection instead of connecting and logging in per email
+            get_smtp_pool(settings).send_message(msg)
             
             logger.info(f"Email sent successfully to {notification.recipient}")
             return True
@@ -0,0 +1,277 @@
+"""
+Authenticated principal cache
+
+Bearer tokens and API keys used to cost a JWT decode or key lookup plus user
+queries on every request, and API keys an UPDATE and commit as well. Once a
+credential has been verified, its SHA-256 now maps to an immutable snapshot
+of the user's row (and the API key's) for PRINCIPAL_CACHE_TTL_SECONDS, never
+past the token's exp or the key's expires_at. Snapshots are attached to the
+request's session without a query, so endpoints still get ordinary User and
+APIKey instances.
+
+ORM updates and deletes of a user or an API key revoke their entries at
+flush and again after commit. Other processes pick up changes when their
+entries expire.
+
+API key usage is counted in memory and written by a background thread every
+API_KEY_USAGE_FLUSH_SECONDS, one UPDATE per key. The usage_count and
+last_used_at of a cached key's snapshot are therefore not current.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from app.core.config import settings
+from app.models.external_integration import APIKey
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+_REVOKED_KEY = "principal_cache_revoked"
+
+
+def credential_key(credential: str) -> str:
+    """Cache key for a bearer token or API key; the credential itself is never stored"""
+    return hashlib.sha256(credential.encode("utf-8")).hexdigest()
+
+
+def _snapshot(instance) -> Mapping[str, Any]:
+    return MappingProxyType({
+        column.key: copy.deepcopy(getattr(instance, column.key)) for column in instance.__table__.columns
+    })
+
+
+def _attach(db: Session, model, values: Mapping[str, Any]):
+    instance = model(**copy.deepcopy(dict(values)))
+    make_transient_to_detached(instance)
+    return db.merge(instance, load=False)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Column values of an authenticated user and, for API keys, the key used"""
+    user_id: str
+    user_values: Mapping[str, Any]
+    api_key_id: Optional[str] = None
+    api_key_values: Optional[Mapping[str, Any]] = None
+
+    @classmethod
+    def from_rows(cls, user: User, api_key: Optional[APIKey] = None) -> "Principal":
+        return cls(
+            user_id=user.id,
+            user_values=_snapshot(user),
+            api_key_id=api_key.id if api_key is not None else None,
+            api_key_values=_snapshot(api_key) if api_key is not None else None
+        )
+
+    def user(self, db: Session) -> User:
+        """The user as a persistent instance of db, without querying it"""
+        return _attach(db, User, self.user_values)
+
+    def api_key(self, db: Session) -> Optional[APIKey]:
+        if self.api_key_values is None:
+            return None
+        return _attach(db, APIKey, self.api_key_values)
+
+
+class _Entries:
+    """One database's principals, least recently used first, indexed by user and key id"""
+
+    def __init__(self):
+        self.principals: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self.by_owner: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def owners(principal: Principal) -> List[str]:
+        owners = [f"user:{principal.user_id}"]
+        if principal.api_key_id is not None:
+            owners.append(f"api_key:{principal.api_key_id}")
+        return owners
+
+    def remove(self, key: str) -> None:
+        entry = self.principals.pop(key, None)
+        if entry is None:
+            return
+        for owner in self.owners(entry[1]):
+            keys = self.by_owner.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_owner[owner]
+
+
+class PrincipalCache:
+    """Verified credential -> Principal, per database"""
+
+    def __init__(self):
+        self._entries: "weakref.WeakKeyDictionary[Any, _Entries]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, credential: str) -> Optional[Principal]:
+        key = credential_key(credential)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(db.get_bind())
+            entry = entries.principals.get(key) if entries is not None else None
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                entries.remove(key)
+                return None
+            entries.principals.move_to_end(key)
+            return entry[1]
+
+    def put(self, db: Session, credential: str, principal: Principal,
+            expires_at: Optional[datetime] = None) -> None:
+        """Cache a verified principal; expires_at is the credential's own expiry in UTC"""
+        ttl = float(settings.PRINCIPAL_CACHE_TTL_SECONDS)
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        key = credential_key(credential)
+        with self._lock:
+            entries = self._entries.setdefault(db.get_bind(), _Entries())
+            entries.remove(key)
+            entries.principals[key] = (time.monotonic() + ttl, principal)
+            for owner in entries.owners(principal):
+                entries.by_owner.setdefault(owner, set()).add(key)
+            while len(entries.principals) > settings.PRINCIPAL_CACHE_SIZE:
+                entries.remove(next(iter(entries.principals)))
+
+    def revoke(self, bind, owner: str) -> None:
+        """Drop every principal of owner ("user:<id>" or "api_key:<id>")"""
+        with self._lock:
+            entries = self._entries.get(bind)
+            if entries is None:
+                return
+            for key in list(entries.by_owner.get(owner, ())):
+                entries.remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def _revoke(owner_prefix: str):
+    def listener(mapper, connection, target) -> None:
+        owner = f"{owner_prefix}:{target.id}"
+        principal_cache.revoke(connection.engine, owner)
+        # Again once committed, in case another request cached the old row meanwhile
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_REVOKED_KEY, set()).add((connection.engine, owner))
+    return listener
+
+
+def _revoke_after_commit(session) -> None:
+    for bind, owner in session.info.pop(_REVOKED_KEY, ()):
+        principal_cache.revoke(bind, owner)
+
+
+for _model, _owner_prefix in ((User, "user"), (APIKey, "api_key")):
+    for _event_name in ("after_update", "after_delete"):
+        event.listen(_model, _event_name, _revoke(_owner_prefix))
+event.listen(Session, "after_commit", _revoke_after_commit)
+
+
+class APIKeyUsage:
+    """Requests per API key since the last flush, per database"""
+
+    def __init__(self):
+        self._pending: "weakref.WeakKeyDictionary[Any, Dict[str, List[Any]]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def record(self, db: Session, api_key_id: str, used_at: Optional[datetime] = None) -> None:
+        used_at = used_at or datetime.utcnow()
+        with self._lock:
+            pending = self._pending.setdefault(db.get_bind(), {})
+            usage = pending.get(api_key_id)
+            if usage is None:
+                pending[api_key_id] = [1, used_at]
+            else:
+                usage[0] += 1
+                usage[1] = max(usage[1], used_at)
+        _ensure_flusher()
+
+    def flush(self) -> int:
+        """Add the counted requests to api_keys; returns the number of keys updated"""
+        with self._lock:
+            batches = [(bind, pending) for bind, pending in self._pending.items() if pending]
+            for bind, _ in batches:
+                self._pending[bind] = {}
+
+        updated = 0
+        for bind, pending in batches:
+            try:
+                with bind.begin() as connection:
+                    for api_key_id, (count, last_used_at) in pending.items():
+                        connection.execute(
+                            update(APIKey.__table__)
+                            .where(APIKey.__table__.c.id == api_key_id)
+                            .values(usage_count=APIKey.__table__.c.usage_count + count, last_used_at=last_used_at)
+                        )
+                updated += len(pending)
+            except Exception as e:
+                logger.error(f"Failed to write API key usage, will retry: {e}")
+                self._restore(bind, pending)
+        return updated
+
+    def _restore(self, bind, pending: Dict[str, List[Any]]) -> None:
+        with self._lock:
+            current = self._pending.setdefault(bind, {})
+            for api_key_id, (count, last_used_at) in pending.items():
+                usage = current.get(api_key_id)
+                if usage is None:
+                    current[api_key_id] = [count, last_used_at]
+                else:
+                    usage[0] += count
+                    usage[1] = max(usage[1], last_used_at)
+
+
+api_key_usage = APIKeyUsage()
+
+# Background flusher for the usage counters
+_flusher: Optional[threading.Thread] = None
+_flusher_stop = threading.Event()
+_flusher_lock = threading.Lock()
+
+
+def _run_flusher() -> None:
+    while not _flusher_stop.wait(settings.API_KEY_USAGE_FLUSH_SECONDS):
+        api_key_usage.flush()
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher_stop.clear()
+            _flusher = threading.Thread(target=_run_flusher, name="api-key-usage-flusher", daemon=True)
+            _flusher.start()
+
+
+def stop_api_key_usage() -> None:
+    """Stop the flusher and write the remaining counts"""
+    global _flusher
+    _flusher_stop.set()
+    if _flusher is not None:
+        _flusher.join(timeout=10)
+        _flusher = None
+    api_key_usage.flush()
@@ -8,6 +8,7 @@ import hashlib
 import hmac
 import time
 import math
+import uuid
 from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -23,6 +24,16 @@ from app.schemas.security import (
     AuditLogResponse, AuditLogFilter, SecurityAlertCreate, SecurityAlertResponse
 )
 from app.core.config import settings
+from app.services.audit_log_writer import (
+    SlidingWindowCounter,
+    get_audit_writer,
+    is_synchronous,
+    user_info_cache
+)
+
+# Failed logins per IP address in the trailing 15 minutes
+FAILED_LOGIN_THRESHOLD = 5
+_failed_logins = SlidingWindowCounter(window_seconds=15 * 60)
 
 
 class CryptoService:
@@ -507,16 +518,7 @@ class SecurityService:
             user_role = None
             if user_id:
                 try:
-                    user = self.db.query(User).filter(User.id == user_id).first()
-                    if user:
-                        # Safely access user attributes
-                        user_email = getattr(user, 'email', 'unknown')
-                        if hasattr(user, 'role') and user.role:
-                            user_role = getattr(user.role, 'value', None)
-                        else:
-                            user_role = 'unknown'
-                    else:
-                        user_email = f"user_id_{user_id}_not_found"
+                    user_email, user_role = user_info_cache.get(self.db, user_id)
                 except Exception as e:
                     logger.warning(f"Failed to retrieve user info for audit: {e}")
                     user_email = f"user_id_{user_id}_error"
@@ -530,8 +532,9 @@ class SecurityService:
                 retention_days = 365  # Default 1 year
                 retention_until = datetime.utcnow() + timedelta(days=retention_days)
 
-            # Create audit log entry with safe parameter handling
+            # Buffered audit log entry; written by the audit log writer, not this session
             audit_log = AuditLog(
+                id=str(uuid.uuid4()),
                 event_type=event_type,
                 severity=severity,
                 message=message,
@@ -552,11 +555,14 @@ class SecurityService:
                 correlation_id=correlation_id,
                 tags=tags,
                 retention_until=retention_until,
-                is_sensitive=self._is_sensitive_event(event_type)
+                is_sensitive=self._is_sensitive_event(event_type),
+                created_at=datetime.utcnow()
             )
 
-            self.db.add(audit_log)
-            self.db.commit()
+            get_audit_writer(self.db).append(
+                {column.key: getattr(audit_log, column.key) for column in AuditLog.__table__.columns},
+                synchronous=is_synchronous(severity)
+            )
 
             # Check for security alerts safely
             try:
@@ -564,7 +570,7 @@ class SecurityService:
             except Exception as e:
                 logger.warning(f"Security pattern check failed for audit event: {e}")
 
-            return str(audit_log.id) if hasattr(audit_log, 'id') else "audit_logged"
+            return audit_log.id
 
         except Exception as e:
             # Critical: Audit logging must never fail silently
@@ -575,12 +581,6 @@ class SecurityService:
                 "message": message[:100] if message else "no_message"
             })
 
-            # Rollback any partial transaction
-            try:
-                self.db.rollback()
-            except Exception:
-                pass
-
             # Consider immediate security team alert for critical failures
             try:
                 self._send_critical_security_alert("Audit logging failure", str(e))
@@ -597,6 +597,7 @@ class SecurityService:
         page_size: int = 50
     ) -> Tuple[List[AuditLogResponse], int]:
         """Get audit logs with filtering and pagination"""
+        get_audit_writer(self.db).flush()
         query = self.db.query(AuditLog)
 
         if filters:
@@ -732,18 +733,11 @@ class SecurityService:
 
     def _check_failed_login_pattern(self, audit_log: AuditLog):
         """Check for patterns of failed login attempts"""
-        # Count failed logins in last 15 minutes
-        cutoff_time = datetime.utcnow() - timedelta(minutes=15)
-
-        failed_count = self.db.query(AuditLog).filter(
-            and_(
-                AuditLog.event_type == AuditEventType.LOGIN_FAILURE,
-                AuditLog.ip_address == audit_log.ip_address,
-                AuditLog.created_at >= cutoff_time
-            )
-        ).count()
+        # Count failed logins from this IP in the last 15 minutes
+        failed_count = _failed_logins.add(audit_log.ip_address or "unknown")
 
-        if failed_count >= 5:
+        # Alert once as the threshold is reached, not on every further attempt
+        if failed_count == FAILED_LOGIN_THRESHOLD:
             # Create security alert
             self.create_security_alert(SecurityAlertCreate(
                 title=f"Multiple failed login attempts from IP {audit_log.ip_address}",
@@ -755,7 +749,7 @@ class SecurityService:
                 context={
                     "failed_count": failed_count,
                     "time_window": "15_minutes",
-                    "threshold": 5
+                    "threshold": FAILED_LOGIN_THRESHOLD
                 }
             ))
 
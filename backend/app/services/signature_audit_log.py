@@ -0,0 +1,429 @@
+"""
+Append-only, hash-chained signature audit log
+
+Events are buffered and written in batches. Each request's events form a
+chain: an event's hash covers its content and the previous event's hash, so
+editing, reordering or removing a chained event breaks every later link.
+Every SIGNATURE_AUDIT_CHECKPOINT_INTERVAL events the appender seals the
+segment since the last checkpoint with a Merkle root. Routine verification
+then starts at the latest checkpoint and only rehashes newer events, and any
+checkpointed event can be proven part of the log with an inclusion proof.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.models.digital_signature import SignatureAuditCheckpoint, SignatureEvent
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0" * 64
+
+# Event columns covered by the hash, in canonical order
+HASHED_FIELDS = (
+    "request_id", "sequence", "signature_id", "event_type", "event_description",
+    "user_id", "ip_address", "user_agent", "external_event_id", "external_event_data",
+    "legal_framework_applied", "authentication_details", "occurred_at"
+)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    """UTC timestamp text that survives a round trip through naive and aware columns"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def canonical_event(event: SignatureEvent) -> bytes:
+    values = {name: getattr(event, name) for name in HASHED_FIELDS}
+    values["occurred_at"] = _timestamp(values["occurred_at"])
+    return json.dumps(values, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def compute_event_hash(previous_hash: str, event: SignatureEvent) -> str:
+    return hashlib.sha256(previous_hash.encode() + canonical_event(event)).hexdigest()
+
+
+# Merkle tree over event hashes, with RFC 6962 leaf and node prefixes.
+# An unpaired node is promoted to the next level unchanged.
+def _leaf(event_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(event_hash)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    return [
+        _node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+        for i in range(0, len(level), 2)
+    ]
+
+
+def merkle_root(event_hashes: List[str]) -> str:
+    level = [_leaf(h) for h in event_hashes]
+    if not level:
+        return hashlib.sha256(b"").hexdigest()
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def inclusion_path(event_hashes: List[str], index: int) -> List[Dict[str, str]]:
+    """Sibling hashes from the leaf at index up to the root"""
+    level = [_leaf(h) for h in event_hashes]
+    path = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({"side": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        level = _next_level(level)
+        index //= 2
+    return path
+
+
+def verify_inclusion(event_hash: str, path: List[Dict[str, str]], root: str) -> bool:
+    node = _leaf(event_hash)
+    for step in path:
+        sibling = bytes.fromhex(step["hash"])
+        node = _node(sibling, node) if step["side"] == "left" else _node(node, sibling)
+    return node.hex() == root
+
+
+@dataclass
+class ChainHead:
+    """Tail of one request's chain and the event hashes since its last checkpoint"""
+    sequence: int = 0
+    event_hash: str = GENESIS_HASH
+    segment: List[str] = field(default_factory=list)
+
+    def copy(self) -> "ChainHead":
+        return ChainHead(self.sequence, self.event_hash, list(self.segment))
+
+
+def load_chain_head(db: Session, request_id: str) -> ChainHead:
+    checkpoint = db.query(SignatureAuditCheckpoint).filter(
+        SignatureAuditCheckpoint.request_id == request_id
+    ).order_by(SignatureAuditCheckpoint.last_sequence.desc()).first()
+    after = checkpoint.last_sequence if checkpoint else 0
+    rows = db.query(SignatureEvent.sequence, SignatureEvent.event_hash).filter(
+        SignatureEvent.request_id == request_id,
+        SignatureEvent.sequence > after
+    ).order_by(SignatureEvent.sequence).all()
+    if rows:
+        return ChainHead(rows[-1].sequence, rows[-1].event_hash, [row.event_hash for row in rows])
+    if checkpoint:
+        return ChainHead(checkpoint.last_sequence, checkpoint.chain_hash)
+    return ChainHead()
+
+
+def _checkpoint(request_id: str, head: ChainHead) -> SignatureAuditCheckpoint:
+    checkpoint = SignatureAuditCheckpoint(
+        request_id=request_id,
+        first_sequence=head.sequence - len(head.segment) + 1,
+        last_sequence=head.sequence,
+        merkle_root=merkle_root(head.segment),
+        chain_hash=head.event_hash
+    )
+    head.segment = []
+    return checkpoint
+
+
+class SignatureAuditLog:
+    """Buffered appender for one database"""
+
+    def __init__(self, session_factory, batch_size: Optional[int] = None,
+                 checkpoint_interval: Optional[int] = None, head_cache_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.SIGNATURE_AUDIT_BATCH_SIZE
+        self.checkpoint_interval = checkpoint_interval or settings.SIGNATURE_AUDIT_CHECKPOINT_INTERVAL
+        self.head_cache_size = head_cache_size or settings.SIGNATURE_AUDIT_HEAD_CACHE_SIZE
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._heads: "OrderedDict[str, ChainHead]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def append(self, **values) -> None:
+        """Buffer an event; writes the buffer once it reaches the batch size"""
+        values.setdefault("occurred_at", datetime.utcnow())
+        with self._buffer_lock:
+            self._buffer.append(values)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered events in one transaction; returns the number written"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                entries, self._buffer = self._buffer, []
+            if not entries:
+                return 0
+            for attempt in range(2):
+                db = self.session_factory()
+                try:
+                    heads = self._write(db, entries)
+                    db.commit()
+                    self._remember(heads)
+                    return len(entries)
+                except IntegrityError:
+                    # Another process extended one of these chains: reload the heads and retry
+                    db.rollback()
+                    for request_id in {entry["request_id"] for entry in entries}:
+                        self._heads.pop(request_id, None)
+                    if attempt:
+                        self._requeue(entries)
+                        raise
+                except Exception:
+                    db.rollback()
+                    self._requeue(entries)
+                    raise
+                finally:
+                    db.close()
+        return 0
+
+    def checkpoint(self, request_id: str) -> Optional[SignatureAuditCheckpoint]:
+        """Seal the request's events since its last checkpoint now"""
+        self.flush()
+        with self._flush_lock:
+            db = self.session_factory()
+            try:
+                head = load_chain_head(db, request_id)
+                if not head.segment:
+                    return None
+                checkpoint = _checkpoint(request_id, head)
+                db.add(checkpoint)
+                db.commit()
+                db.refresh(checkpoint)
+                db.expunge(checkpoint)
+                self._remember({request_id: head})
+                return checkpoint
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    def _write(self, db: Session, entries: List[Dict[str, Any]]) -> Dict[str, ChainHead]:
+        heads: Dict[str, ChainHead] = {}
+        rows: List[Any] = []
+        # signature_events is partitioned on PostgreSQL, where (request_id, sequence) cannot be
+        # unique on its own: lock each chain for the transaction and read its head instead
+        locked = db.get_bind().dialect.name == "postgresql"
+        for values in entries:
+            request_id = values["request_id"]
+            head = heads.get(request_id)
+            if head is None:
+                if locked:
+                    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:chain))"), {"chain": request_id})
+                    head = heads[request_id] = load_chain_head(db, request_id)
+                else:
+                    cached = self._heads.get(request_id)
+                    head = heads[request_id] = cached.copy() if cached else load_chain_head(db, request_id)
+
+            event = SignatureEvent(**values, sequence=head.sequence + 1, previous_hash=head.event_hash)
+            event.event_hash = compute_event_hash(head.event_hash, event)
+            rows.append(event)
+
+            head.sequence, head.event_hash = event.sequence, event.event_hash
+            head.segment.append(event.event_hash)
+            if len(head.segment) >= self.checkpoint_interval:
+                rows.append(_checkpoint(request_id, head))
+        db.add_all(rows)
+        return heads
+
+    def _remember(self, heads: Dict[str, ChainHead]) -> None:
+        for request_id, head in heads.items():
+            self._heads[request_id] = head
+            self._heads.move_to_end(request_id)
+        while len(self._heads) > self.head_cache_size:
+            self._heads.popitem(last=False)
+
+    def _requeue(self, entries: List[Dict[str, Any]]) -> None:
+        with self._buffer_lock:
+            self._buffer[:0] = entries
+
+
+# One appender per database engine
+_logs: "weakref.WeakKeyDictionary[Any, SignatureAuditLog]" = weakref.WeakKeyDictionary()
+_logs_lock = threading.Lock()
+
+
+def get_audit_log(db: Session) -> SignatureAuditLog:
+    bind = db.get_bind()
+    with _logs_lock:
+        log = _logs.get(bind)
+        if log is None:
+            log = _logs[bind] = SignatureAuditLog(
+                sessionmaker(autocommit=False, autoflush=False, bind=bind)
+            )
+    return log
+
+
+def flush_audit_logs() -> int:
+    with _logs_lock:
+        logs = list(_logs.values())
+    written = 0
+    for log in logs:
+        try:
+            written += log.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush signature audit log: {str(e)}")
+    return written
+
+
+def verify_chain(db: Session, request_id: str, full: bool = False) -> Dict[str, Any]:
+    """
+    Recompute the request's chain. By default starts at the latest checkpoint, so
+    the cost is the number of events since then; full=True rehashes from genesis
+    and also checks every checkpoint's Merkle root. Events written without a
+    sequence after the chain's first event are reported as unchained.
+    """
+    checkpoints = db.query(SignatureAuditCheckpoint).filter(
+        SignatureAuditCheckpoint.request_id == request_id
+    ).order_by(SignatureAuditCheckpoint.last_sequence).all()
+    if not full and checkpoints:
+        start = checkpoints[-1]
+        sequence, previous_hash = start.last_sequence, start.chain_hash
+        checkpoints = []
+    else:
+        sequence, previous_hash = 0, GENESIS_HASH
+
+    errors: List[Dict[str, Any]] = []
+    pending = {checkpoint.last_sequence: checkpoint for checkpoint in checkpoints}
+    segment: List[str] = []
+    verified_from = sequence + 1
+    verified = 0
+
+    events = db.query(SignatureEvent).filter(
+        SignatureEvent.request_id == request_id,
+        SignatureEvent.sequence > sequence
+    ).order_by(SignatureEvent.sequence).yield_per(500)
+    for event in events:
+        sequence += 1
+        verified += 1
+        if event.sequence != sequence:
+            errors.append({"sequence": sequence, "event_id": event.id, "reason": "missing event"})
+            sequence = event.sequence
+        if event.previous_hash != previous_hash:
+            errors.append({"sequence": event.sequence, "event_id": event.id, "reason": "broken link"})
+        if compute_event_hash(event.previous_hash or "", event) != event.event_hash:
+            errors.append({"sequence": event.sequence, "event_id": event.id, "reason": "content modified"})
+        previous_hash = event.event_hash
+        segment.append(event.event_hash)
+
+        checkpoint = pending.pop(event.sequence, None)
+        if checkpoint is not None:
+            if checkpoint.merkle_root != merkle_root(segment) or checkpoint.chain_hash != event.event_hash:
+                errors.append({"sequence": event.sequence, "event_id": event.id, "reason": "checkpoint mismatch"})
+            segment = []
+
+    for checkpoint in pending.values():
+        errors.append({"sequence": checkpoint.last_sequence, "event_id": None, "reason": "missing event"})
+
+    unchained = db.query(func.count(SignatureEvent.id)).filter(
+        SignatureEvent.request_id == request_id,
+        SignatureEvent.sequence.is_(None)
+    ).scalar()
+    if unchained:
+        # Events from before the chain began are legacy; any later one bypassed the log
+        chain_start = db.query(func.min(SignatureEvent.occurred_at)).filter(
+            SignatureEvent.request_id == request_id,
+            SignatureEvent.sequence.isnot(None)
+        ).scalar()
+        if chain_start is not None:
+            for event_id, in db.query(SignatureEvent.id).filter(
+                SignatureEvent.request_id == request_id,
+                SignatureEvent.sequence.is_(None),
+                SignatureEvent.occurred_at >= chain_start
+            ).order_by(SignatureEvent.occurred_at):
+                errors.append({"sequence": None, "event_id": event_id, "reason": "unchained event"})
+
+    return {
+        "request_id": request_id,
+        "is_valid": not errors,
+        "head_sequence": sequence,
+        "verified_from": verified_from,
+        "verified_events": verified,
+        "unchained_events": unchained,
+        "errors": errors
+    }
+
+
+def inclusion_proof(db: Session, event_id: str) -> Optional[Dict[str, Any]]:
+    """Merkle path from a checkpointed event to its checkpoint's root"""
+    event = db.get(SignatureEvent, event_id)
+    if event is None or event.sequence is None:
+        return None
+    checkpoint = db.query(SignatureAuditCheckpoint).filter(
+        SignatureAuditCheckpoint.request_id == event.request_id,
+        SignatureAuditCheckpoint.last_sequence >= event.sequence
+    ).order_by(SignatureAuditCheckpoint.last_sequence).first()
+    if checkpoint is None:
+        return None
+    hashes = [row.event_hash for row in db.query(SignatureEvent.event_hash).filter(
+        SignatureEvent.request_id == event.request_id,
+        SignatureEvent.sequence.between(checkpoint.first_sequence, checkpoint.last_sequence)
+    ).order_by(SignatureEvent.sequence)]
+    return {
+        "event_id": event.id,
+        "request_id": event.request_id,
+        "sequence": event.sequence,
+        "event_hash": event.event_hash,
+        "checkpoint_id": checkpoint.id,
+        "merkle_root": checkpoint.merkle_root,
+        "path": inclusion_path(hashes, event.sequence - checkpoint.first_sequence)
+    }
+
+
+def verify_inclusion_proof(event: SignatureEvent, proof: Dict[str, Any]) -> bool:
+    """Check the event's current content against a proof issued for it"""
+    if compute_event_hash(event.previous_hash or "", event) != proof["event_hash"]:
+        return False
+    return verify_inclusion(proof["event_hash"], proof["path"], proof["merkle_root"])
+
+
+# Background flushing inside the API process
+_flusher_task: Optional["asyncio.Task[None]"] = None
+
+
+async def _run_flusher() -> None:
+    while True:
+        await asyncio.sleep(settings.SIGNATURE_AUDIT_FLUSH_INTERVAL_SECONDS)
+        await asyncio.to_thread(flush_audit_logs)
+
+
+def start_audit_flusher() -> None:
+    global _flusher_task
+    if _flusher_task is None:
+        _flusher_task = asyncio.create_task(_run_flusher())
+
+
+async def stop_audit_flusher() -> None:
+    global _flusher_task
+    if _flusher_task is not None:
+        _flusher_task.cancel()
+        try:
+            await _flusher_task
+        except asyncio.CancelledError:
+            pass
+        _flusher_task = None
+    flush_audit_logs()
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
 import json
 import hashlib
+from collections import Counter
 from dataclasses import dataclass
 
 from app.models.digital_signature import (
@@ -18,6 +19,18 @@ from app.models.digital_signature import (
 from app.models.user import User
 from app.models.document import Document
 from app.schemas.digital_signature import SignatureEventCreate
+from app.services.signature_audit_log import (
+    get_audit_log,
+    inclusion_proof,
+    verify_chain,
+    verify_inclusion_proof
+)
+from app.services.signature_statistics_service import SignatureStatisticsService
+from app.services.signature_security_monitor import (
+    AuditEventSnapshot,
+    SecurityAlert,
+    security_monitor
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,17 +47,6 @@ class AuditEventSummary:
     compliance_score: float
 
 
-@dataclass
-class SecurityAlert:
-    """Security alert based on audit analysis"""
-    alert_type: str
-    severity: str  # low, medium, high, critical
-    description: str
-    affected_entities: List[str]
-    recommended_actions: List[str]
-    timestamp: datetime
-
-
 class SignatureAuditService:
     """Service for comprehensive audit trail management and analysis"""
 
@@ -67,7 +69,8 @@ class SignatureAuditService:
     ) -> bool:
         """Log a comprehensive signature event"""
         try:
-            event = SignatureEvent(
+            # Buffered and hash-chained; written in batches by the audit log
+            get_audit_log(self.db).append(
                 request_id=request_id,
                 signature_id=signature_id,
                 event_type=event_type,
@@ -77,21 +80,22 @@ class SignatureAuditService:
                 user_agent=user_agent,
                 external_event_data=external_event_data,
                 legal_framework_applied=legal_framework_applied,
-                authentication_details=authentication_details,
-                occurred_at=datetime.utcnow()
+                authentication_details=authentication_details
             )
 
-            self.db.add(event)
-            self.db.commit()
-
-            # Perform real-time security analysis
-            await self._analyze_event_for_security_alerts(event)
+            # Security analysis runs in the background monitor, not on this request
+            security_monitor.submit(AuditEventSnapshot(
+                request_id=request_id,
+                event_type=event_type,
+                user_id=user_id,
+                ip_address=ip_address,
+                auth_result=(authentication_details or {}).get("result")
+            ))
 
             logger.info(f"Signature event logged: {event_type} for request {request_id}")
             return True
 
         except Exception as e:
-            self.db.rollback()
             logger.error(f"Failed to log signature event: {str(e)}")
             return False
 
@@ -169,6 +173,7 @@ class SignatureAuditService:
     ) -> List[SignatureEvent]:
         """Get complete audit trail for a signature request"""
         try:
+            get_audit_log(self.db).flush()
             query = self.db.query(SignatureEvent).filter(
                 SignatureEvent.request_id == request_id
             )
@@ -176,7 +181,7 @@ class SignatureAuditService:
             if not include_system_events:
                 query = query.filter(SignatureEvent.user_id.isnot(None))
 
-            events = query.order_by(SignatureEvent.occurred_at).all()
+            events = query.order_by(SignatureEvent.occurred_at, SignatureEvent.sequence).all()
 
             logger.info(f"Retrieved {len(events)} audit events for request {request_id}")
             return events
@@ -193,6 +198,7 @@ class SignatureAuditService:
     ) -> List[SignatureEvent]:
         """Get signature activity for a specific user"""
         try:
+            get_audit_log(self.db).flush()
             query = self.db.query(SignatureEvent).filter(
                 SignatureEvent.user_id == user_id
             )
@@ -267,172 +273,6 @@ class SignatureAuditService:
             logger.error(f"Failed to get document signature history: {str(e)}")
             return []
 
-    # Security Analysis Methods
-    async def _analyze_event_for_security_alerts(self, event: SignatureEvent):
-        """Analyze events for potential security issues"""
-        try:
-            alerts = []
-
-            # Check for suspicious IP patterns
-            if event.ip_address:
-                suspicious_ips = await self._check_suspicious_ip_activity(event.ip_address, event.user_id)
-                alerts.extend(suspicious_ips)
-
-            # Check for unusual authentication patterns
-            if event.authentication_details:
-                auth_alerts = await self._check_authentication_anomalies(event)
-                alerts.extend(auth_alerts)
-
-            # Check for rapid-fire events (potential automation)
-            timing_alerts = await self._check_event_timing_anomalies(event.request_id, event.event_type)
-            alerts.extend(timing_alerts)
-
-            # Log any alerts found
-            for alert in alerts:
-                await self._log_security_alert(alert)
-
-        except Exception as e:
-            logger.error(f"Failed to analyze event for security alerts: {str(e)}")
-
-    async def _check_suspicious_ip_activity(
-        self,
-        ip_address: str,
-        user_id: Optional[str]
-    ) -> List[SecurityAlert]:
-        """Check for suspicious IP address activity"""
-        alerts = []
-
-        try:
-            # Check for multiple users from same IP in short time
-            recent_events = self.db.query(SignatureEvent).filter(
-                and_(
-                    SignatureEvent.ip_address == ip_address,
-                    SignatureEvent.occurred_at >= datetime.utcnow() - timedelta(hours=1),
-                    SignatureEvent.user_id.isnot(None)
-                )
-            ).all()
-
-            unique_users = set(event.user_id for event in recent_events if event.user_id)
-
-            if len(unique_users) > 3:
-                alerts.append(SecurityAlert(
-                    alert_type="suspicious_ip_activity",
-                    severity="medium",
-                    description=f"Multiple users ({len(unique_users)}) from same IP {ip_address} in 1 hour",
-                    affected_entities=[ip_address] + list(unique_users),
-                    recommended_actions=[
-                        "Review IP address reputation",
-                        "Verify user identities",
-                        "Consider additional authentication"
-                    ],
-                    timestamp=datetime.utcnow()
-                ))
-
-            # Check for unusual geographic patterns (if geolocation data available)
-            # This would require integration with IP geolocation service
-
-        except Exception as e:
-            logger.error(f"Failed to check suspicious IP activity: {str(e)}")
-
-        return alerts
-
-    async def _check_authentication_anomalies(self, event: SignatureEvent) -> List[SecurityAlert]:
-        """Check for authentication anomalies"""
-        alerts = []
-
-        try:
-            if not event.authentication_details:
-                return alerts
-
-            auth_result = event.authentication_details.get("result")
-            auth_method = event.authentication_details.get("method")
-
-            # Check for repeated failed authentications
-            if auth_result == "failed":
-                recent_failures = self.db.query(SignatureEvent).filter(
-                    and_(
-                        SignatureEvent.user_id == event.user_id,
-                        SignatureEvent.event_type.like("authentication_failed%"),
-                        SignatureEvent.occurred_at >= datetime.utcnow() - timedelta(minutes=30)
-                    )
-                ).count()
-
-                if recent_failures >= 3:
-                    alerts.append(SecurityAlert(
-                        alert_type="repeated_auth_failures",
-                        severity="high",
-                        description=f"Multiple authentication failures for user in 30 minutes",
-                        affected_entities=[event.user_id] if event.user_id else [],
-                        recommended_actions=[
-                            "Lock user account temporarily",
-                            "Require password reset",
-                            "Investigate potential brute force attack"
-                        ],
-                        timestamp=datetime.utcnow()
-                    ))
-
-        except Exception as e:
-            logger.error(f"Failed to check authentication anomalies: {str(e)}")
-
-        return alerts
-
-    async def _check_event_timing_anomalies(
-        self,
-        request_id: str,
-        event_type: str
-    ) -> List[SecurityAlert]:
-        """Check for unusual event timing patterns"""
-        alerts = []
-
-        try:
-            # Check for rapid-fire events (possible automation)
-            recent_events = self.db.query(SignatureEvent).filter(
-                and_(
-                    SignatureEvent.request_id == request_id,
-                    SignatureEvent.event_type == event_type,
-                    SignatureEvent.occurred_at >= datetime.utcnow() - timedelta(minutes=5)
-                )
-            ).count()
-
-            if recent_events > 10:
-                alerts.append(SecurityAlert(
-                    alert_type="rapid_fire_events",
-                    severity="medium",
-                    description=f"Unusual number of {event_type} events in 5 minutes",
-                    affected_entities=[request_id],
-                    recommended_actions=[
-                        "Review event patterns",
-                        "Check for automated tools",
-                        "Implement rate limiting"
-                    ],
-                    timestamp=datetime.utcnow()
-                ))
-
-        except Exception as e:
-            logger.error(f"Failed to check timing anomalies: {str(e)}")
-
-        return alerts
-
-    async def _log_security_alert(self, alert: SecurityAlert):
-        """Log security alert as audit event"""
-        try:
-            await self.log_signature_event(
-                request_id="system",
-                event_type=f"security_alert_{alert.alert_type}",
-                description=alert.description,
-                external_event_data={
-                    "alert_type": alert.alert_type,
-                    "severity": alert.severity,
-                    "affected_entities": alert.affected_entities,
-                    "recommended_actions": alert.recommended_actions
-                }
-            )
-
-            logger.warning(f"Security alert logged: {alert.alert_type} - {alert.description}")
-
-        except Exception as e:
-            logger.error(f"Failed to log security alert: {str(e)}")
-
     # Reporting and Analytics Methods
     def generate_audit_summary(
         self,
@@ -441,40 +281,23 @@ class SignatureAuditService:
     ) -> AuditEventSummary:
         """Generate summary of audit events for a date range"""
         try:
-            # Get all events in date range
-            events = self.db.query(SignatureEvent).filter(
-                and_(
-                    SignatureEvent.occurred_at >= start_date,
-                    SignatureEvent.occurred_at <= end_date
-                )
-            ).all()
-
-            # Count event types
-            event_types = {}
-            users_involved = set()
-            request_ids = set()
+            get_audit_log(self.db).flush()
 
-            for event in events:
-                event_types[event.event_type] = event_types.get(event.event_type, 0) + 1
-                if event.user_id:
-                    users_involved.add(event.user_id)
-                request_ids.add(event.request_id)
-
-            # Get documents affected
-            documents_affected = self.db.query(DigitalSignatureRequest.document_id).filter(
-                DigitalSignatureRequest.id.in_(request_ids)
-            ).distinct().count()
+            summary = SignatureStatisticsService(self.db).audit_summary(start_date, end_date)
+            total_events = summary["total_events"]
 
             # Calculate compliance score (simplified)
-            compliance_events = sum(1 for event in events if "compliance" in event.event_type)
-            compliance_score = min(1.0, compliance_events / max(1, len(events) * 0.1))
+            compliance_events = sum(
+                count for event_type, count in summary["event_types"].items() if "compliance" in event_type
+            )
+            compliance_score = min(1.0, compliance_events / max(1, total_events * 0.1))
 
             return AuditEventSummary(
-                total_events=len(events),
-                event_types=event_types,
+                total_events=total_events,
+                event_types=summary["event_types"],
                 date_range=(start_date, end_date),
-                users_involved=len(users_involved),
-                documents_affected=documents_affected,
+                users_involved=summary["users_involved"],
+                documents_affected=summary["documents_affected"],
                 compliance_score=compliance_score
             )
 
@@ -497,38 +320,14 @@ class SignatureAuditService:
     ) -> Dict[str, Any]:
         """Generate compliance report for specific framework"""
         try:
-            # Get compliance-related events
-            compliance_events = self.db.query(SignatureEvent).filter(
-                and_(
-                    SignatureEvent.legal_framework_applied == framework,
-                    SignatureEvent.occurred_at >= start_date,
-                    SignatureEvent.occurred_at <= end_date
-                )
-            ).all()
+            get_audit_log(self.db).flush()
 
-            # Analyze compliance metrics
-            validation_events = [e for e in compliance_events if "validation" in e.event_type]
-            violations = []
-            requirements_met = []
-
-            for event in validation_events:
-                if event.external_event_data:
-                    violations.extend(event.external_event_data.get("violations", []))
-                    requirements_met.extend(event.external_event_data.get("requirements_met", []))
-
-            # Get affected requests
-            request_ids = set(event.request_id for event in compliance_events)
-            total_requests = len(request_ids)
-
-            compliant_requests = len([
-                rid for rid in request_ids
-                if not any(
-                    "violation" in event.event_type
-                    for event in compliance_events
-                    if event.request_id == rid
-                )
-            ])
+            metrics = SignatureStatisticsService(self.db).compliance_statistics(framework, start_date, end_date)
+            violations = metrics["violations"]
+            requirements_met = metrics["requirements_met"]
 
+            total_requests = metrics["total_requests"]
+            compliant_requests = metrics["compliant_requests"]
             compliance_rate = compliant_requests / max(1, total_requests)
 
             return {
@@ -541,21 +340,21 @@ class SignatureAuditService:
                     "total_requests": total_requests,
                     "compliant_requests": compliant_requests,
                     "compliance_rate": compliance_rate,
-                    "total_events": len(compliance_events),
-                    "validation_events": len(validation_events)
+                    "total_events": metrics["total_events"],
+                    "validation_events": metrics["validation_events"]
                 },
                 "violations": {
-                    "total": len(violations),
-                    "unique": len(set(violations)),
+                    "total": sum(violations.values()),
+                    "unique": len(violations),
                     "common": self._get_most_common(violations, 5)
                 },
                 "requirements": {
-                    "total_met": len(requirements_met),
-                    "unique_met": len(set(requirements_met)),
+                    "total_met": sum(requirements_met.values()),
+                    "unique_met": len(requirements_met),
                     "common": self._get_most_common(requirements_met, 5)
                 },
                 "recommendations": self._generate_compliance_recommendations(
-                    violations, requirements_met, compliance_rate
+                    list(Counter(violations).elements()), list(Counter(requirements_met).elements()), compliance_rate
                 )
             }
 
@@ -571,9 +370,8 @@ class SignatureAuditService:
                 }
             }
 
-    def _get_most_common(self, items: List[str], count: int) -> List[Dict[str, Any]]:
-        """Get most common items from a list"""
-        from collections import Counter
+    def _get_most_common(self, items: Dict[str, int], count: int) -> List[Dict[str, Any]]:
+        """Get most common items from their counts"""
         counter = Counter(items)
         return [
             {"item": item, "count": count}
@@ -607,53 +405,38 @@ class SignatureAuditService:
         return recommendations
 
     # Data Integrity Methods
-    def verify_audit_integrity(self, request_id: str) -> Dict[str, Any]:
-        """Verify integrity of audit trail for a request"""
+    def verify_audit_integrity(self, request_id: str, full: bool = False) -> Dict[str, Any]:
+        """
+        Verify the request's audit hash chain. Rehashes only the events since the
+        latest checkpoint unless full=True, which rehashes from the first event.
+        """
         try:
-            events = self.get_signature_audit_trail(request_id)
-
-            # Check for gaps in timeline
-            timeline_gaps = []
-            for i in range(1, len(events)):
-                time_diff = (events[i].occurred_at - events[i-1].occurred_at).total_seconds()
-                if time_diff > 86400:  # More than 24 hours
-                    timeline_gaps.append({
-                        "after_event": events[i-1].id,
-                        "before_event": events[i].id,
-                        "gap_hours": time_diff / 3600
-                    })
-
-            # Check for required events
-            required_events = ["request_created", "signatures_requested"]
-            missing_events = []
-            existing_event_types = set(event.event_type for event in events)
-
-            for required in required_events:
-                if required not in existing_event_types:
-                    missing_events.append(required)
-
-            # Calculate integrity score
-            integrity_score = 1.0
-            if timeline_gaps:
-                integrity_score -= 0.1 * len(timeline_gaps)
-            if missing_events:
-                integrity_score -= 0.2 * len(missing_events)
-
-            integrity_score = max(0.0, integrity_score)
-
-            return {
-                "request_id": request_id,
-                "total_events": len(events),
-                "timeline_gaps": timeline_gaps,
-                "missing_events": missing_events,
-                "integrity_score": integrity_score,
-                "verified_at": datetime.utcnow().isoformat()
-            }
+            get_audit_log(self.db).flush()
+            result = verify_chain(self.db, request_id, full=full)
+            result["integrity_score"] = 1.0 if result["is_valid"] else 0.0
+            result["verified_at"] = datetime.utcnow().isoformat()
+            return result
 
         except Exception as e:
             logger.error(f"Failed to verify audit integrity: {str(e)}")
             return {
                 "request_id": request_id,
+                "is_valid": False,
                 "error": str(e),
                 "integrity_score": 0.0
-            }
\ No newline at end of file
+            }
+
+    def get_event_inclusion_proof(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """Merkle proof that an event is part of its request's checkpointed log"""
+        try:
+            get_audit_log(self.db).flush()
+            return inclusion_proof(self.db, event_id)
+
+        except Exception as e:
+            logger.error(f"Failed to build inclusion proof: {str(e)}")
+            return None
+
+    def verify_event_inclusion(self, event_id: str, proof: Dict[str, Any]) -> bool:
+        """Check an event's stored content against a previously issued proof"""
+        event = self.db.get(SignatureEvent, event_id)
+        return event is not None and verify_inclusion_proof(event, proof)
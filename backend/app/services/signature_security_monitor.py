@@ -0,0 +1,318 @@
+"""
+Security analysis of signature audit events, off the request path
+
+SignatureAuditService only appends events and hands a snapshot of each to the
+monitor's queue. A background consumer updates sliding-window counters
+(distinct users per IP address, authentication failures per user, events per
+request and type) and appends security alerts to the audit log as events of
+their own. Alerts are never analysed again.
+
+Counters live in Redis when the cache service is connected, so every API
+process sees the same windows; otherwise each process keeps them in memory.
+"""
+import asyncio
+import time
+import uuid
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.services.signature_audit_log import get_audit_log
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SecurityAlert:
+    """Security alert based on audit analysis"""
+    alert_type: str
+    severity: str  # low, medium, high, critical
+    description: str
+    affected_entities: List[str]
+    recommended_actions: List[str]
+    timestamp: datetime
+
+
+@dataclass(frozen=True)
+class AuditEventSnapshot:
+    """The fields of a logged event that the detectors read"""
+    request_id: str
+    event_type: str
+    user_id: Optional[str] = None
+    ip_address: Optional[str] = None
+    auth_result: Optional[str] = None
+    occurred_at: float = field(default_factory=time.time)
+
+
+# Detector windows and thresholds
+IP_WINDOW_SECONDS = 3600
+IP_MAX_USERS = 3                  # Alert above this many distinct users per IP
+AUTH_FAILURE_WINDOW_SECONDS = 1800
+AUTH_MAX_FAILURES = 3             # Alert at this many failures per user
+RAPID_FIRE_WINDOW_SECONDS = 300
+RAPID_FIRE_MAX_EVENTS = 10        # Alert above this many events per request and type
+
+MONITOR_QUEUE_SIZE = 10000
+MONITOR_BATCH_SIZE = 500
+
+
+class MemoryWindowStore:
+    """Sliding windows kept in process memory"""
+
+    def __init__(self):
+        self._windows: Dict[str, Deque[Tuple[float, str]]] = {}
+        self._suppressed: Dict[str, float] = {}
+
+    def _window(self, key: str, now: float, window: int) -> Deque[Tuple[float, str]]:
+        entries = self._windows.setdefault(key, deque())
+        while entries and entries[0][0] <= now - window:
+            entries.popleft()
+        return entries
+
+    async def add(self, key: str, member: str, now: float, window: int) -> int:
+        """Record member at now; returns the number of distinct members in the window"""
+        entries = self._window(key, now, window)
+        entries.append((now, member))
+        return len({m for _, m in entries})
+
+    async def incr(self, key: str, now: float, window: int) -> int:
+        """Record one occurrence at now; returns occurrences in the window"""
+        entries = self._window(key, now, window)
+        entries.append((now, ""))
+        return len(entries)
+
+    async def suppress(self, key: str, now: float, seconds: int) -> bool:
+        """True the first time key is raised within seconds; False while suppressed"""
+        if self._suppressed.get(key, 0) > now:
+            return False
+        self._suppressed[key] = now + seconds
+        return True
+
+    def clear(self) -> None:
+        self._windows.clear()
+        self._suppressed.clear()
+
+
+class RedisWindowStore:
+    """Sliding windows as Redis sorted sets scored by time, shared across processes"""
+
+    PREFIX = "ca_dms:signature_security:"
+
+    def __init__(self, client):
+        self.client = client
+
+    async def _record(self, key: str, member: str, now: float, window: int) -> int:
+        key = self.PREFIX + key
+        pipe = self.client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zadd(key, {member: now})
+        pipe.zcard(key)
+        pipe.expire(key, window)
+        return (await pipe.execute())[2]
+
+    async def add(self, key: str, member: str, now: float, window: int) -> int:
+        return await self._record(key, member, now, window)
+
+    async def incr(self, key: str, now: float, window: int) -> int:
+        return await self._record(key, uuid.uuid4().hex, now, window)
+
+    async def suppress(self, key: str, now: float, seconds: int) -> bool:
+        return bool(await self.client.set(self.PREFIX + "alerted:" + key, 1, ex=seconds, nx=True))
+
+
+_memory_store = MemoryWindowStore()
+
+
+def get_window_store():
+    """Redis when the cache service is connected, process memory otherwise"""
+    if cache_service._is_connected and cache_service._redis_client is not None:
+        return RedisWindowStore(cache_service._redis_client)
+    return _memory_store
+
+
+async def detect_alerts(snapshot: AuditEventSnapshot, store=None) -> List[SecurityAlert]:
+    """Update the windows with one event and return the alerts it raises"""
+    store = store or get_window_store()
+    now = snapshot.occurred_at
+    alerts: List[Tuple[str, SecurityAlert]] = []
+
+    if snapshot.ip_address and snapshot.user_id:
+        users = await store.add(f"ip_users:{snapshot.ip_address}", snapshot.user_id, now, IP_WINDOW_SECONDS)
+        if users > IP_MAX_USERS:
+            alerts.append((f"ip:{snapshot.ip_address}", SecurityAlert(
+                alert_type="suspicious_ip_activity",
+                severity="medium",
+                description=f"Multiple users ({users}) from same IP {snapshot.ip_address} in 1 hour",
+                affected_entities=[snapshot.ip_address],
+                recommended_actions=[
+                    "Review IP address reputation",
+                    "Verify user identities",
+                    "Consider additional authentication"
+                ],
+                timestamp=datetime.utcnow()
+            )))
+
+    if snapshot.auth_result == "failed":
+        failures = await store.incr(
+            f"auth_failures:{snapshot.user_id or snapshot.ip_address}", now, AUTH_FAILURE_WINDOW_SECONDS
+        )
+        if failures >= AUTH_MAX_FAILURES:
+            alerts.append((f"auth:{snapshot.user_id or snapshot.ip_address}", SecurityAlert(
+                alert_type="repeated_auth_failures",
+                severity="high",
+                description="Multiple authentication failures for user in 30 minutes",
+                affected_entities=[snapshot.user_id] if snapshot.user_id else [],
+                recommended_actions=[
+                    "Lock user account temporarily",
+                    "Require password reset",
+                    "Investigate potential brute force attack"
+                ],
+                timestamp=datetime.utcnow()
+            )))
+
+    events = await store.incr(
+        f"request_events:{snapshot.request_id}:{snapshot.event_type}", now, RAPID_FIRE_WINDOW_SECONDS
+    )
+    if events > RAPID_FIRE_MAX_EVENTS:
+        alerts.append((f"rapid:{snapshot.request_id}:{snapshot.event_type}", SecurityAlert(
+            alert_type="rapid_fire_events",
+            severity="medium",
+            description=f"Unusual number of {snapshot.event_type} events in 5 minutes",
+            affected_entities=[snapshot.request_id],
+            recommended_actions=[
+                "Review event patterns",
+                "Check for automated tools",
+                "Implement rate limiting"
+            ],
+            timestamp=datetime.utcnow()
+        )))
+
+    # Raise each condition once per window rather than on every further event
+    raised = []
+    for key, alert in alerts:
+        window = {
+            "suspicious_ip_activity": IP_WINDOW_SECONDS,
+            "repeated_auth_failures": AUTH_FAILURE_WINDOW_SECONDS,
+        }.get(alert.alert_type, RAPID_FIRE_WINDOW_SECONDS)
+        if await store.suppress(key, now, window):
+            raised.append(alert)
+    return raised
+
+
+class SignatureSecurityMonitor:
+    """Queue of audit event snapshots and the consumer that analyses them"""
+
+    def __init__(self, session_factory=None, store=None):
+        self.session_factory = session_factory
+        self.store = store
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.alerts_emitted = 0
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=MONITOR_QUEUE_SIZE)
+            self._loop = loop
+            self._task = None
+        return self._queue
+
+    def submit(self, snapshot: AuditEventSnapshot) -> None:
+        """Queue an event for analysis; never blocks the caller"""
+        try:
+            queue = self._ensure_queue()
+        except RuntimeError:
+            return  # No event loop: nothing can consume the event
+        try:
+            queue.put_nowait(snapshot)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    async def _consume(self) -> None:
+        while True:
+            snapshot = await self._queue.get()
+            batch = [snapshot]
+            while len(batch) < MONITOR_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self.process(batch)
+            except Exception as e:
+                logger.error(f"Signature security analysis failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def process(self, snapshots: List[AuditEventSnapshot]) -> List[SecurityAlert]:
+        """Analyse a batch of events and write any alerts in one transaction"""
+        alerts: List[SecurityAlert] = []
+        for snapshot in snapshots:
+            alerts.extend(await detect_alerts(snapshot, self.store))
+        if alerts:
+            # Session queries and the commit block, so they run off the event loop
+            await asyncio.to_thread(self._emit, alerts)
+        return alerts
+
+    def _session(self):
+        if self.session_factory is not None:
+            return self.session_factory()
+        from app.core import database
+        if database.SessionLocal is None:
+            database.init_db()
+        return database.SessionLocal()
+
+    def _emit(self, alerts: List[SecurityAlert]) -> None:
+        """Write alerts through the audit log on a session of its own (runs in a worker thread)"""
+        db = self._session()
+        try:
+            audit_log = get_audit_log(db)
+            for alert in alerts:
+                audit_log.append(
+                    request_id="system",
+                    event_type=f"security_alert_{alert.alert_type}",
+                    event_description=alert.description,
+                    external_event_data={
+                        "alert_type": alert.alert_type,
+                        "severity": alert.severity,
+                        "affected_entities": alert.affected_entities,
+                        "recommended_actions": alert.recommended_actions
+                    },
+                    occurred_at=alert.timestamp
+                )
+            audit_log.flush()
+            self.alerts_emitted += len(alerts)
+            for alert in alerts:
+                logger.warning(f"Security alert logged: {alert.alert_type} - {alert.description}")
+        except Exception as e:
+            logger.error(f"Failed to log security alerts: {str(e)}")
+        finally:
+            db.close()
+
+    async def drain(self) -> None:
+        """Wait until every queued event has been analysed"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            await self.drain()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+security_monitor = SignatureSecurityMonitor()
+
+
+async def stop_security_monitor() -> None:
+    await security_monitor.stop()
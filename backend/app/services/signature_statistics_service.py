@@ -0,0 +1,366 @@
+"""
+Signature statistics and compliance counters from grouped SQL aggregates
+
+Reports group requests and audit events by day in the database instead of
+loading them. Whole days that have settled are stored in
+signature_statistics_rollups the first time a report covers them, so a
+historical range reads one row per day; only the partial days at either end
+of a range, and days not yet cached, are aggregated from the source tables.
+Request rows are dropped whenever a request created that day changes. Audit
+events are append-only, so compliance rows never go stale.
+"""
+import logging
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, distinct, event, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models.digital_signature import (
+    DigitalSignatureRequest,
+    SignatureEvent,
+    SignatureStatisticsRollup,
+    SignatureStatus
+)
+from app.services.workflow_metrics_service import sketch_bin
+
+logger = logging.getLogger(__name__)
+
+# Dialects with native INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+REQUESTS_SCOPE = "requests"
+COMPLIANCE_SCOPE = "compliance"
+ALL_PROVIDERS = "*"
+
+# A day is cached once it ended this long ago, leaving time for buffered writes to land
+ROLLUP_SETTLE_TIME = timedelta(minutes=5)
+
+Range = Tuple[datetime, datetime]  # Half-open [start, end)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _exclusive_end(end: datetime) -> datetime:
+    """Inclusive report end as an exclusive bound; an end within a second of midnight covers the whole day"""
+    end = _naive_utc(end) + timedelta(microseconds=1)
+    midnight = datetime.combine(end.date() + timedelta(days=1), time.min)
+    return midnight if midnight - end < timedelta(seconds=1) else end
+
+
+def _as_date(value: Any) -> date:
+    """func.date() returns text on SQLite and a date elsewhere"""
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def split_range(start: datetime, end: datetime, now: datetime) -> Tuple[List[date], List[Range]]:
+    """
+    Whole settled days inside [start, end), and the ranges around them that
+    must be aggregated from the source tables.
+    """
+    first = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    last = min(end.date(), (now - ROLLUP_SETTLE_TIME).date())  # Exclusive
+    if first >= last:
+        return [], [(start, end)] if start < end else []
+
+    days = [first + timedelta(days=i) for i in range((last - first).days)]
+    live = []
+    first_start, last_end = datetime.combine(first, time.min), datetime.combine(last, time.min)
+    if start < first_start:
+        live.append((start, first_start))
+    if last_end < end:
+        live.append((last_end, end))
+    return days, live
+
+
+def _day_ranges(days: List[date]) -> List[Range]:
+    """Contiguous runs of days as datetime ranges"""
+    ranges: List[Range] = []
+    for day in sorted(days):
+        day_start = datetime.combine(day, time.min)
+        if ranges and ranges[-1][1] == day_start:
+            ranges[-1] = (ranges[-1][0], day_start + timedelta(days=1))
+        else:
+            ranges.append((day_start, day_start + timedelta(days=1)))
+    return ranges
+
+
+def _within(column, ranges: List[Range]):
+    return or_(*[and_(column >= start, column < end) for start, end in ranges])
+
+
+def elapsed_hours(dialect_name: str, started, finished):
+    """SQL expression for the hours between two timestamp columns"""
+    if dialect_name == "sqlite":
+        return (func.julianday(finished) - func.julianday(started)) * 24
+    return func.extract("epoch", finished - started) / 3600
+
+
+# Request metrics: {"statuses": {status: n}, "completion_count": n,
+#                   "completion_sum_hours": h, "completion_sketch": {bin: n}}
+def empty_request_metrics() -> Dict[str, Any]:
+    return {"statuses": {}, "completion_count": 0, "completion_sum_hours": 0.0, "completion_sketch": {}}
+
+
+def merge_request_metrics(items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    total = empty_request_metrics()
+    for metrics in items:
+        for status, count in metrics["statuses"].items():
+            total["statuses"][status] = total["statuses"].get(status, 0) + count
+        total["completion_count"] += metrics["completion_count"]
+        total["completion_sum_hours"] += metrics["completion_sum_hours"]
+        for bin_index, count in metrics["completion_sketch"].items():
+            bin_index = int(bin_index)  # JSON object keys come back as text
+            total["completion_sketch"][bin_index] = total["completion_sketch"].get(bin_index, 0) + count
+    return total
+
+
+# Compliance metrics: {"total_events": n, "validation_events": n,
+#                      "violations": {text: n}, "requirements_met": {text: n}}
+def empty_compliance_metrics() -> Dict[str, Any]:
+    return {"total_events": 0, "validation_events": 0, "violations": {}, "requirements_met": {}}
+
+
+def merge_compliance_metrics(items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    total = empty_compliance_metrics()
+    violations, requirements = Counter(), Counter()
+    for metrics in items:
+        total["total_events"] += metrics["total_events"]
+        total["validation_events"] += metrics["validation_events"]
+        violations.update(metrics["violations"])
+        requirements.update(metrics["requirements_met"])
+    total["violations"], total["requirements_met"] = dict(violations), dict(requirements)
+    return total
+
+
+class SignatureStatisticsService:
+    """Aggregate queries and daily rollups behind signature reports"""
+
+    def __init__(self, db: Session, now: Optional[Callable[[], datetime]] = None):
+        self.db = db
+        self.now = now or datetime.utcnow
+
+    @property
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    # Requests
+    def request_statistics(self, start_date: Optional[datetime] = None,
+                           end_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Merged request metrics for requests created in [start_date, end_date]"""
+        now = self.now()
+        end = _exclusive_end(end_date or now)
+        if start_date:
+            start = _naive_utc(start_date)
+        else:
+            first = self.db.query(func.min(DigitalSignatureRequest.created_at)).scalar()
+            if first is None:
+                return empty_request_metrics()
+            start = _naive_utc(first)
+
+        return merge_request_metrics(self._cached(
+            REQUESTS_SCOPE, ALL_PROVIDERS, start, end, now,
+            compute=self._request_metrics_by_day, empty=empty_request_metrics
+        ))
+
+    def _request_metrics_by_day(self, ranges: List[Range]) -> Dict[date, Dict[str, Any]]:
+        R = DigitalSignatureRequest
+        day = func.date(R.created_at)
+        in_range = _within(R.created_at, ranges)
+        by_day: Dict[date, Dict[str, Any]] = {}
+
+        for bucket, status, count in self.db.query(day, R.status, func.count(R.id)).filter(
+            in_range
+        ).group_by(day, R.status):
+            metrics = by_day.setdefault(_as_date(bucket), empty_request_metrics())
+            metrics["statuses"][status.value if status else "unknown"] = count
+
+        hours = elapsed_hours(self._dialect, R.requested_at, R.completed_at)
+        completed = and_(in_range, R.completed_at.isnot(None), R.requested_at.isnot(None))
+        for bucket, count, total in self.db.query(day, func.count(R.id), func.sum(hours)).filter(
+            completed
+        ).group_by(day):
+            metrics = by_day.setdefault(_as_date(bucket), empty_request_metrics())
+            metrics["completion_count"], metrics["completion_sum_hours"] = count, float(total or 0.0)
+
+        # Percentiles come from a mergeable sketch, built from one column per completed request
+        for bucket, value in self.db.query(day, hours).filter(completed):
+            sketch = by_day[_as_date(bucket)]["completion_sketch"]
+            bin_index = sketch_bin(max(float(value), 0.0))
+            sketch[bin_index] = sketch.get(bin_index, 0) + 1
+        return by_day
+
+    def provider_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """Request totals, signed count, average completion and last use per provider"""
+        R = DigitalSignatureRequest
+        hours = elapsed_hours(self._dialect, R.requested_at, R.completed_at)
+        rows = self.db.query(
+            R.provider_id,
+            func.count(R.id),
+            func.sum(case((R.status == SignatureStatus.SIGNED, 1), else_=0)),
+            func.avg(case((R.completed_at.isnot(None), hours), else_=None)),
+            func.max(R.created_at)
+        ).group_by(R.provider_id)
+        return {
+            provider_id: {
+                "total_requests": total,
+                "signed_requests": int(signed or 0),
+                "average_completion_hours": float(average) if average is not None else None,
+                "last_used": last_used
+            }
+            for provider_id, total, signed, average, last_used in rows
+        }
+
+    # Audit events
+    def audit_summary(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Event type counts and distinct users and documents for events in [start_date, end_date]"""
+        E = SignatureEvent
+        in_range = and_(E.occurred_at >= start_date, E.occurred_at <= end_date)
+
+        event_types = dict(
+            self.db.query(E.event_type, func.count(E.id)).filter(in_range).group_by(E.event_type).all()
+        )
+        users_involved = self.db.query(func.count(distinct(E.user_id))).filter(in_range).scalar() or 0
+        request_ids = self.db.query(E.request_id).filter(in_range)
+        documents_affected = self.db.query(func.count(distinct(DigitalSignatureRequest.document_id))).filter(
+            DigitalSignatureRequest.id.in_(request_ids)
+        ).scalar() or 0
+
+        return {
+            "total_events": sum(event_types.values()),
+            "event_types": event_types,
+            "users_involved": users_involved,
+            "documents_affected": documents_affected
+        }
+
+    def compliance_statistics(self, framework: str, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Compliance counters and request totals for a framework's events in [start_date, end_date]"""
+        now = self.now()
+        start, end = _naive_utc(start_date), _exclusive_end(end_date)
+        metrics = merge_compliance_metrics(self._cached(
+            COMPLIANCE_SCOPE, framework, start, end, now,
+            compute=lambda ranges: self._compliance_metrics_by_day(framework, ranges),
+            empty=empty_compliance_metrics
+        ))
+
+        # Distinct request counts do not add up across days, so they come straight from SQL
+        E = SignatureEvent
+        in_range = and_(E.legal_framework_applied == framework, E.occurred_at >= start, E.occurred_at < end)
+        total_requests, violating_requests = self.db.query(
+            func.count(distinct(E.request_id)),
+            func.count(distinct(case((E.event_type.like("%violation%"), E.request_id), else_=None)))
+        ).filter(in_range).one()
+        metrics["total_requests"] = total_requests
+        metrics["compliant_requests"] = total_requests - violating_requests
+        return metrics
+
+    def _compliance_metrics_by_day(self, framework: str, ranges: List[Range]) -> Dict[date, Dict[str, Any]]:
+        E = SignatureEvent
+        day = func.date(E.occurred_at)
+        in_range = and_(E.legal_framework_applied == framework, _within(E.occurred_at, ranges))
+        by_day: Dict[date, Dict[str, Any]] = {}
+
+        validation = case((E.event_type.like("%validation%"), 1), else_=0)
+        for bucket, total, validations in self.db.query(
+            day, func.count(E.id), func.sum(validation)
+        ).filter(in_range).group_by(day):
+            metrics = by_day.setdefault(_as_date(bucket), empty_compliance_metrics())
+            metrics["total_events"], metrics["validation_events"] = total, int(validations or 0)
+
+        # Only validation payloads are read, and only their JSON column
+        for bucket, data in self.db.query(day, E.external_event_data).filter(
+            in_range, E.event_type.like("%validation%"), E.external_event_data.isnot(None)
+        ):
+            metrics = by_day[_as_date(bucket)]
+            for key in ("violations", "requirements_met"):
+                counts = metrics[key]
+                for item in data.get(key, []) or []:
+                    counts[str(item)] = counts.get(str(item), 0) + 1
+        return by_day
+
+    # Daily rollup cache
+    def _cached(self, scope: str, scope_key: str, start: datetime, end: datetime, now: datetime,
+                compute: Callable[[List[Range]], Dict[date, Dict[str, Any]]],
+                empty: Callable[[], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Metrics for [start, end): stored days from the rollup table, the rest aggregated now"""
+        days, live = split_range(start, end, now)
+        results: List[Dict[str, Any]] = []
+
+        if days:
+            stored = {
+                row.bucket_date: row.metrics
+                for row in self.db.query(SignatureStatisticsRollup).filter(
+                    SignatureStatisticsRollup.scope == scope,
+                    SignatureStatisticsRollup.scope_key == scope_key,
+                    SignatureStatisticsRollup.bucket_date >= days[0],
+                    SignatureStatisticsRollup.bucket_date <= days[-1]
+                )
+            }
+            results.extend(stored.values())
+            missing = [day for day in days if day not in stored]
+            if missing:
+                computed = compute(_day_ranges(missing))
+                fresh = {day: computed.get(day) or empty() for day in missing}
+                self._store(scope, scope_key, fresh)
+                results.extend(fresh.values())
+
+        if live:
+            results.extend(compute(live).values())
+        return results
+
+    def _store(self, scope: str, scope_key: str, metrics_by_day: Dict[date, Dict[str, Any]]) -> None:
+        """Write rollup rows in their own transaction, leaving the caller's session untouched"""
+        table = SignatureStatisticsRollup.__table__
+        rows = [
+            {"scope": scope, "scope_key": scope_key, "bucket_date": day, "metrics": metrics,
+             "computed_at": datetime.utcnow()}
+            for day, metrics in metrics_by_day.items()
+        ]
+        session = sessionmaker(bind=self.db.get_bind())()
+        try:
+            dialect_insert = _UPSERT_INSERTS.get(self._dialect)
+            if dialect_insert is not None:
+                statement = dialect_insert(table)
+                session.execute(statement.on_conflict_do_update(
+                    index_elements=["scope", "scope_key", "bucket_date"],
+                    set_={"metrics": statement.excluded.metrics, "computed_at": statement.excluded.computed_at}
+                ), rows)
+            else:
+                session.execute(delete(table).where(
+                    table.c.scope == scope, table.c.scope_key == scope_key,
+                    table.c.bucket_date.in_(list(metrics_by_day))
+                ))
+                session.execute(table.insert(), rows)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to store signature statistics rollups: {str(e)}")
+        finally:
+            session.close()
+
+
+def _invalidate_request_day(mapper, connection, target) -> None:
+    """A request changed: its creation day's stored statistics are stale"""
+    created_at = target.created_at
+    if created_at is None:
+        return  # Server default: created now, a day that is not cached yet
+    table = SignatureStatisticsRollup.__table__
+    connection.execute(delete(table).where(
+        table.c.scope == REQUESTS_SCOPE,
+        table.c.bucket_date == _naive_utc(created_at).date()
+    ))
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(DigitalSignatureRequest, _event_name, _invalidate_request_day)
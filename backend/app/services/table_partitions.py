@@ -0,0 +1,125 @@
+"""
+Monthly partitions for the append-mostly audit tables
+
+On PostgreSQL, migration 010 turns audit_logs, notifications and
+signature_events into tables range-partitioned by month on their time column.
+This module keeps partitions created ahead of the current month and lets
+retention detach and drop a whole month at once instead of deleting its rows.
+
+Other databases (SQLite in development and tests) keep plain tables: there
+are no partitions to list, and retention falls back to chunked deletes.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition column
+PARTITIONED_TABLES = {
+    "audit_logs": "created_at",
+    "notifications": "created_at",
+    "signature_events": "occurred_at",
+}
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+@dataclass
+class Partition:
+    """One month of a partitioned table: rows with start <= time column < end"""
+    table: str
+    name: str
+    start: date
+    end: date
+
+
+class PartitionManager:
+    """Lists, creates and drops monthly partitions through a session's connection"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def is_partitioned(self, table: str) -> bool:
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        relkind = self.db.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+        return relkind == "p"
+
+    def partitions(self, table: str) -> List[Partition]:
+        """The table's monthly partitions, oldest first; empty when it is not partitioned"""
+        if not self.is_partitioned(table):
+            return []
+        names = self.db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ), {"table": table}).scalars()
+
+        pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$")
+        partitions = []
+        for name in names:
+            match = pattern.match(name)
+            if match:  # Skips <table>_default
+                start = date(int(match.group(1)), int(match.group(2)), 1)
+                partitions.append(Partition(table, name, start, add_months(start, 1)))
+        return sorted(partitions, key=lambda partition: partition.start)
+
+    def ensure_partitions(self, table: str, today: Optional[date] = None) -> List[str]:
+        """Create the current and the next PARTITION_PRECREATE_MONTHS months; returns the new partitions"""
+        if not self.is_partitioned(table):
+            return []
+        existing = {partition.name for partition in self.partitions(table)}
+        current = month_start(today or datetime.utcnow().date())
+
+        created = []
+        for offset in range(settings.PARTITION_PRECREATE_MONTHS + 1):
+            month = add_months(current, offset)
+            name = partition_name(table, month)
+            if name not in existing:
+                self.db.execute(text("SELECT create_monthly_partition(:table, :month)"),
+                                {"table": table, "month": month})
+                created.append(name)
+        self.db.commit()
+        return created
+
+    def drop_partition(self, partition: Partition) -> int:
+        """Detach and drop one partition; returns the number of rows it held"""
+        rows = self.db.execute(text(f'SELECT count(*) FROM "{partition.name}"')).scalar()
+        self.db.execute(text(f'ALTER TABLE "{partition.table}" DETACH PARTITION "{partition.name}"'))
+        self.db.execute(text(f'DROP TABLE "{partition.name}"'))
+        self.db.commit()
+        logger.info(f"Dropped partition {partition.name} ({rows} rows)")
+        return rows
+
+
+def ensure_table_partitions(db: Session) -> None:
+    """Create upcoming monthly partitions for every partitioned table"""
+    manager = PartitionManager(db)
+    for table in PARTITIONED_TABLES:
+        try:
+            created = manager.ensure_partitions(table)
+            if created:
+                logger.info(f"Created partitions {', '.join(created)}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to create partitions for {table}: {e}")
@@ -0,0 +1,185 @@
+"""
+Compiled document templates
+
+A template's Quill Delta is scanned once for {field} placeholders into an
+immutable slot index: the op index and character offset of every field.
+Instantiation then builds a new Delta in a single pass over the compiled ops
+instead of copying the content and running str.replace for every text op and
+every field value. Nothing in the result is shared with the template's
+content or with other instances.
+
+Compiled templates are cached per database and template. Publishing a
+template compiles it ahead of use; ORM updates and deletes of a template drop
+its entry.
+"""
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_template import DocumentTemplate
+
+FIELD_PATTERN = re.compile(r"\{([^{}\n]+)\}")
+
+
+@dataclass(frozen=True)
+class Slot:
+    """One {field} occurrence: the op it is in and the offset of its opening brace"""
+    op_index: int
+    offset: int
+    field: str
+
+
+@dataclass(frozen=True)
+class CompiledOp:
+    """A Delta op; text inserts with fields are pieces alternating literal text and field names"""
+    insert: Any
+    pieces: Optional[Tuple[str, ...]] = None
+    extras: Tuple[Tuple[str, Any], ...] = ()
+
+
+class _FrozenDict(tuple):
+    """Items of a JSON object"""
+
+
+class _FrozenList(tuple):
+    """Items of a JSON array"""
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, _FrozenDict):
+        return {key: _thaw(item) for key, item in value}
+    if isinstance(value, _FrozenList):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def split_fields(text: str) -> Tuple[str, ...]:
+    """Literal text and field names, alternating, starting and ending with literal text"""
+    return tuple(FIELD_PATTERN.split(text))
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    template_id: Optional[str]
+    version: int
+    ops: Tuple[CompiledOp, ...]
+    slots: Tuple[Slot, ...]
+
+    @property
+    def fields(self) -> FrozenSet[str]:
+        return frozenset(slot.field for slot in self.slots)
+
+    def render(self, field_values: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+        """A new Delta with field values substituted; fields without a value keep their {field} text"""
+        values = {name: str(value) for name, value in (field_values or {}).items()}
+        ops: List[Dict[str, Any]] = []
+        for compiled in self.ops:
+            op = {key: _thaw(value) for key, value in compiled.extras}
+            if compiled.pieces is None:
+                op["insert"] = _thaw(compiled.insert)
+            else:
+                pieces = compiled.pieces
+                parts = [pieces[0]]
+                for index in range(1, len(pieces), 2):
+                    field = pieces[index]
+                    parts.append(values.get(field, f"{{{field}}}"))
+                    parts.append(pieces[index + 1])
+                op["insert"] = "".join(parts)
+            ops.append(op)
+        return {"ops": ops}
+
+
+def compile_content(template_id: Optional[str], version: int, content: Dict[str, Any]) -> CompiledTemplate:
+    """Build the slot index for a document Delta; raises ValueError for anything else"""
+    if not isinstance(content, dict) or not isinstance(content.get("ops"), list):
+        raise ValueError("Template content must be a Delta with an ops list")
+    ops = []
+    slots = []
+    for op_index, op in enumerate(content["ops"]):
+        if not isinstance(op, dict) or "insert" not in op:
+            raise ValueError(f"Template op {op_index} is not an insert")
+        insert = op.get("insert")
+        extras = tuple((key, _freeze(value)) for key, value in op.items() if key != "insert")
+        if isinstance(insert, str) and "{" in insert:
+            pieces = split_fields(insert)
+            offset = 0
+            for index, piece in enumerate(pieces):
+                if index % 2:
+                    slots.append(Slot(op_index, offset, piece))
+                    offset += len(piece) + 2
+                else:
+                    offset += len(piece)
+            if len(pieces) > 1:
+                ops.append(CompiledOp(insert=None, pieces=pieces, extras=extras))
+                continue
+        ops.append(CompiledOp(insert=_freeze(insert), extras=extras))
+    return CompiledTemplate(template_id=template_id, version=version, ops=tuple(ops), slots=tuple(slots))
+
+
+class CompiledTemplateCache:
+    """Compiled templates by template id, per database, least recently used first"""
+
+    def __init__(self):
+        self._entries: "weakref.WeakKeyDictionary[Any, OrderedDict[str, CompiledTemplate]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, template: DocumentTemplate) -> CompiledTemplate:
+        bind = db.get_bind()
+        with self._lock:
+            entries = self._entries.get(bind)
+            compiled = entries.get(template.id) if entries is not None else None
+            if compiled is not None and compiled.version == template.version:
+                entries.move_to_end(template.id)
+                return compiled
+        return self.compile(db, template)
+
+    def compile(self, db: Session, template: DocumentTemplate) -> CompiledTemplate:
+        """Compile a template and cache the result"""
+        compiled = compile_content(template.id, template.version, template.content)
+        self.store(db, compiled)
+        return compiled
+
+    def store(self, db: Session, compiled: CompiledTemplate) -> None:
+        with self._lock:
+            entries = self._entries.setdefault(db.get_bind(), OrderedDict())
+            entries[compiled.template_id] = compiled
+            entries.move_to_end(compiled.template_id)
+            while len(entries) > settings.COMPILED_TEMPLATE_CACHE_SIZE:
+                entries.popitem(last=False)
+
+    def invalidate(self, bind, template_id: str) -> None:
+        with self._lock:
+            entries = self._entries.get(bind)
+            if entries is not None:
+                entries.pop(template_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+compiled_templates = CompiledTemplateCache()
+
+
+def _invalidate_template(mapper, connection, target) -> None:
+    compiled_templates.invalidate(connection.engine, target.id)
+
+
+for _event_name in ("after_update", "after_delete"):
+    event.listen(DocumentTemplate, _event_name, _invalidate_template)
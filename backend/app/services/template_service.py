@@ -5,6 +5,7 @@ from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc, func, and_, or_
 from datetime import datetime, timedelta
+import copy
 import uuid
 
 from app.models.document_template import (
@@ -17,6 +18,7 @@ from app.models.document_template import (
     TemplateAccessLevel,
     TemplateStatus
 )
+from app.core.config import settings
 from app.models.document import Document
 from app.schemas.document_template import (
     DocumentTemplateCreate,
@@ -31,6 +33,9 @@ from app.schemas.document_template import (
     TemplateInstanceRequest,
     BulkTemplateAction
 )
+from app.schemas.document import DocumentCreate
+from app.services.document_service import DocumentService
+from app.services.template_compiler import compile_content, compiled_templates
 
 
 class TemplateService:
@@ -234,12 +239,16 @@ class TemplateService:
         if not self._check_template_access(template, user_id, "publish"):
             return None
         
+        # Compile before publishing so a template whose content cannot be instantiated is rejected
+        compiled = compile_content(template.id, template.version, template.content)
+        
         template.status = TemplateStatus.PUBLISHED
         template.published_at = datetime.utcnow()
         template.updated_by = user_id
         
         self.db.commit()
         self.db.refresh(template)
+        compiled_templates.store(self.db, compiled)
         
         return template
     
@@ -264,8 +273,8 @@ class TemplateService:
         if not document_title:
             document_title = f"Document from {template.name}"
         
-        # Process template content with field values
-        processed_content = self._process_template_content(template.content, request.field_values)
+        # Build the document content from the compiled template
+        processed_content = compiled_templates.get(self.db, template).render(request.field_values)
         
         # Create document (this would integrate with the existing document service)
         document_data = {
@@ -290,6 +299,56 @@ class TemplateService:
             "template_name": template.name
         }
     
+    def merge_documents(
+        self,
+        template_id: str,
+        rows: List[Dict[str, Any]],
+        user_id: str,
+        document_type: str = "governance",
+        title_pattern: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Create one document per row of field values, in a single transaction"""
+        template = self.get_template(template_id, user_id)
+        if not template:
+            return None
+        
+        if len(rows) > settings.TEMPLATE_MERGE_MAX_ROWS:
+            raise ValueError(f"A merge can create at most {settings.TEMPLATE_MERGE_MAX_ROWS} documents")
+        
+        required_fields = template.required_fields or []
+        for index, row in enumerate(rows, start=1):
+            missing = [field for field in required_fields if row.get(field) in (None, "")]
+            if missing:
+                raise ValueError(f"Row {index} is missing required fields: {', '.join(missing)}")
+        
+        compiled = compiled_templates.get(self.db, template)
+        title_pattern = title_pattern or template.default_title_pattern
+        documents = [
+            DocumentCreate(
+                title=(self._generate_document_title(title_pattern, row) if title_pattern
+                       else f"Document from {template.name}")[:255],
+                content=compiled.render(row),
+                document_type=document_type,
+                placeholders=copy.deepcopy(template.placeholders)
+            )
+            for row in rows
+        ]
+        
+        db_documents = DocumentService(self.db).create_documents(documents, user_id, commit=False)
+        
+        for db_document in db_documents:
+            self._log_template_usage(template.id, user_id, "used", db_document.id)
+        
+        template.usage_count += len(db_documents)
+        template.last_used_at = datetime.utcnow()
+        self.db.commit()
+        
+        return {
+            "documents": db_documents,
+            "template_id": template.id,
+            "template_name": template.name
+        }
+    
     def add_collaborator(
         self, 
         template_id: str, 
@@ -662,24 +721,7 @@ class TemplateService:
     
     def _process_template_content(self, content: Dict[str, Any], field_values: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Process template content by replacing field placeholders"""
-        if not field_values:
-            return content
-        
-        # This is a simplified implementation
-        # In practice, you'd want more sophisticated content processing
-        processed_content = content.copy()
-        
-        # Process content operations for field substitutions
-        if "ops" in processed_content:
-            for op in processed_content["ops"]:
-                if isinstance(op.get("insert"), str):
-                    text = op["insert"]
-                    for key, value in field_values.items():
-                        placeholder = f"{{{key}}}"
-                        if placeholder in text:
-                            op["insert"] = text.replace(placeholder, str(value))
-        
-        return processed_content
+        return compile_content(None, 0, content).render(field_values)
     
     def _log_template_usage(
         self, 
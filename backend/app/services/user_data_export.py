@@ -0,0 +1,381 @@
+"""
+Streaming GDPR data export
+
+Exports run as background jobs (DataExportJob). Each category is read in
+keyset pages with a streaming cursor and appended, one record per line, to a
+part file in the job's directory. After every page the job records the last
+exported key and the part's size, so a job restarted after a crash truncates
+the part back to its last checkpoint and carries on from there. Once every
+category is written the parts are streamed into a zip archive, one member per
+category plus a manifest. Memory use is bounded by a page, not by how much
+data the user has.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core import database
+from app.core.config import settings
+from app.models.compliance import DataExportJob, UserConsent
+from app.models.document import Document
+from app.models.security import AuditEventType, AuditLog, AuditSeverity
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {"json": "ndjson", "csv": "csv"}  # Request format -> archive member extension
+FETCH_SIZE = 100  # Rows per cursor fetch within a page; documents carry their full content
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _hidden(job: DataExportJob, value: Any) -> Any:
+    return "***" if job.anonymize_sensitive else value
+
+
+def _profile(row, job: DataExportJob) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "email": row.email,
+        "username": row.username,
+        "full_name": row.full_name,
+        "title": row.title,
+        "phone": row.phone,
+        "role": row.role,
+        "is_active": row.is_active,
+        "is_verified": row.is_verified,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "last_login": row.last_login,
+        "verified_at": row.verified_at
+    }
+
+
+def _document(row, job: DataExportJob) -> Dict[str, Any]:
+    record = {
+        "id": row.id,
+        "title": row.title,
+        "document_type": row.document_type,
+        "version": row.version,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "created_by": row.created_by,
+        "updated_by": row.updated_by
+    }
+    if job.include_metadata:
+        record["content"] = row.content
+        record["placeholders"] = row.placeholders
+    return record
+
+
+def _consent(row, job: DataExportJob) -> Dict[str, Any]:
+    record = {
+        "id": row.id,
+        "consent_type": row.consent_type,
+        "status": row.status,
+        "method": row.method,
+        "purpose": row.purpose,
+        "data_categories": row.data_categories,
+        "processing_activities": row.processing_activities,
+        "legal_basis": row.legal_basis,
+        "consent_version": row.consent_version,
+        "granted_at": row.granted_at,
+        "withdrawn_at": row.withdrawn_at,
+        "expires_at": row.expires_at,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
+    if job.include_metadata:
+        record["consent_metadata"] = row.consent_metadata
+        record["ip_address"] = _hidden(job, row.ip_address)
+        record["user_agent"] = _hidden(job, row.user_agent)
+    return record
+
+
+def _audit_log(row, job: DataExportJob) -> Dict[str, Any]:
+    record = {
+        "id": row.id,
+        "event_type": row.event_type,
+        "severity": row.severity,
+        "message": row.message,
+        "resource_type": row.resource_type,
+        "resource_id": row.resource_id,
+        "resource_name": row.resource_name,
+        "created_at": row.created_at
+    }
+    if job.include_metadata:
+        record["details"] = row.details
+        record["ip_address"] = _hidden(job, row.ip_address)
+        record["user_agent"] = _hidden(job, row.user_agent)
+    return record
+
+
+@dataclass
+class ExportCategory:
+    """How one category of a user's data is selected, paged and serialized"""
+    key: Any  # Unique, ordered column pages are keyed on
+    owner: Any  # Column holding the exported user's id
+    columns: List[Any]
+    serialize: Callable[[Any, DataExportJob], Dict[str, Any]]
+
+
+def _columns(model, names: str) -> List[Any]:
+    return [getattr(model, name) for name in names.split()]
+
+
+# Archive order
+CATEGORIES: Dict[str, ExportCategory] = {
+    "profile": ExportCategory(User.id, User.id, _columns(
+        User, "id email username full_name title phone role is_active is_verified "
+              "created_at updated_at last_login verified_at"
+    ), _profile),
+    "documents": ExportCategory(Document.id, Document.created_by, _columns(
+        Document, "id title document_type version created_at updated_at created_by updated_by content placeholders"
+    ), _document),
+    "consents": ExportCategory(UserConsent.id, UserConsent.user_id, _columns(
+        UserConsent, "id consent_type status method purpose data_categories processing_activities legal_basis "
+                     "consent_version granted_at withdrawn_at expires_at created_at updated_at "
+                     "consent_metadata ip_address user_agent"
+    ), _consent),
+    "audit_logs": ExportCategory(AuditLog.id, AuditLog.user_id, _columns(
+        AuditLog, "id event_type severity message resource_type resource_id resource_name created_at "
+                  "details ip_address user_agent"
+    ), _audit_log),
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _json_line(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, default=_plain, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _csv_line(values: List[Any]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow([
+        json.dumps(value, default=_plain, ensure_ascii=False) if isinstance(value, (dict, list)) else _plain(value)
+        for value in values
+    ])
+    return buffer.getvalue().encode("utf-8")
+
+
+def job_directory(job_id: str) -> Path:
+    return Path(settings.DATA_EXPORT_DIR) / job_id
+
+
+class DataExporter:
+    """Creates export jobs and runs them to a zip archive"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_job(
+        self,
+        user_id: str,
+        format: str = "json",
+        data_categories: Optional[List[str]] = None,
+        include_metadata: bool = True,
+        anonymize_sensitive: bool = False,
+        requested_by: Optional[str] = None
+    ) -> DataExportJob:
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        job = DataExportJob(
+            user_id=user_id,
+            requested_by=requested_by,
+            format=format,
+            data_categories=[name for name in CATEGORIES if not data_categories or name in data_categories],
+            include_metadata=include_metadata,
+            anonymize_sensitive=anonymize_sensitive,
+            status="pending",
+            progress={}
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def run(self, job_id: str) -> DataExportJob:
+        """Run or resume a job; returns it completed, failed, or untouched when another worker holds it"""
+        if not self._claim(job_id):
+            job = self.db.get(DataExportJob, job_id)
+            if job is None:
+                raise ValueError(f"Data export job {job_id} not found")
+            return job
+
+        job = self.db.get(DataExportJob, job_id)
+        directory = job_directory(job.id)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            for name in job.data_categories:
+                if not (job.progress or {}).get(name, {}).get("done"):
+                    self._export_category(job, name, directory)
+            self._write_archive(job, directory)
+        except Exception as e:
+            self.db.rollback()
+            job.status = "failed"
+            job.error = str(e)[:1000]
+            self.db.commit()
+            logger.error(f"Data export {job.id} failed: {e}")
+        return job
+
+    def _claim(self, job_id: str) -> bool:
+        stale = datetime.utcnow() - timedelta(seconds=settings.DATA_EXPORT_STALE_SECONDS)
+        claimed = self.db.query(DataExportJob).filter(
+            DataExportJob.id == job_id,
+            or_(
+                DataExportJob.status.in_(("pending", "failed")),
+                and_(DataExportJob.status == "running", DataExportJob.updated_at < stale)
+            )
+        ).update({
+            DataExportJob.status: "running",
+            DataExportJob.error: None,
+            DataExportJob.started_at: datetime.utcnow(),
+            DataExportJob.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        self.db.commit()
+        return claimed == 1
+
+    def _export_category(self, job: DataExportJob, name: str, directory: Path) -> None:
+        category = CATEGORIES[name]
+        state = dict((job.progress or {}).get(name) or {"after": None, "records": 0, "bytes": 0})
+        with open(directory / f"{name}.part", "a+b") as part:
+            # Anything past the last checkpoint is from a page that never committed
+            part.truncate(state["bytes"])
+            part.seek(state["bytes"])
+            while True:
+                query = self.db.query(*category.columns).filter(category.owner == job.user_id)
+                if state["after"] is not None:
+                    query = query.filter(category.key > state["after"])
+                page = query.order_by(category.key).limit(settings.DATA_EXPORT_PAGE_SIZE).yield_per(FETCH_SIZE)
+
+                written = 0
+                for row in page:
+                    record = category.serialize(row, job)
+                    if job.format == "csv":
+                        if state["records"] == 0:
+                            part.write(_csv_line(list(record)))
+                        part.write(_csv_line(list(record.values())))
+                    else:
+                        part.write(_json_line(record))
+                    state["after"] = record["id"]
+                    state["records"] += 1
+                    written += 1
+
+                part.flush()
+                os.fsync(part.fileno())
+                state["bytes"] = part.tell()
+                state["done"] = written < settings.DATA_EXPORT_PAGE_SIZE
+                job.progress = {**(job.progress or {}), name: dict(state)}
+                self.db.commit()
+                if state["done"]:
+                    return
+
+    def _write_archive(self, job: DataExportJob, directory: Path) -> None:
+        archive = directory / f"user_data_export_{job.id}.zip"
+        staging = directory / f"{archive.name}.tmp"
+        extension = EXPORT_FORMATS[job.format]
+        counts = {name: job.progress[name]["records"] for name in job.data_categories}
+
+        with zipfile.ZipFile(staging, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
+            for name in job.data_categories:
+                with open(directory / f"{name}.part", "rb") as source, \
+                        zipf.open(f"{name}.{extension}", "w", force_zip64=True) as member:
+                    shutil.copyfileobj(source, member, COPY_BUFFER_SIZE)
+            zipf.writestr("manifest.json", json.dumps({
+                "export_id": job.id,
+                "user_id": job.user_id,
+                "format": job.format,
+                "records": counts,
+                "anonymized": job.anonymize_sensitive,
+                "include_metadata": job.include_metadata,
+                "generated_at": datetime.utcnow().isoformat()
+            }, indent=2))
+
+        file_hash = hashlib.sha256()
+        with open(staging, "rb") as f:
+            for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+                file_hash.update(chunk)
+        os.replace(staging, archive)
+        for name in job.data_categories:
+            (directory / f"{name}.part").unlink(missing_ok=True)
+
+        job.status = "completed"
+        job.file_path = str(archive)
+        job.file_size = archive.stat().st_size
+        job.file_hash = file_hash.hexdigest()
+        job.completed_at = datetime.utcnow()
+        job.expires_at = job.completed_at + timedelta(days=settings.DATA_EXPORT_EXPIRY_DAYS)
+
+        self.db.add(AuditLog(
+            event_type=AuditEventType.USER_UPDATED,
+            severity=AuditSeverity.MEDIUM,
+            message="User data exported for GDPR compliance",
+            user_id=job.user_id,
+            resource_type="data_export",
+            resource_id=job.id,
+            details={
+                "export_format": job.format,
+                "data_categories": job.data_categories,
+                "records": counts,
+                "file_size": job.file_size,
+                "anonymized": job.anonymize_sensitive
+            }
+        ))
+        self.db.commit()
+
+
+def run_export_job(job_id: str, session_factory=None) -> None:
+    """Run a job on a session of its own, for BackgroundTasks and the resume thread"""
+    db = (session_factory or database.SessionLocal)()
+    try:
+        DataExporter(db).run(job_id)
+    except Exception as e:
+        logger.error(f"Data export {job_id} could not be run: {e}")
+    finally:
+        db.close()
+
+
+def resume_export_jobs(session_factory=None) -> int:
+    """Run pending jobs and jobs left running by a stopped worker; returns how many were picked up"""
+    factory = session_factory or database.SessionLocal
+    if factory is None:
+        return 0
+    db = factory()
+    try:
+        stale = datetime.utcnow() - timedelta(seconds=settings.DATA_EXPORT_STALE_SECONDS)
+        job_ids = [row.id for row in db.query(DataExportJob.id).filter(or_(
+            DataExportJob.status == "pending",
+            and_(DataExportJob.status == "running", DataExportJob.updated_at < stale)
+        )).order_by(DataExportJob.created_at)]
+    except Exception as e:
+        logger.error(f"Failed to load data exports to resume: {e}")
+        return 0
+    finally:
+        db.close()
+    for job_id in job_ids:
+        run_export_job(job_id, factory)
+    return len(job_ids)
+
+
+def start_export_resume() -> None:
+    threading.Thread(target=resume_export_jobs, name="data-export-resume", daemon=True).start()
@@ -0,0 +1,489 @@
+"""
+Webhook delivery pipeline for CA-DMS
+
+Triggered events are written to the webhook_deliveries outbox and return
+immediately. Dispatch workers claim due deliveries in batches and post them
+through one shared HTTP/2 client, with a per-endpoint concurrency limit and a
+circuit breaker that stops hammering endpoints that keep failing. Outcomes are
+written back with one bulk update per batch; retryable failures back off
+exponentially with jitter until WEBHOOK_MAX_ATTEMPTS.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+import weakref
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.external_integration import Webhook, WebhookDelivery, WebhookDeliveryStatus
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+USER_AGENT = "CA-DMS-Webhook/1.0"
+REQUEST_HEADERS = {"Content-Type": "application/json", "User-Agent": USER_AGENT}
+
+# Response statuses worth retrying; any other non-2xx status fails the delivery at once
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+MAX_RESPONSE_BODY = 10000
+MAX_ERROR_MESSAGE = 1000
+
+
+@lru_cache(maxsize=1024)
+def _signer(secret: str) -> "hmac.HMAC":
+    # Keyed HMAC state, copied per body so the key schedule is computed once per secret
+    return hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+
+def sign_payload(body: str, secret: str) -> str:
+    """HMAC-SHA256 signature header value for a request body"""
+    signer = _signer(secret).copy()
+    signer.update(body.encode('utf-8'))
+    return f"sha256={signer.hexdigest()}"
+
+
+def serialize_payload(payload: Dict[str, Any]) -> str:
+    """Request body for an event payload; serialized once and reused for every subscriber"""
+    return json.dumps(payload, default=str)
+
+
+def retry_delay(attempt_count: int) -> timedelta:
+    """Backoff before the next attempt after `attempt_count` failed attempts"""
+    seconds = min(
+        settings.WEBHOOK_RETRY_BASE_SECONDS * (2 ** max(attempt_count - 1, 0)),
+        settings.WEBHOOK_RETRY_MAX_SECONDS
+    )
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+# =========================================================================
+# Shared HTTP client
+# =========================================================================
+
+# One client (and connection pool) per event loop; httpx pools cannot be shared across loops
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=settings.WEBHOOK_HTTP2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS
+            ),
+            headers={"User-Agent": USER_AGENT}
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the running loop's client and its connections"""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# =========================================================================
+# Circuit breakers
+# =========================================================================
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker.
+
+    Opens after WEBHOOK_CIRCUIT_FAILURE_THRESHOLD consecutive failures; while
+    open, deliveries are deferred without spending attempts. After the reset
+    period a single trial request is let through and its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, threshold: Optional[int] = None, reset_seconds: Optional[int] = None):
+        self.threshold = threshold or settings.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_seconds = reset_seconds or settings.WEBHOOK_CIRCUIT_RESET_SECONDS
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def retry_at(self) -> datetime:
+        """When an open circuit next lets a request through"""
+        remaining = max(self.opened_at + self.reset_seconds - time.monotonic(), 0) if self.opened_at else 0
+        return datetime.utcnow() + timedelta(seconds=remaining)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_circuits: Dict[str, CircuitBreaker] = {}
+_circuits_lock = threading.Lock()
+
+
+def get_circuit(webhook_id: str) -> CircuitBreaker:
+    with _circuits_lock:
+        circuit = _circuits.get(webhook_id)
+        if circuit is None:
+            circuit = _circuits[webhook_id] = CircuitBreaker()
+        return circuit
+
+
+def reset_circuits() -> None:
+    with _circuits_lock:
+        _circuits.clear()
+
+
+# =========================================================================
+# Dispatch worker
+# =========================================================================
+
+@dataclass(frozen=True)
+class DeliveryTarget:
+    """Session-independent copy of a claimed delivery and its endpoint"""
+    delivery_id: str
+    webhook_id: str
+    url: Optional[str]          # None when the webhook was deleted or deactivated
+    secret: Optional[str]
+    timeout_seconds: int
+    body: str
+    attempt_count: int
+
+
+@dataclass
+class DeliveryAttempt:
+    delivery_id: str
+    webhook_id: str
+    success: bool
+    retryable: bool = False
+    response_status: Optional[int] = None
+    response_body: Optional[str] = None
+    error: Optional[str] = None
+    duration_ms: Optional[int] = None
+    deferred_until: Optional[datetime] = None   # Circuit open; not an attempt
+
+
+@dataclass
+class DispatchStats:
+    claimed: int = 0
+    delivered: int = 0
+    retrying: int = 0         # Failed attempts that will be retried
+    failed: int = 0           # Deliveries given up on
+    deferred: int = 0         # Held back by an open circuit
+    errors: List[str] = field(default_factory=list)
+
+
+async def send_delivery(client: httpx.AsyncClient, target: DeliveryTarget) -> DeliveryAttempt:
+    """Post one delivery and classify the outcome"""
+    headers = dict(REQUEST_HEADERS)
+    if target.secret:
+        headers["X-Webhook-Signature"] = sign_payload(target.body, target.secret)
+
+    started = time.perf_counter()
+    try:
+        response = await client.post(target.url, content=target.body, headers=headers,
+                                     timeout=target.timeout_seconds)
+    except Exception as e:
+        return DeliveryAttempt(
+            target.delivery_id, target.webhook_id, False, retryable=True,
+            error=(str(e) or type(e).__name__)[:MAX_ERROR_MESSAGE],
+            duration_ms=int((time.perf_counter() - started) * 1000)
+        )
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    text = response.text or ""
+    if response.is_success:
+        return DeliveryAttempt(target.delivery_id, target.webhook_id, True, response_status=response.status_code,
+                               response_body=text[:MAX_RESPONSE_BODY], duration_ms=duration_ms)
+    return DeliveryAttempt(
+        target.delivery_id, target.webhook_id, False,
+        retryable=response.status_code in RETRYABLE_STATUSES,
+        response_status=response.status_code, response_body=text[:MAX_RESPONSE_BODY],
+        error=f"HTTP {response.status_code}: {text[:MAX_ERROR_MESSAGE]}", duration_ms=duration_ms
+    )
+
+
+class WebhookDispatchWorker:
+    """Claims batches of due webhook deliveries, posts them and records the outcomes"""
+
+    def __init__(
+        self,
+        db: Session,
+        worker_id: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        batch_size: Optional[int] = None,
+        endpoint_concurrency: Optional[int] = None
+    ):
+        self.db = db
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.client = client
+        self.batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        self.endpoint_concurrency = endpoint_concurrency or settings.WEBHOOK_ENDPOINT_CONCURRENCY
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def claim_batch(self, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[DeliveryTarget]:
+        """Claim up to `limit` due deliveries for this worker and commit the claim"""
+        now = now or datetime.utcnow()
+        limit = limit or self.batch_size
+        lease_expired = now - timedelta(seconds=settings.WEBHOOK_CLAIM_TIMEOUT_SECONDS)
+        claimable = (
+            WebhookDelivery.status == WebhookDeliveryStatus.PENDING.value,
+            or_(WebhookDelivery.next_attempt_at.is_(None), WebhookDelivery.next_attempt_at <= now),
+            or_(WebhookDelivery.claimed_at.is_(None), WebhookDelivery.claimed_at < lease_expired)
+        )
+
+        candidate_ids = self.db.execute(
+            select(WebhookDelivery.id).where(*claimable)
+            .order_by(WebhookDelivery.next_attempt_at, WebhookDelivery.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not candidate_ids:
+            self.db.rollback()
+            return []
+
+        self.db.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(candidate_ids), *claimable)
+            .values(claimed_by=self.worker_id, claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        rows = self.db.execute(
+            select(
+                WebhookDelivery.id, WebhookDelivery.webhook_id, WebhookDelivery.body, WebhookDelivery.payload,
+                WebhookDelivery.attempt_count, Webhook.url, Webhook.secret, Webhook.timeout_seconds,
+                Webhook.is_active
+            ).outerjoin(Webhook, Webhook.id == WebhookDelivery.webhook_id).where(
+                WebhookDelivery.id.in_(candidate_ids),
+                WebhookDelivery.claimed_by == self.worker_id
+            )
+        ).all()
+        self.db.commit()
+
+        return [
+            DeliveryTarget(
+                delivery_id=row.id, webhook_id=row.webhook_id,
+                url=row.url if row.is_active else None, secret=row.secret,
+                timeout_seconds=row.timeout_seconds or 30,
+                body=row.body if row.body is not None else serialize_payload(row.payload),
+                attempt_count=row.attempt_count or 0
+            )
+            for row in rows
+        ]
+
+    async def deliver(self, targets: List[DeliveryTarget]) -> List[DeliveryAttempt]:
+        """Post a batch concurrently, at most endpoint_concurrency requests per webhook"""
+        client = self.client or get_http_client()
+        limits: Dict[str, asyncio.Semaphore] = {}
+
+        async def attempt(target: DeliveryTarget) -> DeliveryAttempt:
+            if target.url is None:
+                return DeliveryAttempt(target.delivery_id, target.webhook_id, False,
+                                       error="Webhook deleted or inactive")
+
+            circuit = get_circuit(target.webhook_id)
+            limit = limits.setdefault(target.webhook_id, asyncio.Semaphore(self.endpoint_concurrency))
+            async with limit:
+                if not circuit.allow():
+                    return DeliveryAttempt(target.delivery_id, target.webhook_id, False,
+                                           deferred_until=circuit.retry_at())
+                result = await send_delivery(client, target)
+
+            if result.success or not result.retryable:
+                # A definite answer means the endpoint is up, even if it rejected the payload
+                circuit.record_success()
+            else:
+                circuit.record_failure()
+            return result
+
+        return list(await asyncio.gather(*(attempt(t) for t in targets)))
+
+    def record_results(
+        self,
+        targets: List[DeliveryTarget],
+        results: List[DeliveryAttempt],
+        now: Optional[datetime] = None
+    ) -> DispatchStats:
+        """Write a batch's outcomes with one bulk delivery update and one counter update per webhook"""
+        now = now or datetime.utcnow()
+        stats = DispatchStats(claimed=len(targets))
+        by_id = {t.delivery_id: t for t in targets}
+
+        updates = []
+        counters: Dict[str, Tuple[int, int]] = {}
+        for result in results:
+            released = {"id": result.delivery_id, "claimed_by": None, "claimed_at": None}
+            if result.deferred_until is not None:
+                stats.deferred += 1
+                updates.append({**released, "next_attempt_at": result.deferred_until})
+                continue
+
+            attempt_count = by_id[result.delivery_id].attempt_count + 1
+            outcome = {
+                **released, "attempt_count": attempt_count,
+                "response_status": result.response_status, "response_body": result.response_body,
+                "error_message": result.error, "duration_ms": result.duration_ms
+            }
+            successes, failures = counters.get(result.webhook_id, (0, 0))
+            if result.success:
+                stats.delivered += 1
+                counters[result.webhook_id] = (successes + 1, failures)
+                updates.append({**outcome, "status": WebhookDeliveryStatus.DELIVERED.value,
+                                 "next_attempt_at": None, "delivered_at": now})
+                continue
+
+            counters[result.webhook_id] = (successes, failures + 1)
+            stats.errors.append(f"Delivery {result.delivery_id}: {result.error}")
+            if result.retryable and attempt_count < settings.WEBHOOK_MAX_ATTEMPTS:
+                stats.retrying += 1
+                updates.append({**outcome, "status": WebhookDeliveryStatus.PENDING.value,
+                                 "next_attempt_at": now + retry_delay(attempt_count)})
+            else:
+                stats.failed += 1
+                updates.append({**outcome, "status": WebhookDeliveryStatus.FAILED.value, "next_attempt_at": None})
+
+        if updates:
+            self.db.execute(update(WebhookDelivery), updates)
+        for webhook_id, (successes, failures) in counters.items():
+            self.db.execute(
+                update(Webhook).where(Webhook.id == webhook_id).values(
+                    success_count=Webhook.success_count + successes,
+                    failure_count=Webhook.failure_count + failures,
+                    last_triggered_at=now
+                ).execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+        return stats
+
+    async def run_once(self, limit: Optional[int] = None) -> DispatchStats:
+        """
+        Claim, post and record one batch.
+
+        Database work runs in a worker thread so that, inside the API process,
+        claims and lock waits do not block the event loop.
+        """
+        targets = await asyncio.to_thread(self.claim_batch, limit)
+        if not targets:
+            return DispatchStats()
+        results = await self.deliver(targets)
+        return await asyncio.to_thread(self.record_results, targets, results)
+
+    def process_pending(self, limit: Optional[int] = None) -> DispatchStats:
+        """Synchronous entry point for callers outside an event loop"""
+        async def run_batch() -> DispatchStats:
+            try:
+                return await self.run_once(limit)
+            finally:
+                if self.client is None:
+                    await close_http_client()
+
+        return asyncio.run(run_batch())
+
+    async def run(self, stop_event: asyncio.Event, poll_interval: float = 5.0) -> None:
+        """Dispatch batches until stop_event is set, idling while the outbox is empty"""
+        self.wakeup = asyncio.Event()
+        while not stop_event.is_set():
+            self.wakeup.clear()
+            try:
+                stats = await self.run_once()
+            except Exception as e:
+                await asyncio.to_thread(self.db.rollback)
+                logger.error(f"Webhook dispatch batch failed: {str(e)}")
+                stats = DispatchStats()
+            if stats.claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+# Background dispatcher inside the API process (WEBHOOK_WORKER_ENABLED)
+_background_stop: Optional[asyncio.Event] = None
+_background_task: Optional["asyncio.Task[None]"] = None
+_background_worker: Optional[WebhookDispatchWorker] = None
+
+
+def wake_dispatcher() -> None:
+    """Start the background dispatcher's next batch now instead of at its next poll"""
+    if _background_worker is not None and _background_worker.wakeup is not None:
+        _background_worker.wakeup.set()
+
+
+async def _run_background_dispatcher(stop_event: asyncio.Event) -> None:
+    global _background_worker
+    from app.core import database
+    if database.SessionLocal is None:
+        database.init_db()
+    db = database.SessionLocal()
+    try:
+        _background_worker = WebhookDispatchWorker(db)
+        await _background_worker.run(stop_event)
+    finally:
+        _background_worker = None
+        await asyncio.to_thread(db.close)
+
+
+def start_background_dispatch() -> None:
+    global _background_stop, _background_task
+    if _background_task is None:
+        _background_stop = asyncio.Event()
+        _background_task = asyncio.create_task(_run_background_dispatcher(_background_stop))
+
+
+async def stop_background_dispatch() -> None:
+    global _background_stop, _background_task
+    if _background_task is not None:
+        _background_stop.set()
+        wake_dispatcher()
+        await _background_task
+        _background_stop, _background_task = None, None
+    await close_http_client()
@@ -1,18 +1,19 @@
 """
 Webhook service for triggering external integrations
 """
-import asyncio
 import json
-import hmac
-import hashlib
-import time
+import uuid
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-import httpx
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
-from app.models.external_integration import Webhook, WebhookDelivery
+from app.models.external_integration import Webhook, WebhookDelivery, WebhookDeliveryStatus
 from app.schemas.external_integration import WebhookEventPayload
+from app.services.webhook_delivery import (
+    DeliveryTarget, WebhookDispatchWorker, get_http_client, serialize_payload, sign_payload, wake_dispatcher
+)
+from app.services.webhook_subscriptions import get_subscription_index
 
 
 class WebhookService:
@@ -28,7 +29,10 @@ class WebhookService:
         metadata: Optional[Dict[str, Any]] = None
     ) -> List[str]:
         """
-        Trigger all active webhooks for a specific event type
+        Queue deliveries of an event to all active webhooks listening for it
+
+        Deliveries are written to the outbox and posted by the webhook
+        dispatch worker, so slow subscribers do not delay the caller.
 
         Args:
             event_type: The type of event (e.g., "document.created")
@@ -38,40 +42,52 @@ class WebhookService:
         Returns:
             List of webhook delivery IDs
         """
-        # Get all active webhooks that listen for this event
-        webhooks = self.db.query(Webhook).filter(
-            Webhook.is_active == True,
-            Webhook.events.contains([event_type])
-        ).all()
-
-        if not webhooks:
+        subscriptions = get_subscription_index(self.db).subscribers(event_type)
+        if not subscriptions:
             return []
 
-        # Create event payload
-        payload = WebhookEventPayload(
+        return self._enqueue(
+            [subscription.webhook_id for subscription in subscriptions],
+            self._event_payload(event_type, data, metadata)
+        )
+
+    @staticmethod
+    def _event_payload(
+        event_type: str,
+        data: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> WebhookEventPayload:
+        return WebhookEventPayload(
             event_type=event_type,
             timestamp=datetime.utcnow(),
             data=data,
             metadata=metadata or {}
         )
 
-        # Trigger webhooks asynchronously
-        delivery_ids = []
-        tasks = []
-
-        for webhook in webhooks:
-            task = self._deliver_webhook(webhook, payload)
-            tasks.append(task)
-
-        # Execute all webhook deliveries concurrently
-        if tasks:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            delivery_ids = [
-                result for result in results
-                if isinstance(result, str) and not isinstance(result, Exception)
-            ]
-
-        return delivery_ids
+    def _enqueue(
+        self,
+        webhook_ids: List[str],
+        payload: WebhookEventPayload,
+        claimed_by: Optional[str] = None
+    ) -> List[str]:
+        """Write one pending delivery per webhook, sharing a single serialized body"""
+        body = serialize_payload(payload.dict())
+        stored_payload = json.loads(body)
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()), "webhook_id": webhook_id, "event_type": payload.event_type,
+                "payload": stored_payload, "body": body, "status": WebhookDeliveryStatus.PENDING.value,
+                "attempt_count": 0, "next_attempt_at": now, "created_at": now,
+                "claimed_by": claimed_by, "claimed_at": now if claimed_by else None
+            }
+            for webhook_id in webhook_ids
+        ]
+        self.db.execute(insert(WebhookDelivery), rows)
+        self.db.commit()
+        if not claimed_by:
+            wake_dispatcher()
+        return [row["id"] for row in rows]
 
     async def _deliver_webhook(
         self,
@@ -79,7 +95,7 @@ class WebhookService:
         payload: WebhookEventPayload
     ) -> str:
         """
-        Deliver a single webhook
+        Deliver a single webhook immediately, bypassing the outbox queue
 
         Args:
             webhook: Webhook configuration
@@ -88,62 +104,16 @@ class WebhookService:
         Returns:
             Delivery ID
         """
-        start_time = time.time()
-        delivery = WebhookDelivery(
-            webhook_id=webhook.id,
-            event_type=payload.event_type,
-            payload=payload.dict(),
-            delivered_at=datetime.utcnow()
+        worker = WebhookDispatchWorker(self.db, client=get_http_client())
+        delivery_id, = self._enqueue([webhook.id], payload, claimed_by=worker.worker_id)
+        delivery = self.db.query(WebhookDelivery).filter(WebhookDelivery.id == delivery_id).first()
+        target = DeliveryTarget(
+            delivery_id=delivery_id, webhook_id=webhook.id, url=str(webhook.url), secret=webhook.secret,
+            timeout_seconds=webhook.timeout_seconds or 30, body=delivery.body, attempt_count=0
         )
-
-        try:
-            # Prepare request data
-            headers = {
-                "Content-Type": "application/json",
-                "User-Agent": "CA-DMS-Webhook/1.0"
-            }
-
-            # Add signature if secret is configured
-            payload_json = json.dumps(payload.dict(), default=str)
-            if webhook.secret:
-                signature = self._generate_signature(payload_json, webhook.secret)
-                headers["X-Webhook-Signature"] = signature
-
-            # Make HTTP request
-            async with httpx.AsyncClient(timeout=webhook.timeout_seconds) as client:
-                response = await client.post(
-                    str(webhook.url),
-                    content=payload_json,
-                    headers=headers
-                )
-
-                # Record response
-                delivery.response_status = response.status_code
-                delivery.response_body = response.text[:10000]  # Limit response body size
-                delivery.duration_ms = int((time.time() - start_time) * 1000)
-
-                # Update webhook statistics
-                if response.is_success:
-                    webhook.success_count += 1
-                else:
-                    webhook.failure_count += 1
-                    delivery.error_message = f"HTTP {response.status_code}: {response.text[:1000]}"
-
-        except Exception as e:
-            # Record error
-            delivery.error_message = str(e)[:1000]
-            delivery.duration_ms = int((time.time() - start_time) * 1000)
-            webhook.failure_count += 1
-
-        # Update webhook last triggered time
-        webhook.last_triggered_at = datetime.utcnow()
-
-        # Save delivery log
-        self.db.add(delivery)
-        self.db.commit()
-        self.db.refresh(delivery)
-
-        return str(delivery.id)
+        worker.record_results([target], await worker.deliver([target]))
+        self.db.refresh(webhook)
+        return delivery_id
 
     def _generate_signature(self, payload: str, secret: str) -> str:
         """
@@ -156,12 +126,7 @@ class WebhookService:
         Returns:
             HMAC signature
         """
-        signature = hmac.new(
-            secret.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return f"sha256={signature}"
+        return sign_payload(payload, secret)
 
     def get_webhook_deliveries(
         self,
@@ -183,7 +148,7 @@ class WebhookService:
         return self.db.query(WebhookDelivery).filter(
             WebhookDelivery.webhook_id == webhook_id
         ).order_by(
-            WebhookDelivery.delivered_at.desc()
+            WebhookDelivery.created_at.desc()
         ).offset(offset).limit(limit).all()
 
     def get_webhook_stats(self, webhook_id: str) -> Dict[str, Any]:
@@ -206,7 +171,7 @@ class WebhookService:
 
         recent_deliveries = self.db.query(WebhookDelivery).filter(
             WebhookDelivery.webhook_id == webhook_id,
-            WebhookDelivery.delivered_at >= seven_days_ago
+            WebhookDelivery.created_at >= seven_days_ago
         ).all()
 
         recent_success = len([d for d in recent_deliveries if d.response_status and 200 <= d.response_status < 300])
@@ -0,0 +1,152 @@
+"""
+Webhook subscription index
+
+Maps each event type to the active webhooks subscribed to it, so triggering
+an event needs no database query. Endpoint settings (url, secret, timeout) are
+not cached: the dispatch worker reads them with each claimed batch, so a
+secret rotated or webhook disabled in another process applies to the next
+attempt rather than after the index is reloaded. The index
+is loaded once per database engine (at startup or on first use) and kept
+current from the webhook changes committed through this process's sessions;
+it is reloaded after WEBHOOK_INDEX_MAX_AGE_SECONDS to pick up changes made by
+other processes.
+"""
+import threading
+import time
+import weakref
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models.external_integration import Webhook
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """Active webhook and the events it receives"""
+    webhook_id: str
+    events: Tuple[str, ...]
+
+    @classmethod
+    def from_values(cls, webhook_id: str, events: Iterable[str]) -> "Subscription":
+        return cls(webhook_id=webhook_id, events=tuple(dict.fromkeys(events or ())))
+
+    @classmethod
+    def from_model(cls, webhook: Webhook) -> "Subscription":
+        return cls.from_values(webhook.id, webhook.events)
+
+
+class WebhookSubscriptionIndex:
+    """Event type -> subscriptions; readers never lock, writers swap in a rebuilt map"""
+
+    def __init__(self):
+        self._webhooks: Dict[str, Subscription] = {}
+        self._by_event: Dict[str, Tuple[Subscription, ...]] = {}
+        self._lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._webhooks)
+
+    def subscribers(self, event_type: str) -> Tuple[Subscription, ...]:
+        return self._by_event.get(event_type, ())
+
+    def get(self, webhook_id: str) -> Optional[Subscription]:
+        return self._webhooks.get(webhook_id)
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > settings.WEBHOOK_INDEX_MAX_AGE_SECONDS
+
+    def load(self, db: Session) -> "WebhookSubscriptionIndex":
+        """Rebuild from the active webhooks in the database"""
+        rows = db.query(Webhook.id, Webhook.events).filter(Webhook.is_active == True).all()
+        with self._lock:
+            self._webhooks = {row.id: Subscription.from_values(*row) for row in rows}
+            self._reindex()
+            self.loaded_at = time.monotonic()
+        return self
+
+    def apply(self, changes: Dict[str, Optional[Subscription]]) -> None:
+        """Apply committed changes; None removes a webhook (deleted or deactivated)"""
+        with self._lock:
+            webhooks = dict(self._webhooks)
+            for webhook_id, subscription in changes.items():
+                if subscription is None:
+                    webhooks.pop(webhook_id, None)
+                else:
+                    webhooks[webhook_id] = subscription
+            self._webhooks = webhooks
+            self._reindex()
+
+    def _reindex(self) -> None:
+        by_event: Dict[str, List[Subscription]] = {}
+        for subscription in self._webhooks.values():
+            for event_type in subscription.events:
+                by_event.setdefault(event_type, []).append(subscription)
+        self._by_event = {event_type: tuple(subs) for event_type, subs in by_event.items()}
+
+
+# One index per database engine
+_indexes: "weakref.WeakKeyDictionary[Any, WebhookSubscriptionIndex]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_subscription_index(db: Session) -> WebhookSubscriptionIndex:
+    """Index for the session's database, loading it on first use or when stale"""
+    bind = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(bind)
+        if index is None:
+            index = _indexes[bind] = WebhookSubscriptionIndex()
+    if index.is_stale():
+        index.load(db)
+    return index
+
+
+def load_webhook_subscriptions(db: Session) -> int:
+    """Build the index ahead of the first event (application startup)"""
+    index = get_subscription_index(db)
+    logger.info(f"Loaded {len(index)} active webhook subscriptions")
+    return len(index)
+
+
+# Change notifications: stage webhook changes at flush, apply them when the transaction commits
+_PENDING_KEY = "webhook_subscription_changes"
+
+
+def _stage(connection, target: Webhook, deleted: bool) -> None:
+    session = object_session(target)
+    if session is None:
+        return
+    changes = session.info.setdefault(_PENDING_KEY, {}).setdefault(connection.engine, {})
+    changes[target.id] = None if deleted or not target.is_active else Subscription.from_model(target)
+
+
+@event.listens_for(Webhook, "after_insert")
+@event.listens_for(Webhook, "after_update")
+def _webhook_saved(mapper, connection, target) -> None:
+    _stage(connection, target, deleted=False)
+
+
+@event.listens_for(Webhook, "after_delete")
+def _webhook_deleted(mapper, connection, target) -> None:
+    _stage(connection, target, deleted=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session) -> None:
+    for engine, changes in session.info.pop(_PENDING_KEY, {}).items():
+        index = _indexes.get(engine)
+        if index is not None and index.loaded_at is not None:
+            index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
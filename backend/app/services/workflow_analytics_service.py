@@ -0,0 +1,160 @@
+"""
+Workflow analytics engine
+
+Computes per-workflow completion and step metrics from narrow projected
+queries instead of loading ORM instances and walking their relationships.
+Cross-workflow approval, bottleneck and user metrics are read from the daily
+rollups in workflow_metrics_service, so dashboards and reports agree.
+"""
+import time
+import weakref
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.workflow import (
+    WorkflowStep,
+    WorkflowInstance,
+    WorkflowStepInstance,
+    WorkflowInstanceStatus,
+    StepInstanceStatus
+)
+
+
+# Analytics results per database engine: {engine: {(metric, workflow_id, window_days): (expires_at, result)}}
+_analytics_cache: "weakref.WeakKeyDictionary[Any, Dict[Tuple, Tuple[float, Any]]]" = weakref.WeakKeyDictionary()
+
+ANALYTICS_CACHE_TTL_SECONDS = 300
+SLOW_STEP_THRESHOLD_HOURS = 24
+
+
+def invalidate_analytics_cache(db: Session, workflow_id: Optional[str] = None) -> None:
+    """Drop cached analytics for a workflow plus the cross-workflow aggregates"""
+    entries = _analytics_cache.get(db.get_bind())
+    if not entries:
+        return
+
+    if workflow_id is None:
+        entries.clear()
+        return
+
+    for key in [k for k in entries if k[1] in (workflow_id, None)]:
+        del entries[key]
+
+
+def _hours(started_at: Optional[datetime], completed_at: Optional[datetime]) -> Optional[float]:
+    """Duration between two timestamps in hours"""
+    if not started_at or not completed_at:
+        return None
+    return (completed_at - started_at).total_seconds() / 3600
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile over pre-sorted values"""
+    if not sorted_values:
+        return 0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _average(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0
+
+
+class WorkflowAnalyticsService:
+    """Set-based workflow analytics with per-workflow, per-window caching"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _cached(self, metric: str, workflow_id: Optional[str], window_days: Optional[int],
+                compute: Callable[[], Any]) -> Any:
+        """Return a cached analytics result or compute and store it"""
+        entries = _analytics_cache.setdefault(self.db.get_bind(), {})
+        key = (metric, workflow_id, window_days)
+        now = time.monotonic()
+
+        cached = entries.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        result = compute()
+        entries[key] = (now + ANALYTICS_CACHE_TTL_SECONDS, result)
+        return result
+
+    def _step_rows(self, *conditions) -> List[Any]:
+        """Project the step-instance columns analytics need, joined to the step name"""
+        return self.db.query(
+            WorkflowStepInstance.assigned_to,
+            WorkflowStepInstance.status,
+            WorkflowStepInstance.started_at,
+            WorkflowStepInstance.completed_at,
+            WorkflowStepInstance.escalated,
+            WorkflowStep.name.label("step_name")
+        ).filter(WorkflowStep.id == WorkflowStepInstance.step_id, *conditions).all()
+
+    # Per-workflow metrics
+    def workflow_performance(self, workflow_id: str) -> Dict[str, Any]:
+        """Completion rate, timings and step performance for one workflow"""
+        return self._cached("performance", workflow_id, None, lambda: self._workflow_performance(workflow_id))
+
+    def _workflow_performance(self, workflow_id: str) -> Dict[str, Any]:
+        instances = self.db.query(
+            WorkflowInstance.status,
+            WorkflowInstance.initiated_at,
+            WorkflowInstance.completed_at
+        ).filter(WorkflowInstance.workflow_id == workflow_id).all()
+
+        if not instances:
+            return {
+                "completion_rate": 0,
+                "average_completion_time": 0,
+                "bottleneck_steps": [],
+                "step_performance": {}
+            }
+
+        completed = [i for i in instances if i.status == WorkflowInstanceStatus.COMPLETED]
+        completion_times = sorted(
+            h for h in (_hours(i.initiated_at, i.completed_at) for i in completed) if h is not None
+        )
+
+        rows = self._step_rows(
+            WorkflowStepInstance.workflow_instance_id == WorkflowInstance.id,
+            WorkflowInstance.workflow_id == workflow_id
+        )
+
+        steps: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            step = steps.setdefault(row.step_name, {"total": 0, "approved": 0, "approved_times": [], "all_times": []})
+            step["total"] += 1
+            duration = _hours(row.started_at, row.completed_at)
+            if duration is not None:
+                step["all_times"].append(duration)
+            if row.status == StepInstanceStatus.APPROVED:
+                step["approved"] += 1
+                if duration is not None:
+                    step["approved_times"].append(duration)
+
+        step_performance = {}
+        for step_name, step in steps.items():
+            approved_times = sorted(step["approved_times"])
+            step_performance[step_name] = {
+                "completion_rate": step["approved"] / step["total"] * 100,
+                "average_time": _average(approved_times),
+                "p50_time": _percentile(approved_times, 0.50),
+                "p95_time": _percentile(approved_times, 0.95),
+                "total_instances": step["total"]
+            }
+
+        bottleneck_steps = [
+            step_name for step_name, step in steps.items()
+            if step["all_times"] and _average(step["all_times"]) > SLOW_STEP_THRESHOLD_HOURS
+        ]
+
+        return {
+            "completion_rate": len(completed) / len(instances) * 100,
+            "average_completion_time": _average(completion_times),
+            "p50_completion_time": _percentile(completion_times, 0.50),
+            "p95_completion_time": _percentile(completion_times, 0.95),
+            "bottleneck_steps": bottleneck_steps,
+            "step_performance": step_performance
+        }
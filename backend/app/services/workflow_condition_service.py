@@ -9,11 +9,13 @@ Handles evaluation and execution of conditional workflow logic including:
 """
 
 import re
-import json
-from typing import List, Dict, Any, Optional, Tuple, Union
+import random
+import time
+import weakref
+from typing import Callable, List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, not_
+from sqlalchemy import and_, or_, not_, event, insert
 
 from app.models.workflow_conditions import (
     WorkflowConditionGroup, WorkflowCondition, WorkflowConditionalAction,
@@ -24,6 +26,9 @@ from app.models.workflow import WorkflowInstance, WorkflowStepInstance
 from app.models.document import Document
 from app.models.user import User
 from app.services.notification_service import NotificationService
+from app.services.document_metrics_service import get_document_metrics
+from app.services.business_calendar_service import BusinessCalendarService
+from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,6 +44,242 @@ class ActionExecutionError(Exception):
     pass
 
 
+# Compiled condition groups per database engine:
+# {engine: {(workflow_id, version, step_id): (expires_at, [ConditionGroupPlan])}}
+# Mapper events only see writes made by this process, so entries also expire
+# after WORKFLOW_CONDITION_PLAN_TTL_SECONDS to pick up edits from other workers.
+_plan_cache: "weakref.WeakKeyDictionary[Any, Dict[Tuple, Tuple[float, List[ConditionGroupPlan]]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def invalidate_condition_plans(db: Session) -> None:
+    """Drop compiled condition plans so the next evaluation recompiles them"""
+    _plan_cache.pop(db.get_bind(), None)
+
+
+def _invalidate_on_change(mapper, connection, target) -> None:
+    _plan_cache.pop(connection.engine, None)
+
+
+for _model in (WorkflowConditionGroup, WorkflowCondition, WorkflowConditionalAction):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_on_change)
+
+
+def _parse_expected_date(expected: Any) -> Optional[datetime]:
+    if not isinstance(expected, str):
+        return None
+    return datetime.fromisoformat(expected.replace("Z", "+00:00"))
+
+
+def compile_comparator(operator: OperatorType, expected: Any) -> Callable[[Any], bool]:
+    """Build a comparison closure with the expected value (and any regex or date) prepared once"""
+    
+    if operator == OperatorType.EQUALS:
+        return lambda actual: actual == expected
+    elif operator == OperatorType.NOT_EQUALS:
+        return lambda actual: actual != expected
+    elif operator == OperatorType.GREATER_THAN:
+        return lambda actual: actual > expected if actual is not None else False
+    elif operator == OperatorType.LESS_THAN:
+        return lambda actual: actual < expected if actual is not None else False
+    elif operator == OperatorType.GREATER_EQUAL:
+        return lambda actual: actual >= expected if actual is not None else False
+    elif operator == OperatorType.LESS_EQUAL:
+        return lambda actual: actual <= expected if actual is not None else False
+    elif operator == OperatorType.CONTAINS:
+        return lambda actual: expected in str(actual) if actual is not None else False
+    elif operator == OperatorType.NOT_CONTAINS:
+        return lambda actual: expected not in str(actual) if actual is not None else True
+    elif operator == OperatorType.STARTS_WITH:
+        prefix = str(expected)
+        return lambda actual: str(actual).startswith(prefix) if actual is not None else False
+    elif operator == OperatorType.ENDS_WITH:
+        suffix = str(expected)
+        return lambda actual: str(actual).endswith(suffix) if actual is not None else False
+    elif operator == OperatorType.IN_LIST:
+        if not isinstance(expected, list):
+            return lambda actual: False
+        return lambda actual: actual in expected
+    elif operator == OperatorType.NOT_IN_LIST:
+        if not isinstance(expected, list):
+            return lambda actual: True
+        return lambda actual: actual not in expected
+    elif operator == OperatorType.IS_EMPTY:
+        return lambda actual: actual is None or actual == "" or (isinstance(actual, (list, dict)) and len(actual) == 0)
+    elif operator == OperatorType.IS_NOT_EMPTY:
+        return lambda actual: actual is not None and actual != "" and (not isinstance(actual, (list, dict)) or len(actual) > 0)
+    elif operator == OperatorType.REGEX_MATCH:
+        pattern = re.compile(str(expected))
+        return lambda actual: bool(pattern.match(str(actual))) if actual is not None else False
+    elif operator == OperatorType.DATE_BEFORE:
+        expected_date = _parse_expected_date(expected)
+        return lambda actual: isinstance(actual, datetime) and expected_date is not None and actual < expected_date
+    elif operator == OperatorType.DATE_AFTER:
+        expected_date = _parse_expected_date(expected)
+        return lambda actual: isinstance(actual, datetime) and expected_date is not None and actual > expected_date
+    else:
+        raise ConditionEvaluationError(f"Unsupported operator: {operator}")
+
+
+class ConditionPlan:
+    """
+    Compiled snapshot of a WorkflowCondition.
+    
+    Holds plain values only, so plans can be shared across sessions. ``read`` and
+    ``test`` are closures prepared once from the condition's type, field path,
+    operator and expected value.
+    """
+
+    def __init__(self, condition: WorkflowCondition):
+        self.id = condition.id
+        self.name = condition.name
+        self.condition_group_id = condition.condition_group_id
+        self.condition_type = condition.condition_type
+        self.field_path = condition.field_path
+        self.custom_function = condition.custom_function
+        self.function_parameters = condition.function_parameters
+        self.expected_value = condition.expected_value
+        self.operator = condition.operator
+        self.negate_result = condition.negate_result
+        self.weight = condition.weight
+        self.read = self._compile_accessor()
+        self.test = self._compile_test()
+
+    def _compile_test(self) -> Callable[[Any], bool]:
+        try:
+            compare = compile_comparator(self.operator, self.expected_value)
+        except Exception as e:
+            error = e
+
+            def compare(actual):
+                raise error
+
+        if self.negate_result:
+            return lambda actual: not compare(actual)
+        return compare
+
+    def _compile_accessor(self) -> Callable[..., Any]:
+        """Build a closure reading the condition's actual value"""
+        condition_type = self.condition_type
+        field_path = self.field_path or ""
+
+        if condition_type == ConditionType.DOCUMENT_FIELD:
+            if not self.field_path:
+                return self._failing_accessor("Field path is required for document field conditions")
+            if field_path.startswith("metadata."):
+                attribute = field_path.split(".", 1)[1]
+                return lambda service, instance, step, context: getattr(instance.document, attribute, None)
+            if field_path.startswith("content."):
+                path_parts = tuple(field_path.split(".")[1:])
+
+                def read_content(service, instance, step, context):
+                    current = instance.document.content or {}
+                    for part in path_parts:
+                        if not isinstance(current, dict):
+                            return None
+                        current = current.get(part)
+                    return current
+                return read_content
+            return lambda service, instance, step, context: getattr(instance.document, field_path, None)
+
+        if condition_type == ConditionType.PLACEHOLDER_VALUE:
+            return lambda service, instance, step, context: service._get_placeholder_value(self, instance)
+
+        if condition_type == ConditionType.WORKFLOW_DATA:
+            if field_path.startswith("context."):
+                key = field_path.split(".", 1)[1]
+                return lambda service, instance, step, context: context.get(key)
+            if field_path.startswith("instance."):
+                attribute = field_path.split(".", 1)[1]
+                return lambda service, instance, step, context: getattr(instance, attribute, None)
+            return lambda service, instance, step, context: (
+                instance.context_data.get(field_path) if instance.context_data else None
+            )
+
+        if condition_type == ConditionType.USER_ROLE:
+            return lambda service, instance, step, context: service._get_user_role_value(self, instance)
+
+        if condition_type == ConditionType.DATE_TIME:
+            return lambda service, instance, step, context: datetime.utcnow()
+
+        if condition_type == ConditionType.APPROVAL_COUNT:
+            return lambda service, instance, step, context: service._get_approval_count_value(self, instance)
+
+        if condition_type == ConditionType.DOCUMENT_SIZE:
+            return lambda service, instance, step, context: service._get_document_size_value(self, instance)
+
+        if condition_type == ConditionType.CUSTOM_FUNCTION:
+            return lambda service, instance, step, context: service._evaluate_custom_function(
+                self, instance, step, context
+            )
+
+        return self._failing_accessor(f"Unsupported condition type: {condition_type}")
+
+    @staticmethod
+    def _failing_accessor(message: str) -> Callable[..., Any]:
+        def read(service, instance, step, context):
+            raise ConditionEvaluationError(message)
+        return read
+
+
+class ConditionGroupPlan:
+    """Compiled WorkflowConditionGroup: active conditions in order plus on-match action ids"""
+
+    def __init__(self, group: WorkflowConditionGroup):
+        self.id = group.id
+        self.name = group.name
+        self.logical_operator = group.logical_operator or LogicalOperator.AND
+        self.stop_on_first_match = bool(group.stop_on_first_match)
+        self.conditions = tuple(
+            ConditionPlan(condition)
+            for condition in sorted(group.conditions, key=lambda c: c.evaluation_order or 0)
+            if condition.is_active
+        )
+        self.action_ids = tuple(
+            action.id
+            for action in sorted(group.actions, key=lambda a: a.execution_order or 0)
+            if action.execute_on_match
+        )
+
+    def evaluate(
+        self,
+        service: "WorkflowConditionService",
+        workflow_instance: WorkflowInstance,
+        step_instance: Optional[WorkflowStepInstance],
+        context: Dict[str, Any]
+    ) -> Tuple[bool, List[Dict[str, Any]]]:
+        """
+        Evaluate conditions until the group's outcome is decided.
+        
+        Returns:
+            The group result and the results of the conditions that were evaluated
+        """
+        results = []
+        if not self.conditions:
+            return True, results
+
+        if self.logical_operator == LogicalOperator.NOT:
+            # NOT operates on the first condition only
+            first = service._evaluate_single_condition(self.conditions[0], workflow_instance, step_instance, context)
+            return not first["result"], [first]
+
+        if self.logical_operator == LogicalOperator.AND:
+            decisive = False
+        elif self.logical_operator == LogicalOperator.OR:
+            decisive = True
+        else:
+            raise ConditionEvaluationError(f"Unsupported logical operator: {self.logical_operator}")
+
+        for condition in self.conditions:
+            result = service._evaluate_single_condition(condition, workflow_instance, step_instance, context)
+            results.append(result)
+            if bool(result["result"]) == decisive:
+                return decisive, results
+        return not decisive, results
+
+
 class WorkflowConditionService:
     """Service for managing conditional workflow logic"""
 
@@ -67,30 +308,34 @@ class WorkflowConditionService:
             "executed_actions": [],
             "errors": []
         }
+        audit_records = []
 
         try:
-            # Get condition groups for this workflow/step
-            condition_groups = self._get_condition_groups(workflow_instance, step_instance)
+            # Get compiled condition groups for this workflow/step
+            group_plans = self._get_group_plans(workflow_instance, step_instance)
             
             # Merge context data
             full_context = self._build_evaluation_context(workflow_instance, step_instance, context_data)
             
-            for group in condition_groups:
+            for plan in group_plans:
                 try:
                     group_result = self._evaluate_condition_group(
-                        group, workflow_instance, step_instance, full_context
+                        plan, workflow_instance, step_instance, full_context, audit_records
                     )
                     results["evaluated_groups"].append(group_result)
                     
                     # Execute actions if conditions are met
                     if group_result["result"]:
                         action_results = self._execute_group_actions(
-                            group, workflow_instance, step_instance, full_context
+                            plan, workflow_instance, step_instance, full_context
                         )
                         results["executed_actions"].extend(action_results)
                         
+                        if plan.stop_on_first_match:
+                            break
+                        
                 except Exception as e:
-                    error_msg = f"Error evaluating condition group {group.id}: {str(e)}"
+                    error_msg = f"Error evaluating condition group {plan.id}: {str(e)}"
                     logger.error(error_msg)
                     results["errors"].append(error_msg)
 
@@ -99,178 +344,107 @@ class WorkflowConditionService:
             logger.error(error_msg)
             results["errors"].append(error_msg)
 
+        self._write_audit_records(audit_records, has_errors=bool(results["errors"]))
+
         return results
 
     def _evaluate_condition_group(
         self,
-        group: WorkflowConditionGroup,
+        plan: "ConditionGroupPlan",
         workflow_instance: WorkflowInstance,
         step_instance: Optional[WorkflowStepInstance],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        audit_records: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
-        """Evaluate a single condition group"""
+        """Evaluate a compiled condition group, short-circuiting on the logical operator"""
         
         start_time = datetime.utcnow()
-        condition_results = []
-        
-        # Evaluate individual conditions
-        for condition in sorted(group.conditions, key=lambda c: c.evaluation_order):
-            if not condition.is_active:
-                continue
-                
-            condition_result = self._evaluate_single_condition(
-                condition, workflow_instance, step_instance, context
-            )
-            condition_results.append(condition_result)
-            
-            # Record individual condition evaluation
-            self._record_condition_evaluation(
-                condition, workflow_instance, step_instance, condition_result
-            )
-
-        # Combine results using logical operator
-        final_result = self._combine_condition_results(condition_results, group.logical_operator)
+        final_result, condition_results = plan.evaluate(self, workflow_instance, step_instance, context)
+        execution_time_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
         
-        # Record group evaluation
-        group_evaluation = ConditionEvaluation(
-            workflow_instance_id=workflow_instance.id,
-            step_instance_id=step_instance.id if step_instance else None,
-            condition_group_id=group.id,
-            result=final_result,
-            evaluation_details={
+        step_instance_id = step_instance.id if step_instance else None
+        audit_records.append({
+            "workflow_instance_id": workflow_instance.id,
+            "step_instance_id": step_instance_id,
+            "condition_group_id": plan.id,
+            "result": final_result,
+            "evaluation_details": {
                 "condition_count": len(condition_results),
+                "skipped_conditions": len(plan.conditions) - len(condition_results),
                 "individual_results": condition_results,
-                "logical_operator": group.logical_operator.value,
-                "stop_on_first_match": group.stop_on_first_match
+                "logical_operator": plan.logical_operator.value,
+                "stop_on_first_match": plan.stop_on_first_match
             },
-            execution_time_ms=int((datetime.utcnow() - start_time).total_seconds() * 1000),
-            context_snapshot=context
-        )
-        
-        self.db.add(group_evaluation)
-        self.db.commit()
+            "condition_id": None,
+            "actual_value": None,
+            "error_message": None,
+            "execution_time_ms": execution_time_ms,
+            "context_snapshot": context
+        })
+        for condition_result in condition_results:
+            audit_records.append({
+                "workflow_instance_id": workflow_instance.id,
+                "step_instance_id": step_instance_id,
+                "condition_id": condition_result["condition_id"],
+                "condition_group_id": plan.id,
+                "result": condition_result["result"],
+                "actual_value": condition_result.get("actual_value"),
+                "evaluation_details": condition_result,
+                "execution_time_ms": condition_result.get("execution_time_ms", 0),
+                "error_message": condition_result.get("error"),
+                "context_snapshot": None
+            })
 
         return {
-            "group_id": group.id,
-            "group_name": group.name,
+            "group_id": plan.id,
+            "group_name": plan.name,
             "result": final_result,
             "condition_results": condition_results,
-            "execution_time_ms": group_evaluation.execution_time_ms
+            "execution_time_ms": execution_time_ms
         }
 
     def _evaluate_single_condition(
         self,
-        condition: WorkflowCondition,
+        plan: "ConditionPlan",
         workflow_instance: WorkflowInstance,
         step_instance: Optional[WorkflowStepInstance],
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Evaluate a single condition"""
+        """Evaluate a single compiled condition"""
         
         start_time = datetime.utcnow()
         
         try:
-            # Get actual value based on condition type
-            actual_value = self._get_condition_value(condition, workflow_instance, step_instance, context)
-            
-            # Perform comparison
-            result = self._compare_values(actual_value, condition.expected_value, condition.operator)
+            # Get actual value and compare using the precomputed accessor and comparator
+            actual_value = plan.read(self, workflow_instance, step_instance, context)
+            result = plan.test(actual_value)
             
-            # Apply negation if specified
-            if condition.negate_result:
-                result = not result
-                
             execution_time = int((datetime.utcnow() - start_time).total_seconds() * 1000)
             
             return {
-                "condition_id": condition.id,
-                "condition_name": condition.name,
+                "condition_id": plan.id,
+                "condition_name": plan.name,
                 "result": result,
                 "actual_value": actual_value,
-                "expected_value": condition.expected_value,
-                "operator": condition.operator.value,
-                "negated": condition.negate_result,
+                "expected_value": plan.expected_value,
+                "operator": plan.operator.value,
+                "negated": plan.negate_result,
                 "execution_time_ms": execution_time,
-                "weight": condition.weight
+                "weight": plan.weight
             }
             
         except Exception as e:
-            error_msg = f"Error evaluating condition {condition.name}: {str(e)}"
+            error_msg = f"Error evaluating condition {plan.name}: {str(e)}"
             logger.error(error_msg)
             
             return {
-                "condition_id": condition.id,
-                "condition_name": condition.name,
+                "condition_id": plan.id,
+                "condition_name": plan.name,
                 "result": False,
                 "error": error_msg,
                 "execution_time_ms": int((datetime.utcnow() - start_time).total_seconds() * 1000)
             }
 
-    def _get_condition_value(
-        self,
-        condition: WorkflowCondition,
-        workflow_instance: WorkflowInstance,
-        step_instance: Optional[WorkflowStepInstance],
-        context: Dict[str, Any]
-    ) -> Any:
-        """Extract the actual value for condition evaluation"""
-        
-        if condition.condition_type == ConditionType.DOCUMENT_FIELD:
-            return self._get_document_field_value(condition, workflow_instance)
-            
-        elif condition.condition_type == ConditionType.PLACEHOLDER_VALUE:
-            return self._get_placeholder_value(condition, workflow_instance)
-            
-        elif condition.condition_type == ConditionType.WORKFLOW_DATA:
-            return self._get_workflow_data_value(condition, workflow_instance, context)
-            
-        elif condition.condition_type == ConditionType.USER_ROLE:
-            return self._get_user_role_value(condition, workflow_instance)
-            
-        elif condition.condition_type == ConditionType.DATE_TIME:
-            return self._get_datetime_value(condition)
-            
-        elif condition.condition_type == ConditionType.APPROVAL_COUNT:
-            return self._get_approval_count_value(condition, workflow_instance)
-            
-        elif condition.condition_type == ConditionType.DOCUMENT_SIZE:
-            return self._get_document_size_value(condition, workflow_instance)
-            
-        elif condition.condition_type == ConditionType.CUSTOM_FUNCTION:
-            return self._evaluate_custom_function(condition, workflow_instance, step_instance, context)
-            
-        else:
-            raise ConditionEvaluationError(f"Unsupported condition type: {condition.condition_type}")
-
-    def _get_document_field_value(self, condition: WorkflowCondition, workflow_instance: WorkflowInstance) -> Any:
-        """Get value from document field using JSON path"""
-        document = workflow_instance.document
-        
-        if not condition.field_path:
-            raise ConditionEvaluationError("Field path is required for document field conditions")
-        
-        # Handle different field paths
-        if condition.field_path.startswith("metadata."):
-            field_name = condition.field_path.split(".", 1)[1]
-            return getattr(document, field_name, None)
-            
-        elif condition.field_path.startswith("content."):
-            # Navigate JSON content using dot notation
-            content = document.content or {}
-            path_parts = condition.field_path.split(".")[1:]  # Remove "content" prefix
-            
-            current = content
-            for part in path_parts:
-                if isinstance(current, dict):
-                    current = current.get(part)
-                else:
-                    return None
-            return current
-            
-        else:
-            # Direct document attribute
-            return getattr(document, condition.field_path, None)
-
     def _get_placeholder_value(self, condition: WorkflowCondition, workflow_instance: WorkflowInstance) -> Any:
         """Get value from document placeholder fields"""
         document = workflow_instance.document
@@ -285,22 +459,6 @@ class WorkflowConditionService:
                     
         return None
 
-    def _get_workflow_data_value(
-        self, 
-        condition: WorkflowCondition, 
-        workflow_instance: WorkflowInstance, 
-        context: Dict[str, Any]
-    ) -> Any:
-        """Get value from workflow context data"""
-        if condition.field_path.startswith("context."):
-            field_name = condition.field_path.split(".", 1)[1]
-            return context.get(field_name)
-        elif condition.field_path.startswith("instance."):
-            field_name = condition.field_path.split(".", 1)[1]
-            return getattr(workflow_instance, field_name, None)
-        else:
-            return workflow_instance.context_data.get(condition.field_path) if workflow_instance.context_data else None
-
     def _get_user_role_value(self, condition: WorkflowCondition, workflow_instance: WorkflowInstance) -> Any:
         """Get user role information"""
         if condition.field_path == "initiator.role":
@@ -317,10 +475,6 @@ class WorkflowConditionService:
                 return assignee.role if assignee else None
         return None
 
-    def _get_datetime_value(self, condition: WorkflowCondition) -> datetime:
-        """Get current datetime for time-based conditions"""
-        return datetime.utcnow()
-
     def _get_approval_count_value(self, condition: WorkflowCondition, workflow_instance: WorkflowInstance) -> int:
         """Get approval count for workflow"""
         if condition.field_path == "total_approvals":
@@ -337,18 +491,14 @@ class WorkflowConditionService:
 
     def _get_document_size_value(self, condition: WorkflowCondition, workflow_instance: WorkflowInstance) -> int:
         """Get document size metrics"""
-        document = workflow_instance.document
+        metrics = get_document_metrics(workflow_instance.document)
         
         if condition.field_path == "content_length":
-            content_str = json.dumps(document.content) if document.content else ""
-            return len(content_str)
+            return metrics.content_length
         elif condition.field_path == "placeholder_count":
-            content = document.content or {}
-            return len(content.get("placeholders", []))
+            return metrics.placeholder_count
         elif condition.field_path == "word_count":
-            # Simple word count from content
-            content_str = json.dumps(document.content) if document.content else ""
-            return len(content_str.split())
+            return metrics.word_count
         return 0
 
     def _evaluate_custom_function(
@@ -361,7 +511,7 @@ class WorkflowConditionService:
         """Evaluate custom function (placeholder for extensibility)"""
         # This would be extended with actual custom function implementations
         if condition.custom_function == "business_hours_check":
-            return self._is_business_hours()
+            return self._is_business_hours(workflow_instance)
         elif condition.custom_function == "document_complexity_score":
             return self._calculate_document_complexity(workflow_instance.document)
         else:
@@ -370,71 +520,7 @@ class WorkflowConditionService:
 
     def _compare_values(self, actual: Any, expected: Any, operator: OperatorType) -> bool:
         """Compare actual and expected values using the specified operator"""
-        
-        if operator == OperatorType.EQUALS:
-            return actual == expected
-        elif operator == OperatorType.NOT_EQUALS:
-            return actual != expected
-        elif operator == OperatorType.GREATER_THAN:
-            return actual > expected if actual is not None else False
-        elif operator == OperatorType.LESS_THAN:
-            return actual < expected if actual is not None else False
-        elif operator == OperatorType.GREATER_EQUAL:
-            return actual >= expected if actual is not None else False
-        elif operator == OperatorType.LESS_EQUAL:
-            return actual <= expected if actual is not None else False
-        elif operator == OperatorType.CONTAINS:
-            return expected in str(actual) if actual is not None else False
-        elif operator == OperatorType.NOT_CONTAINS:
-            return expected not in str(actual) if actual is not None else True
-        elif operator == OperatorType.STARTS_WITH:
-            return str(actual).startswith(str(expected)) if actual is not None else False
-        elif operator == OperatorType.ENDS_WITH:
-            return str(actual).endswith(str(expected)) if actual is not None else False
-        elif operator == OperatorType.IN_LIST:
-            return actual in expected if isinstance(expected, list) else False
-        elif operator == OperatorType.NOT_IN_LIST:
-            return actual not in expected if isinstance(expected, list) else True
-        elif operator == OperatorType.IS_EMPTY:
-            return actual is None or actual == "" or (isinstance(actual, (list, dict)) and len(actual) == 0)
-        elif operator == OperatorType.IS_NOT_EMPTY:
-            return actual is not None and actual != "" and (not isinstance(actual, (list, dict)) or len(actual) > 0)
-        elif operator == OperatorType.REGEX_MATCH:
-            return bool(re.match(str(expected), str(actual))) if actual is not None else False
-        elif operator == OperatorType.DATE_BEFORE:
-            if isinstance(actual, datetime) and isinstance(expected, str):
-                expected_date = datetime.fromisoformat(expected.replace("Z", "+00:00"))
-                return actual < expected_date
-            return False
-        elif operator == OperatorType.DATE_AFTER:
-            if isinstance(actual, datetime) and isinstance(expected, str):
-                expected_date = datetime.fromisoformat(expected.replace("Z", "+00:00"))
-                return actual > expected_date
-            return False
-        else:
-            raise ConditionEvaluationError(f"Unsupported operator: {operator}")
-
-    def _combine_condition_results(
-        self, 
-        results: List[Dict[str, Any]], 
-        logical_operator: LogicalOperator
-    ) -> bool:
-        """Combine individual condition results using logical operator"""
-        
-        if not results:
-            return True
-            
-        condition_values = [r["result"] for r in results]
-        
-        if logical_operator == LogicalOperator.AND:
-            return all(condition_values)
-        elif logical_operator == LogicalOperator.OR:
-            return any(condition_values)
-        elif logical_operator == LogicalOperator.NOT:
-            # NOT operates on the first condition only
-            return not condition_values[0] if condition_values else True
-        else:
-            raise ConditionEvaluationError(f"Unsupported logical operator: {logical_operator}")
+        return compile_comparator(operator, expected)(actual)
 
     # =========================================================================
     # Action Execution Methods  
@@ -442,24 +528,27 @@ class WorkflowConditionService:
 
     def _execute_group_actions(
         self,
-        group: WorkflowConditionGroup,
+        plan: "ConditionGroupPlan",
         workflow_instance: WorkflowInstance,
         step_instance: Optional[WorkflowStepInstance],
         context: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
-        """Execute all actions for a condition group"""
+        """Execute the on-match actions of a condition group in execution order"""
         
-        results = []
+        if not plan.action_ids:
+            return []
         
-        # Sort actions by execution order
-        sorted_actions = sorted(group.actions, key=lambda a: a.execution_order)
+        actions = {
+            action.id: action
+            for action in self.db.query(WorkflowConditionalAction).filter(
+                WorkflowConditionalAction.id.in_(plan.action_ids)
+            ).all()
+        }
         
-        for action in sorted_actions:
-            if action.execute_on_match:  # Execute on condition match
-                result = self._execute_single_action(action, workflow_instance, step_instance, context)
-                results.append(result)
-                
-        return results
+        return [
+            self._execute_single_action(actions[action_id], workflow_instance, step_instance, context)
+            for action_id in plan.action_ids if action_id in actions
+        ]
 
     def _execute_single_action(
         self,
@@ -661,6 +750,33 @@ class WorkflowConditionService:
             
         return query.order_by(WorkflowConditionGroup.evaluation_order).all()
 
+    def _get_group_plans(
+        self,
+        workflow_instance: WorkflowInstance,
+        step_instance: Optional[WorkflowStepInstance] = None
+    ) -> List["ConditionGroupPlan"]:
+        """Get compiled condition groups, compiling them once per workflow version"""
+        
+        workflow = workflow_instance.workflow
+        key = (
+            workflow_instance.workflow_id,
+            workflow.version if workflow else None,
+            step_instance.step_id if step_instance else None
+        )
+        plans = _plan_cache.setdefault(self.db.get_bind(), {})
+        now = time.monotonic()
+        
+        entry = plans.get(key)
+        if entry is None or entry[0] <= now:
+            entry = plans[key] = (
+                now + settings.WORKFLOW_CONDITION_PLAN_TTL_SECONDS,
+                [
+                    ConditionGroupPlan(group)
+                    for group in self._get_condition_groups(workflow_instance, step_instance)
+                ]
+            )
+        return entry[1]
+
     def _build_evaluation_context(
         self,
         workflow_instance: WorkflowInstance,
@@ -696,51 +812,42 @@ class WorkflowConditionService:
             
         return context
 
-    def _record_condition_evaluation(
-        self,
-        condition: WorkflowCondition,
-        workflow_instance: WorkflowInstance,
-        step_instance: Optional[WorkflowStepInstance],
-        result: Dict[str, Any]
-    ) -> None:
-        """Record individual condition evaluation result"""
+    def _write_audit_records(self, records: List[Dict[str, Any]], has_errors: bool = False) -> None:
+        """
+        Write condition evaluation records for one evaluation in a single batched insert.
         
-        evaluation = ConditionEvaluation(
-            workflow_instance_id=workflow_instance.id,
-            step_instance_id=step_instance.id if step_instance else None,
-            condition_id=condition.id,
-            condition_group_id=condition.condition_group_id,
-            result=result["result"],
-            actual_value=result.get("actual_value"),
-            evaluation_details=result,
-            execution_time_ms=result.get("execution_time_ms", 0),
-            error_message=result.get("error")
-        )
+        CONDITION_AUDIT_LEVEL selects what is kept: "none", "groups" (group results
+        without context snapshots) or "full" (group results with context snapshots plus
+        per-condition records). Evaluations without errors are kept at
+        CONDITION_AUDIT_SAMPLE_RATE; evaluations with errors are always kept.
+        """
+        level = settings.CONDITION_AUDIT_LEVEL
+        if not records or level == "none":
+            return
+        if not has_errors and random.random() >= settings.CONDITION_AUDIT_SAMPLE_RATE:
+            return
+        
+        if level == "groups":
+            records = [
+                {**record, "context_snapshot": None}
+                for record in records if record["condition_id"] is None
+            ]
         
-        self.db.add(evaluation)
+        try:
+            self.db.execute(insert(ConditionEvaluation), records)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error recording condition evaluations: {str(e)}")
 
-    def _is_business_hours(self) -> bool:
-        """Check if current time is within business hours"""
-        now = datetime.utcnow()
-        weekday = now.weekday()  # 0 = Monday, 6 = Sunday
-        hour = now.hour
-        
-        # Business hours: Monday-Friday, 9 AM to 5 PM UTC
-        return weekday < 5 and 9 <= hour < 17
+    def _is_business_hours(self, workflow_instance: WorkflowInstance) -> bool:
+        """Check if the current time is within the workflow's business calendar"""
+        calendar = BusinessCalendarService(self.db).business_calendar(workflow_instance.workflow_id)
+        return calendar.is_working_time(datetime.utcnow())
 
     def _calculate_document_complexity(self, document: Document) -> int:
         """Calculate document complexity score"""
-        score = 0
-        
-        if document.content:
-            content_str = json.dumps(document.content)
-            score += len(content_str) // 100  # Length factor
-            
-            content = document.content
-            if "placeholders" in content:
-                score += len(content["placeholders"]) * 5  # Placeholder factor
-                
-        return score
+        return get_document_metrics(document).complexity_score
 
     # Import required models after class definition
     from app.models.workflow import WorkflowStep
\ No newline at end of file
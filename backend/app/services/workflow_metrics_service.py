@@ -0,0 +1,500 @@
+"""
+Workflow metric rollups
+
+Maintains per-day workflow, step, user and hour-of-day counters as workflows
+move through their steps, so dashboards and reports read a bounded number of
+precomputed buckets instead of rescanning every instance.
+"""
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, or_, case, insert, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.workflow_metrics import WorkflowMetricRollup, WorkflowMetricSketchBin
+from app.models.workflow import (
+    WorkflowStep,
+    WorkflowInstance,
+    WorkflowStepInstance,
+    WorkflowInstanceStatus,
+    StepInstanceStatus
+)
+
+
+# Dialects with native INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+COUNTER_COLUMNS = (
+    "started_count", "completed_count", "approved_count", "rejected_count",
+    "escalated_count", "duration_count", "duration_sum_hours"
+)
+
+# Log-bucketed sketch with 1% relative accuracy; durations below the floor share one bin
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+SKETCH_MIN_HOURS = 0.001
+
+logger = logging.getLogger(__name__)
+
+RECENT_WINDOW_DAYS = 30
+SLOW_STEP_THRESHOLD_HOURS = 24
+
+
+def sketch_bin(hours: float) -> int:
+    """Sketch bin index for a duration"""
+    return math.ceil(math.log(max(hours, SKETCH_MIN_HOURS)) / math.log(SKETCH_GAMMA))
+
+
+def sketch_value(bin_index: int) -> float:
+    """Representative duration for a sketch bin"""
+    return 2 * SKETCH_GAMMA ** bin_index / (SKETCH_GAMMA + 1)
+
+
+def sketch_quantiles(bins: Dict[int, int], fractions: Iterable[float]) -> Dict[float, float]:
+    """Nearest-rank quantiles from merged sketch bins"""
+    total = sum(bins.values())
+    if not total:
+        return {fraction: 0 for fraction in fractions}
+
+    ordered = sorted(bins.items())
+    quantiles = {}
+    for fraction in fractions:
+        rank = min(int(total * fraction), total - 1)
+        seen = 0
+        for bin_index, count in ordered:
+            seen += count
+            if seen > rank:
+                quantiles[fraction] = sketch_value(bin_index)
+                break
+    return quantiles
+
+
+def _hours(started_at: Optional[datetime], finished_at: Optional[datetime]) -> Optional[float]:
+    if not started_at or not finished_at:
+        return None
+    return max((finished_at - started_at).total_seconds() / 3600, 0.0)
+
+
+class WorkflowMetricsService:
+    """Incremental workflow metric rollups and the analytics read from them"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # Writers - called inside the transaction of the transition they describe
+    def record_workflow_started(self, workflow_id: str, started_at: Optional[datetime] = None):
+        """Count a new workflow instance"""
+        started_at = started_at or datetime.utcnow()
+        self._bump("workflow", workflow_id, started_at, workflow_id=workflow_id, started_count=1)
+        self._bump("hour", str(started_at.hour), started_at, started_count=1)
+
+    def record_step_assigned(self, workflow_id: str, step: WorkflowStep, user_id: Optional[str],
+                             assigned_at: Optional[datetime] = None):
+        """Count a step instance and, if assigned, the assignee's workload"""
+        assigned_at = assigned_at or datetime.utcnow()
+        self._bump("step", step.id, assigned_at, workflow_id=workflow_id, label=step.name, started_count=1)
+        if user_id:
+            self._bump("user", user_id, assigned_at, started_count=1)
+
+    def record_step_decision(self, workflow_id: str, step: WorkflowStep, user_id: Optional[str],
+                             approved: bool, started_at: Optional[datetime], decided_at: datetime):
+        """Count an approval or rejection and its time to decision"""
+        duration = _hours(started_at, decided_at)
+        counter = "approved_count" if approved else "rejected_count"
+        self._bump("step", step.id, decided_at, workflow_id=workflow_id, label=step.name,
+                   duration=duration, **{counter: 1})
+        if user_id:
+            self._bump("user", user_id, decided_at, duration=duration, **{counter: 1})
+
+    def record_step_escalated(self, workflow_id: str, step: WorkflowStep, user_id: Optional[str],
+                              escalated_at: Optional[datetime] = None):
+        """Count an escalation against the step and the assignee it was taken from"""
+        escalated_at = escalated_at or datetime.utcnow()
+        self._bump("step", step.id, escalated_at, workflow_id=workflow_id, label=step.name, escalated_count=1)
+        if user_id:
+            self._bump("user", user_id, escalated_at, escalated_count=1)
+
+    def record_workflow_finished(self, workflow_id: str, completed: bool,
+                                 initiated_at: Optional[datetime], finished_at: datetime):
+        """Count a completed or rejected workflow instance"""
+        if completed:
+            self._bump("workflow", workflow_id, finished_at, workflow_id=workflow_id,
+                       duration=_hours(initiated_at, finished_at), completed_count=1)
+        else:
+            self._bump("workflow", workflow_id, finished_at, workflow_id=workflow_id, rejected_count=1)
+
+    def _bump(self, scope: str, scope_key: str, at: datetime, workflow_id: Optional[str] = None,
+              label: Optional[str] = None, duration: Optional[float] = None, **increments: int):
+        """Atomically add to one day's rollup row, creating it if needed"""
+        table = WorkflowMetricRollup.__table__
+        key = {"scope": scope, "scope_key": scope_key, "bucket_date": at.date()}
+
+        if duration is not None:
+            increments["duration_count"] = 1
+            increments["duration_sum_hours"] = duration
+
+        values = dict(key, workflow_id=workflow_id, label=label,
+                      duration_min_hours=duration, duration_max_hours=duration)
+        values.update({column: increments.get(column, 0) for column in COUNTER_COLUMNS})
+
+        updates = {column: table.c[column] + amount for column, amount in increments.items()}
+        if duration is not None:
+            updates["duration_min_hours"] = case(
+                (or_(table.c.duration_min_hours.is_(None), table.c.duration_min_hours > duration), duration),
+                else_=table.c.duration_min_hours
+            )
+            updates["duration_max_hours"] = case(
+                (or_(table.c.duration_max_hours.is_(None), table.c.duration_max_hours < duration), duration),
+                else_=table.c.duration_max_hours
+            )
+        self._upsert(table, key, values, updates)
+
+        if duration is not None:
+            bin_table = WorkflowMetricSketchBin.__table__
+            bin_key = dict(key, bin=sketch_bin(duration))
+            self._upsert(bin_table, bin_key, dict(bin_key, count=1), {"count": bin_table.c.count + 1})
+
+    def _upsert(self, table, key: Dict[str, Any], values: Dict[str, Any], updates: Dict[str, Any]):
+        """INSERT ... ON CONFLICT DO UPDATE where supported, otherwise update-then-insert"""
+        dialect_insert = _UPSERT_INSERTS.get(self.db.get_bind().dialect.name)
+        if dialect_insert is not None:
+            statement = dialect_insert(table).values(**values)
+            self.db.execute(statement.on_conflict_do_update(index_elements=list(key), set_=updates))
+            return
+
+        result = self.db.execute(
+            update(table).where(and_(*[table.c[column] == value for column, value in key.items()])).values(updates)
+        )
+        if not result.rowcount:
+            self.db.execute(insert(table).values(**values))
+
+    # Readers
+    def _rollups(self, scope: str, start_day: Optional[date] = None,
+                 end_day: Optional[date] = None) -> List[WorkflowMetricRollup]:
+        """Daily rollup rows for a scope within an optional date range"""
+        conditions = [WorkflowMetricRollup.scope == scope]
+        if start_day:
+            conditions.append(WorkflowMetricRollup.bucket_date >= start_day)
+        if end_day:
+            conditions.append(WorkflowMetricRollup.bucket_date <= end_day)
+        return self.db.query(WorkflowMetricRollup).filter(*conditions).all()
+
+    def _sketch_bins(self, scope: str, start_day: Optional[date] = None,
+                     end_day: Optional[date] = None) -> Dict[str, Dict[int, int]]:
+        """Merged sketch bins per scope key within an optional date range"""
+        conditions = [WorkflowMetricSketchBin.scope == scope]
+        if start_day:
+            conditions.append(WorkflowMetricSketchBin.bucket_date >= start_day)
+        if end_day:
+            conditions.append(WorkflowMetricSketchBin.bucket_date <= end_day)
+
+        merged: Dict[str, Dict[int, int]] = {}
+        for row in self.db.query(WorkflowMetricSketchBin).filter(*conditions).all():
+            bins = merged.setdefault(row.scope_key, {})
+            bins[row.bin] = bins.get(row.bin, 0) + row.count
+        return merged
+
+    @staticmethod
+    def _merge(rows: Iterable[WorkflowMetricRollup], key_attr: str = "scope_key") -> Dict[str, Dict[str, Any]]:
+        """Sum daily rollup rows into one total per key"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            total = totals.setdefault(getattr(row, key_attr), {
+                **{column: 0 for column in COUNTER_COLUMNS},
+                "keys": set(), "duration_min_hours": None, "duration_max_hours": None
+            })
+            total["keys"].add(row.scope_key)
+            for column in COUNTER_COLUMNS:
+                total[column] += getattr(row, column) or 0
+            for column, pick in (("duration_min_hours", min), ("duration_max_hours", max)):
+                value = getattr(row, column)
+                if value is not None:
+                    total[column] = value if total[column] is None else pick(total[column], value)
+        return totals
+
+    @staticmethod
+    def _average_duration(total: Dict[str, Any]) -> float:
+        return total["duration_sum_hours"] / total["duration_count"] if total["duration_count"] else 0
+
+    def completion_summary(self, start_day: Optional[date] = None, end_day: Optional[date] = None) -> Dict[str, Any]:
+        """Started, completed and rejected instance counts and completion times"""
+        total = self._merge(self._rollups("workflow", start_day, end_day), "scope").get("workflow")
+        if not total:
+            return {"started": 0, "completed": 0, "rejected": 0, "average_completion_time": 0}
+        return {
+            "started": total["started_count"],
+            "completed": total["completed_count"],
+            "rejected": total["rejected_count"],
+            "average_completion_time": self._average_duration(total)
+        }
+
+    def approval_rates(self, start_day: Optional[date] = None, end_day: Optional[date] = None) -> Dict[str, Any]:
+        """Approval, rejection and delegation rates from step rollups"""
+        steps = self._merge(self._rollups("step", start_day, end_day), "label")
+
+        approved = sum(step["approved_count"] for step in steps.values())
+        rejected = sum(step["rejected_count"] for step in steps.values())
+        escalated = sum(step["escalated_count"] for step in steps.values())
+        started = sum(step["started_count"] for step in steps.values())
+
+        decided = approved + rejected
+        if not decided:
+            return {
+                "overall_approval_rate": 0,
+                "rejection_rate": 0,
+                "delegation_rate": 0,
+                "step_approval_rates": {}
+            }
+
+        return {
+            "overall_approval_rate": approved / decided * 100,
+            "rejection_rate": rejected / decided * 100,
+            "delegation_rate": escalated / started * 100 if started else 0,
+            "step_approval_rates": {
+                name: step["approved_count"] / (step["approved_count"] + step["rejected_count"]) * 100
+                for name, step in steps.items()
+                if step["approved_count"] + step["rejected_count"]
+            }
+        }
+
+    def slow_steps(self, start_day: Optional[date] = None, end_day: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Steps whose average time to decision exceeds the threshold"""
+        steps = self._merge(self._rollups("step", start_day, end_day), "label")
+        sketches = self._sketch_bins("step", start_day, end_day)
+
+        slow = []
+        for name, step in steps.items():
+            average = self._average_duration(step)
+            if step["duration_count"] > 1 and average > SLOW_STEP_THRESHOLD_HOURS:
+                bins: Dict[int, int] = {}
+                for step_id in step["keys"]:
+                    for bin_index, count in sketches.get(step_id, {}).items():
+                        bins[bin_index] = bins.get(bin_index, 0) + count
+                quantiles = sketch_quantiles(bins, (0.50, 0.75, 0.95))
+                slow.append({
+                    "step_name": name,
+                    "average_time_hours": average,
+                    "p50_time_hours": quantiles[0.50],
+                    "p75_time_hours": quantiles[0.75],
+                    "p95_time_hours": quantiles[0.95],
+                    "instance_count": step["duration_count"]
+                })
+        return slow
+
+    def bottleneck_analysis(self, start_day: Optional[date] = None, end_day: Optional[date] = None,
+                            overdue_frequency: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Slow and frequently escalated steps, plus recommendations"""
+        overdue_frequency = overdue_frequency or {}
+        slow_steps = self.slow_steps(start_day, end_day)
+
+        steps = self._merge(self._rollups("step", start_day, end_day), "label")
+        escalation_patterns = [
+            {
+                "step_name": name,
+                "escalation_count": step["escalated_count"],
+                "pattern": "high" if step["escalated_count"] > 5 else "moderate" if step["escalated_count"] > 2 else "low"
+            }
+            for name, step in steps.items() if step["escalated_count"]
+        ]
+
+        recommendations = [
+            f"Consider optimizing '{step['step_name']}' - average time {step['average_time_hours']:.1f} hours"
+            for step in slow_steps
+        ]
+        for step_name, freq in overdue_frequency.items():
+            if freq > 3:
+                recommendations.append(f"Review timeout settings for '{step_name}' - {freq} overdue instances")
+
+        return {
+            "slow_steps": slow_steps,
+            "overdue_frequency": overdue_frequency,
+            "escalation_patterns": escalation_patterns,
+            "performance_recommendations": recommendations
+        }
+
+    def user_performance(self, start_day: Optional[date] = None, end_day: Optional[date] = None) -> Dict[str, Any]:
+        """Approval speed, quality, workload and delegation per assignee"""
+        users = self._merge(self._rollups("user", start_day, end_day))
+
+        approval_speed = {}
+        approval_quality = {}
+        workload_distribution = {}
+        delegation_patterns = {}
+        for user_id, user in users.items():
+            decided = user["approved_count"] + user["rejected_count"]
+            if user["approved_count"]:
+                approval_speed[user_id] = self._average_duration(user)
+            if decided:
+                approval_quality[user_id] = user["approved_count"] / decided * 100
+            workload_distribution[user_id] = user["started_count"]
+            delegation_patterns[user_id] = {
+                "delegated_count": user["escalated_count"],
+                "delegation_rate": user["escalated_count"] / user["started_count"] * 100 if user["started_count"] else 0
+            }
+
+        return {
+            "approval_speed": approval_speed,
+            "approval_quality": approval_quality,
+            "workload_distribution": workload_distribution,
+            "delegation_patterns": delegation_patterns
+        }
+
+    def trend_analysis(self, start_day: date, end_day: date) -> Dict[str, Any]:
+        """Daily, weekly, monthly and hour-of-day trends from rollup buckets"""
+        daily_completions: Dict[str, int] = {}
+        daily_initiations: Dict[str, int] = {}
+        weekly: Dict[int, List[float]] = {}  # iso week -> [duration sum, duration count]
+        monthly_activity: Dict[int, int] = {}
+        daily_performance: List[Tuple[date, float, int]] = []
+
+        for row in sorted(self._rollups("workflow", start_day, end_day), key=lambda r: r.bucket_date):
+            day = row.bucket_date
+            if row.started_count:
+                daily_initiations[str(day)] = daily_initiations.get(str(day), 0) + row.started_count
+                monthly_activity[day.month] = monthly_activity.get(day.month, 0) + row.started_count
+            if row.completed_count:
+                daily_completions[str(day)] = daily_completions.get(str(day), 0) + row.completed_count
+            if row.duration_count:
+                week = weekly.setdefault(day.isocalendar()[1], [0.0, 0])
+                week[0] += row.duration_sum_hours
+                week[1] += row.duration_count
+                daily_performance.append((day, row.duration_sum_hours, row.duration_count))
+
+        hourly_activity: Dict[int, int] = {}
+        for row in self._rollups("hour", start_day, end_day):
+            hour = int(row.scope_key)
+            hourly_activity[hour] = hourly_activity.get(hour, 0) + row.started_count
+        peak_hours = sorted(hourly_activity.items(), key=lambda x: x[1], reverse=True)[:3]
+
+        return {
+            "daily_completion_trends": daily_completions,
+            "daily_initiation_trends": daily_initiations,
+            "peak_usage_hours": [h[0] for h in peak_hours],
+            "hourly_activity": hourly_activity,
+            "weekly_performance_trends": {week: s / n for week, (s, n) in weekly.items()},
+            "seasonal_patterns": self._seasonal_patterns(monthly_activity),
+            "performance_trends": self._performance_trends(daily_performance)
+        }
+
+    @staticmethod
+    def _seasonal_patterns(monthly_activity: Dict[int, int]) -> Dict[str, Any]:
+        if not monthly_activity:
+            return {"monthly_distribution": {}, "peak_month": None, "low_month": None}
+
+        peak_month = max(monthly_activity.items(), key=lambda x: x[1])
+        low_month = min(monthly_activity.items(), key=lambda x: x[1])
+        return {
+            "monthly_distribution": monthly_activity,
+            "peak_month": peak_month[0],
+            "peak_activity": peak_month[1],
+            "low_month": low_month[0],
+            "low_activity": low_month[1]
+        }
+
+    @staticmethod
+    def _performance_trends(daily_performance: List[Tuple[date, float, int]]) -> Dict[str, Any]:
+        """Compare average completion time in the first and second half of completions"""
+        completions = sum(count for _, _, count in daily_performance)
+        if completions < 2:
+            return {"trend": "insufficient_data", "improvement": 0}
+
+        halves = [[0.0, 0], [0.0, 0]]
+        seen = 0
+        for _, duration_sum, count in daily_performance:
+            half = halves[0 if seen < completions // 2 else 1]
+            half[0] += duration_sum
+            half[1] += count
+            seen += count
+
+        first_half_avg, second_half_avg = (s / n if n else 0 for s, n in halves)
+        improvement = first_half_avg - second_half_avg
+        trend = "improving" if improvement > 0 else "declining" if improvement < 0 else "stable"
+
+        return {
+            "trend": trend,
+            "improvement_hours": improvement,
+            "first_half_avg": first_half_avg,
+            "second_half_avg": second_half_avg
+        }
+
+    def recent_window(self) -> Tuple[date, date]:
+        """Date range used for bottleneck and user metrics"""
+        today = datetime.utcnow().date()
+        return today - timedelta(days=RECENT_WINDOW_DAYS), today
+
+    # Maintenance
+    def rebuild(self):
+        """
+        Recompute all rollups from workflow history.
+
+        Used to backfill rollups for data recorded before they existed;
+        commits the rebuilt rows.
+        """
+        self.db.query(WorkflowMetricSketchBin).delete(synchronize_session=False)
+        self.db.query(WorkflowMetricRollup).delete(synchronize_session=False)
+
+        for instance in self.db.query(
+            WorkflowInstance.workflow_id, WorkflowInstance.status,
+            WorkflowInstance.initiated_at, WorkflowInstance.completed_at
+        ).all():
+            self.record_workflow_started(instance.workflow_id, instance.initiated_at)
+            if instance.completed_at and instance.status in (
+                WorkflowInstanceStatus.COMPLETED, WorkflowInstanceStatus.REJECTED
+            ):
+                self.record_workflow_finished(
+                    instance.workflow_id, instance.status == WorkflowInstanceStatus.COMPLETED,
+                    instance.initiated_at, instance.completed_at
+                )
+
+        for row in self.db.query(WorkflowStepInstance, WorkflowStep).filter(
+            WorkflowStep.id == WorkflowStepInstance.step_id
+        ).all():
+            step_instance, step = row
+            self.record_step_assigned(
+                step.workflow_id, step, step_instance.assigned_to,
+                step_instance.started_at or step_instance.created_at
+            )
+            if step_instance.escalated:
+                self.record_step_escalated(
+                    step.workflow_id, step, step_instance.assigned_to,
+                    step_instance.escalated_at or step_instance.created_at
+                )
+            if step_instance.completed_at and step_instance.status in (
+                StepInstanceStatus.APPROVED, StepInstanceStatus.REJECTED
+            ):
+                self.record_step_decision(
+                    step.workflow_id, step, step_instance.assigned_to,
+                    step_instance.status == StepInstanceStatus.APPROVED,
+                    step_instance.started_at, step_instance.completed_at
+                )
+
+        self.db.commit()
+
+
+def backfill_workflow_metrics(db: Session) -> bool:
+    """
+    Rebuild the rollups from workflow history if they are empty but history exists.
+
+    Run at startup so dashboards cover instances recorded before the rollups
+    existed. On PostgreSQL an advisory lock keeps concurrently starting
+    workers from rebuilding at the same time. Returns True if it rebuilt.
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext('workflow_metric_rollups'))"))
+        has_rollups = db.query(WorkflowMetricRollup.scope).first() is not None
+        has_history = db.query(WorkflowInstance.id).first() is not None
+        if has_rollups or not has_history:
+            db.rollback()
+            return False
+        WorkflowMetricsService(db).rebuild()
+        logger.info("Backfilled workflow metric rollups from workflow history")
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to backfill workflow metric rollups: {e}")
+        return False
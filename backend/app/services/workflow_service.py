@@ -3,7 +3,7 @@ Workflow service layer for managing approval workflows
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import desc, and_, or_
 from app.models.workflow import (
     Workflow, 
@@ -16,6 +16,7 @@ from app.models.workflow import (
     WorkflowStepType
 )
 from app.models.user import User, UserRole
+from app.models.workflow_conditions import EscalationInstance
 from app.models.document import Document
 from app.schemas.workflow import (
     WorkflowCreate, 
@@ -29,8 +30,15 @@ from app.services.notification_service import (
     notify_document_shared
 )
 from app.models.notification import NotificationType, NotificationPriority
+from app.services.activity_feed_service import record_activity
+from app.services.workflow_analytics_service import WorkflowAnalyticsService, invalidate_analytics_cache
+from app.services.workflow_metrics_service import WorkflowMetricsService
+from app.services.escalation_scheduler import EscalationScheduler
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 class WorkflowService:
     """Service layer for workflow operations"""
@@ -39,6 +47,10 @@ class WorkflowService:
         if db is None:
             raise ValueError("Database session cannot be None")
         self.db = db
+        self.analytics = WorkflowAnalyticsService(db)
+        self.metrics = WorkflowMetricsService(db)
+        self.escalation_scheduler = EscalationScheduler(db)
+        self.calendars = self.escalation_scheduler.calendars
     
     # Workflow Definition Management
     def create_workflow(self, workflow_data: WorkflowCreate, created_by: str) -> Workflow:
@@ -62,6 +74,7 @@ class WorkflowService:
                 trigger_conditions=workflow_data.trigger_conditions,
                 status=workflow_data.status,
                 is_default=workflow_data.is_default,
+                business_calendar_id=workflow_data.business_calendar_id,
                 created_by=created_by
             )
 
@@ -191,18 +204,26 @@ class WorkflowService:
         
         self.db.add(instance)
         self.db.flush()  # Get instance ID
+        self._record_metrics(self.metrics.record_workflow_started, workflow.id, datetime.utcnow())
         
         # Create step instances for the first step(s)
         first_steps = [step for step in workflow.steps if step.step_order == 1]
         
-        for step in first_steps:
-            self._create_step_instance(instance.id, step)
+        step_instances = [self._create_step_instance(instance.id, step) for step in first_steps]
         
         # Update instance status to in progress
         instance.status = WorkflowInstanceStatus.IN_PROGRESS
         
+        self._record_workflow_activity(
+            "workflow_started", instance, document, workflow, instance.initiated_by,
+            [instance.initiated_by] + [si.assigned_to for si in step_instances]
+        )
+        for step, step_instance in zip(first_steps, step_instances):
+            self._record_step_assignment(instance, document, workflow, step, step_instance)
+        
         self.db.commit()
         self.db.refresh(instance)
+        invalidate_analytics_cache(self.db, workflow.id)
         
         # Send workflow assignment notifications
         self._send_workflow_notifications(instance.id, "started")
@@ -225,11 +246,16 @@ class WorkflowService:
             step_instance.status = StepInstanceStatus.IN_PROGRESS
             step_instance.started_at = datetime.utcnow()
         
-        # Set due date if timeout is configured
+        # Set due date if timeout is configured, counted in the workflow's working hours
         if step.timeout_hours:
-            step_instance.due_date = datetime.utcnow() + timedelta(hours=step.timeout_hours)
+            step_instance.due_date = self._step_due_date(step, step_instance.started_at or datetime.utcnow())
         
         self.db.add(step_instance)
+        self._schedule_escalations(step_instance, step.workflow_id)
+        self._record_metrics(
+            self.metrics.record_step_assigned, step.workflow_id, step, step_instance.assigned_to,
+            step_instance.started_at or datetime.utcnow()
+        )
         return step_instance
     
     def _get_step_assignee(self, step: WorkflowStep) -> Optional[str]:
@@ -264,6 +290,19 @@ class WorkflowService:
         step_instance.attachments = action.attachments
         step_instance.completed_at = datetime.utcnow()
         
+        if action.action in ("approve", "reject") and (
+            step_instance.next_escalation_at or self._has_active_escalation(step_instance)
+        ):
+            # Let the next escalation tick resolve any active escalation
+            step_instance.next_escalation_at = step_instance.completed_at
+        
+        if action.action in ("approve", "reject"):
+            self._record_metrics(
+                self.metrics.record_step_decision, step_instance.workflow_instance.workflow_id,
+                step_instance.step, user_id, action.action == "approve",
+                step_instance.started_at, step_instance.completed_at
+            )
+        
         if action.action == "approve":
             step_instance.status = StepInstanceStatus.APPROVED
             self._advance_workflow(step_instance.workflow_instance_id)
@@ -282,6 +321,7 @@ class WorkflowService:
                 # Keep status as IN_PROGRESS for new assignee
         
         self.db.commit()
+        invalidate_analytics_cache(self.db, step_instance.workflow_instance.workflow_id)
         return True
     
     def _advance_workflow(self, workflow_instance_id: str):
@@ -320,11 +360,21 @@ class WorkflowService:
             # Workflow is complete
             instance.status = WorkflowInstanceStatus.COMPLETED
             instance.completed_at = datetime.utcnow()
+            self._record_metrics(
+                self.metrics.record_workflow_finished, instance.workflow_id, True,
+                instance.initiated_at, instance.completed_at
+            )
+            self._record_workflow_activity(
+                "workflow_completed", instance, instance.document, instance.workflow,
+                current_steps[-1].assigned_to if current_steps else None,
+                [instance.initiated_by] + [si.assigned_to for si in instance.step_instances]
+            )
             self._send_workflow_notifications(workflow_instance_id, "completed")
         else:
             # Create next step instances
             for step in next_steps:
-                self._create_step_instance(instance.id, step)
+                step_instance = self._create_step_instance(instance.id, step)
+                self._record_step_assignment(instance, instance.document, instance.workflow, step, step_instance)
             instance.current_step_order = next_step_order
             self._send_workflow_notifications(workflow_instance_id, "advanced")
         
@@ -340,8 +390,98 @@ class WorkflowService:
             instance.status = WorkflowInstanceStatus.REJECTED
             instance.completed_at = datetime.utcnow()
             instance.rejection_reason = rejection_reason
+            self._record_metrics(
+                self.metrics.record_workflow_finished, instance.workflow_id, False,
+                instance.initiated_at, instance.completed_at
+            )
+            
+            rejected_by = next(
+                (si.assigned_to for si in instance.step_instances if si.status == StepInstanceStatus.REJECTED),
+                None
+            )
+            self._record_workflow_activity(
+                "workflow_rejected", instance, instance.document, instance.workflow, rejected_by,
+                [instance.initiated_by] + [si.assigned_to for si in instance.step_instances],
+                rejection_reason=rejection_reason
+            )
             self.db.commit()
     
+    def _record_workflow_activity(
+        self,
+        activity_type: str,
+        instance: WorkflowInstance,
+        document: Optional[Document],
+        workflow: Optional[Workflow],
+        actor_id: Optional[str],
+        recipients: List[Optional[str]],
+        audience_role: Optional[str] = None,
+        **details
+    ):
+        """Append a workflow event to the activity log in the current transaction"""
+        record_activity(
+            self.db, activity_type, actor_id=actor_id, recipients=recipients, audience_role=audience_role,
+            object_type="workflow_instance", object_id=instance.id,
+            document_id=instance.document_id, workflow_instance_id=instance.id,
+            title=document.title if document else None,
+            details={
+                "workflow_id": instance.workflow_id,
+                "workflow_name": workflow.name if workflow else None,
+                "document_type": document.document_type if document else None,
+                "status": activity_type.replace("workflow_", ""),
+                **details
+            }
+        )
+    
+    def _record_step_assignment(
+        self,
+        instance: WorkflowInstance,
+        document: Optional[Document],
+        workflow: Optional[Workflow],
+        step: WorkflowStep,
+        step_instance: WorkflowStepInstance
+    ):
+        """Record a step assignment for its assignee and, for role steps, everyone holding the role"""
+        role = getattr(step.required_role, "value", step.required_role)
+        if not step_instance.assigned_to and not role:
+            return
+        self._record_workflow_activity(
+            "workflow_assigned", instance, document, workflow, instance.initiated_by,
+            [step_instance.assigned_to], audience_role=role,
+            step_name=step.name, assigned_to=step_instance.assigned_to, required_role=role
+        )
+    
+    def _record_metrics(self, record, *args):
+        """Update metric rollups in a savepoint, so a failed upsert does not abort the transition"""
+        savepoint = self.db.begin_nested()
+        try:
+            record(*args)
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            logger.error(f"Error updating workflow metric rollups: {e}")
+    
+    def _step_due_date(self, step: WorkflowStep, start: datetime) -> datetime:
+        """Deadline for a step, falling back to wall-clock hours if the calendar cannot be resolved"""
+        try:
+            return self.calendars.due_date(step.workflow_id, start, step.timeout_hours)
+        except Exception as e:
+            logger.error(f"Error resolving business calendar for workflow {step.workflow_id}: {e}")
+            return start + timedelta(hours=step.timeout_hours)
+    
+    def _schedule_escalations(self, step_instance: WorkflowStepInstance, workflow_id: str):
+        """Set the step's first escalation time; reschedule_open_steps backfills any step missed here"""
+        try:
+            self.escalation_scheduler.schedule_new_step(step_instance, workflow_id)
+        except Exception as e:
+            logger.error(f"Error scheduling escalations for step {step_instance.id}: {e}")
+    
+    def _has_active_escalation(self, step_instance: WorkflowStepInstance) -> bool:
+        """Whether the step has an escalation the escalation engine must still resolve"""
+        return self.db.query(EscalationInstance.id).filter(
+            EscalationInstance.step_instance_id == step_instance.id,
+            EscalationInstance.status == "active"
+        ).first() is not None
+    
     # Query and Monitoring
     def get_workflow_instance(self, instance_id: str) -> Optional[WorkflowInstance]:
         """Get a workflow instance by ID"""
@@ -391,13 +531,25 @@ class WorkflowService:
         ).all()
     
     def escalate_overdue_approvals(self):
-        """Escalate overdue approvals"""
-        overdue_items = self.get_overdue_approvals()
+        """Escalate overdue approvals that have not been escalated yet"""
+        now = datetime.utcnow()
+        overdue_items = self.db.query(WorkflowStepInstance).join(WorkflowStep).options(
+            contains_eager(WorkflowStepInstance.step)
+        ).filter(
+            WorkflowStepInstance.status == StepInstanceStatus.IN_PROGRESS,
+            WorkflowStepInstance.due_date < now,
+            or_(WorkflowStepInstance.escalated == False, WorkflowStepInstance.escalated.is_(None)),
+            WorkflowStep.escalation_users.isnot(None)
+        ).all()
         
         for step_instance in overdue_items:
-            if step_instance.step.escalation_users and not step_instance.escalated:
+            if step_instance.step.escalation_users:
                 # Escalate to first escalation user
                 escalation_user = step_instance.step.escalation_users[0]
+                self._record_metrics(
+                    self.metrics.record_step_escalated, step_instance.step.workflow_id,
+                    step_instance.step, step_instance.assigned_to, datetime.utcnow()
+                )
                 step_instance.escalated = True
                 step_instance.escalated_at = datetime.utcnow()
                 step_instance.escalated_to = escalation_user
@@ -407,6 +559,8 @@ class WorkflowService:
                 self._send_workflow_notifications(step_instance.workflow_instance_id, "escalated", step_instance)
         
         self.db.commit()
+        if overdue_items:
+            invalidate_analytics_cache(self.db)
     
     # Enhanced Monitoring and Reporting Methods
     def get_workflow_performance_metrics(self, workflow_id: str) -> Dict[str, Any]:
@@ -415,307 +569,39 @@ class WorkflowService:
         if not workflow:
             return {}
         
-        instances = self.db.query(WorkflowInstance).filter(
-            WorkflowInstance.workflow_id == workflow_id
-        ).all()
-        
-        if not instances:
-            return {
-                "completion_rate": 0,
-                "average_completion_time": 0,
-                "bottleneck_steps": [],
-                "step_performance": {}
-            }
-        
-        completed = [i for i in instances if i.status == WorkflowInstanceStatus.COMPLETED]
-        completion_rate = len(completed) / len(instances) * 100
-        
-        # Calculate average completion time
-        if completed:
-            completion_times = []
-            for instance in completed:
-                if instance.completed_at:
-                    duration = instance.completed_at - instance.initiated_at
-                    completion_times.append(duration.total_seconds() / 3600)
-            avg_completion_time = sum(completion_times) / len(completion_times) if completion_times else 0
-        else:
-            avg_completion_time = 0
-        
-        # Analyze step performance
-        step_performance = {}
-        for step in workflow.steps:
-            step_instances = []
-            for instance in instances:
-                step_inst = next((si for si in instance.step_instances if si.step_id == step.id), None)
-                if step_inst:
-                    step_instances.append(step_inst)
-            
-            if step_instances:
-                completed_steps = [s for s in step_instances if s.status == StepInstanceStatus.APPROVED]
-                avg_step_time = 0
-                if completed_steps:
-                    step_times = []
-                    for s in completed_steps:
-                        if s.completed_at and s.started_at:
-                            duration = s.completed_at - s.started_at
-                            step_times.append(duration.total_seconds() / 3600)
-                    avg_step_time = sum(step_times) / len(step_times) if step_times else 0
-                
-                step_performance[step.name] = {
-                    "completion_rate": len(completed_steps) / len(step_instances) * 100,
-                    "average_time": avg_step_time,
-                    "total_instances": len(step_instances)
-                }
-        
-        return {
-            "completion_rate": completion_rate,
-            "average_completion_time": avg_completion_time,
-            "bottleneck_steps": self._identify_bottleneck_steps(workflow_id),
-            "step_performance": step_performance
-        }
+        return self.analytics.workflow_performance(workflow_id)
     
     def get_approval_rate_analytics(self) -> Dict[str, Any]:
-        """Get comprehensive approval rate analytics"""
-        all_step_instances = self.db.query(WorkflowStepInstance).all()
-        
-        if not all_step_instances:
-            return {
-                "overall_approval_rate": 0,
-                "rejection_rate": 0,
-                "delegation_rate": 0,
-                "step_approval_rates": {}
-            }
-        
-        completed_steps = [s for s in all_step_instances if s.status in [
-            StepInstanceStatus.APPROVED, StepInstanceStatus.REJECTED
-        ]]
-        
-        if not completed_steps:
-            return {
-                "overall_approval_rate": 0,
-                "rejection_rate": 0,
-                "delegation_rate": 0,
-                "step_approval_rates": {}
-            }
-        
-        approved = len([s for s in completed_steps if s.status == StepInstanceStatus.APPROVED])
-        rejected = len([s for s in completed_steps if s.status == StepInstanceStatus.REJECTED])
-        delegated = len([s for s in all_step_instances if s.escalated])
-        
-        overall_approval_rate = approved / len(completed_steps) * 100
-        rejection_rate = rejected / len(completed_steps) * 100
-        delegation_rate = delegated / len(all_step_instances) * 100
-        
-        # Step-specific approval rates
-        step_approval_rates = {}
-        step_groups = {}
-        for step_instance in completed_steps:
-            if step_instance.step:
-                step_name = step_instance.step.name
-                if step_name not in step_groups:
-                    step_groups[step_name] = []
-                step_groups[step_name].append(step_instance)
-        
-        for step_name, instances in step_groups.items():
-            approved_count = len([s for s in instances if s.status == StepInstanceStatus.APPROVED])
-            step_approval_rates[step_name] = approved_count / len(instances) * 100
-        
-        return {
-            "overall_approval_rate": overall_approval_rate,
-            "rejection_rate": rejection_rate,
-            "delegation_rate": delegation_rate,
-            "step_approval_rates": step_approval_rates
-        }
+        """Get comprehensive approval rate analytics from the daily metric rollups"""
+        return self.metrics.approval_rates()
     
     def get_bottleneck_analysis(self) -> Dict[str, Any]:
-        """Get bottleneck identification and analysis"""
-        # Get all active and recently completed workflow instances
-        recent_date = datetime.utcnow() - timedelta(days=30)
-        instances = self.db.query(WorkflowInstance).filter(
-            WorkflowInstance.initiated_at >= recent_date
-        ).all()
-        
-        slow_steps = []
-        overdue_frequency = {}
-        escalation_patterns = []
-        
-        # Analyze step performance to identify bottlenecks
-        step_times = {}
-        for instance in instances:
-            for step_instance in instance.step_instances:
-                if step_instance.step and step_instance.completed_at and step_instance.started_at:
-                    step_name = step_instance.step.name
-                    duration = step_instance.completed_at - step_instance.started_at
-                    duration_hours = duration.total_seconds() / 3600
-                    
-                    if step_name not in step_times:
-                        step_times[step_name] = []
-                    step_times[step_name].append(duration_hours)
-        
-        # Identify slow steps (above 75th percentile)
-        for step_name, times in step_times.items():
-            if len(times) > 1:
-                times.sort()
-                p75_index = int(len(times) * 0.75)
-                p75_time = times[p75_index]
-                avg_time = sum(times) / len(times)
-                
-                if avg_time > 24:  # More than 24 hours average
-                    slow_steps.append({
-                        "step_name": step_name,
-                        "average_time_hours": avg_time,
-                        "p75_time_hours": p75_time,
-                        "instance_count": len(times)
-                    })
-        
-        # Analyze overdue frequency
-        overdue_steps = self.get_overdue_approvals()
-        for step in overdue_steps:
-            if step.step:
-                step_name = step.step.name
-                overdue_frequency[step_name] = overdue_frequency.get(step_name, 0) + 1
-        
-        # Analyze escalation patterns
-        escalated_steps = self.db.query(WorkflowStepInstance).filter(
-            WorkflowStepInstance.escalated == True
-        ).all()
-        
-        escalation_counts = {}
-        for step in escalated_steps:
-            if step.step:
-                step_name = step.step.name
-                escalation_counts[step_name] = escalation_counts.get(step_name, 0) + 1
-        
-        for step_name, count in escalation_counts.items():
-            escalation_patterns.append({
-                "step_name": step_name,
-                "escalation_count": count,
-                "pattern": "high" if count > 5 else "moderate" if count > 2 else "low"
-            })
-        
-        # Generate recommendations
-        recommendations = []
-        for step in slow_steps:
-            recommendations.append(f"Consider optimizing '{step['step_name']}' - average time {step['average_time_hours']:.1f} hours")
-        
-        for step_name, freq in overdue_frequency.items():
-            if freq > 3:
-                recommendations.append(f"Review timeout settings for '{step_name}' - {freq} overdue instances")
-        
-        return {
-            "slow_steps": slow_steps,
-            "overdue_frequency": overdue_frequency,
-            "escalation_patterns": escalation_patterns,
-            "performance_recommendations": recommendations
-        }
+        """Get bottleneck identification and analysis from the daily metric rollups"""
+        recent_start, recent_end = self.metrics.recent_window()
+        return self.metrics.bottleneck_analysis(recent_start, recent_end, self._overdue_frequency())
     
     def get_workflow_analytics(self) -> Dict[str, Any]:
-        """Get workflow analytics data"""
+        """Get workflow analytics data from the daily metric rollups"""
         total_workflows = self.db.query(Workflow).count()
         active_workflows = self.db.query(Workflow).filter(Workflow.status == WorkflowStatus.ACTIVE).count()
         
-        completed_instances = self.db.query(WorkflowInstance).filter(
-            WorkflowInstance.status == WorkflowInstanceStatus.COMPLETED
-        ).count()
-        
-        # Calculate average completion time
-        completed = self.db.query(WorkflowInstance).filter(
-            and_(
-                WorkflowInstance.status == WorkflowInstanceStatus.COMPLETED,
-                WorkflowInstance.completed_at.isnot(None)
-            )
-        ).all()
-        
-        if completed:
-            completion_times = []
-            for instance in completed:
-                duration = instance.completed_at - instance.initiated_at
-                completion_times.append(duration.total_seconds() / 3600)  # hours
-            
-            avg_completion_time = sum(completion_times) / len(completion_times)
-        else:
-            avg_completion_time = 0
-        
-        # Get detailed approval rates
-        approval_rates = self.get_approval_rate_analytics()
-        
-        # Get bottleneck analysis
-        bottleneck_analysis = self.get_bottleneck_analysis()
-        
-        # Get user performance summary
-        user_performance = self.get_user_performance_metrics()
+        summary = self.metrics.completion_summary()
+        recent_start, recent_end = self.metrics.recent_window()
         
         return {
             "total_workflows": total_workflows,
             "active_workflows": active_workflows,
-            "completed_instances": completed_instances,
-            "average_completion_time": avg_completion_time,
-            "approval_rates": approval_rates,
-            "bottleneck_steps": bottleneck_analysis.get("slow_steps", []),
-            "user_performance": user_performance
+            "completed_instances": summary["completed"],
+            "average_completion_time": summary["average_completion_time"],
+            "approval_rates": self.metrics.approval_rates(),
+            "bottleneck_steps": self.metrics.slow_steps(recent_start, recent_end),
+            "user_performance": self.metrics.user_performance(recent_start, recent_end)
         }
     
     def get_user_performance_metrics(self) -> Dict[str, Any]:
-        """Get user performance metrics"""
-        # Get recent step instances (last 30 days)
-        recent_date = datetime.utcnow() - timedelta(days=30)
-        recent_steps = self.db.query(WorkflowStepInstance).filter(
-            WorkflowStepInstance.started_at >= recent_date
-        ).all()
-        
-        user_metrics = {}
-        approval_speed = {}
-        approval_quality = {}
-        workload_distribution = {}
-        delegation_patterns = {}
-        
-        # Group by user
-        user_steps = {}
-        for step in recent_steps:
-            if step.assigned_to:
-                if step.assigned_to not in user_steps:
-                    user_steps[step.assigned_to] = []
-                user_steps[step.assigned_to].append(step)
-        
-        for user_id, steps in user_steps.items():
-            completed_steps = [s for s in steps if s.status == StepInstanceStatus.APPROVED]
-            
-            # Calculate approval speed
-            if completed_steps:
-                completion_times = []
-                for step in completed_steps:
-                    if step.completed_at and step.started_at:
-                        duration = step.completed_at - step.started_at
-                        completion_times.append(duration.total_seconds() / 3600)
-                
-                avg_speed = sum(completion_times) / len(completion_times) if completion_times else 0
-                approval_speed[user_id] = avg_speed
-            
-            # Calculate approval quality (approval rate)
-            total_decisions = len([s for s in steps if s.status in [
-                StepInstanceStatus.APPROVED, StepInstanceStatus.REJECTED
-            ]])
-            approvals = len([s for s in steps if s.status == StepInstanceStatus.APPROVED])
-            
-            if total_decisions > 0:
-                approval_quality[user_id] = approvals / total_decisions * 100
-            
-            # Workload distribution
-            workload_distribution[user_id] = len(steps)
-            
-            # Delegation patterns
-            delegated = len([s for s in steps if s.escalated])
-            delegation_patterns[user_id] = {
-                "delegated_count": delegated,
-                "delegation_rate": delegated / len(steps) * 100 if steps else 0
-            }
-        
-        return {
-            "approval_speed": approval_speed,
-            "approval_quality": approval_quality,
-            "workload_distribution": workload_distribution,
-            "delegation_patterns": delegation_patterns
-        }
+        """Get user performance metrics from the daily metric rollups"""
+        recent_start, recent_end = self.metrics.recent_window()
+        return self.metrics.user_performance(recent_start, recent_end)
     
     def get_workflow_health_metrics(self) -> Dict[str, Any]:
         """Get workflow system health metrics"""
@@ -898,32 +784,27 @@ class WorkflowService:
         end_date: datetime, 
         include_recommendations: bool = True
     ) -> Dict[str, Any]:
-        """Generate comprehensive workflow report"""
-        # Get instances in date range
-        instances = self.db.query(WorkflowInstance).filter(
-            and_(
-                WorkflowInstance.initiated_at >= start_date,
-                WorkflowInstance.initiated_at <= end_date
-            )
-        ).all()
+        """Generate comprehensive workflow report from the daily metric rollups"""
+        start_day, end_day = start_date.date(), end_date.date()
         
         # Executive summary
-        total_instances = len(instances)
-        completed_instances = len([i for i in instances if i.status == WorkflowInstanceStatus.COMPLETED])
+        summary = self.metrics.completion_summary(start_day, end_day)
+        total_instances = summary["started"]
+        completed_instances = summary["completed"]
         completion_rate = completed_instances / total_instances * 100 if total_instances > 0 else 0
         
         # Performance metrics
         performance_metrics = self.get_workflow_analytics()
         
-        # Bottleneck analysis
-        bottleneck_analysis = self.get_bottleneck_analysis()
+        # Bottleneck analysis; overdue items are live state, not history
+        overdue_frequency = self._overdue_frequency()
+        bottleneck_analysis = self.metrics.bottleneck_analysis(start_day, end_day, overdue_frequency)
         
         # User insights
-        user_insights = self.get_user_performance_metrics()
+        user_insights = self.metrics.user_performance(start_day, end_day)
         
         # Trend analysis
-        days_in_period = (end_date - start_date).days
-        trend_analysis = self.get_time_based_analytics(days_in_period)
+        trend_analysis = self.metrics.trend_analysis(start_day, end_day)
         
         # Generate recommendations
         recommendations = []
@@ -937,7 +818,7 @@ class WorkflowService:
             if performance_metrics.get('average_completion_time', 0) > 72:
                 recommendations.append("Review timeout settings - average completion time exceeds 72 hours")
             
-            overdue_count = len(self.get_overdue_approvals())
+            overdue_count = sum(overdue_frequency.values())
             if overdue_count > 10:
                 recommendations.append(f"Address {overdue_count} overdue approvals to improve system efficiency")
         
@@ -958,32 +839,17 @@ class WorkflowService:
         }
     
     # Helper methods
+    def _overdue_frequency(self) -> Dict[str, int]:
+        """Currently overdue step instances per step name"""
+        overdue_frequency = {}
+        for step_instance in self.get_overdue_approvals():
+            step_name = step_instance.step.name
+            overdue_frequency[step_name] = overdue_frequency.get(step_name, 0) + 1
+        return overdue_frequency
+    
     def _identify_bottleneck_steps(self, workflow_id: str) -> List[str]:
         """Identify bottleneck steps in a specific workflow"""
-        instances = self.db.query(WorkflowInstance).filter(
-            WorkflowInstance.workflow_id == workflow_id
-        ).all()
-        
-        step_times = {}
-        for instance in instances:
-            for step_instance in instance.step_instances:
-                if step_instance.step and step_instance.completed_at and step_instance.started_at:
-                    step_name = step_instance.step.name
-                    duration = step_instance.completed_at - step_instance.started_at
-                    duration_hours = duration.total_seconds() / 3600
-                    
-                    if step_name not in step_times:
-                        step_times[step_name] = []
-                    step_times[step_name].append(duration_hours)
-        
-        # Return steps with average time > 24 hours
-        bottlenecks = []
-        for step_name, times in step_times.items():
-            avg_time = sum(times) / len(times)
-            if avg_time > 24:  # More than 24 hours
-                bottlenecks.append(step_name)
-        
-        return bottlenecks
+        return self.analytics.workflow_performance(workflow_id)["bottleneck_steps"]
     
     def _analyze_seasonal_patterns(self, instances: List[WorkflowInstance]) -> Dict[str, Any]:
         """Analyze seasonal patterns in workflow data"""
@@ -1195,7 +1061,8 @@ class WorkflowService:
                     "event_type": f"workflow_{status}",
                     "document_title": document.title,
                     "workflow_instance_id": instance.id
-                }
+                },
+                digest_topic="workflow_status"
             )
         except Exception as e:
             print(f"Error creating status notification: {str(e)}")
@@ -0,0 +1,17 @@
+-- Index step escalation deadlines so escalation ticks read only due steps
+-- Generated: 2026-10-18
+
+ALTER TABLE workflow_step_instances ADD COLUMN IF NOT EXISTS next_escalation_at TIMESTAMPTZ;
+
+-- Steps opened before this column existed are due on the first tick, which
+-- evaluates them and stores their real next escalation time (or NULL)
+UPDATE workflow_step_instances
+SET next_escalation_at = now()
+WHERE next_escalation_at IS NULL
+  AND status IN ('PENDING', 'IN_PROGRESS');
+
+CREATE INDEX IF NOT EXISTS ix_workflow_step_instances_next_escalation_at
+    ON workflow_step_instances (next_escalation_at);
+
+CREATE INDEX IF NOT EXISTS ix_workflow_step_instances_due_date
+    ON workflow_step_instances (due_date);
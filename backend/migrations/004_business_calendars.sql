@@ -0,0 +1,21 @@
+-- Business calendars for working-hour SLA timing of workflow steps and escalations
+-- Generated: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS business_calendars (
+    id VARCHAR PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    description TEXT,
+    timezone VARCHAR(64) NOT NULL DEFAULT 'UTC',
+    working_hours JSON,
+    holidays JSON,
+    is_default BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    created_by VARCHAR REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_business_calendars_is_default ON business_calendars (is_default);
+
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS business_calendar_id VARCHAR REFERENCES business_calendars(id);
+
+CREATE INDEX IF NOT EXISTS ix_workflows_business_calendar_id ON workflows (business_calendar_id);
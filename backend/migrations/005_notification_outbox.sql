@@ -0,0 +1,7 @@
+-- Notification outbox claims for the batched delivery worker
+-- Generated: 2026-10-18
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(64);
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS ix_notifications_outbox ON notifications (status, scheduled_at);
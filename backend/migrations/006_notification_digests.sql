@@ -0,0 +1,9 @@
+-- Digest coalescing for held topic notifications
+-- Generated: 2026-10-18
+
+ALTER TYPE notificationstatus ADD VALUE IF NOT EXISTS 'COALESCED';
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS digest_key VARCHAR(255);
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS digest_id INTEGER REFERENCES notifications(id);
+
+CREATE INDEX IF NOT EXISTS ix_notifications_digest ON notifications (digest_key, status);
@@ -0,0 +1,23 @@
+-- Webhook delivery outbox for background dispatch workers
+-- Generated: 2026-10-18
+
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS body TEXT;
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'delivered';
+ALTER TABLE webhook_deliveries ALTER COLUMN status SET DEFAULT 'pending';
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS attempt_count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE webhook_deliveries ALTER COLUMN attempt_count SET DEFAULT 0;
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP;
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(64);
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+
+-- Queued deliveries have no delivery time until the endpoint accepts them
+ALTER TABLE webhook_deliveries ADD COLUMN IF NOT EXISTS created_at TIMESTAMP;
+UPDATE webhook_deliveries SET created_at = delivered_at WHERE created_at IS NULL;
+ALTER TABLE webhook_deliveries ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE webhook_deliveries ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE webhook_deliveries ALTER COLUMN delivered_at DROP NOT NULL;
+ALTER TABLE webhook_deliveries ALTER COLUMN delivered_at DROP DEFAULT;
+
+CREATE INDEX IF NOT EXISTS ix_webhook_deliveries_outbox ON webhook_deliveries (status, next_attempt_at);
+DROP INDEX IF EXISTS ix_webhook_deliveries_webhook;
+CREATE INDEX IF NOT EXISTS ix_webhook_deliveries_webhook ON webhook_deliveries (webhook_id, created_at);
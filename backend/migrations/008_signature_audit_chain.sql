@@ -0,0 +1,21 @@
+-- Hash-chained signature audit events and Merkle checkpoints
+-- Generated: 2026-10-18
+
+ALTER TABLE signature_events ADD COLUMN IF NOT EXISTS sequence INTEGER;
+ALTER TABLE signature_events ADD COLUMN IF NOT EXISTS previous_hash VARCHAR(64);
+ALTER TABLE signature_events ADD COLUMN IF NOT EXISTS event_hash VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_signature_events_request_sequence ON signature_events (request_id, sequence);
+
+CREATE TABLE IF NOT EXISTS signature_audit_checkpoints (
+    id VARCHAR PRIMARY KEY,
+    request_id VARCHAR NOT NULL,
+    first_sequence INTEGER NOT NULL,
+    last_sequence INTEGER NOT NULL,
+    merkle_root VARCHAR(64) NOT NULL,
+    chain_hash VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_signature_audit_checkpoints_request_sequence
+    ON signature_audit_checkpoints (request_id, last_sequence);
@@ -0,0 +1,14 @@
+-- Cached daily rollups for signature statistics and compliance reports
+-- Generated: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS signature_statistics_rollups (
+    scope VARCHAR(20) NOT NULL,
+    scope_key VARCHAR NOT NULL,
+    bucket_date DATE NOT NULL,
+    metrics JSON NOT NULL,
+    computed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (scope, scope_key, bucket_date)
+);
+
+CREATE INDEX IF NOT EXISTS ix_digital_signature_requests_created_at ON digital_signature_requests (created_at);
+CREATE INDEX IF NOT EXISTS ix_signature_events_framework_occurred ON signature_events (legal_framework_applied, occurred_at);
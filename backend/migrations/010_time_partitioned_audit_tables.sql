@@ -0,0 +1,106 @@
+-- Monthly range partitions for audit logs, notifications and signature events
+-- Generated: 2026-10-18
+--
+-- Partitions are named <table>_pYYYY_MM and cover one calendar month of the
+-- table's time column. The application creates upcoming months ahead of time
+-- (app/services/table_partitions.py) and retention detaches and drops whole
+-- partitions once every row in them has expired. Rows outside every monthly
+-- range land in <table>_default.
+--
+-- PostgreSQL requires primary keys and unique indexes on a partitioned table to
+-- include the partition column, so:
+--   * primary keys become (id, <time column>), which makes the time column NOT NULL;
+--     notifications.created_at was nullable and is backfilled before partitioning
+--   * ix_signature_events_request_sequence becomes (request_id, sequence, occurred_at);
+--     the signature audit log serialises appends per request with an advisory lock
+--   * foreign keys that reference notifications.id (notification_logs and the
+--     digest_id self-reference) are no longer enforced by the database
+
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent TEXT, month_start DATE) RETURNS VOID AS $$
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        parent || '_p' || to_char(month_start, 'YYYY_MM'), parent,
+        month_start, (month_start + INTERVAL '1 month')::DATE
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION partition_table_by_month(parent TEXT, key_column TEXT) RETURNS VOID AS $$
+DECLARE
+    legacy TEXT := parent || '_unpartitioned';
+    first_month DATE;
+    month DATE;
+    definition RECORD;
+    index_definitions TEXT[] := ARRAY[]::TEXT[];
+    foreign_keys TEXT[] := ARRAY[]::TEXT[];
+    statement TEXT;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = parent::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    -- Secondary indexes and outgoing foreign keys, recreated on the partitioned table
+    FOR definition IN
+        SELECT indisunique, pg_get_indexdef(indexrelid) AS ddl
+        FROM pg_index
+        WHERE indrelid = parent::regclass AND NOT indisprimary
+    LOOP
+        statement := definition.ddl;
+        IF definition.indisunique THEN
+            statement := regexp_replace(statement, '\)$', ', ' || quote_ident(key_column) || ')');
+        END IF;
+        index_definitions := index_definitions || statement;
+    END LOOP;
+    FOR definition IN
+        SELECT conname, pg_get_constraintdef(oid) AS ddl
+        FROM pg_constraint
+        WHERE conrelid = parent::regclass AND contype = 'f' AND confrelid <> parent::regclass
+    LOOP
+        foreign_keys := foreign_keys || format('ALTER TABLE %I ADD CONSTRAINT %I %s', parent, definition.conname, definition.ddl);
+    END LOOP;
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, legacy);
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS, PRIMARY KEY (id, %I)) PARTITION BY RANGE (%I)',
+        parent, legacy, key_column, key_column
+    );
+    EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+
+    -- One partition per month from the oldest row through the next three months
+    EXECUTE format('SELECT date_trunc(''month'', min(%I))::DATE FROM %I', key_column, legacy) INTO first_month;
+    month := COALESCE(first_month, date_trunc('month', now())::DATE);
+    WHILE month <= (date_trunc('month', now()) + INTERVAL '3 months')::DATE LOOP
+        PERFORM create_monthly_partition(parent, month);
+        month := (month + INTERVAL '1 month')::DATE;
+    END LOOP;
+
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', parent, legacy);
+
+    -- Serial ids keep their sequence
+    FOR definition IN
+        SELECT s.oid::regclass::TEXT AS sequence_name
+        FROM pg_depend d JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+        WHERE d.refobjid = legacy::regclass AND d.deptype = 'a'
+    LOOP
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', definition.sequence_name, parent);
+    END LOOP;
+
+    EXECUTE format('DROP TABLE %I CASCADE', legacy);
+
+    FOREACH statement IN ARRAY index_definitions LOOP
+        EXECUTE statement;
+    END LOOP;
+    FOREACH statement IN ARRAY foreign_keys LOOP
+        EXECUTE statement;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE INDEX IF NOT EXISTS ix_notifications_created_at ON notifications (created_at);
+
+UPDATE notifications SET created_at = COALESCE(created_at, updated_at, now()) WHERE created_at IS NULL;
+
+SELECT partition_table_by_month('audit_logs', 'created_at');
+SELECT partition_table_by_month('notifications', 'created_at');
+SELECT partition_table_by_month('signature_events', 'occurred_at');
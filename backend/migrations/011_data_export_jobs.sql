@@ -0,0 +1,28 @@
+-- Resumable background GDPR data export jobs
+-- Generated: 2026-10-18
+
+CREATE TABLE IF NOT EXISTS data_export_jobs (
+    id VARCHAR PRIMARY KEY,
+    user_id VARCHAR NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    requested_by VARCHAR REFERENCES users(id) ON DELETE SET NULL,
+    format VARCHAR(20) NOT NULL DEFAULT 'json',
+    data_categories JSON NOT NULL,
+    include_metadata BOOLEAN NOT NULL DEFAULT TRUE,
+    anonymize_sensitive BOOLEAN NOT NULL DEFAULT FALSE,
+    status VARCHAR(50) NOT NULL DEFAULT 'pending',
+    progress JSON,
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    file_path VARCHAR(500),
+    file_size BIGINT,
+    file_hash VARCHAR(64),
+    expires_at TIMESTAMP WITH TIME ZONE,
+    download_count INTEGER NOT NULL DEFAULT 0,
+    last_downloaded TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_data_export_jobs_user_id ON data_export_jobs (user_id);
+CREATE INDEX IF NOT EXISTS ix_data_export_jobs_status ON data_export_jobs (status, updated_at);
@@ -0,0 +1,24 @@
+-- Store API keys as a public prefix plus an HMAC-SHA256 hash instead of plaintext
+-- Generated: 2026-10-18
+--
+-- Existing keys keep working: their lookup prefix becomes the first 12 hex
+-- characters of the key's SHA-256, which app.core.security.api_key_prefix
+-- derives for keys without a prefix of their own. The HMAC secret is read from
+-- cadms.api_key_hash_secret, which app.core.migration sets from
+-- API_KEY_HASH_SECRET; when applying by hand, first run
+--   SELECT set_config('cadms.api_key_hash_secret', '<API_KEY_HASH_SECRET>', false);
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+ALTER TABLE api_keys ADD COLUMN IF NOT EXISTS key_hash VARCHAR(64);
+ALTER TABLE api_keys ALTER COLUMN key_prefix TYPE VARCHAR(16);
+
+UPDATE api_keys
+SET key_prefix = left(encode(digest(key_value, 'sha256'), 'hex'), 12),
+    key_hash = encode(hmac(key_value, current_setting('cadms.api_key_hash_secret'), 'sha256'), 'hex')
+WHERE key_hash IS NULL;
+
+ALTER TABLE api_keys ALTER COLUMN key_hash SET NOT NULL;
+ALTER TABLE api_keys DROP COLUMN key_value;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_api_keys_key_prefix ON api_keys (key_prefix);
@@ -344,4 +344,141 @@ class TestActivityFeedService:
         assert isinstance(result['activities'], list)
         assert result['total_count'] >= 0
         assert isinstance(result['has_more'], bool)
-        assert 'last_updated' in result
\ No newline at end of file
+        assert 'last_updated' in result
+
+@pytest.fixture
+def feed_service():
+    """Activity feed service bound to an in-memory database"""
+    from sqlalchemy.pool import StaticPool
+    from app.core.database import Base
+    from app.services.activity_feed_service import ActivityFeedService
+    import app.models  # noqa: F401 - register all tables
+
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+
+    service = ActivityFeedService()
+    service.engine = engine
+    service.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return service
+
+
+class TestActivityEventLog:
+    """Test the append-only activity log and materialized feeds"""
+
+    def _record(self, service, count, **kwargs):
+        from app.services.activity_feed_service import record_activity
+        db = service.SessionLocal()
+        try:
+            for i in range(count):
+                record_activity(
+                    db, kwargs.get('activity_type', 'document_created'), actor_id='author-1',
+                    recipients=kwargs.get('recipients'), audience_role=kwargs.get('audience_role'),
+                    object_type='document', object_id=f'doc-{i}', document_id=f'doc-{i}',
+                    title=f'Document {i}', details={'document_type': 'policy'}
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    async def test_record_activity_fans_out_to_recipients(self, feed_service):
+        """Actor and recipients each get the event in their feed"""
+        self._record(feed_service, 1, recipients=['reviewer-1'])
+
+        author_feed = await feed_service.get_user_activity_feed('author-1')
+        reviewer_feed = await feed_service.get_user_activity_feed('reviewer-1')
+        other_feed = await feed_service.get_user_activity_feed('someone-else')
+
+        assert len(author_feed['activities']) == 1
+        assert reviewer_feed['activities'][0]['document_title'] == 'Document 0'
+        assert other_feed['activities'] == []
+
+    async def test_cursor_pagination_walks_feed_without_overlap(self, feed_service):
+        """Following next_page_token visits every event exactly once, newest first"""
+        self._record(feed_service, 7)
+
+        seen = []
+        token = None
+        while True:
+            page = await feed_service.get_user_activity_feed('author-1', limit=3, page_token=token)
+            seen.extend(a['activity_id'] for a in page['activities'])
+            if not page['has_more']:
+                break
+            token = page['next_page_token']
+
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+
+    async def test_broadcast_events_are_read_without_fan_out(self, feed_service):
+        """Events addressed to everyone are merged into feeds at read time"""
+        from app.models.activity import ActivityFeedEntry
+        from app.services.activity_feed_service import BROADCAST_AUDIENCE
+
+        self._record(feed_service, 1, activity_type='document_published', audience_role=BROADCAST_AUDIENCE)
+
+        db = feed_service.SessionLocal()
+        try:
+            assert db.query(ActivityFeedEntry).count() == 1  # Only the actor's entry
+        finally:
+            db.close()
+
+        feed = await feed_service.get_user_activity_feed('any-user')
+        assert [a['activity_type'] for a in feed['activities']] == ['document_published']
+
+    async def test_category_readers_filter_by_activity_type(self, feed_service):
+        """Document and workflow readers only return their own activity types"""
+        self._record(feed_service, 2)
+        self._record(feed_service, 1, activity_type='workflow_started')
+
+        documents = await feed_service.get_document_activities('author-1')
+        workflows = await feed_service.get_workflow_activities('author-1')
+
+        assert len(documents) == 2
+        assert [a['activity_type'] for a in workflows] == ['workflow_started']
+
+    async def test_feed_without_users_table_shows_broadcast_events(self, feed_service):
+        """A failed role lookup falls back to the broadcast audience"""
+        from app.models.user import User
+        from app.services.activity_feed_service import BROADCAST_AUDIENCE
+
+        self._record(feed_service, 1, activity_type='document_published', audience_role=BROADCAST_AUDIENCE)
+        User.__table__.drop(feed_service.engine)
+
+        feed = await feed_service.get_user_activity_feed('any-user')
+        assert feed['user_id'] == 'any-user'
+        assert [a['activity_type'] for a in feed['activities']] == ['document_published']
+
+    async def test_role_step_assignment_reaches_role_holders(self, feed_service):
+        """Assignments of role-based workflow steps are read by everyone holding the role"""
+        from app.models.document import Document
+        from app.models.user import User, UserRole
+        from app.models.workflow import Workflow, WorkflowStatus, WorkflowStep, WorkflowStepType
+        from app.services.workflow_service import WorkflowService
+
+        db = feed_service.SessionLocal()
+        try:
+            db.add_all([
+                Document(id="doc-1", title="Budget", content={"ops": []}, document_type="policy"),
+                Workflow(id="wf-1", name="Budget Approval", document_type="policy", status=WorkflowStatus.ACTIVE),
+                WorkflowStep(id="step-1", workflow_id="wf-1", name="Manager Review",
+                             step_type=WorkflowStepType.APPROVAL, step_order=1, required_role="manager"),
+                User(id="manager-1", email="m1@example.com", username="m1", hashed_password="x",
+                     role=UserRole.MANAGER),
+                User(id="manager-2", email="m2@example.com", username="m2", hashed_password="x",
+                     role=UserRole.MANAGER),
+                User(id="resident-1", email="r1@example.com", username="r1", hashed_password="x",
+                     role=UserRole.RESIDENT),
+            ])
+            db.commit()
+            WorkflowService(db).start_workflow("doc-1", "wf-1", initiated_by="author-1")
+        finally:
+            db.close()
+
+        # Only one manager is the assignee; the other reads the event through the role audience
+        for manager_id in ('manager-1', 'manager-2'):
+            feed = await feed_service.get_user_activity_feed(manager_id)
+            assert 'workflow_assigned' in [a['activity_type'] for a in feed['activities']]
+        resident_feed = await feed_service.get_user_activity_feed('resident-1')
+        assert resident_feed['activities'] == []
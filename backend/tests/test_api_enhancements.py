@@ -10,9 +10,11 @@ from httpx import AsyncClient
 from fastapi import status
 
 from app.main import app
+from app.core.security import api_key_prefix, hash_api_key
 from app.models.external_integration import APIKey, Webhook, WebhookDelivery, RateLimitRule
 from app.models.user import User
 from app.services.webhook_service import WebhookService, WebhookEvents
+from app.services.webhook_delivery import WebhookDispatchWorker
 from app.middleware.rate_limiting import RateLimitService
 from app.schemas.external_integration import (
     APIKeyCreate, WebhookCreate, WebhookEventPayload,
@@ -43,7 +45,7 @@ class TestAPIKeys:
         assert data["name"] == "Test API Key"
         assert data["permissions"] == ["documents:read", "templates:read"]
         assert "key_value" in data  # Should only be shown on creation
-        assert len(data["key_prefix"]) == 8
+        assert len(data["key_prefix"]) == 16
 
     @pytest.mark.asyncio
     async def test_create_api_key_invalid_permissions(self, async_client: AsyncClient, test_user):
@@ -254,6 +256,10 @@ class TestWebhookService:
             )
 
             assert len(delivery_ids) >= 1
+            mock_post.assert_not_called()  # Queued, posted by the dispatch worker
+
+            stats = await WebhookDispatchWorker(test_db).run_once()
+            assert stats.delivered >= 1
             mock_post.assert_called()
 
     @pytest.mark.asyncio
@@ -296,6 +302,7 @@ class TestWebhookService:
             )
 
             assert len(delivery_ids) >= 1
+            await WebhookDispatchWorker(test_db).run_once()
 
             # Check that failure was recorded
             test_db.refresh(test_webhook)
@@ -490,7 +497,7 @@ class TestAPIKeyAuthentication:
         """Test authentication using API key"""
         response = await async_client.get(
             "/api/v1/documents",
-            headers={"X-API-Key": test_api_key.key_value}
+            headers={"X-API-Key": TEST_API_KEY}
         )
 
         # Should work if API key has documents:read permission
@@ -514,7 +521,7 @@ class TestAPIKeyAuthentication:
         """Test authentication with expired API key"""
         response = await async_client.get(
             "/api/v1/documents",
-            headers={"X-API-Key": test_expired_api_key.key_value}
+            headers={"X-API-Key": EXPIRED_API_KEY}
         )
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -547,13 +554,17 @@ class TestUtilityEndpoints:
 
 
 # Fixtures for tests
+TEST_API_KEY = "test-api-key-12345678901234567890"
+EXPIRED_API_KEY = "expired-api-key-12345678901234567890"
+
+
 @pytest.fixture
 async def test_api_key(test_db, test_user):
     """Create a test API key"""
     api_key = APIKey(
         name="Test API Key",
-        key_value="test-api-key-12345678901234567890",
-        key_prefix="test-api",
+        key_prefix=api_key_prefix(TEST_API_KEY),
+        key_hash=hash_api_key(TEST_API_KEY),
         permissions=["documents:read", "templates:read"],
         is_active=True,
         created_by=test_user["user"].id,
@@ -570,8 +581,8 @@ async def test_expired_api_key(test_db, test_user):
     """Create an expired API key"""
     api_key = APIKey(
         name="Expired API Key",
-        key_value="expired-api-key-12345678901234567890",
-        key_prefix="expired",
+        key_prefix=api_key_prefix(EXPIRED_API_KEY),
+        key_hash=hash_api_key(EXPIRED_API_KEY),
         permissions=["documents:read"],
         is_active=True,
         created_by=test_user["user"].id,
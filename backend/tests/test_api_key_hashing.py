@@ -0,0 +1,40 @@
+"""
+Tests for hashed API key storage and lookup
+"""
+import hashlib
+import hmac
+
+from app.core.config import settings
+from app.core.security import api_key_prefix, generate_api_key, hash_api_key, verify_api_key
+
+
+class TestAPIKeyHashing:
+    """Test key generation, prefixes and verification"""
+
+    def test_generated_key_carries_its_prefix(self):
+        key, prefix = generate_api_key()
+        assert len(prefix) == 16 and key.startswith(f"{prefix}.")
+        assert api_key_prefix(key) == prefix
+        assert generate_api_key()[0] != key
+
+    def test_hash_is_keyed(self, monkeypatch):
+        key, _ = generate_api_key()
+        digest = hash_api_key(key)
+        assert len(digest) == 64 and key not in digest
+        assert verify_api_key(key, digest)
+        assert not verify_api_key(key + "x", digest)
+
+        monkeypatch.setattr(settings, "API_KEY_HASH_SECRET", "rotated")
+        assert not verify_api_key(key, digest)
+
+    def test_legacy_keys_match_migration(self):
+        """Keys issued before hashing are found by the prefix and hash migration 012 computes"""
+        legacy = "Xq3-legacy_token_urlsafe_value_0123456789"
+        assert api_key_prefix(legacy) == hashlib.sha256(legacy.encode()).hexdigest()[:12]
+        assert hash_api_key(legacy) == hmac.new(
+            settings.API_KEY_HASH_SECRET.encode(), legacy.encode(), hashlib.sha256
+        ).hexdigest()
+
+    def test_prefix_of_other_length_is_not_trusted(self):
+        key = "short.value"
+        assert api_key_prefix(key) == hashlib.sha256(key.encode()).hexdigest()[:12]
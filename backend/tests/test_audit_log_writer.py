@@ -0,0 +1,144 @@
+"""
+Tests for the buffered security audit log writer
+"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.security import AuditEventType, AuditLog, AuditSeverity
+from app.models.user import User
+from app.services.audit_log_writer import (
+    SlidingWindowCounter, get_audit_writer, stop_audit_writers, user_info_cache
+)
+from app.services import security_service
+from app.services.security_service import SecurityService
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_session(engine, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_LOG_FLUSH_INTERVAL_SECONDS", 3600)  # Flush explicitly
+    monkeypatch.setattr(security_service, "_failed_logins", SlidingWindowCounter(window_seconds=15 * 60))
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add(User(id="user-1", email="clerk@example.com", username="clerk", hashed_password="x"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        stop_audit_writers()
+        user_info_cache.clear()
+        session.close()
+
+
+def _statements(engine, prefix):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement)
+                 if statement.startswith(prefix) else None)
+    return statements
+
+
+def _log(service, count=1, **kwargs):
+    kwargs.setdefault("event_type", AuditEventType.DOCUMENT_VIEWED)
+    return [service.log_audit_event(message=f"Event {i}", **kwargs) for i in range(count)]
+
+
+class TestBufferedWrites:
+    """Test when audit events reach the database"""
+
+    def test_low_severity_is_buffered_and_batched(self, db_session, engine):
+        inserts = _statements(engine, "INSERT INTO audit_logs")
+        ids = _log(SecurityService(db_session), 5, user_id="user-1")
+
+        assert db_session.query(AuditLog).count() == 0
+        assert get_audit_writer(db_session).flush() == 5
+
+        assert len(inserts) == 1
+        rows = db_session.query(AuditLog).all()
+        assert {row.id for row in rows} == set(ids)
+        assert {row.user_email for row in rows} == {"clerk@example.com"}
+
+    def test_critical_events_are_written_before_returning(self, db_session):
+        service = SecurityService(db_session)
+        _log(service, 2)
+        audit_id, = _log(service, severity=AuditSeverity.CRITICAL)
+
+        assert db_session.get(AuditLog, audit_id) is not None
+        assert db_session.query(AuditLog).count() == 3  # Earlier events are written with it
+        assert len(get_audit_writer(db_session)) == 0
+
+    def test_full_buffer_flushes_inline(self, db_session, monkeypatch):
+        monkeypatch.setattr(settings, "AUDIT_LOG_BUFFER_SIZE", 3)
+        _log(SecurityService(db_session), 4)
+
+        assert db_session.query(AuditLog).count() == 3
+        assert len(get_audit_writer(db_session)) == 1
+
+    def test_failed_flush_keeps_rows(self, db_session, engine):
+        _log(SecurityService(db_session), 2)
+        writer = get_audit_writer(db_session)
+        AuditLog.__table__.drop(engine)
+
+        with pytest.raises(Exception):
+            writer.flush()
+        assert len(writer) == 2
+
+        AuditLog.__table__.create(engine)
+        assert writer.flush() == 2
+        assert db_session.query(AuditLog).count() == 2
+
+    def test_reads_flush_the_buffer(self, db_session):
+        service = SecurityService(db_session)
+        _log(service, 3)
+
+        logs, total = service.get_audit_logs()
+        assert total == 3 and len(logs) == 3
+
+
+class TestAuditLookups:
+    """Test the per-event lookups no longer query the database"""
+
+    def test_user_info_is_cached_and_invalidated(self, db_session, engine):
+        service = SecurityService(db_session)
+        selects = _statements(engine, "SELECT users")
+        _log(service, 3, user_id="user-1")
+        assert len(selects) == 1
+
+        db_session.get(User, "user-1").email = "registrar@example.com"
+        db_session.commit()
+        _log(service, user_id="user-1")
+        get_audit_writer(db_session).flush()
+
+        emails = [row.user_email for row in db_session.query(AuditLog).order_by(AuditLog.created_at)]
+        assert emails == ["clerk@example.com"] * 3 + ["registrar@example.com"]
+
+    def test_failed_logins_alert_once_at_threshold(self, db_session, engine, monkeypatch):
+        service = SecurityService(db_session)
+        alerts = []
+        monkeypatch.setattr(service, "create_security_alert", alerts.append)
+        counts = _statements(engine, "SELECT count")
+
+        _log(service, 8, event_type=AuditEventType.LOGIN_FAILURE, ip_address="203.0.113.7")
+        _log(service, 2, event_type=AuditEventType.LOGIN_FAILURE, ip_address="198.51.100.1")
+
+        assert len(alerts) == 1
+        assert alerts[0].context["failed_count"] == security_service.FAILED_LOGIN_THRESHOLD
+        assert counts == []
+
+    def test_sliding_window_expires_events(self):
+        counter = SlidingWindowCounter(window_seconds=60)
+        assert [counter.add("ip", now=t) for t in (0, 10, 30)] == [1, 2, 3]
+        assert counter.add("ip", now=75) == 2  # The events at 0 and 10 have left the window
@@ -0,0 +1,299 @@
+"""
+Tests for batch signing and verification
+"""
+import base64
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography import x509
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi.testclient import TestClient
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.dependencies import get_current_verified_user
+from app.models.digital_signature import (
+    DigitalSignature, DigitalSignatureProvider, DigitalSignatureRequest, SignatureCertificate,
+    SignatureEvent, SignatureProviderType, SignatureStatus
+)
+from app.models.document import Document
+from app.models.user import User
+from app.services.digital_signature import batch_signing
+from app.services.digital_signature.batch_signing import BatchDocument, BatchSigningService
+from app.services.digital_signature.certificate_cache import certificate_cache
+from app.services.digital_signature.pdf_signing import IncrementalPdf, verify_incremental_signature
+from app.services.signature_audit_log import verify_chain
+import app.models  # noqa: F401 - register all tables
+
+PASSWORD = "board-secret"
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session shared across threads"""
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(autouse=True)
+def signing_settings(monkeypatch):
+    key = Fernet.generate_key().decode()
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY", key)
+    monkeypatch.setenv("ENCRYPTION_KEY", key)  # Read by spawned pool workers
+    certificate_cache.clear()
+    yield
+    batch_signing.shutdown_signing_pool()
+    certificate_cache.clear()
+
+
+@pytest.fixture(scope="module")
+def key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Board Secretary")])
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=30))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert
+
+
+@pytest.fixture
+def setup(db_session, key_and_cert):
+    key, cert = key_and_cert
+    user = User(id="user-1", email="secretary@example.com", username="secretary",
+                full_name="Board Secretary", hashed_password="x", is_verified=True)
+    provider = DigitalSignatureProvider(id="provider-1", name="Internal",
+                                        provider_type=SignatureProviderType.CERTIFICATE_BASED)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.BestAvailableEncryption(PASSWORD.encode())
+    )
+    certificate = SignatureCertificate(
+        id="cert-1", user_id=user.id, certificate_name="Secretary",
+        certificate_data=cert.public_bytes(serialization.Encoding.DER),
+        private_key_encrypted=Fernet(settings.ENCRYPTION_KEY.encode()).encrypt(pem)
+    )
+    documents = [
+        Document(id=f"doc-{i}", title=f"Resolution {i}", content={"ops": []}) for i in range(1, 5)
+    ]
+    db_session.add_all([user, provider, certificate] + documents)
+    db_session.commit()
+    return user, cert
+
+
+def _pdf(label: str) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(72, 720, label)
+    c.save()
+    return buffer.getvalue()
+
+
+def _batch(count: int):
+    return [BatchDocument(f"doc-{i}", _pdf(f"Resolution {i}")) for i in range(1, count + 1)]
+
+
+class TestBatchSigning:
+    """Test signing many documents in one batch"""
+
+    @pytest.mark.asyncio
+    async def test_sign_batch(self, db_session, setup):
+        user, cert = setup
+        progress = []
+
+        batch = await BatchSigningService(db_session).sign_batch(
+            "provider-1", "cert-1", PASSWORD, _batch(3), user,
+            progress=lambda p, result: progress.append((p.completed, result.document_id))
+        )
+
+        assert (batch.progress.succeeded, batch.progress.failed) == (3, 0)
+        assert [completed for completed, _ in progress] == [1, 2, 3]
+        assert batch.compliance_validations == 1
+        for result in batch.results:
+            assert verify_incremental_signature(result.signed_content, cert.public_key()) is True
+
+        requests = db_session.query(DigitalSignatureRequest).all()
+        assert len(requests) == 3
+        assert {r.status for r in requests} == {SignatureStatus.SIGNED}
+        assert {r.external_request_id for r in requests} == {batch.batch_id}
+        assert db_session.query(DigitalSignature).filter(
+            DigitalSignature.status == SignatureStatus.SIGNED
+        ).count() == 3
+        event_types = sorted(e.event_type for e in db_session.query(SignatureEvent).all())
+        assert event_types == ["compliance_validation"] * 3 + ["document_signed"] * 3
+        for request in requests:
+            assert verify_chain(db_session, request.id)["verified_events"] == 2
+        assert db_session.query(SignatureEvent).filter(SignatureEvent.sequence.is_(None)).count() == 0
+        assert db_session.get(SignatureCertificate, "cert-1").usage_count == 3
+
+    @pytest.mark.asyncio
+    async def test_rows_are_written_in_bulk(self, db_session, setup):
+        user, _ = setup
+        inserts = []
+        event.listen(db_session.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: inserts.append(statement)
+                     if statement.startswith("INSERT") else None)
+
+        await BatchSigningService(db_session).sign_batch("provider-1", "cert-1", PASSWORD, _batch(4), user)
+
+        tables = [statement.split()[2] for statement in inserts]
+        assert sorted(tables) == ["digital_signature_requests", "digital_signatures", "signature_events"]
+
+    @pytest.mark.asyncio
+    async def test_distinct_inputs_are_validated_separately(self, db_session, setup):
+        user, _ = setup
+        documents = _batch(3)
+        documents[0].title = "Consumer notice"
+
+        batch = await BatchSigningService(db_session).sign_batch(
+            "provider-1", "cert-1", PASSWORD, documents, user
+        )
+
+        assert batch.compliance_validations == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_document_does_not_fail_batch(self, db_session, setup):
+        user, _ = setup
+        documents = _batch(2) + [BatchDocument("doc-3", b"not a pdf")]
+
+        batch = await BatchSigningService(db_session).sign_batch(
+            "provider-1", "cert-1", PASSWORD, documents, user
+        )
+
+        assert (batch.progress.succeeded, batch.progress.failed) == (2, 1)
+        failed = db_session.query(DigitalSignatureRequest).filter(
+            DigitalSignatureRequest.document_id == "doc-3"
+        ).one()
+        assert failed.status == SignatureStatus.ERROR
+        assert db_session.query(SignatureEvent).filter(SignatureEvent.event_type == "signing_failed").count() == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_errors(self, db_session, setup):
+        user, _ = setup
+        service = BatchSigningService(db_session)
+
+        with pytest.raises(ValueError, match="unlock"):
+            await service.sign_batch("provider-1", "cert-1", "wrong", _batch(1), user)
+        with pytest.raises(ValueError, match="doc-404"):
+            await service.sign_batch("provider-1", "cert-1", PASSWORD, [BatchDocument("doc-404", b"")], user)
+
+        db_session.get(SignatureCertificate, "cert-1").is_revoked = True
+        db_session.commit()
+        with pytest.raises(ValueError, match="revoked"):
+            await service.sign_batch("provider-1", "cert-1", PASSWORD, _batch(1), user)
+        assert db_session.query(DigitalSignatureRequest).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self, db_session, setup, monkeypatch):
+        user, cert = setup
+        monkeypatch.setattr(settings, "SIGNATURE_BATCH_WORKERS", 2)
+        monkeypatch.setattr(settings, "SIGNATURE_BATCH_MIN_PARALLEL", 2)
+        service = BatchSigningService(db_session)
+
+        signed = await service.sign_batch("provider-1", "cert-1", PASSWORD, _batch(4), user)
+        assert signed.progress.succeeded == 4
+        assert batch_signing._pool is not None
+
+        documents = [BatchDocument(r.document_id, r.signed_content) for r in signed.results]
+        tampered = bytearray(documents[0].content)
+        tampered[200] ^= 0x01
+        documents[0].content = bytes(tampered)
+        verified = await service.verify_batch("cert-1", documents, user)
+
+        assert verified.progress.succeeded == 3
+        tampered = [r for r in verified.results if not r.success]
+        assert tampered[0].signature_intact is False
+
+    @pytest.mark.asyncio
+    async def test_update_appended_after_signing_fails_verification(self, db_session, setup):
+        user, _ = setup
+        service = BatchSigningService(db_session)
+        signed = await service.sign_batch("provider-1", "cert-1", PASSWORD, _batch(2), user)
+
+        documents = [BatchDocument(r.document_id, r.signed_content) for r in signed.results]
+        amended = IncrementalPdf(documents[0].content)
+        amended.updates["/Title"] = "Amended"
+        documents[0].content = amended.to_bytes()
+        verified = await service.verify_batch("cert-1", documents, user)
+
+        assert verified.progress.succeeded == 1
+        failed, = [r for r in verified.results if not r.success]
+        assert (failed.document_id, failed.signature_intact) == (documents[0].document_id, False)
+        assert failed.error == "Document was modified after signing"
+
+
+class TestBatchEndpoint:
+    """Test the batch API and its progress stream"""
+
+    @pytest.fixture
+    def client(self, db_session, setup):
+        from app.main import app
+
+        user, _ = setup
+        app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_current_verified_user] = lambda: user
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.clear()
+
+    def _body(self, count: int):
+        return {
+            "provider_id": "provider-1",
+            "certificate_id": "cert-1",
+            "private_key_password": PASSWORD,
+            "documents": [
+                {"document_id": d.document_id, "content": base64.b64encode(d.content).decode()}
+                for d in _batch(count)
+            ]
+        }
+
+    def test_sign_and_verify(self, client):
+        response = client.post("/api/v1/digital-signatures/batch/sign", json=self._body(2))
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2
+
+        response = client.post("/api/v1/digital-signatures/batch/verify", json={
+            "certificate_id": "cert-1",
+            "documents": [
+                {"document_id": r["document_id"], "content": r["signed_content"]} for r in data["results"]
+            ]
+        })
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 2
+
+    def test_progress_stream(self, client):
+        response = client.post("/api/v1/digital-signatures/batch/sign?stream=true", json=self._body(3))
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["event"] for line in lines] == ["progress"] * 3 + ["result"]
+        assert [line["completed"] for line in lines[:3]] == [1, 2, 3]
+        assert lines[-1]["succeeded"] == 3
+
+    def test_batch_error(self, client):
+        body = self._body(1)
+        body["private_key_password"] = "wrong"
+        assert client.post("/api/v1/digital-signatures/batch/sign", json=body).status_code == 400
@@ -0,0 +1,115 @@
+"""
+Tests for business calendar working-time lookups
+"""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.workflow import Workflow, WorkflowStatus, BusinessCalendar
+from app.services.business_calendar_service import (
+    BusinessCalendarService, CompiledCalendar, BusinessCalendarError, OFFICE_HOURS
+)
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class TestCompiledCalendar:
+    """Test working-time arithmetic on the interval index"""
+
+    @pytest.mark.parametrize("start,hours,expected", [
+        (datetime(2026, 3, 4, 10, 0), 3, datetime(2026, 3, 4, 13, 0)),    # Within one day
+        (datetime(2026, 3, 6, 15, 0), 4, datetime(2026, 3, 9, 11, 0)),    # Over the weekend
+        (datetime(2026, 3, 6, 17, 0), 8, datetime(2026, 3, 9, 17, 0)),    # Starts after hours
+        (datetime(2026, 3, 7, 12, 0), 1, datetime(2026, 3, 9, 10, 0)),    # Starts on Saturday
+    ])
+    def test_add_hours(self, start, hours, expected):
+        assert OFFICE_HOURS.add_hours(start, hours) == expected
+
+    def test_hours_between_is_inverse_of_add(self):
+        start = datetime(2026, 3, 6, 15, 0)
+        assert OFFICE_HOURS.hours_between(start, datetime(2026, 3, 9, 11, 0)) == 4
+        assert OFFICE_HOURS.hours_between(start, OFFICE_HOURS.add_hours(start, 123)) == 123
+        assert OFFICE_HOURS.hours_between(datetime(2026, 3, 7), datetime(2026, 3, 8)) == 0
+
+    def test_far_dates_extend_the_index(self):
+        start = datetime(2026, 3, 2, 9, 0)
+        # 600 working days of 8 hours, well past the initial window
+        assert OFFICE_HOURS.add_hours(start, 8 * 600).weekday() < 5
+        assert OFFICE_HOURS.hours_between(datetime(2020, 1, 6, 9, 0), datetime(2020, 1, 7, 9, 0)) == 8
+
+    def test_time_zone_and_holidays(self):
+        calendar = CompiledCalendar("America/Toronto", holidays=["2026-03-09"])
+
+        # Friday 16:00 EST plus two hours runs past the Monday holiday into Tuesday (now EDT)
+        assert calendar.add_hours(datetime(2026, 3, 6, 21, 0), 2) == datetime(2026, 3, 10, 14, 0)
+        assert not calendar.is_working_time(datetime(2026, 3, 9, 15, 0))
+        assert calendar.next_working_time(datetime(2026, 3, 9, 15, 0)) == datetime(2026, 3, 10, 13, 0)
+
+        aware = datetime(2026, 3, 6, 21, 0, tzinfo=timezone.utc)
+        assert calendar.add_hours(aware, 1) == datetime(2026, 3, 6, 22, 0, tzinfo=timezone.utc)
+
+    def test_full_working_days(self):
+        days = OFFICE_HOURS.full_working_days()
+        assert days.add_hours(datetime(2026, 3, 6, 12, 0), 24) == datetime(2026, 3, 9, 12, 0)
+        assert days.is_working_time(datetime(2026, 3, 6, 23, 0))
+
+    @pytest.mark.parametrize("kwargs", [
+        {"timezone_name": "Mars/Olympus"},
+        {"working_hours": {"mon": [["17:00", "09:00"]]}},
+        {"working_hours": {"funday": [["09:00", "17:00"]]}},
+        {"working_hours": {}},
+    ])
+    def test_invalid_definitions(self, kwargs):
+        with pytest.raises(BusinessCalendarError):
+            CompiledCalendar(**kwargs)
+
+
+class TestBusinessCalendarService:
+    """Test calendar resolution for workflows"""
+
+    def test_workflow_calendar_resolution(self, db_session):
+        db_session.add_all([
+            BusinessCalendar(id="cal-default", name="Head office", is_default=True),
+            BusinessCalendar(id="cal-24x7", name="Operations",
+                             working_hours={day: [["00:00", "24:00"]] for day in
+                                            ("mon", "tue", "wed", "thu", "fri", "sat", "sun")}),
+            Workflow(id="wf-ops", name="Ops", document_type="policy", status=WorkflowStatus.ACTIVE,
+                     business_calendar_id="cal-24x7"),
+            Workflow(id="wf-plain", name="Plain", document_type="policy", status=WorkflowStatus.ACTIVE)
+        ])
+        db_session.commit()
+        service = BusinessCalendarService(db_session)
+        saturday = datetime(2026, 3, 7, 12, 0)
+
+        assert service.due_date("wf-ops", saturday, 5) == datetime(2026, 3, 7, 17, 0)
+        assert service.due_date("wf-plain", saturday, 5) == datetime(2026, 3, 9, 14, 0)
+        assert service.workflow_calendar("wf-ops") is service.workflow_calendar("wf-ops")
+
+        workflow = db_session.query(Workflow).get("wf-ops")
+        workflow.business_calendar_id = None
+        db_session.commit()
+        assert service.due_date("wf-ops", saturday, 5) == datetime(2026, 3, 9, 14, 0)
+
+    def test_without_calendars_due_dates_use_wall_clock(self, db_session):
+        db_session.add(Workflow(id="wf-1", name="Plain", document_type="policy", status=WorkflowStatus.ACTIVE))
+        db_session.commit()
+        service = BusinessCalendarService(db_session)
+        saturday = datetime(2026, 3, 7, 12, 0)
+
+        assert service.workflow_calendar("wf-1") is None
+        assert service.due_date("wf-1", saturday, 5) == datetime(2026, 3, 7, 17, 0)
+        assert service.business_calendar("wf-1") is OFFICE_HOURS
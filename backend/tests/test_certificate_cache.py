@@ -0,0 +1,161 @@
+"""
+Tests for the certificate material cache
+"""
+import io
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from cryptography import x509
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from reportlab.pdfgen import canvas
+
+from app.core.config import settings
+from app.models.digital_signature import SignatureCertificate
+from app.services.digital_signature import certificate_service
+from app.services.digital_signature.certificate_cache import CERTIFICATE, CertificateCache, certificate_cache
+from app.services.digital_signature.certificate_service import CertificateSignatureService
+from app.services.digital_signature.pdf_signing import verify_incremental_signature
+
+PASSWORD = "board-secret"
+
+
+@pytest.fixture(autouse=True)
+def cache_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY", Fernet.generate_key().decode())
+    monkeypatch.setattr(settings, "CERTIFICATE_KEY_CACHE_ENABLED", True)
+    certificate_cache.clear()
+    yield
+    certificate_cache.clear()
+
+
+@pytest.fixture(scope="module")
+def key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Board Secretary")])
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=30))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert
+
+
+@pytest.fixture
+def certificate(key_and_cert):
+    key, cert = key_and_cert
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.BestAvailableEncryption(PASSWORD.encode())
+    )
+    return SignatureCertificate(
+        id="cert-cache-1", user_id="user-1", certificate_name="Secretary",
+        certificate_data=cert.public_bytes(serialization.Encoding.DER),
+        private_key_encrypted=Fernet(settings.ENCRYPTION_KEY.encode()).encrypt(pem),
+        is_revoked=False, updated_at=datetime(2026, 10, 1)
+    )
+
+
+@pytest.fixture
+def service():
+    return CertificateSignatureService(SimpleNamespace(certificate_storage_path=None))
+
+
+def _pdf() -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    c.drawString(72, 720, "Minutes")
+    c.save()
+    return buffer.getvalue()
+
+
+class TestCertificateCache:
+    """Test bounds, expiry and versioning"""
+
+    def test_bounded_lru(self, certificate):
+        cache = CertificateCache(max_size=2)
+        for kind in ("a", "b", "c"):
+            cache.get_or_load(kind, certificate, lambda: kind)
+        assert len(cache) == 2
+
+        loads = []
+        cache.get_or_load("a", certificate, lambda: loads.append("a") or "a")
+        assert loads == ["a"]  # Evicted as least recently used
+
+    def test_expired_entries_reload(self, certificate):
+        cache = CertificateCache()
+        cache.get_or_load(CERTIFICATE, certificate, lambda: "v1", ttl_seconds=0)
+        assert cache.get_or_load(CERTIFICATE, certificate, lambda: "v2") == "v2"
+
+    def test_new_version_is_a_new_key(self, certificate):
+        cache = CertificateCache()
+        cache.get_or_load(CERTIFICATE, certificate, lambda: "v1")
+
+        certificate.updated_at = datetime(2026, 10, 2)
+        assert cache.get_or_load(CERTIFICATE, certificate, lambda: "v2") == "v2"
+
+    def test_revoked_certificates_are_not_cached(self, certificate):
+        cache = CertificateCache()
+        cache.get_or_load(CERTIFICATE, certificate, lambda: "v1")
+
+        certificate.is_revoked = True
+        assert cache.get_or_load(CERTIFICATE, certificate, lambda: "v2") == "v2"
+        assert len(cache) == 0
+
+
+class TestCachedSigning:
+    """Test the service pays parsing and decryption once per certificate"""
+
+    @pytest.mark.asyncio
+    async def test_batch_signing_unlocks_key_once(self, service, certificate, key_and_cert):
+        _, cert = key_and_cert
+        document = _pdf()
+
+        with patch.object(certificate_service.serialization, "load_pem_private_key",
+                          wraps=serialization.load_pem_private_key) as load_key, \
+             patch.object(certificate_service.x509, "load_der_x509_certificate",
+                          wraps=x509.load_der_x509_certificate) as load_cert:
+            for _ in range(5):
+                success, signed, error = await service.sign_document(document, certificate, PASSWORD)
+                assert success, error
+                assert verify_incremental_signature(signed, cert.public_key()) is True
+
+        assert load_key.call_count == 1
+        assert load_cert.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_wrong_password_is_not_served_from_cache(self, service, certificate):
+        assert (await service.sign_document(_pdf(), certificate, PASSWORD))[0] is True
+
+        success, _, error = await service.sign_document(_pdf(), certificate, "wrong")
+        assert success is False and error
+
+    @pytest.mark.asyncio
+    async def test_key_cache_is_opt_in(self, service, certificate, monkeypatch):
+        monkeypatch.setattr(settings, "CERTIFICATE_KEY_CACHE_ENABLED", False)
+
+        with patch.object(certificate_service.serialization, "load_pem_private_key",
+                          wraps=serialization.load_pem_private_key) as load_key:
+            for _ in range(3):
+                assert (await service.sign_document(_pdf(), certificate, PASSWORD))[0] is True
+
+        assert load_key.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_revoke_evicts(self, service, certificate):
+        await service.sign_document(_pdf(), certificate, PASSWORD)
+        chain = await service.get_certificate_chain(certificate)
+        assert len(chain) == 1 and len(certificate_cache) == 3  # Key, certificate, chain
+
+        success, _ = await service.revoke_certificate(certificate.id)
+
+        assert success is True
+        assert len(certificate_cache) == 0
@@ -0,0 +1,237 @@
+"""
+Tests for incremental PDF signing
+"""
+import io
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.x509.oid import NameOID
+from PyPDF2 import PdfReader, PdfWriter
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from app.services.digital_signature.certificate_service import CertificateSignatureService
+from app.services.digital_signature.pdf_signing import (
+    IncrementalPdf, PdfSigningError, verify_incremental_signature
+)
+
+PROVIDER = SimpleNamespace(certificate_storage_path=None)
+
+
+def _pdf(pages: int = 3) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(pages):
+        for line in range(40):
+            c.drawString(72, 720 - line * 16, f"Governance packet page {page + 1}, line {line + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Board Secretary")])
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=30))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert
+
+
+@pytest.fixture
+def signers():
+    return [
+        SimpleNamespace(signer_email="chair@example.com", signer_name="Chair"),
+        SimpleNamespace(signer_email="treasurer@example.com", signer_name=None),
+    ]
+
+
+class TestIncrementalPdf:
+    """Test field preparation and signing as an incremental update"""
+
+    def test_prepared_document_keeps_original_bytes(self, signers):
+        original = _pdf()
+        prepared = IncrementalPdf(original).add_signature_fields(signers).to_bytes()
+
+        assert prepared.startswith(original)
+        reader = PdfReader(io.BytesIO(prepared))
+        assert len(reader.pages) == 3
+        assert reader.metadata["/SignerEmail1"] == "chair@example.com"
+        assert reader.metadata["/SignatureField2"] == "signature_2_treasurer@example.com"
+        assert reader.metadata["/SignerName2"] == ""
+
+    def test_sign_and_verify(self, key_and_cert, signers):
+        key, cert = key_and_cert
+        prepared = IncrementalPdf(_pdf()).add_signature_fields(signers).to_bytes()
+
+        signed = IncrementalPdf(prepared).sign(key, {"/SignatureReason": "Approval"}).to_bytes()
+
+        assert signed.startswith(prepared)
+        reader = PdfReader(io.BytesIO(signed))
+        assert reader.metadata["/SignatureReason"] == "Approval"
+        assert reader.metadata["/SignerEmail1"] == "chair@example.com"
+        assert verify_incremental_signature(signed, cert.public_key(), reader) is True
+
+    def test_tampering_is_detected(self, key_and_cert):
+        key, cert = key_and_cert
+        signed = bytearray(IncrementalPdf(_pdf()).sign(key, {"/SignatureReason": "Approval"}).to_bytes())
+
+        signed[200] ^= 0x01  # Inside the original document's bytes
+        assert verify_incremental_signature(bytes(signed), cert.public_key()) is False
+
+    def test_signed_attributes_are_covered(self, key_and_cert):
+        key, cert = key_and_cert
+        signed = IncrementalPdf(_pdf()).sign(key, {"/SignatureReason": "Approval"}).to_bytes()
+
+        # A later update that rewrites a signed attribute invalidates the signature
+        altered = IncrementalPdf(signed)
+        altered.updates["/SignatureReason"] = "Rejected"
+        assert verify_incremental_signature(altered.to_bytes(), cert.public_key()) is False
+
+    def test_later_updates_are_detected(self, key_and_cert):
+        key, cert = key_and_cert
+        signed = IncrementalPdf(_pdf()).sign(key, {"/SignatureReason": "Approval"}).to_bytes()
+
+        # An update that leaves every signed entry alone still changes the document
+        appended = IncrementalPdf(signed)
+        appended.updates["/Title"] = "Amended"
+        amended = appended.to_bytes()
+        assert PdfReader(io.BytesIO(amended)).metadata["/SignatureReason"] == "Approval"
+        assert verify_incremental_signature(amended, cert.public_key()) is False
+        assert verify_incremental_signature(signed + b"\n% trailing\n", cert.public_key()) is False
+
+    def test_signature_value_is_excluded_from_range(self, key_and_cert):
+        key, cert = key_and_cert
+        signed = bytearray(IncrementalPdf(_pdf()).sign(key, {"/SignatureReason": "Approval"}).to_bytes())
+
+        # The signed update itself is covered, not just the original document
+        position = signed.rindex(b"/SignatureReason")
+        signed[position + len(b"/SignatureReason (")] ^= 0x01
+        assert verify_incremental_signature(bytes(signed), cert.public_key()) is False
+
+    def test_ec_key(self):
+        key = ec.generate_private_key(ec.SECP256R1())
+        pdf = IncrementalPdf(_pdf(1)).sign(key, {"/SignatureReason": "Approval"})
+
+        assert pdf.to_bytes() == pdf.to_bytes()
+        assert verify_incremental_signature(pdf.to_bytes(), key.public_key()) is True
+
+    def test_unsigned_document(self, key_and_cert):
+        _, cert = key_and_cert
+        assert verify_incremental_signature(_pdf(), cert.public_key()) is None
+
+    def test_write_streams_same_bytes(self, key_and_cert):
+        key, _ = key_and_cert
+        pdf = IncrementalPdf(_pdf()).sign(key, {"/SignatureReason": "Approval"})
+        output = io.BytesIO()
+
+        written = pdf.write(output)
+
+        assert output.getvalue() == pdf.to_bytes()
+        assert written == len(output.getvalue())
+
+    def test_rejects_non_pdf(self):
+        with pytest.raises(Exception):
+            IncrementalPdf(b"not a pdf")
+
+    def test_unsupported_key_type(self):
+        with pytest.raises(PdfSigningError):
+            IncrementalPdf(_pdf(1)).sign(object(), {})
+
+
+class TestCertificateServiceSigning:
+    """Test the certificate service uses the in-memory pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_prepare_and_sign_without_temp_files(self, key_and_cert, signers, monkeypatch):
+        key, cert = key_and_cert
+        service = CertificateSignatureService(PROVIDER)
+        monkeypatch.setattr(tempfile, "mkdtemp", lambda *a, **k: pytest.fail("temp directory created"))
+
+        prepared = await service._prepare_document_for_signing(_pdf(), "Budget", signers)
+        signed = await service._create_pdf_signature(prepared, key, cert, "Approval", "CA-DMS")
+
+        assert isinstance(signed, bytes) and signed.startswith(prepared)
+        assert verify_incremental_signature(signed, cert.public_key()) is True
+
+    @pytest.mark.asyncio
+    async def test_sign_with_fields_in_one_update(self, key_and_cert, signers):
+        key, cert = key_and_cert
+        original = _pdf()
+
+        signed = await CertificateSignatureService(PROVIDER)._create_pdf_signature(
+            original, key, cert, "Approval", "CA-DMS", signers
+        )
+
+        # One increment: the original file's %%EOF plus the update's
+        assert signed.count(b"%%EOF") == original.count(b"%%EOF") + 1
+        metadata = PdfReader(io.BytesIO(signed)).metadata
+        assert metadata["/SignerEmail2"] == "treasurer@example.com"
+        assert metadata["/SignerName"] == cert.subject.rfc4514_string()
+
+    @pytest.mark.asyncio
+    async def test_create_signature_from_path(self, key_and_cert):
+        key, cert = key_and_cert
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_pdf(1))
+            signed = await CertificateSignatureService(PROVIDER)._create_pdf_signature(
+                path, key, cert, "Approval", "CA-DMS"
+            )
+        finally:
+            os.remove(path)
+
+        assert verify_incremental_signature(signed, cert.public_key()) is True
+
+
+class TestSigningMemory:
+    """Benchmark peak memory of a full rewrite against the incremental update"""
+
+    def _peak(self, fn) -> int:
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_incremental_signing_uses_less_memory(self, key_and_cert, signers):
+        key, _ = key_and_cert
+        document = _pdf(pages=60)
+
+        def rewrite():
+            # Former pipeline: copy every page through a writer, then again to sign
+            for _ in range(2):
+                reader = PdfReader(io.BytesIO(document))
+                writer = PdfWriter()
+                for page in reader.pages:
+                    writer.add_page(page)
+                writer.add_metadata({"/SignatureReason": "Approval"})
+                writer.write(io.BytesIO())
+
+        def incremental():
+            IncrementalPdf(document).add_signature_fields(signers).sign(
+                key, {"/SignatureReason": "Approval"}
+            ).write(io.BytesIO())
+
+        rewrite_peak = self._peak(rewrite)
+        incremental_peak = self._peak(incremental)
+        print(f"\nPeak memory for {len(document)} byte document: "
+              f"rewrite {rewrite_peak} bytes, incremental {incremental_peak} bytes")
+
+        assert incremental_peak < rewrite_peak
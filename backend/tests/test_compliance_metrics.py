@@ -0,0 +1,227 @@
+"""
+Tests for grouped, cached compliance metrics
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.compliance import (
+    ConsentMethod, ConsentStatus, ConsentType, DataDeletionRequest, DataExportJob,
+    PrivacyImpactAssessment, UserConsent
+)
+from app.models.security import AuditEventType, AuditLog, AuditSeverity
+from app.models.user import User
+from app.services.compliance_metrics import (
+    compute_compliance_metrics, get_compliance_metrics, invalidate_compliance_metrics
+)
+import app.models  # noqa: F401 - register all tables
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_session(engine, monkeypatch):
+    monkeypatch.setattr(settings, "COMPLIANCE_METRICS_CACHE_TTL_SECONDS", 300)
+    invalidate_compliance_metrics()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _selects(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement)
+                 if statement.startswith("SELECT") else None)
+    return statements
+
+
+def _consent(user_id, consent_type, status, **kwargs):
+    return UserConsent(
+        user_id=user_id, consent_type=consent_type, status=status, method=ConsentMethod.EXPLICIT_FORM,
+        purpose="Board records", consent_version="1.0", **kwargs
+    )
+
+
+def _seed_users(db, count):
+    db.add_all([
+        User(id=f"user-{i}", email=f"member{i}@example.com", username=f"member{i}", hashed_password="x")
+        for i in range(count)
+    ])
+
+
+def _legacy_metrics(db, now):
+    """The per-counter COUNT queries the metrics used to run, for comparison"""
+    since = now - timedelta(days=30)
+    db.query(User).filter(User.is_active == True).count()
+    db.query(UserConsent.user_id).distinct().count()
+    db.query(UserConsent).filter(and_(UserConsent.status == ConsentStatus.WITHDRAWN,
+                                      UserConsent.withdrawn_at >= since)).count()
+    for consent_type in ConsentType:
+        for status in (ConsentStatus.GRANTED, ConsentStatus.DENIED):
+            db.query(UserConsent).filter(and_(UserConsent.consent_type == consent_type,
+                                              UserConsent.status == status)).count()
+    db.query(PrivacyImpactAssessment).count()
+    db.query(PrivacyImpactAssessment).filter(PrivacyImpactAssessment.status == "draft").count()
+    db.query(PrivacyImpactAssessment).filter(PrivacyImpactAssessment.status == "approved").count()
+    db.query(PrivacyImpactAssessment).filter(PrivacyImpactAssessment.next_review_due < now).count()
+    db.query(DataDeletionRequest).filter(DataDeletionRequest.status.in_(["pending", "verified"])).count()
+    db.query(DataDeletionRequest).filter(and_(DataDeletionRequest.status == "completed",
+                                              DataDeletionRequest.processing_completed_at >= since)).count()
+    db.query(AuditLog).filter(AuditLog.created_at >= since).count()
+    db.query(AuditLog).filter(and_(AuditLog.severity.in_([AuditSeverity.HIGH, AuditSeverity.CRITICAL]),
+                                   AuditLog.created_at >= since)).count()
+    db.query(AuditLog).filter(and_(AuditLog.resource_type.in_(["consent", "data_export", "retention_policy"]),
+                                   AuditLog.created_at >= since)).count()
+
+
+class TestMetrics:
+    """Test counter values"""
+
+    def test_counts(self, db_session):
+        _seed_users(db_session, 3)
+        db_session.add_all([
+            _consent("user-0", ConsentType.MARKETING, ConsentStatus.GRANTED),
+            _consent("user-0", ConsentType.ANALYTICS, ConsentStatus.DENIED),
+            _consent("user-1", ConsentType.MARKETING, ConsentStatus.GRANTED),
+            _consent("user-1", ConsentType.COOKIES, ConsentStatus.WITHDRAWN, withdrawn_at=NOW - timedelta(days=2)),
+            _consent("user-1", ConsentType.COOKIES, ConsentStatus.WITHDRAWN, withdrawn_at=NOW - timedelta(days=90)),
+            PrivacyImpactAssessment(
+                title="Portal", description="Board portal", processing_purpose="Meetings", data_categories=[],
+                data_subjects=[], necessity_justification="-", proportionality_assessment="-", identified_risks=[],
+                risk_likelihood="low", risk_impact="low", overall_risk_level="low", mitigation_measures=[],
+                residual_risk_level="low", status="approved", review_date=NOW - timedelta(days=365),
+                next_review_due=NOW - timedelta(days=1)
+            ),
+            DataDeletionRequest(user_id="user-2", request_type="user_requested", email="member2@example.com",
+                                data_categories=["all"], status="pending"),
+            DataExportJob(user_id="user-0", requested_by="user-0", data_categories=["profile"], file_size=2 * 1024 * 1024),
+            AuditLog(event_type=AuditEventType.SUSPICIOUS_ACTIVITY, severity=AuditSeverity.HIGH, message="Odd"),
+            AuditLog(event_type=AuditEventType.DOCUMENT_VIEWED, severity=AuditSeverity.LOW, message="Export",
+                     resource_type="data_export"),
+            AuditLog(event_type=AuditEventType.LOGIN_SUCCESS, severity=AuditSeverity.LOW, message="Old",
+                     created_at=NOW - timedelta(days=40)),
+        ])
+        db_session.commit()
+
+        metrics = compute_compliance_metrics(db_session, NOW)
+
+        consents = metrics["consent_statistics"]
+        assert consents["total_users"] == 3 and consents["users_with_consent"] == 2
+        assert consents["consent_by_type"]["marketing"] == {"granted": 2, "denied": 0, "total": 2}
+        assert consents["consent_by_type"]["analytics"] == {"granted": 0, "denied": 1, "total": 1}
+        assert consents["consent_by_type"]["cookies"] == {"granted": 0, "denied": 0, "total": 0}
+        assert consents["recent_withdrawals"] == 1
+        assert metrics["pia_status"] == {"total_pias": 1, "draft": 0, "approved": 1, "overdue_reviews": 1}
+        assert metrics["deletion_requests"]["pending"] == 1
+        assert metrics["data_exports"]["requests_last_30_days"] == 1
+        assert metrics["data_exports"]["average_export_size_mb"] == 2.0
+        assert metrics["audit_summary"] == {
+            "total_events_last_30_days": 2, "security_events_last_30_days": 1, "compliance_events_last_30_days": 1
+        }
+
+    def test_empty_database(self, db_session):
+        metrics = compute_compliance_metrics(db_session, NOW)
+        assert metrics["consent_statistics"]["total_users"] == 0
+        assert metrics["data_exports"]["average_export_size_mb"] == 0
+        assert metrics["audit_summary"]["total_events_last_30_days"] == 0
+
+
+class TestCache:
+    """Test caching and invalidation"""
+
+    def test_two_statements_then_cached(self, db_session, engine):
+        selects = _selects(engine)
+        computed_at, first = get_compliance_metrics(db_session)
+        assert len(selects) == 2
+
+        assert get_compliance_metrics(db_session) == (computed_at, first)
+        assert len(selects) == 2
+
+    def test_consent_writes_invalidate(self, db_session):
+        _seed_users(db_session, 1)
+        db_session.commit()
+        computed_at, metrics = get_compliance_metrics(db_session)
+        assert metrics["consent_statistics"]["users_with_consent"] == 0
+
+        consent = _consent("user-0", ConsentType.MARKETING, ConsentStatus.GRANTED)
+        db_session.add(consent)
+        db_session.commit()
+        metrics = get_compliance_metrics(db_session)[1]
+        assert metrics["consent_statistics"]["consent_by_type"]["marketing"]["granted"] == 1
+
+        consent.status = ConsentStatus.WITHDRAWN
+        consent.withdrawn_at = datetime.utcnow()
+        db_session.commit()
+        later, metrics = get_compliance_metrics(db_session)
+        assert metrics["consent_statistics"]["recent_withdrawals"] == 1
+        assert later >= computed_at
+
+    def test_expires_after_ttl(self, db_session, engine, monkeypatch):
+        monkeypatch.setattr(settings, "COMPLIANCE_METRICS_CACHE_TTL_SECONDS", 0)
+        get_compliance_metrics(db_session)
+        selects = _selects(engine)
+        get_compliance_metrics(db_session)
+        assert len(selects) == 2
+
+
+class TestBenchmark:
+    """Compare the grouped queries with the previous per-counter queries on a seeded dataset"""
+
+    def test_fewer_queries_and_faster(self, db_session, engine):
+        users = 500
+        _seed_users(db_session, users)
+        statuses = [ConsentStatus.GRANTED, ConsentStatus.DENIED, ConsentStatus.WITHDRAWN]
+        consent_types = list(ConsentType)
+        db_session.add_all([
+            _consent(f"user-{i % users}", consent_types[i % len(consent_types)], statuses[i % len(statuses)],
+                     withdrawn_at=NOW - timedelta(days=i % 60) if i % len(statuses) == 2 else None)
+            for i in range(6000)
+        ])
+        db_session.add_all([
+            AuditLog(event_type=AuditEventType.DOCUMENT_VIEWED, severity=AuditSeverity.LOW, message="Viewed",
+                     created_at=NOW - timedelta(hours=i))
+            for i in range(4000)
+        ])
+        db_session.commit()
+
+        selects = _selects(engine)
+        start = time.perf_counter()
+        _legacy_metrics(db_session, NOW)
+        legacy_seconds = time.perf_counter() - start
+        legacy_queries = len(selects)
+
+        del selects[:]
+        start = time.perf_counter()
+        compute_compliance_metrics(db_session, NOW)
+        grouped_seconds = time.perf_counter() - start
+        grouped_queries = len(selects)
+
+        start = time.perf_counter()
+        get_compliance_metrics(db_session)
+        get_compliance_metrics(db_session)
+        cached_seconds = time.perf_counter() - start
+
+        print(f"\nlegacy: {legacy_queries} queries, {legacy_seconds * 1000:.1f}ms; "
+              f"grouped: {grouped_queries} queries, {grouped_seconds * 1000:.1f}ms; "
+              f"cold + cached: {cached_seconds * 1000:.1f}ms")
+        assert legacy_queries == 24 and grouped_queries == 2
+        assert grouped_seconds < legacy_seconds
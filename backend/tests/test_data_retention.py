@@ -0,0 +1,171 @@
+"""
+Tests for partition-aware, chunked data retention
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.compliance import DataRetentionPolicy
+from app.models.document import Document
+from app.models.notification import Notification, NotificationType
+from app.models.security import AuditEventType, AuditLog, AuditSeverity
+from app.services.compliance_service import DataRetentionService
+from app.services.table_partitions import Partition, PartitionManager, add_months, partition_name
+import app.models  # noqa: F401 - register all tables
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_session(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _policy(db, resource_type, days=30):
+    policy = DataRetentionPolicy(
+        name=f"{resource_type} retention", data_category=resource_type, resource_type=resource_type,
+        retention_period_days=days, grace_period_days=0, auto_delete_enabled=True,
+        effective_from=NOW - timedelta(days=1000), is_active=True
+    )
+    db.add(policy)
+    db.commit()
+    return policy
+
+
+def _audit_log(age_days, **kwargs):
+    return AuditLog(event_type=AuditEventType.DOCUMENT_VIEWED, severity=AuditSeverity.LOW,
+                    message="Viewed", created_at=NOW - timedelta(days=age_days), **kwargs)
+
+
+def _deletes(engine, table):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement)
+                 if statement.startswith(f"DELETE FROM {table}") else None)
+    return statements
+
+
+class TestPartitionNames:
+    """Test monthly partition bounds"""
+
+    def test_months(self):
+        assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+        assert partition_name("audit_logs", date(2026, 3, 1)) == "audit_logs_p2026_03"
+
+    def test_sqlite_tables_are_not_partitioned(self, db_session):
+        manager = PartitionManager(db_session)
+        assert manager.partitions("audit_logs") == []
+        assert manager.ensure_partitions("audit_logs") == []
+
+
+class TestExpiredData:
+    """Test expired rows are listed without loading whole objects"""
+
+    def test_listing_and_count(self, db_session):
+        _policy(db_session, "audit_logs")
+        db_session.add_all([_audit_log(age) for age in (40, 50, 60, 5)])
+        db_session.add(_audit_log(1, retention_until=NOW - timedelta(hours=1)))
+        db_session.commit()
+        service = DataRetentionService(db_session)
+
+        assert service.count_expired_data("audit_logs", "audit_logs") == 4
+        items = service.get_expired_data("audit_logs", "audit_logs", limit=2)
+        assert [item["created_at"] for item in items] == [NOW - timedelta(days=60), NOW - timedelta(days=50)]
+        assert items[0]["event_type"] == "document_viewed"
+
+
+class TestChunkedDeletion:
+    """Test set-based deletes in committed chunks"""
+
+    def test_audit_logs(self, db_session, engine, monkeypatch):
+        monkeypatch.setattr(settings, "RETENTION_DELETE_CHUNK_SIZE", 2)
+        policy = _policy(db_session, "audit_logs")
+        db_session.add_all([_audit_log(age) for age in (40, 41, 42, 43, 44)])
+        db_session.add_all([
+            _audit_log(45, is_sensitive=True),  # Needs review
+            _audit_log(5),  # Not expired
+        ])
+        db_session.commit()
+        deletes = _deletes(engine, "audit_logs")
+
+        result = DataRetentionService(db_session).execute_automated_deletion(policy)
+
+        assert result["status"] == "completed"
+        assert result["deleted_count"] == 5
+        assert len(deletes) == 3 and all("IN" in statement for statement in deletes)
+        remaining = db_session.query(AuditLog).filter(AuditLog.resource_type.is_(None)).all()
+        assert sorted(log.is_sensitive for log in remaining) == [False, True]
+
+    def test_notifications(self, db_session):
+        policy = _policy(db_session, "notifications")
+        db_session.add_all([
+            Notification(user_id=1, type=NotificationType.EMAIL, content="Old", recipient="a@example.com",
+                         created_at=NOW - timedelta(days=age))
+            for age in (90, 60, 1)
+        ])
+        db_session.commit()
+
+        result = DataRetentionService(db_session).execute_automated_deletion(policy)
+
+        assert result["deleted_count"] == 2
+        assert db_session.query(Notification).count() == 1
+
+    def test_documents_cascade_through_the_orm(self, db_session):
+        policy = _policy(db_session, "documents")
+        db_session.add_all([
+            Document(title="Old", content={"ops": []}, created_at=NOW - timedelta(days=90)),
+            Document(title="New", content={"ops": []}, created_at=NOW - timedelta(days=1)),
+        ])
+        db_session.commit()
+
+        assert DataRetentionService(db_session).execute_automated_deletion(policy)["deleted_count"] == 1
+        assert [doc.title for doc in db_session.query(Document)] == ["New"]
+
+
+class TestPartitionDrops:
+    """Test which months are dropped whole"""
+
+    def test_only_fully_expired_months_without_kept_rows(self, db_session, monkeypatch):
+        policy = _policy(db_session, "audit_logs", days=60)
+        current = date(NOW.year, NOW.month, 1)
+        months = [add_months(current, offset) for offset in (-6, -5, -4, 0)]
+        partitions = [Partition("audit_logs", partition_name("audit_logs", m), m, add_months(m, 1)) for m in months]
+
+        db_session.add_all([
+            _audit_log((NOW - datetime.combine(months[0], datetime.min.time())).days - 1),
+            _audit_log((NOW - datetime.combine(months[1], datetime.min.time())).days - 1, is_sensitive=True),
+            _audit_log((NOW - datetime.combine(months[2], datetime.min.time())).days - 1,
+                       retention_until=NOW + timedelta(days=30)),
+        ])
+        db_session.commit()
+
+        dropped = []
+        monkeypatch.setattr(PartitionManager, "partitions", lambda self, table: partitions)
+        monkeypatch.setattr(PartitionManager, "drop_partition",
+                            lambda self, partition: dropped.append(partition.name) or 7)
+
+        result = DataRetentionService(db_session).execute_automated_deletion(policy)
+
+        assert dropped == [partitions[0].name]
+        assert result["dropped_partitions"] == dropped
+        assert result["deleted_count"] == 7 + 1  # The stubbed drop leaves its row to the chunked delete
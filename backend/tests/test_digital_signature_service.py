@@ -284,18 +284,37 @@ class TestDigitalSignatureService:
             mock_service.cancel_envelope.assert_called_once_with("envelope-123", "Test cancellation")
             mock_log.assert_called_once()
 
-    def test_get_signature_statistics(self, signature_service, mock_db):
-        """Test getting signature statistics"""
-        mock_requests = [
-            Mock(status=SignatureStatus.SIGNED, completed_at=datetime.utcnow(), requested_at=datetime.utcnow() - timedelta(hours=24)),
-            Mock(status=SignatureStatus.PENDING, completed_at=None, requested_at=datetime.utcnow()),
-            Mock(status=SignatureStatus.DECLINED, completed_at=None, requested_at=datetime.utcnow()),
-            Mock(status=SignatureStatus.EXPIRED, completed_at=None, requested_at=datetime.utcnow())
-        ]
-
-        mock_db.query.return_value.all.return_value = mock_requests
+    def test_get_signature_statistics(self):
+        """Test getting signature statistics from grouped aggregates"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from sqlalchemy.pool import StaticPool
+        from app.core.database import Base
+        import app.models  # noqa: F401 - register all tables
+
+        engine = create_engine(
+            "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+        requested_at = datetime.utcnow() - timedelta(hours=30)
+        completed_at = {SignatureStatus.SIGNED: requested_at + timedelta(hours=24)}
+        db.add_all([
+            DigitalSignatureRequest(
+                id=f"request-{status.value}", document_id="doc-1", provider_id="provider-1",
+                title="Resolution", status=status, created_by="user-1", created_at=requested_at,
+                requested_at=requested_at, completed_at=completed_at.get(status)
+            )
+            for status in (SignatureStatus.SIGNED, SignatureStatus.PENDING,
+                           SignatureStatus.DECLINED, SignatureStatus.EXPIRED)
+        ])
+        db.commit()
 
-        stats = signature_service.get_signature_statistics()
+        try:
+            stats = DigitalSignatureService(db).get_signature_statistics()
+        finally:
+            db.close()
 
         assert stats.total_requests == 4
         assert stats.pending_requests == 1
@@ -303,7 +322,7 @@ class TestDigitalSignatureService:
         assert stats.declined_requests == 1
         assert stats.expired_requests == 1
         assert stats.completion_rate == 0.25
-        assert stats.average_completion_time_hours == 24.0
+        assert stats.average_completion_time_hours == pytest.approx(24.0)
 
 
 class TestDocuSignService:
@@ -0,0 +1,194 @@
+"""
+Tests for SQL-aggregated signature statistics and their daily rollups
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.digital_signature import (
+    DigitalSignatureProvider, DigitalSignatureRequest, SignatureEvent, SignatureProviderType,
+    SignatureStatisticsRollup, SignatureStatus
+)
+from app.models.document import Document
+from app.models.user import User
+from app.services.digital_signature_service import DigitalSignatureService
+from app.services.signature_audit_service import SignatureAuditService
+from app.services.signature_statistics_service import split_range
+import app.models  # noqa: F401 - register all tables
+
+DAY = datetime(2025, 3, 3)
+END = DAY + timedelta(days=3) - timedelta(seconds=1)  # Inclusive, 23:59:59 on the third day
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_session(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _request(request_id, provider_id, created_at, status, hours=None):
+    return DigitalSignatureRequest(
+        id=request_id, document_id="doc-1", provider_id=provider_id, title=request_id,
+        status=status, created_by="user-1", created_at=created_at, requested_at=created_at,
+        completed_at=created_at + timedelta(hours=hours) if hours is not None else None
+    )
+
+
+@pytest.fixture
+def requests(db_session):
+    db_session.add_all([
+        User(id="user-1", email="clerk@example.com", username="clerk", hashed_password="x"),
+        Document(id="doc-1", title="Resolution", content={"ops": []}),
+        DigitalSignatureProvider(id="docusign", name="DocuSign", provider_type=SignatureProviderType.DOCUSIGN),
+        DigitalSignatureProvider(id="internal", name="Internal", provider_type=SignatureProviderType.INTERNAL),
+        _request("r1", "docusign", DAY + timedelta(hours=9), SignatureStatus.SIGNED, hours=2),
+        _request("r2", "docusign", DAY + timedelta(hours=15), SignatureStatus.SIGNED, hours=4),
+        _request("r3", "internal", DAY + timedelta(days=1, hours=10), SignatureStatus.PENDING),
+        _request("r4", "internal", DAY + timedelta(days=2, hours=8), SignatureStatus.DECLINED),
+        _request("r5", "docusign", DAY + timedelta(days=2, hours=20), SignatureStatus.SIGNED, hours=12),
+    ])
+    db_session.commit()
+
+
+def _selects(engine, table):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement)
+                 if statement.startswith("SELECT") and f"FROM {table}" in statement else None)
+    return statements
+
+
+class TestSplitRange:
+    """Test which days are served from rollups"""
+
+    def test_whole_settled_days(self):
+        days, live = split_range(datetime(2025, 3, 1, 12), datetime(2025, 3, 4, 6), datetime(2025, 4, 1))
+        assert days == [date(2025, 3, 2), date(2025, 3, 3)]
+        assert live == [(datetime(2025, 3, 1, 12), datetime(2025, 3, 2)),
+                        (datetime(2025, 3, 4), datetime(2025, 3, 4, 6))]
+
+    def test_today_is_never_cached(self):
+        now = datetime(2025, 3, 4, 12)
+        days, live = split_range(datetime(2025, 3, 3), now, now)
+        assert days == [date(2025, 3, 3)]
+        assert live == [(datetime(2025, 3, 4), now)]
+
+
+class TestSignatureStatistics:
+    """Test statistics from grouped aggregates"""
+
+    def test_statistics(self, db_session, requests):
+        stats = DigitalSignatureService(db_session).get_signature_statistics(DAY, END)
+
+        assert (stats.total_requests, stats.completed_requests, stats.pending_requests,
+                stats.declined_requests) == (5, 3, 1, 1)
+        assert stats.completion_rate == pytest.approx(0.6)
+        assert stats.average_completion_time_hours == pytest.approx(6.0)
+        assert stats.median_completion_time_hours == pytest.approx(4.0, rel=0.02)
+        assert stats.p90_completion_time_hours == pytest.approx(12.0, rel=0.02)
+
+    def test_partial_days_are_exact(self, db_session, requests):
+        stats = DigitalSignatureService(db_session).get_signature_statistics(
+            DAY + timedelta(hours=12), DAY + timedelta(days=2, hours=12)
+        )
+        assert stats.total_requests == 3  # r2, r3, r4
+
+    def test_unbounded_range(self, db_session, requests):
+        assert DigitalSignatureService(db_session).get_signature_statistics().total_requests == 5
+
+    def test_historical_days_are_read_from_rollups(self, db_session, engine, requests):
+        service = DigitalSignatureService(db_session)
+        service.get_signature_statistics(DAY, END)
+        assert db_session.query(SignatureStatisticsRollup).count() == 3
+
+        selects = _selects(engine, "digital_signature_requests")
+        stats = service.get_signature_statistics(DAY, END)
+
+        assert stats.total_requests == 5
+        assert selects == []
+
+    def test_changed_request_invalidates_its_day(self, db_session, requests):
+        service = DigitalSignatureService(db_session)
+        service.get_signature_statistics(DAY, END)
+
+        db_session.get(DigitalSignatureRequest, "r3").status = SignatureStatus.SIGNED
+        db_session.commit()
+
+        assert db_session.query(SignatureStatisticsRollup).count() == 2
+        stats = service.get_signature_statistics(DAY, END)
+        assert (stats.completed_requests, stats.pending_requests) == (4, 0)
+
+    def test_provider_statistics(self, db_session, requests):
+        stats = {s.provider_id: s for s in DigitalSignatureService(db_session).get_provider_statistics()}
+
+        assert stats["docusign"].total_requests == 3
+        assert stats["docusign"].success_rate == 1.0
+        assert stats["docusign"].average_response_time_seconds == pytest.approx(6 * 3600)
+        assert stats["docusign"].last_used == DAY + timedelta(days=2, hours=20)
+        assert stats["internal"].success_rate == 0.0
+        assert stats["internal"].average_response_time_seconds is None
+
+
+class TestAuditReports:
+    """Test audit summaries and compliance reports"""
+
+    @pytest.fixture
+    def events(self, db_session, requests):
+        def validation(request_id, at, violations, met):
+            return SignatureEvent(
+                request_id=request_id, event_type="compliance_validation", user_id="user-1",
+                legal_framework_applied="esign_act", occurred_at=at,
+                external_event_data={"violations": violations, "requirements_met": met}
+            )
+        db_session.add_all([
+            validation("r1", DAY + timedelta(hours=9), [], ["consent", "intent"]),
+            validation("r2", DAY + timedelta(hours=15), ["Missing legal notice"], ["intent"]),
+            SignatureEvent(request_id="r2", event_type="compliance_violation", legal_framework_applied="esign_act",
+                           occurred_at=DAY + timedelta(hours=16)),
+            validation("r4", DAY + timedelta(days=2, hours=8), ["Missing legal notice"], []),
+            SignatureEvent(request_id="r4", event_type="document_viewed", occurred_at=DAY + timedelta(days=2)),
+        ])
+        db_session.commit()
+
+    def test_audit_summary(self, db_session, events):
+        summary = SignatureAuditService(db_session).generate_audit_summary(DAY, END)
+
+        assert summary.total_events == 5
+        assert summary.event_types == {"compliance_validation": 3, "compliance_violation": 1, "document_viewed": 1}
+        assert (summary.users_involved, summary.documents_affected) == (1, 1)
+
+    def test_compliance_report(self, db_session, engine, events):
+        service = SignatureAuditService(db_session)
+        report = service.get_compliance_report("esign_act", DAY, END)
+
+        assert report["metrics"] == {
+            "total_requests": 3, "compliant_requests": 2, "compliance_rate": pytest.approx(2 / 3),
+            "total_events": 4, "validation_events": 3
+        }
+        assert report["violations"]["total"] == 2
+        assert report["violations"]["common"] == [{"item": "Missing legal notice", "count": 2}]
+        assert report["requirements"]["total_met"] == 3
+        assert "Review and update legal notice templates" in report["recommendations"]
+
+        # The month's validation payloads are read once; later reports use the rollups
+        payloads = _selects(engine, "signature_events")
+        again = service.get_compliance_report("esign_act", DAY, END)
+        assert again["violations"] == report["violations"]
+        assert not [s for s in payloads if "external_event_data" in s]
@@ -76,7 +76,8 @@ sys.modules['app.services.digital_signature.certificate_service'].CertificateSig
 sys.modules['app.services.digital_signature.compliance_service'].LegalComplianceService = MockLegalComplianceService
 sys.modules['app.services.digital_signature.compliance_service'].ComplianceLevel = MockComplianceLevel
 
-# Now import the service under test
+# Now import the service under test (afresh, in case the application already imported it)
+sys.modules.pop('app.services.digital_signature_service', None)
 from app.services.digital_signature_service import DigitalSignatureService
 from app.schemas.digital_signature import DigitalSignatureProviderCreate
 
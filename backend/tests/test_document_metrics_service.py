@@ -0,0 +1,105 @@
+"""
+Tests for cached document content metrics
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.document import Document
+from app.services import document_metrics_service
+from app.services.document_metrics_service import compute_document_metrics, get_document_metrics
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+DELTA = {
+    "ops": [
+        {"insert": "Board "},
+        {"insert": "meeting", "attributes": {"bold": True}},
+        {"insert": " minutes\nApproved by"},
+        {"insert": {"signature": {"label": "Chair"}}},
+        {"insert": {"image": "logo.png"}},
+        {"insert": "\n"}
+    ]
+}
+
+
+class TestDocumentMetrics:
+    """Test metrics computed from Delta ops"""
+
+    def test_compute_from_delta(self):
+        metrics = compute_document_metrics(DELTA)
+
+        assert metrics.content_length == len("Board meeting minutes\nApproved by") + 2 + 1
+        assert metrics.word_count == 5
+        assert metrics.placeholder_count == 1
+        assert metrics.complexity_score == 5
+
+    def test_empty_and_legacy_content(self):
+        assert compute_document_metrics(None).to_dict() == {
+            "content_length": 0, "word_count": 0, "placeholder_count": 0, "complexity_score": 0
+        }
+        assert compute_document_metrics({"placeholders": [{"id": "p1"}, {"id": "p2"}]}).placeholder_count == 2
+
+    def test_cached_per_version(self, db_session, monkeypatch):
+        document = Document(id="doc-1", title="Minutes", content=DELTA, document_type="minutes", version=1)
+        db_session.add(document)
+        db_session.commit()
+
+        calls = []
+        original = document_metrics_service.compute_document_metrics
+        monkeypatch.setattr(
+            document_metrics_service, "compute_document_metrics",
+            lambda content: calls.append(1) or original(content)
+        )
+
+        assert get_document_metrics(document).word_count == 5
+        assert get_document_metrics(document).word_count == 5
+        assert len(calls) == 1
+
+        document.content = {"ops": [{"insert": "Revised\n"}]}
+        document.version = 2
+        db_session.commit()
+        assert get_document_metrics(document).word_count == 1
+        assert len(calls) == 2
+
+    def test_content_edits_without_version_bump(self, db_session):
+        document = Document(id="doc-1", title="Minutes", content=DELTA, document_type="minutes", version=1)
+        db_session.add(document)
+        db_session.commit()
+        assert get_document_metrics(document).word_count == 5
+
+        # Collaborative edits replace content but leave the version alone
+        document.content = {"ops": [{"insert": "Revised\n"}]}
+        db_session.commit()
+        assert get_document_metrics(document).word_count == 1
+
+    def test_edits_from_another_session_change_the_stamp(self, db_session):
+        document = Document(id="doc-1", title="Minutes", content=DELTA, document_type="minutes", version=1)
+        db_session.add(document)
+        db_session.commit()
+        assert get_document_metrics(document).word_count == 5
+
+        # A write this session's mapper events never see
+        db_session.execute(
+            Document.__table__.update().where(Document.id == "doc-1").values(
+                content={"ops": [{"insert": "Revised\n"}]}, updated_at=datetime(2030, 1, 1)
+            )
+        )
+        db_session.commit()
+        db_session.expire_all()
+        assert get_document_metrics(document).word_count == 1
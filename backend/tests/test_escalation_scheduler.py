@@ -0,0 +1,229 @@
+"""
+Tests for indexed escalation scheduling
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.document import Document
+from app.models.workflow import (
+    Workflow, WorkflowStep, WorkflowInstance, WorkflowStepInstance,
+    WorkflowStatus, WorkflowStepType, WorkflowInstanceStatus, StepInstanceStatus
+)
+from app.models.workflow_conditions import EscalationRule, EscalationInstance
+from app.services.escalation_scheduler import EscalationScheduler
+from app.schemas.workflow import ApprovalAction
+from app.services.escalation_service import EscalationService
+from app.services.workflow_service import WorkflowService
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def workflow(db_session):
+    """Active workflow with one approval step and a running instance"""
+    db_session.add_all([
+        Document(id="doc-1", title="Policy", content={"ops": []}, document_type="policy"),
+        Workflow(id="wf-1", name="Policy Approval", document_type="policy", status=WorkflowStatus.ACTIVE),
+        WorkflowStep(id="step-1", workflow_id="wf-1", name="Review", step_type=WorkflowStepType.APPROVAL,
+                     step_order=1),
+        WorkflowInstance(id="inst-1", workflow_id="wf-1", document_id="doc-1", initiated_by="author",
+                         status=WorkflowInstanceStatus.IN_PROGRESS)
+    ])
+    db_session.commit()
+    return db_session
+
+
+def _rule(db_session, **kwargs):
+    rule = EscalationRule(
+        workflow_id="wf-1", name=kwargs.pop("name", "Overdue"),
+        escalation_chain=[{"type": "user", "user_id": "manager"}, {"type": "user", "user_id": "director"}],
+        **kwargs
+    )
+    db_session.add(rule)
+    db_session.commit()
+    return rule
+
+
+def _step_instance(db_session, id, started_at, status=StepInstanceStatus.IN_PROGRESS):
+    step_instance = WorkflowStepInstance(
+        id=id, workflow_instance_id="inst-1", step_id="step-1", status=status,
+        assigned_to="reviewer", started_at=started_at
+    )
+    db_session.add(step_instance)
+    db_session.flush()
+    return step_instance
+
+
+class TestEscalationScheduler:
+    """Test next escalation time bookkeeping"""
+
+    def test_new_step_scheduled_from_rule(self, workflow):
+        _rule(workflow, trigger_after_hours=24)
+        started_at = datetime(2026, 3, 2, 10, 0)
+        step_instance = _step_instance(workflow, "si-1", started_at)
+
+        EscalationScheduler(workflow).schedule_new_step(step_instance, "wf-1")
+
+        assert step_instance.next_escalation_at == started_at + timedelta(hours=24)
+
+    def test_step_without_rules_is_not_scheduled(self, workflow):
+        step_instance = _step_instance(workflow, "si-1", datetime(2026, 3, 2, 10, 0))
+
+        EscalationScheduler(workflow).schedule_new_step(step_instance, "wf-1")
+
+        assert step_instance.next_escalation_at is None
+
+    def test_rule_change_reschedules_open_steps(self, workflow):
+        started_at = datetime(2026, 3, 2, 10, 0)
+        open_step = _step_instance(workflow, "si-1", started_at)
+        closed_step = _step_instance(workflow, "si-2", started_at, status=StepInstanceStatus.APPROVED)
+        workflow.commit()
+
+        _rule(workflow, trigger_after_hours=8)
+        assert EscalationScheduler(workflow).reschedule_open_steps("wf-1") == 1
+
+        assert open_step.next_escalation_at == started_at + timedelta(hours=8)
+        assert closed_step.next_escalation_at is None
+
+    def test_due_steps_read_from_index(self, workflow):
+        now = datetime(2026, 3, 5, 12, 0)
+        due = _step_instance(workflow, "si-1", now - timedelta(hours=30))
+        later = _step_instance(workflow, "si-2", now)
+        due.next_escalation_at = now - timedelta(hours=6)
+        later.next_escalation_at = now + timedelta(hours=24)
+        workflow.commit()
+
+        assert [si.id for si in EscalationScheduler(workflow).due_steps(now)] == ["si-1"]
+
+    def test_business_hours_rule_counts_working_hours(self, workflow):
+        _rule(workflow, trigger_after_hours=4, business_hours_only=True)
+        _rule(workflow, name="Weekdays", trigger_after_hours=24, exclude_weekends=True)
+        step_instance = _step_instance(workflow, "si-1", datetime(2026, 3, 6, 15, 0))  # Friday afternoon
+
+        EscalationScheduler(workflow).schedule_new_step(step_instance, "wf-1")
+
+        # Two hours on Friday, two more on Monday morning
+        assert step_instance.next_escalation_at == datetime(2026, 3, 9, 11, 0)
+
+
+class TestScheduledEscalationProcessing:
+    """Test escalation processing driven by next_escalation_at"""
+
+    @pytest.fixture
+    def service(self, workflow, monkeypatch):
+        service = EscalationService(workflow)
+        monkeypatch.setattr(service, "_send_escalation_notification", lambda *args: None)
+        return service
+
+    def test_due_step_escalates_and_reschedules(self, workflow, service):
+        now = datetime.utcnow()
+        _rule(workflow, trigger_after_hours=24, notification_intervals=[12, 12])
+        step_instance = _step_instance(workflow, "si-1", now - timedelta(hours=30))
+        service.scheduler.schedule_new_step(step_instance, "wf-1")
+        workflow.commit()
+
+        results = service.process_escalations(now)
+
+        assert results["new_escalations"] == 1
+        assert results["errors"] == []
+        escalation = workflow.query(EscalationInstance).one()
+        assert escalation.escalated_to == "manager"
+        assert step_instance.assigned_to == "manager"
+        assert step_instance.next_escalation_at == escalation.last_escalated_at + timedelta(hours=12)
+
+        # Nothing is due again until the next escalation level
+        assert service.process_escalations(now) == {
+            "processed_escalations": 0, "new_escalations": 0, "resolved_escalations": 0, "errors": []
+        }
+
+    def test_completed_step_resolves_escalation(self, workflow, service):
+        now = datetime.utcnow()
+        _rule(workflow, trigger_after_hours=24)
+        step_instance = _step_instance(workflow, "si-1", now - timedelta(hours=30))
+        service.scheduler.schedule_new_step(step_instance, "wf-1")
+        workflow.commit()
+        service.process_escalations(now)
+
+        step_instance.status = StepInstanceStatus.APPROVED
+        step_instance.completed_at = now
+        step_instance.next_escalation_at = now
+        workflow.commit()
+
+        results = service.process_escalations(now)
+
+        assert results["resolved_escalations"] == 1
+        assert workflow.query(EscalationInstance).one().status == "resolved"
+        assert step_instance.next_escalation_at is None
+
+    def test_failing_step_is_retried_later(self, workflow, service, monkeypatch):
+        now = datetime.utcnow()
+        _rule(workflow, trigger_after_hours=24)
+        failing = _step_instance(workflow, "si-1", now - timedelta(hours=30))
+        healthy = _step_instance(workflow, "si-2", now - timedelta(hours=30))
+        service.scheduler.schedule_steps([failing, healthy])
+        workflow.commit()
+
+        original = service._trigger_escalation
+
+        def trigger(step_instance, rule):
+            if step_instance.id == "si-1":
+                raise RuntimeError("notification backend down")
+            return original(step_instance, rule)
+
+        monkeypatch.setattr(service, "_trigger_escalation", trigger)
+        results = service.process_escalations(now)
+
+        assert results["new_escalations"] == 1
+        assert len(results["errors"]) == 1
+        assert failing.next_escalation_at > now
+        assert workflow.query(EscalationInstance).one().step_instance_id == "si-2"
+
+    def test_max_level_without_auto_approve_is_unscheduled(self, workflow, service):
+        now = datetime.utcnow()
+        _rule(workflow, trigger_after_hours=24, notification_intervals=[1, 1, 1], max_escalation_levels=2)
+        step_instance = _step_instance(workflow, "si-1", now - timedelta(hours=30))
+        service.scheduler.schedule_new_step(step_instance, "wf-1")
+        workflow.commit()
+
+        service.process_escalations(now)
+        results = service.process_escalations(now + timedelta(hours=2))
+
+        assert results["processed_escalations"] == 1
+        assert workflow.query(EscalationInstance).one().current_level == 1
+        assert step_instance.next_escalation_at is None
+        assert service.scheduler.due_steps(now + timedelta(days=30)) == []
+
+        # Completing the step still brings it back to resolve the escalation
+        assert WorkflowService(workflow).process_approval("si-1", ApprovalAction(action="approve"), "director")
+        assert service.process_escalations()["resolved_escalations"] == 1
+
+    def test_each_due_step_is_visited_once_per_tick(self, workflow, service, monkeypatch):
+        now = datetime.utcnow()
+        _rule(workflow, trigger_after_hours=24)
+        steps = [_step_instance(workflow, f"si-{i}", now - timedelta(hours=30)) for i in range(3)]
+        service.scheduler.schedule_steps(steps)
+        workflow.commit()
+
+        # A step that stays due after processing must not be read again in the same tick
+        visits = []
+        monkeypatch.setattr(service.scheduler, "next_escalation_time",
+                            lambda step_instance, *args: visits.append(step_instance.id) or now)
+
+        service.process_escalations(now, batch_size=1)
+
+        assert sorted(visits) == ["si-0", "si-1", "si-2"]
@@ -0,0 +1,291 @@
+"""
+Tests for the batched notification delivery pipeline
+
+Email is delivered to a local SMTP sink so the pool, worker and retry logic
+run against a real SMTP conversation.
+"""
+import smtplib
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.notification import (
+    Notification, NotificationLog, NotificationStatus, NotificationType, NotificationPriority
+)
+from app.services.notification_delivery import (
+    NotificationDeliveryWorker, SMTPConnectionPool, EmailSender, LoggingSender, DeliveryResult,
+    build_email_message
+)
+import app.models  # noqa: F401 - register all tables
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal local SMTP server that records messages and can refuse recipients"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPSinkHandler)
+        self.messages = []
+        self.connections = 0
+        self.rejected_recipients = set()
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 sink ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 sink")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in self.server.rejected_recipients:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    body.append(data_line)
+                with self.server.lock:
+                    self.server.messages.append((recipients, b"".join(body)))
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@pytest.fixture
+def smtp_sink():
+    """Local SMTP sink running in a background thread"""
+    sink = SMTPSink()
+    thread = threading.Thread(target=sink.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield sink
+    finally:
+        sink.shutdown()
+        sink.server_close()
+
+
+@pytest.fixture
+def smtp_pool(smtp_sink):
+    pool = SMTPConnectionPool("127.0.0.1", smtp_sink.port, size=2, timeout=5)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _queue(db_session, count, recipient="member{}@example.com", **kwargs):
+    notifications = [
+        Notification(
+            user_id=1, type=kwargs.get("type", NotificationType.EMAIL),
+            priority=kwargs.get("priority", NotificationPriority.NORMAL),
+            subject=f"Notice {i}", content=f"Body {i}", recipient=recipient.format(i),
+            status=NotificationStatus.PENDING, scheduled_at=datetime.utcnow() - timedelta(minutes=1),
+            retry_count=0, max_retries=kwargs.get("max_retries", 3)
+        )
+        for i in range(count)
+    ]
+    db_session.add_all(notifications)
+    db_session.commit()
+    return notifications
+
+
+def _worker(db_session, smtp_pool, **kwargs):
+    senders = {
+        NotificationType.EMAIL: EmailSender(pool=smtp_pool, sender="noreply@example.com"),
+        NotificationType.SMS: LoggingSender(NotificationType.SMS),
+    }
+    return NotificationDeliveryWorker(db_session, senders=senders, **kwargs)
+
+
+class TestSMTPConnectionPool:
+    """Test connection reuse against the SMTP sink"""
+
+    def test_connections_are_reused(self, smtp_sink, smtp_pool):
+        for i in range(10):
+            smtp_pool.send_message(build_email_message("Hi", f"Body {i}", "a@example.com", "noreply@example.com"))
+
+        assert len(smtp_sink.messages) == 10
+        assert smtp_sink.connections == 1
+        assert smtp_pool.connections_opened == 1
+
+    def test_refused_recipient_keeps_connection(self, smtp_sink, smtp_pool):
+        smtp_sink.rejected_recipients.add("gone@example.com")
+
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            smtp_pool.send_message(build_email_message("Hi", "Body", "gone@example.com", "noreply@example.com"))
+        smtp_pool.send_message(build_email_message("Hi", "Body", "a@example.com", "noreply@example.com"))
+
+        assert smtp_pool.connections_opened == 1
+        assert len(smtp_sink.messages) == 1
+
+
+class TestNotificationDeliveryWorker:
+    """Test outbox claiming, delivery and batched status updates"""
+
+    def test_batch_is_delivered_and_recorded(self, db_session, smtp_sink, smtp_pool):
+        _queue(db_session, 5)
+        _queue(db_session, 2, recipient="+1555000{}", type=NotificationType.SMS)
+
+        stats = _worker(db_session, smtp_pool).process_pending()
+
+        assert (stats.claimed, stats.sent, stats.failed) == (7, 7, 0)
+        assert len(smtp_sink.messages) == 5
+        assert smtp_sink.connections <= smtp_pool.size
+        db_session.expire_all()
+        assert {n.status for n in db_session.query(Notification)} == {NotificationStatus.SENT}
+        assert db_session.query(Notification).filter(Notification.claimed_by.isnot(None)).count() == 0
+        assert db_session.query(NotificationLog).filter(NotificationLog.event_type == "sent").count() == 7
+
+    def test_failures_back_off_until_retries_run_out(self, db_session, smtp_sink, smtp_pool):
+        smtp_sink.rejected_recipients.add("gone@example.com")
+        notification, = _queue(db_session, 1, recipient="gone@example.com", max_retries=2)
+        worker = _worker(db_session, smtp_pool)
+
+        stats = worker.process_pending()
+        db_session.refresh(notification)
+        assert (stats.failed, stats.exhausted) == (1, 0)
+        assert notification.status == NotificationStatus.FAILED
+        assert notification.retry_count == 1
+        assert notification.scheduled_at > datetime.utcnow()
+        assert worker.claim_batch() == []
+
+        later = notification.scheduled_at + timedelta(seconds=1)
+        messages = worker.claim_batch(now=later)
+        assert [m.notification_id for m in messages] == [notification.id]
+        stats = worker.record_results(messages, [DeliveryResult(notification.id, False, "550 No such user")], now=later)
+        assert stats.exhausted == 1
+        assert worker.claim_batch(now=later + timedelta(days=1)) == []
+
+    def test_claims_are_exclusive_until_lease_expires(self, db_session, smtp_pool):
+        _queue(db_session, 4)
+        first = _worker(db_session, smtp_pool, batch_size=3)
+        second = _worker(db_session, smtp_pool, batch_size=3)
+
+        claimed = first.claim_batch()
+        assert len(claimed) == 3
+        assert len(second.claim_batch()) == 1
+
+        # A worker that died holding a claim releases it when the lease runs out
+        assert second.claim_batch() == []
+        assert len(second.claim_batch(now=datetime.utcnow() + timedelta(hours=1))) == 3
+
+    def test_urgent_notifications_are_claimed_first(self, db_session, smtp_pool):
+        _queue(db_session, 3, priority=NotificationPriority.LOW)
+        urgent, = _queue(db_session, 1, priority=NotificationPriority.URGENT)
+
+        assert _worker(db_session, smtp_pool).claim_batch(limit=1)[0].notification_id == urgent.id
+
+    def test_database_work_runs_off_the_event_loop(self, db_session, smtp_sink, smtp_pool):
+        _queue(db_session, 2)
+        worker = _worker(db_session, smtp_pool)
+        threads = {}
+
+        def traced(name):
+            method = getattr(worker, name)
+
+            def call(*args):
+                threads[name] = threading.get_ident()
+                return method(*args)
+            return call
+
+        worker.claim_batch = traced("claim_batch")
+        worker.record_results = traced("record_results")
+
+        stats = worker.process_pending()
+
+        assert stats.sent == 2
+        assert threading.get_ident() not in threads.values() and len(threads) == 2
+
+
+class TestDeliveryThroughput:
+    """Benchmark pooled, batched delivery against one connection per email"""
+
+    MESSAGES = 200
+
+    def test_pooled_delivery_throughput(self, db_session, smtp_sink):
+        # Baseline: connect, send and quit per email, one at a time
+        started = time.perf_counter()
+        for i in range(self.MESSAGES):
+            with smtplib.SMTP("127.0.0.1", smtp_sink.port, timeout=5) as server:
+                server.send_message(build_email_message("Hi", f"Body {i}", "a@example.com", "noreply@example.com"))
+        per_connection_seconds = time.perf_counter() - started
+        baseline_connections = smtp_sink.connections
+
+        pool = SMTPConnectionPool("127.0.0.1", smtp_sink.port, size=4, timeout=5)
+        try:
+            _queue(db_session, self.MESSAGES)
+            worker = _worker(db_session, pool, batch_size=50)
+            started = time.perf_counter()
+            sent = 0
+            while True:
+                stats = worker.process_pending()
+                if not stats.claimed:
+                    break
+                sent += stats.sent
+            pooled_seconds = time.perf_counter() - started
+        finally:
+            pool.close()
+
+        print(
+            f"\nper-connection: {self.MESSAGES / per_connection_seconds:.0f} msg/s, "
+            f"pooled worker: {self.MESSAGES / pooled_seconds:.0f} msg/s "
+            f"({pool.connections_opened} connections)"
+        )
+        assert sent == self.MESSAGES
+        assert baseline_connections == self.MESSAGES
+        assert pool.connections_opened <= pool.size
+        assert len(smtp_sink.messages) == 2 * self.MESSAGES
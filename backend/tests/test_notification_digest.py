@@ -0,0 +1,118 @@
+"""
+Tests for notification digest coalescing
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.notification import (
+    Notification, NotificationLog, NotificationTemplate, NotificationStatus, NotificationType,
+    NotificationPriority
+)
+from app.models.user import User
+from app.services.notification_delivery import NotificationDeliveryWorker, LoggingSender
+from app.services.notification_digest import NotificationCoalescer, digest_hold_until
+from app.services.notification_service import NotificationService
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add_all([
+        User(id="1", email="chair@example.com", username="chair", hashed_password="x"),
+        User(id="2", email="treasurer@example.com", username="treasurer", hashed_password="x"),
+        NotificationTemplate(
+            name="workflow_approved", type=NotificationType.EMAIL, is_active=True,
+            subject_template="{{ document_title }} approved", content_template="{{ message }}"
+        ),
+    ])
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _notify(db_session, user_id, title, priority=NotificationPriority.NORMAL, topic="workflow_status"):
+    return NotificationService(db_session).create_notification(
+        user_id=user_id, template_name="workflow_approved",
+        template_variables={"document_title": title, "message": f"Step on {title} was approved"},
+        notification_type=NotificationType.EMAIL, priority=priority, digest_topic=topic
+    )
+
+
+class TestDigestHold:
+    """Test which notifications wait for a digest"""
+
+    def test_topic_notifications_are_held(self, db_session):
+        notification = _notify(db_session, "1", "Budget")
+
+        assert notification.digest_key == "1:email:workflow_status"
+        assert notification.scheduled_at > datetime.utcnow() + timedelta(minutes=10)
+
+    def test_urgent_notifications_bypass_the_window(self, db_session):
+        notification = _notify(db_session, "1", "Budget", priority=NotificationPriority.URGENT)
+
+        assert notification.digest_key is None
+        assert notification.scheduled_at <= datetime.utcnow()
+
+    def test_window_can_be_disabled(self):
+        assert digest_hold_until(NotificationPriority.LOW, datetime.utcnow(), window_seconds=0) is None
+
+
+class TestNotificationCoalescer:
+    """Test folding held notifications into digests"""
+
+    def test_group_is_folded_into_one_digest(self, db_session):
+        held = [_notify(db_session, "1", title) for title in ("Budget", "Bylaws", "Minutes")]
+        other_user = _notify(db_session, "2", "Budget")
+        other_topic = _notify(db_session, "1", "Budget", topic="documents")
+        now = held[0].scheduled_at
+
+        stats = NotificationCoalescer(db_session).coalesce(now)
+
+        assert (stats.groups, stats.coalesced, stats.sends_saved) == (1, 3, 2)
+        db_session.expire_all()
+        digest = db_session.query(Notification).filter(Notification.digest_id.is_(None),
+                                                       Notification.digest_key.is_(None)).one()
+        assert digest.subject == "3 workflow status updates"
+        assert "Step on Bylaws was approved" in digest.content
+        assert digest.recipient == "chair@example.com"
+        assert {n.digest_id for n in held} == {digest.id}
+        assert {n.status for n in held} == {NotificationStatus.COALESCED}
+        assert other_user.status == other_topic.status == NotificationStatus.PENDING
+        assert db_session.query(NotificationLog).filter(NotificationLog.event_type == "coalesced").count() == 3
+
+    def test_nothing_happens_inside_the_window(self, db_session):
+        _notify(db_session, "1", "Budget")
+        _notify(db_session, "1", "Bylaws")
+
+        assert NotificationCoalescer(db_session).coalesce(datetime.utcnow()).groups == 0
+
+    def test_worker_sends_digest_and_reports_savings(self, db_session):
+        held = [_notify(db_session, "1", f"Doc {i}") for i in range(5)]
+        _notify(db_session, "1", "Rejected", priority=NotificationPriority.HIGH)
+        held[0].scheduled_at = datetime.utcnow() - timedelta(seconds=1)  # Window of the oldest has passed
+        db_session.commit()
+        worker = NotificationDeliveryWorker(
+            db_session, senders={NotificationType.EMAIL: LoggingSender(NotificationType.EMAIL)}
+        )
+
+        stats = worker.process_pending()
+
+        assert stats.sent == 2  # One digest plus the high priority notification
+        assert (stats.coalesced, stats.sends_saved) == (5, 4)
+        assert db_session.query(Notification).filter(
+            Notification.status == NotificationStatus.COALESCED
+        ).count() == 5
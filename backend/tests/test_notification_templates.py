@@ -0,0 +1,149 @@
+"""
+Tests for compiled notification templates and bulk notification creation
+"""
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.notification import (
+    Notification, NotificationLog, NotificationPreference, NotificationTemplate,
+    NotificationType, NotificationStatus
+)
+from app.models.user import User
+from app.services import notification_service
+from app.services.notification_service import NotificationService, compile_notification_template
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def template(db_session):
+    template = NotificationTemplate(
+        name="document_shared", type=NotificationType.EMAIL,
+        subject_template="{{ document_title }} shared with you",
+        content_template="Hello {{ name | default('member') }}, {{ document_title }} is ready.",
+        is_active=True
+    )
+    db_session.add(template)
+    db_session.commit()
+    return template
+
+
+@pytest.fixture
+def users(db_session):
+    users = [
+        User(id=str(i), email=f"member{i}@example.com", username=f"member{i}", hashed_password="x")
+        for i in range(1, 6)
+    ]
+    db_session.add_all(users)
+    db_session.commit()
+    return users
+
+
+def _count_queries(db_session):
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+class TestCompiledTemplates:
+    """Test that templates compile once per revision"""
+
+    def test_template_is_compiled_once(self, template):
+        notification_service._compiled_templates.clear()
+
+        with patch.object(notification_service, "Template", wraps=notification_service.Template) as compile_:
+            service = NotificationService(None)
+            for i in range(20):
+                subject, content = service._render_template(template, {"document_title": f"Doc {i}"})
+            assert compile_.call_count == 2  # Subject and content
+
+        assert subject == "Doc 19 shared with you"
+        assert content == "Hello member, Doc 19 is ready."
+
+    def test_edited_template_is_recompiled(self, db_session, template):
+        service = NotificationService(db_session)
+        assert service._render_template(template, {"document_title": "A"})[0] == "A shared with you"
+
+        template.subject_template = "New: {{ document_title }}"
+        template.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        db_session.commit()
+
+        assert service._render_template(template, {"document_title": "A"})[0] == "New: A"
+
+    def test_cache_is_bounded(self, template, monkeypatch):
+        monkeypatch.setattr(notification_service, "COMPILED_TEMPLATE_CACHE_SIZE", 3)
+        notification_service._compiled_templates.clear()
+
+        for minute in range(10):
+            template.updated_at = datetime(2026, 1, 1, 0, minute)
+            compile_notification_template(template)
+
+        assert len(notification_service._compiled_templates) == 3
+
+
+class TestBulkNotifications:
+    """Test single-transaction bulk creation"""
+
+    def test_bulk_create_uses_fixed_number_of_queries(self, db_session, template, users):
+        user_ids = [u.id for u in users]
+        statements = _count_queries(db_session)
+
+        results = NotificationService(db_session).create_notifications_bulk(
+            user_ids=user_ids, template_name="document_shared",
+            template_variables={"document_title": "Budget"}, notification_type=NotificationType.EMAIL
+        )
+
+        assert len(results["notifications"]) == 5
+        assert results["errors"] == [] and results["skipped"] == []
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        assert len(selects) == 3  # Template, users, preferences
+        assert db_session.query(Notification).filter(
+            Notification.status == NotificationStatus.PENDING
+        ).count() == 5
+        assert db_session.query(NotificationLog).filter(NotificationLog.event_type == "created").count() == 5
+
+    def test_preferences_and_missing_users(self, db_session, template, users):
+        db_session.add_all([
+            NotificationPreference(user_id=1, notification_type=NotificationType.EMAIL,
+                                   document_shared=False, is_active=True),
+            NotificationPreference(user_id=2, notification_type=NotificationType.EMAIL,
+                                   email_address="board@example.com", is_active=True),
+        ])
+        db_session.commit()
+
+        results = NotificationService(db_session).create_notifications_bulk(
+            user_ids=["1", "2", "3", "404"], template_name="document_shared",
+            template_variables={"document_title": "Budget"}, notification_type=NotificationType.EMAIL,
+            context_data={"event_type": "document_shared"}, recipient_variables={"3": {"name": "Chair"}}
+        )
+
+        assert results["skipped"] == ["1"]
+        assert results["errors"] == ["User 404: User with ID 404 not found"]
+        by_recipient = {n.recipient: n for n in results["notifications"]}
+        assert set(by_recipient) == {"board@example.com", "member3@example.com"}
+        assert by_recipient["member3@example.com"].content == "Hello Chair, Budget is ready."
+        assert by_recipient["board@example.com"].content == "Hello member, Budget is ready."
+
+    def test_unknown_template_raises(self, db_session, users):
+        with pytest.raises(ValueError):
+            NotificationService(db_session).create_notifications_bulk(
+                user_ids=["1"], template_name="missing", template_variables={},
+                notification_type=NotificationType.EMAIL
+            )
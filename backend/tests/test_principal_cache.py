@@ -0,0 +1,166 @@
+"""
+Tests for the authenticated principal cache and batched API key usage
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.dependencies import get_current_user, get_optional_current_user
+from app.core.security import api_key_prefix, create_access_token, hash_api_key
+from app.middleware.api_key_auth import get_api_key_user
+from app.models.external_integration import APIKey
+from app.models.user import User, UserRole
+from app.services.principal_cache import api_key_usage, principal_cache
+import app.models  # noqa: F401 - register all tables
+
+API_KEY = "0a1b2c3d4e5f6071.portal-sync-secret"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine, monkeypatch):
+    monkeypatch.setattr(settings, "PRINCIPAL_CACHE_TTL_SECONDS", 60)
+    principal_cache.clear()
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = factory()
+    session.add(User(id="user-1", email="member@example.com", username="member", hashed_password="x",
+                     role=UserRole.BOARD_MEMBER, permissions=["audit_read"]))
+    session.add(APIKey(id="key-1", name="Portal sync", key_prefix=api_key_prefix(API_KEY),
+                       key_hash=hash_api_key(API_KEY), permissions=["documents:read"], created_by="user-1"))
+    session.commit()
+    session.close()
+    return factory
+
+
+@pytest.fixture
+def statements(engine):
+    captured = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: captured.append(statement))
+    return captured
+
+
+def _bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+class TestBearerTokens:
+    """Test JWT authentication through the cache"""
+
+    @pytest.mark.asyncio
+    async def test_second_request_runs_no_queries(self, session_factory, statements):
+        token = create_access_token({"sub": "user-1"})
+        first = await get_current_user(_bearer(token), session_factory())
+        assert first.id == "user-1" and len(statements) == 1
+
+        db = session_factory()
+        del statements[:]
+        user = await get_current_user(_bearer(token), db)
+
+        assert statements == []
+        assert user in db and user.role == UserRole.BOARD_MEMBER
+        assert user.has_permission("audit_read")
+
+    @pytest.mark.asyncio
+    async def test_deactivation_revokes(self, session_factory):
+        token = create_access_token({"sub": "user-1"})
+        await get_current_user(_bearer(token), session_factory())
+
+        db = session_factory()
+        db.get(User, "user-1").is_active = False
+        db.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(_bearer(token), session_factory())
+        assert exc.value.detail == "User account is disabled"
+        assert await get_optional_current_user(_bearer(token), session_factory()) is None
+
+    @pytest.mark.asyncio
+    async def test_changes_through_cached_user_are_written(self, session_factory):
+        token = create_access_token({"sub": "user-1"})
+        await get_current_user(_bearer(token), session_factory())
+
+        db = session_factory()
+        user = await get_current_user(_bearer(token), db)
+        user.full_name = "Board Member"
+        db.commit()
+
+        assert session_factory().get(User, "user-1").full_name == "Board Member"
+        assert (await get_current_user(_bearer(token), session_factory())).full_name == "Board Member"
+
+    @pytest.mark.asyncio
+    async def test_invalid_token(self, session_factory):
+        with pytest.raises(HTTPException) as exc:
+            await get_current_user(_bearer("not-a-token"), session_factory())
+        assert exc.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_not_cached_past_token_expiry(self, session_factory):
+        token = create_access_token({"sub": "user-1"}, expires_delta=timedelta(seconds=-1))
+        with pytest.raises(HTTPException):
+            await get_current_user(_bearer(token), session_factory())
+        assert principal_cache.get(session_factory(), token) is None
+
+
+class TestAPIKeys:
+    """Test API key authentication through the cache"""
+
+    @pytest.mark.asyncio
+    async def test_cached_key_runs_no_queries_and_usage_is_batched(self, session_factory, statements):
+        credentials = _bearer(API_KEY)
+        await get_api_key_user(credentials, session_factory())
+
+        del statements[:]
+        for _ in range(4):
+            user, api_key = await get_api_key_user(credentials, session_factory())
+        assert statements == []
+        assert user.id == "user-1" and api_key.permissions == ["documents:read"]
+
+        assert api_key_usage.flush() == 1
+        assert [s for s in statements if s.startswith("UPDATE")] == [statements[-1]]
+        api_key = session_factory().get(APIKey, "key-1")
+        assert api_key.usage_count == 5 and api_key.last_used_at is not None
+
+    @pytest.mark.asyncio
+    async def test_deactivated_key_is_revoked(self, session_factory):
+        credentials = _bearer(API_KEY)
+        assert await get_api_key_user(credentials, session_factory()) is not None
+
+        db = session_factory()
+        db.get(APIKey, "key-1").is_active = False
+        db.commit()
+
+        assert await get_api_key_user(credentials, session_factory()) is None
+        api_key_usage.flush()
+
+    @pytest.mark.asyncio
+    async def test_expired_key(self, session_factory):
+        db = session_factory()
+        db.get(APIKey, "key-1").expires_at = datetime.utcnow() - timedelta(minutes=1)
+        db.commit()
+
+        assert await get_api_key_user(_bearer(API_KEY), session_factory()) is None
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_with_valid_prefix(self, session_factory, statements):
+        forged = API_KEY.split(".")[0] + ".guessed-secret"
+        assert await get_api_key_user(_bearer(forged), session_factory()) is None
+        assert len([s for s in statements if s.startswith("SELECT")]) == 1  # One indexed lookup
+        assert await get_api_key_user(_bearer(API_KEY), session_factory()) is not None
+        api_key_usage.flush()
@@ -270,8 +270,9 @@ class TestSecurityService:
         )
 
         assert isinstance(audit_id, str)
-        mock_db.add.assert_called_once()
-        mock_db.commit.assert_called_once()
+        # Low severity events are buffered for the audit log writer, not committed on the request session
+        mock_db.add.assert_not_called()
+        mock_db.commit.assert_not_called()
 
     def test_create_security_alert(self, security_service, mock_db):
         """Test security alert creation"""
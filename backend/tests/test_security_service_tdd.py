@@ -535,7 +535,6 @@ class TestSecurityServiceTDD:
 
         # Test successful transaction
         result = security_service.setup_totp_2fa("user-123")
-        security_service.db.add.assert_called()
         security_service.db.commit.assert_called()
 
         # Test transaction rollback on failure
@@ -559,10 +558,12 @@ class TestSecurityServiceTDD:
         security_service.db.query.return_value.filter.return_value.first.return_value = mock_2fa
 
         # Test with invalid code
-        assert security_service.verify_totp_setup("user-123", "000000") == False
+        with patch("app.services.security_service.get_audit_writer") as get_writer:
+            assert security_service.verify_totp_setup("user-123", "000000") == False
 
         # Should log failed attempt
-        security_service.db.commit.assert_called()
+        row = get_writer.return_value.append.call_args.args[0]
+        assert row["event_type"] == AuditEventType.MFA_FAILURE
 
     def test_verify_totp_login_account_lockout_security(self, security_service):
         """Test account lockout security in TOTP login verification"""
@@ -673,8 +673,8 @@ class TestNotificationService:
             assert result is None
 
     @patch('app.services.notification_service.settings')
-    @patch('app.services.notification_service.smtplib.SMTP')
-    def test_send_notification_email_success(self, mock_smtp, mock_settings, notification_service, mock_db, mock_notification):
+    @patch('app.services.notification_service.get_smtp_pool')
+    def test_send_notification_email_success(self, mock_get_pool, mock_settings, notification_service, mock_db, mock_notification):
         """Test successful email notification sending"""
         # Setup
         mock_notification.type = NotificationType.EMAIL
@@ -683,15 +683,10 @@ class TestNotificationService:
 
         # Mock settings
         mock_settings.SMTP_FROM_EMAIL = "noreply@example.com"
-        mock_settings.SMTP_HOST = "smtp.example.com"
-        mock_settings.SMTP_PORT = 587
-        mock_settings.SMTP_TLS = True
-        mock_settings.SMTP_USERNAME = "user"
-        mock_settings.SMTP_PASSWORD = "pass"
 
-        # Mock SMTP
-        mock_server = Mock()
-        mock_smtp.return_value.__enter__.return_value = mock_server
+        # Mock pooled SMTP connection
+        mock_pool = Mock()
+        mock_get_pool.return_value = mock_pool
 
         # Mock logging
         with patch.object(notification_service, '_log_notification_event'):
@@ -702,7 +697,7 @@ class TestNotificationService:
             assert result is True
             assert mock_notification.status == NotificationStatus.SENT
             assert mock_notification.sent_at is not None
-            mock_server.send_message.assert_called_once()
+            mock_pool.send_message.assert_called_once()
 
     def test_send_notification_not_found(self, notification_service, mock_db):
         """Test sending non-existent notification"""
@@ -776,8 +771,8 @@ class TestNotificationService:
             assert mock_notification.status == NotificationStatus.SENT
 
     @patch('app.services.notification_service.settings')
-    @patch('app.services.notification_service.smtplib.SMTP')
-    def test_send_notification_email_failure(self, mock_smtp, mock_settings, notification_service, mock_db, mock_notification):
+    @patch('app.services.notification_service.get_smtp_pool')
+    def test_send_notification_email_failure(self, mock_get_pool, mock_settings, notification_service, mock_db, mock_notification):
         """Test email notification sending failure"""
         # Setup
         mock_notification.type = NotificationType.EMAIL
@@ -788,14 +783,9 @@ class TestNotificationService:
 
         # Mock settings
         mock_settings.SMTP_FROM_EMAIL = "noreply@example.com"
-        mock_settings.SMTP_HOST = "smtp.example.com"
-        mock_settings.SMTP_PORT = 587
-        mock_settings.SMTP_TLS = True
-        mock_settings.SMTP_USERNAME = "user"
-        mock_settings.SMTP_PASSWORD = "pass"
 
-        # Mock SMTP to raise exception
-        mock_smtp.side_effect = Exception("SMTP connection failed")
+        # Mock SMTP pool to raise exception
+        mock_get_pool.return_value.send_message.side_effect = Exception("SMTP connection failed")
 
         # Mock logging
         with patch.object(notification_service, '_log_notification_event'):
@@ -806,24 +796,20 @@ class TestNotificationService:
             assert result is False
             assert mock_notification.status == NotificationStatus.FAILED
             assert mock_notification.retry_count == 1
-            # The error_message is set by the service, so we just check the result is correct
+            assert mock_notification.scheduled_at > datetime.utcnow()  # Retried after backoff
 
-    def test_send_pending_notifications(self, notification_service, mock_db):
-        """Test sending multiple pending notifications"""
+    @patch('app.services.notification_service.NotificationDeliveryWorker')
+    def test_send_pending_notifications(self, mock_worker_class, notification_service, mock_db):
+        """Test sending pending notifications through the delivery worker"""
         # Setup
-        mock_notifications = [Mock(), Mock(), Mock()]
-        for i, notif in enumerate(mock_notifications):
-            notif.id = i + 1
+        mock_worker_class.return_value.process_pending.return_value = Mock(sent=3)
 
-        mock_db.query.return_value.filter.return_value.limit.return_value.all.return_value = mock_notifications
-
-        # Mock successful sending
-        with patch.object(notification_service, 'send_notification', return_value=True):
-            # Execute
-            result = notification_service.send_pending_notifications(limit=10)
+        # Execute
+        result = notification_service.send_pending_notifications(limit=10)
 
-            # Verify
-            assert result == 3  # All 3 notifications sent successfully
+        # Verify
+        assert result == 3  # All 3 notifications sent successfully
+        mock_worker_class.return_value.process_pending.assert_called_once_with(10)
 
     def test_should_send_notification_no_preferences(self, notification_service, mock_db):
         """Test notification sending when no preferences exist"""
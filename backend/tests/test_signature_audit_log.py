@@ -0,0 +1,236 @@
+"""
+Tests for the hash-chained signature audit log
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.digital_signature import SignatureAuditCheckpoint, SignatureEvent
+from app.services.signature_audit_log import (
+    SignatureAuditLog, get_audit_log, inclusion_path, merkle_root, verify_chain, verify_inclusion
+)
+from app.services.digital_signature_service import DigitalSignatureService
+from app.services.signature_audit_service import SignatureAuditService
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db_session(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _log(session_factory, **options):
+    options.setdefault("batch_size", 1000)
+    options.setdefault("checkpoint_interval", 4)
+    return SignatureAuditLog(session_factory, **options)
+
+
+def _append(log, count, request_id="req-1"):
+    for i in range(count):
+        log.append(request_id=request_id, event_type="document_viewed", event_description=f"View {i}")
+
+
+class TestMerkleTree:
+    """Test roots and inclusion paths for every leaf position"""
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 8])
+    def test_every_leaf_has_a_valid_path(self, size):
+        hashes = [f"{i:064x}" for i in range(size)]
+        root = merkle_root(hashes)
+
+        for index, leaf in enumerate(hashes):
+            assert verify_inclusion(leaf, inclusion_path(hashes, index), root)
+        assert not verify_inclusion(f"{99:064x}", inclusion_path(hashes, 0), root)
+
+
+class TestAppender:
+    """Test buffering, chaining and checkpoints"""
+
+    def test_buffered_until_flush(self, session_factory, db_session, engine):
+        log = _log(session_factory)
+        inserts = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: inserts.append(statement)
+                     if statement.startswith("INSERT INTO signature_events") else None)
+
+        _append(log, 3)
+        assert db_session.query(SignatureEvent).count() == 0
+        assert log.flush() == 3
+
+        assert len(inserts) == 1
+        events = db_session.query(SignatureEvent).order_by(SignatureEvent.sequence).all()
+        assert [e.sequence for e in events] == [1, 2, 3]
+        assert events[1].previous_hash == events[0].event_hash
+        assert events[2].previous_hash == events[1].event_hash
+
+    def test_batch_size_triggers_flush(self, session_factory, db_session):
+        log = _log(session_factory, batch_size=2)
+        _append(log, 3)
+        assert db_session.query(SignatureEvent).count() == 2
+        assert len(log) == 1
+
+    def test_periodic_checkpoints(self, session_factory, db_session):
+        log = _log(session_factory)
+        _append(log, 10)
+        _append(log, 2, request_id="req-2")
+        log.flush()
+
+        checkpoints = db_session.query(SignatureAuditCheckpoint).order_by(SignatureAuditCheckpoint.last_sequence).all()
+        assert [(c.request_id, c.first_sequence, c.last_sequence) for c in checkpoints] == [
+            ("req-1", 1, 4), ("req-1", 5, 8)
+        ]
+        sealed = log.checkpoint("req-2")
+        assert (sealed.first_sequence, sealed.last_sequence) == (1, 2)
+
+    def test_chain_continues_in_a_new_process(self, session_factory, db_session):
+        _append(first := _log(session_factory), 6)
+        first.flush()
+
+        second = _log(session_factory)
+        _append(second, 3)
+        second.flush()
+
+        assert verify_chain(db_session, "req-1", full=True)["is_valid"] is True
+        assert db_session.query(SignatureAuditCheckpoint).count() == 2  # At 4 and 8
+
+    def test_concurrent_appenders_do_not_fork_the_chain(self, session_factory, db_session):
+        first, second = _log(session_factory), _log(session_factory)
+        _append(first, 1)
+        first.flush()
+        _append(second, 1)
+        second.flush()  # Learns the head from the database
+
+        _append(first, 1)  # Cached head is now stale
+        assert first.flush() == 1
+
+        result = verify_chain(db_session, "req-1", full=True)
+        assert result["is_valid"] is True and result["head_sequence"] == 3
+
+
+class TestVerification:
+    """Test tamper evidence and incremental cost"""
+
+    def test_incremental_verification_starts_at_checkpoint(self, session_factory, db_session):
+        log = _log(session_factory)
+        _append(log, 10)
+        log.flush()
+
+        result = verify_chain(db_session, "req-1")
+        assert result["is_valid"] is True
+        assert (result["verified_from"], result["verified_events"], result["head_sequence"]) == (9, 2, 10)
+
+        assert verify_chain(db_session, "req-1", full=True)["verified_events"] == 10
+
+    def test_modified_event_is_detected(self, session_factory, db_session):
+        log = _log(session_factory)
+        _append(log, 10)
+        log.flush()
+
+        db_session.query(SignatureEvent).filter(SignatureEvent.sequence == 3).update(
+            {"event_description": "Rewritten"}
+        )
+        db_session.commit()
+
+        assert verify_chain(db_session, "req-1")["is_valid"] is True  # Sealed before the latest checkpoint
+        result = verify_chain(db_session, "req-1", full=True)
+        assert result["is_valid"] is False
+        assert {(e["sequence"], e["reason"]) for e in result["errors"]} == {(3, "content modified")}
+
+        db_session.query(SignatureEvent).filter(SignatureEvent.sequence == 10).update(
+            {"user_id": "someone-else"}
+        )
+        db_session.commit()
+        assert verify_chain(db_session, "req-1")["is_valid"] is False
+
+    def test_deleted_event_is_detected(self, session_factory, db_session):
+        log = _log(session_factory)
+        _append(log, 6)
+        log.flush()
+
+        db_session.query(SignatureEvent).filter(SignatureEvent.sequence == 5).delete()
+        db_session.commit()
+
+        reasons = {e["reason"] for e in verify_chain(db_session, "req-1")["errors"]}
+        assert reasons == {"missing event", "broken link"}
+
+    def test_unchained_events_after_chain_start_fail(self, session_factory, db_session):
+        legacy = SignatureEvent(request_id="req-1", event_type="document_viewed",
+                                occurred_at=datetime.utcnow() - timedelta(days=1))
+        db_session.add(legacy)
+        db_session.commit()
+
+        log = _log(session_factory)
+        _append(log, 2)
+        log.flush()
+        result = verify_chain(db_session, "req-1")
+        assert result["is_valid"] is True and result["unchained_events"] == 1  # Predates the chain
+
+        bypass = SignatureEvent(request_id="req-1", event_type="document_signed", occurred_at=datetime.utcnow())
+        db_session.add(bypass)
+        db_session.commit()
+
+        result = verify_chain(db_session, "req-1")
+        assert result["is_valid"] is False
+        assert result["errors"] == [{"sequence": None, "event_id": bypass.id, "reason": "unchained event"}]
+
+
+class TestAuditService:
+    """Test the service writes through the log and proves inclusion"""
+
+    @pytest.mark.asyncio
+    async def test_log_verify_and_prove(self, db_session, monkeypatch):
+        monkeypatch.setattr("app.services.signature_audit_service.security_monitor.submit", lambda snapshot: None)
+        service = SignatureAuditService(db_session)
+        for i in range(5):
+            assert await service.log_signature_event("req-1", "document_viewed", f"View {i}") is True
+
+        assert len(get_audit_log(db_session)) == 5
+        assert len(service.get_signature_audit_trail("req-1")) == 5  # Reads flush the buffer
+
+        result = service.verify_audit_integrity("req-1")
+        assert result["is_valid"] is True and result["integrity_score"] == 1.0
+
+        get_audit_log(db_session).checkpoint("req-1")
+        event_id = service.get_signature_audit_trail("req-1")[2].id
+        proof = service.get_event_inclusion_proof(event_id)
+        assert proof["sequence"] == 3
+        assert service.verify_event_inclusion(event_id, proof) is True
+
+        db_session.query(SignatureEvent).filter(SignatureEvent.id == event_id).update(
+            {"event_type": "document_signed"}
+        )
+        db_session.commit()
+        db_session.expire_all()
+        assert service.verify_event_inclusion(event_id, proof) is False
+
+    @pytest.mark.asyncio
+    async def test_signature_service_events_are_chained(self, db_session):
+        await DigitalSignatureService(db_session)._log_signature_event("req-1", "request_cancelled", "Cancelled")
+        get_audit_log(db_session).flush()
+
+        event = db_session.query(SignatureEvent).one()
+        assert event.sequence == 1
+        assert verify_chain(db_session, "req-1")["is_valid"] is True
@@ -0,0 +1,185 @@
+"""
+Tests for background security analysis of signature audit events
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.digital_signature import SignatureEvent
+from app.services import signature_security_monitor as monitor_module
+from app.services.signature_audit_service import SignatureAuditService
+from app.services.signature_security_monitor import (
+    AuditEventSnapshot, MemoryWindowStore, SignatureSecurityMonitor, detect_alerts
+)
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db_session(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def monitor(session_factory, monkeypatch):
+    monitor = SignatureSecurityMonitor(session_factory, store=MemoryWindowStore())
+    monkeypatch.setattr(monitor_module, "security_monitor", monitor)
+    monkeypatch.setattr("app.services.signature_audit_service.security_monitor", monitor)
+    return monitor
+
+
+class TestWindowStore:
+    """Test sliding-window counting"""
+
+    @pytest.mark.asyncio
+    async def test_counts_expire_with_window(self):
+        store = MemoryWindowStore()
+        assert await store.incr("k", 0, 60) == 1
+        assert await store.incr("k", 30, 60) == 2
+        assert await store.incr("k", 61, 60) == 2  # First entry left the window
+
+    @pytest.mark.asyncio
+    async def test_distinct_members(self):
+        store = MemoryWindowStore()
+        for member in ("a", "a", "b"):
+            count = await store.add("k", member, 10, 60)
+        assert count == 2
+
+    @pytest.mark.asyncio
+    async def test_suppress(self):
+        store = MemoryWindowStore()
+        assert await store.suppress("k", 0, 60) is True
+        assert await store.suppress("k", 30, 60) is False
+        assert await store.suppress("k", 61, 60) is True
+
+
+class TestDetectors:
+    """Test each detector against the original thresholds"""
+
+    @pytest.mark.asyncio
+    async def test_many_users_from_one_ip(self):
+        store = MemoryWindowStore()
+        alerts = []
+        for i in range(5):
+            alerts += await detect_alerts(AuditEventSnapshot(
+                f"req-{i}", "document_viewed", user_id=f"user-{i}", ip_address="10.0.0.1", occurred_at=100 + i
+            ), store)
+
+        assert [a.alert_type for a in alerts] == ["suspicious_ip_activity"]  # Raised once per window
+        assert alerts[0].affected_entities == ["10.0.0.1"]
+
+    @pytest.mark.asyncio
+    async def test_repeated_auth_failures(self):
+        store = MemoryWindowStore()
+        results = []
+        for i in range(3):
+            results.append(await detect_alerts(AuditEventSnapshot(
+                f"req-{i}", "authentication_failed", user_id="user-1", auth_result="failed", occurred_at=100 + i
+            ), store))
+
+        assert results[:2] == [[], []]
+        assert [a.alert_type for a in results[2]] == ["repeated_auth_failures"]
+        assert results[2][0].severity == "high"
+
+    @pytest.mark.asyncio
+    async def test_rapid_fire_events(self):
+        store = MemoryWindowStore()
+        alerts = []
+        for i in range(10):
+            alerts += await detect_alerts(AuditEventSnapshot("req-1", "reminder_sent", occurred_at=100 + i), store)
+        assert alerts == []
+
+        alerts = await detect_alerts(AuditEventSnapshot("req-1", "reminder_sent", occurred_at=110), store)
+        assert [a.alert_type for a in alerts] == ["rapid_fire_events"]
+
+        # Events outside the five-minute window no longer count
+        alerts = await detect_alerts(AuditEventSnapshot("req-1", "reminder_sent", occurred_at=1000), store)
+        assert alerts == []
+
+
+class TestOffRequestAnalysis:
+    """Test logging stays an append and alerts are written by the consumer"""
+
+    @pytest.mark.asyncio
+    async def test_logging_does_not_query_events(self, db_session, engine, monitor):
+        statements = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        service = SignatureAuditService(db_session)
+
+        for i in range(5):
+            assert await service.log_signature_event(
+                "req-1", "document_viewed", "Viewed", user_id=f"user-{i}", ip_address="10.0.0.1"
+            ) is True
+
+        assert not [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+        await monitor.drain()
+        alerts = db_session.query(SignatureEvent).filter(SignatureEvent.request_id == "system").all()
+        assert [a.event_type for a in alerts] == ["security_alert_suspicious_ip_activity"]
+        assert alerts[0].external_event_data["severity"] == "medium"
+        assert monitor.alerts_emitted == 1
+        await monitor.stop()
+
+    @pytest.mark.asyncio
+    async def test_alerts_are_not_reanalysed(self, db_session, monitor):
+        service = SignatureAuditService(db_session)
+
+        for _ in range(3):
+            await service.log_authentication_event(
+                "req-1", None, "sms", "failed", {}, "10.0.0.2", "pytest"
+            )
+        await monitor.drain()
+        await monitor.stop()
+
+        events = db_session.query(SignatureEvent).all()
+        assert sorted(e.event_type for e in events) == [
+            "authentication_failed"] * 3 + ["security_alert_repeated_auth_failures"]
+
+    @pytest.mark.asyncio
+    async def test_alerts_are_written_off_the_event_loop(self, db_session, monitor, monkeypatch):
+        threads = []
+        emit = monitor._emit
+        monkeypatch.setattr(monitor, "_emit", lambda alerts: threads.append(threading.get_ident()) or emit(alerts))
+
+        alerts = await monitor.process([
+            AuditEventSnapshot("req-1", "document_viewed", user_id=f"user-{i}", ip_address="10.0.0.3")
+            for i in range(5)
+        ])
+
+        assert [a.alert_type for a in alerts] == ["suspicious_ip_activity"]
+        assert threads and threading.get_ident() not in threads
+        assert db_session.query(SignatureEvent).filter(SignatureEvent.request_id == "system").count() == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_events(self, session_factory, monkeypatch):
+        monkeypatch.setattr(monitor_module, "MONITOR_QUEUE_SIZE", 2)
+        monitor = SignatureSecurityMonitor(session_factory, store=MemoryWindowStore())
+
+        for i in range(5):
+            monitor.submit(AuditEventSnapshot(f"req-{i}", "document_viewed"))
+
+        assert monitor.dropped == 3
+        await monitor.stop()
@@ -0,0 +1,204 @@
+"""
+Tests for compiled template instantiation and mail merge
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.dependencies import get_current_user
+from app.models.document import Document
+from app.models.document_history import DocumentHistory
+from app.models.document_template import DocumentTemplate, TemplateAccessLevel, TemplateCategory, TemplateStatus
+from app.schemas.document_template import TemplateInstanceRequest, TemplateMergeRequest
+from app.services.template_compiler import Slot, compile_content, compiled_templates
+from app.services.template_service import TemplateService
+import app.models  # noqa: F401 - register all tables
+
+CONTENT = {
+    "ops": [
+        {"insert": "Meeting of {board} on {date}\n", "attributes": {"header": 1}},
+        {"insert": "Chair: {chair}. Secretary: {secretary}.\n"},
+        {"insert": {"signature": {"label": "Chair"}}},
+        {"insert": "Plain closing line\n", "attributes": {"bold": True}},
+    ]
+}
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def db_session(engine):
+    compiled_templates.clear()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add(DocumentTemplate(
+        id="template-1", name="Board packet", category=TemplateCategory.MEETING, content=CONTENT,
+        placeholders={"signatures": [{"id": "sig-1"}]}, default_title_pattern="{board} packet - {date}",
+        required_fields=["board"], access_level=TemplateAccessLevel.PUBLIC, created_by="user-1"
+    ))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class TestCompile:
+    """Test the slot index and rendering"""
+
+    def test_slot_index(self):
+        compiled = compile_content("template-1", 1, CONTENT)
+        assert compiled.slots == (
+            Slot(0, 11, "board"), Slot(0, 22, "date"), Slot(1, 7, "chair"), Slot(1, 27, "secretary")
+        )
+        assert compiled.fields == {"board", "date", "chair", "secretary"}
+
+    def test_render_substitutes_every_field(self):
+        delta = compile_content("template-1", 1, CONTENT).render(
+            {"board": "Maple Court", "date": "2026-11-02", "chair": "A. Rivera"}
+        )
+        assert delta["ops"][0] == {"insert": "Meeting of Maple Court on 2026-11-02\n", "attributes": {"header": 1}}
+        assert delta["ops"][1]["insert"] == "Chair: A. Rivera. Secretary: {secretary}.\n"
+        assert delta["ops"][2:] == CONTENT["ops"][2:]
+
+    def test_instances_share_nothing(self):
+        compiled = compile_content("template-1", 1, CONTENT)
+        first = compiled.render({"board": "One"})
+        first["ops"][0]["attributes"]["header"] = 2
+        first["ops"][2]["insert"]["signature"]["label"] = "Changed"
+
+        second = compiled.render({"board": "Two"})
+        assert second["ops"][0]["attributes"] == {"header": 1}
+        assert second["ops"][2]["insert"]["signature"]["label"] == "Chair"
+        assert CONTENT["ops"][0]["insert"] == "Meeting of {board} on {date}\n"
+
+    @pytest.mark.parametrize("content", [None, {}, {"ops": "not_an_array"}, {"ops": [{"retain": 3}]}])
+    def test_rejects_non_document_content(self, content):
+        with pytest.raises(ValueError):
+            compile_content("template-1", 1, content)
+
+
+class TestInstantiation:
+    """Test documents created from cached compiled templates"""
+
+    def test_template_content_is_not_mutated(self, db_session):
+        service = TemplateService(db_session)
+        result = service.create_document_from_template(
+            TemplateInstanceRequest(template_id="template-1", field_values={"board": "Maple Court"}), "user-1"
+        )
+
+        assert result["document_data"]["content"]["ops"][0]["insert"].startswith("Meeting of Maple Court")
+        template = db_session.get(DocumentTemplate, "template-1")
+        assert template.content == CONTENT
+
+    def test_publish_compiles_and_updates_recompile(self, db_session):
+        service = TemplateService(db_session)
+        template = service.publish_template("template-1", "user-1")
+        assert template.status == TemplateStatus.PUBLISHED
+        assert compiled_templates.get(db_session, template).version == 1
+
+        template.content = {"ops": [{"insert": "Revised for {board}\n"}]}
+        template.version += 1
+        db_session.commit()
+
+        assert compiled_templates.get(db_session, template).render({"board": "X"}) == {
+            "ops": [{"insert": "Revised for X\n"}]
+        }
+
+
+class TestMerge:
+    """Test bulk document generation"""
+
+    def test_one_transaction_with_history(self, db_session, engine):
+        commits = []
+        event.listen(db_session, "after_commit", lambda session: commits.append(session))
+        rows = TemplateMergeRequest(csv_data="board,date,chair\nMaple Court,2026-11-02,A. Rivera\n"
+                                             "Oak Row,2026-11-03,B. Chen\nPine Hill,2026-11-04,\n").field_rows()
+
+        result = TemplateService(db_session).merge_documents("template-1", rows, "user-1")
+
+        assert len(commits) == 1
+        titles = [document.title for document in result["documents"]]
+        assert titles == ["Maple Court packet - 2026-11-02", "Oak Row packet - 2026-11-03",
+                          "Pine Hill packet - 2026-11-04"]
+        assert db_session.query(Document).count() == 3
+        history = db_session.query(DocumentHistory).order_by(DocumentHistory.title).all()
+        assert [(entry.version_number, entry.change_summary) for entry in history] == \
+            [(1, "Initial document creation")] * 3
+        assert history[0].content["ops"][1]["insert"] == "Chair: A. Rivera. Secretary: {secretary}.\n"
+        assert db_session.get(DocumentTemplate, "template-1").usage_count == 3
+
+    def test_missing_required_field_creates_nothing(self, db_session):
+        with pytest.raises(ValueError, match="Row 2"):
+            TemplateService(db_session).merge_documents(
+                "template-1", [{"board": "Maple Court"}, {"board": ""}], "user-1"
+            )
+        assert db_session.query(Document).count() == 0
+
+    def test_row_limit(self, db_session, monkeypatch):
+        monkeypatch.setattr(settings, "TEMPLATE_MERGE_MAX_ROWS", 2)
+        with pytest.raises(ValueError):
+            TemplateService(db_session).merge_documents("template-1", [{"board": "B"}] * 3, "user-1")
+
+    def test_request_needs_exactly_one_source(self):
+        with pytest.raises(ValueError):
+            TemplateMergeRequest()
+        with pytest.raises(ValueError):
+            TemplateMergeRequest(rows=[], csv_data="board\n")
+        assert TemplateMergeRequest(rows=[{"board": "B"}]).field_rows() == [{"board": "B"}]
+
+
+class TestEndpoints:
+    """Test how compile errors reach API clients"""
+
+    @pytest.fixture
+    def client(self, db_session):
+        from app.main import app
+
+        app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_current_user] = lambda: {"id": "user-1"}
+        try:
+            yield TestClient(app)
+        finally:
+            app.dependency_overrides.clear()
+
+    @pytest.fixture
+    def draft(self, db_session):
+        db_session.add(DocumentTemplate(
+            id="template-2", name="Imported draft", category=TemplateCategory.MEETING,
+            content={"blocks": [{"text": "{board}"}]}, access_level=TemplateAccessLevel.PUBLIC,
+            created_by="user-1"
+        ))
+        db_session.commit()
+        return "template-2"
+
+    def test_publish_rejects_non_delta_content(self, client, db_session, draft):
+        response = client.post(f"/api/v1/templates/{draft}/publish")
+
+        assert response.status_code == 400
+        assert "Delta" in response.json()["detail"]
+        assert db_session.get(DocumentTemplate, draft).status == TemplateStatus.DRAFT
+
+    def test_publish(self, client):
+        response = client.post("/api/v1/templates/template-1/publish")
+        assert response.status_code == 200
+        assert response.json()["status"] == "published"
+
+    def test_instantiate_rejects_non_delta_content(self, client, db_session, draft):
+        response = client.post(f"/api/v1/templates/{draft}/create-document",
+                               json={"template_id": draft, "field_values": {"board": "Maple Court"}})
+
+        assert response.status_code == 400
+        assert "Delta" in response.json()["detail"]
+        assert db_session.query(Document).count() == 0
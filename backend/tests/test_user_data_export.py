@@ -0,0 +1,162 @@
+"""
+Tests for streaming, resumable GDPR data exports
+"""
+import csv
+import io
+import json
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.compliance import ConsentMethod, ConsentStatus, ConsentType, DataExportJob, UserConsent
+from app.models.document import Document
+from app.models.security import AuditEventType, AuditLog, AuditSeverity
+from app.models.user import User
+from app.services import user_data_export
+from app.services.user_data_export import DataExporter, resume_export_jobs
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:", echo=False,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db_session(session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DATA_EXPORT_PAGE_SIZE", 2)
+    session = session_factory()
+    session.add(User(id="user-1", email="member@example.com", username="member", hashed_password="x"))
+    session.add_all([
+        Document(id=f"doc-{i}", title=f"Minutes {i}", content={"ops": [{"insert": f"Item {i}\n"}]},
+                 created_by="user-1")
+        for i in range(5)
+    ])
+    session.add(Document(id="doc-other", title="Someone else's", content={"ops": []}, created_by="user-2"))
+    session.add(UserConsent(
+        user_id="user-1", consent_type=ConsentType.DATA_PROCESSING, status=ConsentStatus.GRANTED,
+        method=ConsentMethod.EXPLICIT_FORM, purpose="Board records", consent_version="1.0",
+        ip_address="203.0.113.7"
+    ))
+    session.add(AuditLog(user_id="user-1", event_type=AuditEventType.LOGIN_SUCCESS,
+                         severity=AuditSeverity.LOW, message="Signed in", ip_address="203.0.113.7"))
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _members(job):
+    with zipfile.ZipFile(job.file_path) as archive:
+        return {name: archive.read(name).decode("utf-8") for name in archive.namelist()}
+
+
+def _ndjson(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+class TestExport:
+    """Test archive contents"""
+
+    def test_ndjson_archive(self, db_session):
+        exporter = DataExporter(db_session)
+        job = exporter.run(exporter.create_job("user-1", anonymize_sensitive=True).id)
+
+        assert job.status == "completed"
+        members = _members(job)
+        assert set(members) == {"profile.ndjson", "documents.ndjson", "consents.ndjson",
+                                "audit_logs.ndjson", "manifest.json"}
+        documents = _ndjson(members["documents.ndjson"])
+        assert [doc["id"] for doc in documents] == [f"doc-{i}" for i in range(5)]
+        assert documents[0]["content"] == {"ops": [{"insert": "Item 0\n"}]}
+        assert _ndjson(members["consents.ndjson"])[0]["ip_address"] == "***"
+        assert _ndjson(members["audit_logs.ndjson"])[0]["event_type"] == "login_success"
+        assert json.loads(members["manifest.json"])["records"] == {
+            "profile": 1, "documents": 5, "consents": 1, "audit_logs": 1
+        }
+        assert db_session.query(AuditLog).filter(AuditLog.resource_id == job.id).count() == 1
+
+    def test_csv_members(self, db_session):
+        exporter = DataExporter(db_session)
+        job = exporter.run(exporter.create_job("user-1", format="csv", data_categories=["documents"]).id)
+
+        rows = list(csv.DictReader(io.StringIO(_members(job)["documents.csv"])))
+        assert len(rows) == 5
+        assert json.loads(rows[0]["content"]) == {"ops": [{"insert": "Item 0\n"}]}
+
+    def test_documents_are_read_in_pages(self, db_session, engine):
+        selects = []
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: selects.append(statement)
+                     if statement.startswith("SELECT") and "FROM documents" in statement else None)
+        exporter = DataExporter(db_session)
+        exporter.run(exporter.create_job("user-1", data_categories=["documents"]).id)
+
+        assert len(selects) == 3  # Pages of 2, 2 and 1
+        assert all("LIMIT" in statement for statement in selects)
+
+    def test_unsupported_format(self, db_session):
+        with pytest.raises(ValueError):
+            DataExporter(db_session).create_job("user-1", format="xml")
+
+
+class TestResume:
+    """Test interrupted exports continue from their last checkpoint"""
+
+    def test_failed_export_resumes_without_duplicates(self, db_session, monkeypatch):
+        category = user_data_export.CATEGORIES["documents"]
+        serialize = category.serialize
+        seen = []
+
+        def failing(row, job):
+            seen.append(row.id)
+            if len(seen) == 4:
+                raise RuntimeError("connection lost")
+            return serialize(row, job)
+
+        monkeypatch.setattr(category, "serialize", failing)
+        exporter = DataExporter(db_session)
+        job = exporter.run(exporter.create_job("user-1", data_categories=["documents"]).id)
+
+        assert job.status == "failed" and "connection lost" in job.error
+        assert job.progress["documents"]["records"] == 2  # The first page was checkpointed
+
+        monkeypatch.setattr(category, "serialize", serialize)
+        job = exporter.run(job.id)
+
+        assert job.status == "completed"
+        ids = [doc["id"] for doc in _ndjson(_members(job)["documents.ndjson"])]
+        assert ids == [f"doc-{i}" for i in range(5)]
+
+    def test_running_job_is_left_to_its_worker(self, db_session, session_factory):
+        exporter = DataExporter(db_session)
+        job = exporter.create_job("user-1")
+        job.status = "running"
+        db_session.commit()
+
+        assert exporter.run(job.id).status == "running"
+        assert resume_export_jobs(session_factory) == 0
+
+    def test_pending_jobs_are_resumed(self, db_session, session_factory):
+        job_id = DataExporter(db_session).create_job("user-1").id
+
+        assert resume_export_jobs(session_factory) == 1
+        db_session.expire_all()
+        assert db_session.get(DataExportJob, job_id).status == "completed"
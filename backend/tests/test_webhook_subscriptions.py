@@ -0,0 +1,104 @@
+"""
+Tests for the in-memory webhook subscription index
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.external_integration import Webhook, WebhookDelivery
+from app.services.webhook_delivery import sign_payload
+from app.services.webhook_service import WebhookService
+from app.services.webhook_subscriptions import get_subscription_index
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _webhook(db_session, name, events, **kwargs):
+    webhook = Webhook(name=name, url=f"https://example.com/{name}", events=events, created_by="admin", **kwargs)
+    db_session.add(webhook)
+    db_session.commit()
+    return webhook
+
+
+def _subscribed(db_session, event_type):
+    return sorted(s.webhook_id for s in get_subscription_index(db_session).subscribers(event_type))
+
+
+class TestWebhookSubscriptionIndex:
+    """Test event matching from the index and change propagation"""
+
+    def test_index_matches_events(self, db_session):
+        docs = _webhook(db_session, "docs", ["document.created", "document.updated"])
+        both = _webhook(db_session, "both", ["document.created", "workflow.completed"])
+        _webhook(db_session, "inactive", ["document.created"], is_active=False)
+
+        assert _subscribed(db_session, "document.created") == sorted([docs.id, both.id])
+        assert _subscribed(db_session, "workflow.completed") == [both.id]
+        assert _subscribed(db_session, "user.created") == []
+
+    def test_committed_changes_update_loaded_index(self, db_session):
+        webhook = _webhook(db_session, "docs", ["document.created"])
+        assert _subscribed(db_session, "document.created") == [webhook.id]
+
+        webhook.events = ["workflow.completed"]
+        db_session.commit()
+        assert _subscribed(db_session, "document.created") == []
+        assert _subscribed(db_session, "workflow.completed") == [webhook.id]
+
+        added = _webhook(db_session, "late", ["workflow.completed"])
+        assert _subscribed(db_session, "workflow.completed") == sorted([webhook.id, added.id])
+
+        webhook.is_active = False
+        db_session.delete(added)
+        db_session.commit()
+        assert _subscribed(db_session, "workflow.completed") == []
+
+    def test_rolled_back_changes_are_ignored(self, db_session):
+        webhook = _webhook(db_session, "docs", ["document.created"])
+        get_subscription_index(db_session)
+
+        webhook.is_active = False
+        db_session.flush()
+        db_session.rollback()
+
+        assert _subscribed(db_session, "document.created") == [webhook.id]
+
+    def test_trigger_reads_no_webhooks_from_database(self, db_session):
+        _webhook(db_session, "a", ["document.created"], secret="s3cret")
+        _webhook(db_session, "b", ["document.created"])
+        get_subscription_index(db_session)
+
+        statements = []
+        event.listen(db_session.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        delivery_ids = asyncio.run(
+            WebhookService(db_session).trigger_webhooks("document.created", {"document_id": "doc-1"})
+        )
+
+        assert len(delivery_ids) == 2
+        assert not [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        bodies = {d.body for d in db_session.query(WebhookDelivery)}
+        assert len(bodies) == 1  # Serialized once for every subscriber
+
+    def test_signature_matches_plain_hmac(self):
+        import hashlib
+        import hmac
+
+        body = '{"event_type": "document.created"}'
+        for _ in range(2):
+            expected = hmac.new(b"key", body.encode(), hashlib.sha256).hexdigest()
+            assert sign_payload(body, "key") == f"sha256={expected}"
@@ -0,0 +1,104 @@
+"""
+Tests for the set-based workflow analytics engine
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.document import Document
+from app.models.workflow import (
+    Workflow, WorkflowStep, WorkflowInstance, WorkflowStepInstance,
+    WorkflowStatus, WorkflowInstanceStatus, StepInstanceStatus, WorkflowStepType
+)
+from app.services.workflow_analytics_service import WorkflowAnalyticsService, invalidate_analytics_cache
+from app.services.workflow_service import WorkflowService
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def workflow_data(db_session):
+    """Workflow with two steps and three instances: two completed, one rejected"""
+    now = datetime.utcnow()
+    document = Document(id="doc-1", title="Bylaw", content={"ops": []}, document_type="bylaw")
+    workflow = Workflow(id="wf-1", name="Bylaw Approval", document_type="bylaw", status=WorkflowStatus.ACTIVE)
+    review = WorkflowStep(id="step-1", workflow_id="wf-1", name="Review", step_type=WorkflowStepType.APPROVAL, step_order=1)
+    final = WorkflowStep(id="step-2", workflow_id="wf-1", name="Final", step_type=WorkflowStepType.APPROVAL, step_order=2)
+    db_session.add_all([document, workflow, review, final])
+
+    durations = [(10, 40, WorkflowInstanceStatus.COMPLETED), (20, 30, WorkflowInstanceStatus.COMPLETED),
+                 (30, None, WorkflowInstanceStatus.REJECTED)]
+    for i, (review_hours, final_hours, status) in enumerate(durations):
+        started = now - timedelta(days=2)
+        instance = WorkflowInstance(
+            id=f"inst-{i}", workflow_id="wf-1", document_id="doc-1", initiated_by="author",
+            status=status, initiated_at=started,
+            completed_at=started + timedelta(hours=review_hours + (final_hours or 0))
+        )
+        db_session.add(instance)
+        db_session.add(WorkflowStepInstance(
+            id=f"si-{i}-1", workflow_instance_id=instance.id, step_id="step-1", assigned_to="reviewer",
+            status=StepInstanceStatus.APPROVED if final_hours else StepInstanceStatus.REJECTED,
+            started_at=started, completed_at=started + timedelta(hours=review_hours)
+        ))
+        if final_hours:
+            db_session.add(WorkflowStepInstance(
+                id=f"si-{i}-2", workflow_instance_id=instance.id, step_id="step-2", assigned_to="chair",
+                status=StepInstanceStatus.APPROVED, escalated=(i == 0),
+                started_at=started + timedelta(hours=review_hours),
+                completed_at=started + timedelta(hours=review_hours + final_hours)
+            ))
+    db_session.commit()
+    return workflow
+
+
+class TestWorkflowAnalyticsService:
+    """Test analytics computed from projected queries"""
+
+    def test_workflow_performance(self, db_session, workflow_data):
+        metrics = WorkflowAnalyticsService(db_session).workflow_performance("wf-1")
+
+        assert metrics["completion_rate"] == pytest.approx(200 / 3)
+        assert metrics["average_completion_time"] == pytest.approx(50)
+        assert metrics["step_performance"]["Review"]["total_instances"] == 3
+        assert metrics["step_performance"]["Review"]["average_time"] == pytest.approx(15)
+        assert metrics["step_performance"]["Final"]["p95_time"] == 40
+        assert metrics["bottleneck_steps"] == ["Final"]
+
+    def test_results_are_cached_until_invalidated(self, db_session, workflow_data):
+        service = WorkflowAnalyticsService(db_session)
+        assert service.workflow_performance("wf-1")["completion_rate"] == pytest.approx(200 / 3)
+
+        db_session.query(WorkflowInstance).filter(WorkflowInstance.id == "inst-2").update(
+            {"status": WorkflowInstanceStatus.COMPLETED}
+        )
+        db_session.commit()
+        assert service.workflow_performance("wf-1")["completion_rate"] == pytest.approx(200 / 3)
+
+        invalidate_analytics_cache(db_session, "wf-1")
+        assert service.workflow_performance("wf-1")["completion_rate"] == 100
+
+    def test_workflow_service_keeps_response_shapes(self, db_session, workflow_data):
+        service = WorkflowService(db_session)
+
+        assert set(service.get_workflow_performance_metrics("wf-1")) >= {
+            "completion_rate", "average_completion_time", "bottleneck_steps", "step_performance"
+        }
+        assert service.get_workflow_performance_metrics("missing") == {}
+        assert set(service.get_workflow_analytics()) >= {
+            "total_workflows", "active_workflows", "completed_instances", "average_completion_time",
+            "approval_rates", "bottleneck_steps", "user_performance"
+        }
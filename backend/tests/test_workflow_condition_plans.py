@@ -0,0 +1,191 @@
+"""
+Tests for compiled workflow condition plans
+"""
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.document import Document
+from app.models.workflow import Workflow, WorkflowInstance, WorkflowStatus, WorkflowInstanceStatus
+from app.models.workflow_conditions import (
+    WorkflowConditionGroup, WorkflowCondition, WorkflowConditionalAction, ConditionEvaluation,
+    ConditionType, OperatorType, ActionType, LogicalOperator
+)
+from app.services.workflow_condition_service import (
+    WorkflowConditionService, ConditionPlan, compile_comparator, _plan_cache
+)
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def workflow_instance(db_session):
+    """Workflow instance with context data and a document"""
+    db_session.add_all([
+        Document(id="doc-1", title="Budget", content={"amount": 1000, "placeholders": []}, document_type="policy"),
+        Workflow(id="wf-1", name="Budget Approval", document_type="policy", status=WorkflowStatus.ACTIVE),
+        WorkflowInstance(id="inst-1", workflow_id="wf-1", document_id="doc-1", initiated_by="author",
+                         status=WorkflowInstanceStatus.IN_PROGRESS, context_data={"amount": 1000, "priority": "high"})
+    ])
+    db_session.commit()
+    return db_session.query(WorkflowInstance).get("inst-1")
+
+
+def _group(db_session, name, operator, conditions, order=0, stop_on_first_match=False, actions=()):
+    group = WorkflowConditionGroup(
+        workflow_id="wf-1", name=name, logical_operator=operator,
+        evaluation_order=order, stop_on_first_match=stop_on_first_match
+    )
+    db_session.add(group)
+    db_session.flush()
+    for i, (field_path, operator_type, expected) in enumerate(conditions):
+        db_session.add(WorkflowCondition(
+            condition_group_id=group.id, name=f"{name} {i}", condition_type=ConditionType.WORKFLOW_DATA,
+            operator=operator_type, field_path=field_path, expected_value=expected, evaluation_order=i
+        ))
+    for action in actions:
+        action.condition_group_id = group.id
+        db_session.add(action)
+    db_session.commit()
+    return group
+
+
+@pytest.fixture
+def audit_settings():
+    """Restore audit settings after a test changes them"""
+    level, rate = settings.CONDITION_AUDIT_LEVEL, settings.CONDITION_AUDIT_SAMPLE_RATE
+    yield settings
+    settings.CONDITION_AUDIT_LEVEL, settings.CONDITION_AUDIT_SAMPLE_RATE = level, rate
+
+
+class TestConditionPlans:
+    """Test compiled, cached condition evaluation"""
+
+    def test_groups_short_circuit(self, db_session, workflow_instance):
+        _group(db_session, "AND", LogicalOperator.AND, [
+            ("amount", OperatorType.LESS_THAN, 10),
+            ("priority", OperatorType.EQUALS, "high")
+        ])
+        _group(db_session, "OR", LogicalOperator.OR, [
+            ("amount", OperatorType.GREATER_THAN, 500),
+            ("priority", OperatorType.EQUALS, "low")
+        ], order=1)
+
+        results = WorkflowConditionService(db_session).evaluate_workflow_conditions(workflow_instance)
+
+        groups = {g["group_name"]: g for g in results["evaluated_groups"]}
+        assert groups["AND"]["result"] is False
+        assert groups["OR"]["result"] is True
+        assert len(groups["AND"]["condition_results"]) == 1
+        assert len(groups["OR"]["condition_results"]) == 1
+        assert results["errors"] == []
+
+    def test_plans_cached_until_conditions_change(self, db_session, workflow_instance):
+        group = _group(db_session, "Amount", LogicalOperator.AND, [("amount", OperatorType.GREATER_THAN, 500)])
+        service = WorkflowConditionService(db_session)
+
+        assert service.evaluate_workflow_conditions(workflow_instance)["evaluated_groups"][0]["result"] is True
+        plans = _plan_cache[db_session.get_bind()]
+        assert service._get_group_plans(workflow_instance) is next(iter(plans.values()))[1]
+
+        condition = group.conditions[0]
+        condition.expected_value = 5000
+        db_session.commit()
+        assert db_session.get_bind() not in _plan_cache
+
+        assert service.evaluate_workflow_conditions(workflow_instance)["evaluated_groups"][0]["result"] is False
+
+    def test_plans_expire_after_ttl(self, db_session, workflow_instance, monkeypatch):
+        group = _group(db_session, "Amount", LogicalOperator.AND, [("amount", OperatorType.GREATER_THAN, 500)])
+        service = WorkflowConditionService(db_session)
+        plans = service._get_group_plans(workflow_instance)
+        assert service._get_group_plans(workflow_instance) is plans
+
+        # An edit made by another worker never reaches this process's mapper events
+        db_session.execute(
+            WorkflowCondition.__table__.update()
+            .where(WorkflowCondition.condition_group_id == group.id)
+            .values(expected_value=5000)
+        )
+        db_session.commit()
+        db_session.expire_all()
+        assert service.evaluate_workflow_conditions(workflow_instance)["evaluated_groups"][0]["result"] is True
+
+        expired = time.monotonic() + settings.WORKFLOW_CONDITION_PLAN_TTL_SECONDS
+        monkeypatch.setattr(time, "monotonic", lambda: expired)
+        assert service._get_group_plans(workflow_instance) is not plans
+        assert service.evaluate_workflow_conditions(workflow_instance)["evaluated_groups"][0]["result"] is False
+
+    def test_stop_on_first_match_and_actions(self, db_session, workflow_instance):
+        _group(db_session, "First", LogicalOperator.AND, [("amount", OperatorType.GREATER_THAN, 500)],
+               stop_on_first_match=True, actions=[WorkflowConditionalAction(
+                   name="Raise priority", action_type=ActionType.SET_PRIORITY, action_parameters={"priority": 9}
+               )])
+        _group(db_session, "Second", LogicalOperator.AND, [], order=1)
+
+        results = WorkflowConditionService(db_session).evaluate_workflow_conditions(workflow_instance)
+
+        assert [g["group_name"] for g in results["evaluated_groups"]] == ["First"]
+        assert results["executed_actions"][0]["status"] == "success"
+        assert workflow_instance.priority == 9
+
+    def test_audit_records_follow_level_and_sampling(self, db_session, workflow_instance, audit_settings):
+        _group(db_session, "Amount", LogicalOperator.AND, [
+            ("amount", OperatorType.GREATER_THAN, 500),
+            ("priority", OperatorType.EQUALS, "high")
+        ])
+        service = WorkflowConditionService(db_session)
+
+        service.evaluate_workflow_conditions(workflow_instance)
+        records = db_session.query(ConditionEvaluation).all()
+        assert len(records) == 3
+        assert sum(1 for r in records if r.context_snapshot) == 1
+
+        audit_settings.CONDITION_AUDIT_LEVEL = "groups"
+        service.evaluate_workflow_conditions(workflow_instance)
+        assert db_session.query(ConditionEvaluation).count() == 4
+
+        audit_settings.CONDITION_AUDIT_SAMPLE_RATE = 0.0
+        service.evaluate_workflow_conditions(workflow_instance)
+        assert db_session.query(ConditionEvaluation).count() == 4
+
+
+class TestComparators:
+    """Test precompiled comparison closures"""
+
+    @pytest.mark.parametrize("operator,expected,actual,result", [
+        (OperatorType.REGEX_MATCH, r"INV-\d+", "INV-42", True),
+        (OperatorType.IN_LIST, "not a list", "a", False),
+        (OperatorType.NOT_CONTAINS, "x", None, True),
+        (OperatorType.GREATER_EQUAL, 3, None, False),
+        (OperatorType.IS_NOT_EMPTY, None, [], False),
+    ])
+    def test_compile_comparator(self, operator, expected, actual, result):
+        assert compile_comparator(operator, expected)(actual) is result
+
+    def test_negation_and_invalid_regex(self):
+        condition = WorkflowCondition(
+            id="c-1", name="Bad regex", condition_type=ConditionType.WORKFLOW_DATA,
+            operator=OperatorType.REGEX_MATCH, field_path="code", expected_value="(", negate_result=True
+        )
+        plan = ConditionPlan(condition)
+        with pytest.raises(Exception):
+            plan.test("anything")
+
+        condition.expected_value = "A"
+        assert ConditionPlan(condition).test("ABC") is False
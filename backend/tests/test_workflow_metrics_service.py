@@ -0,0 +1,187 @@
+"""
+Tests for incremental workflow metric rollups
+"""
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.document import Document
+from app.models.workflow import Workflow, WorkflowStep, WorkflowStatus, WorkflowStepType
+from app.models.workflow_metrics import WorkflowMetricRollup, WorkflowMetricSketchBin
+from app.schemas.workflow import ApprovalAction
+from app.services.workflow_metrics_service import (
+    WorkflowMetricsService, backfill_workflow_metrics, sketch_bin, sketch_value, sketch_quantiles,
+    SKETCH_RELATIVE_ACCURACY
+)
+from app.services.workflow_service import WorkflowService
+import app.models  # noqa: F401 - register all tables
+
+
+@pytest.fixture
+def db_session():
+    """In-memory database session"""
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def workflow_service(db_session):
+    """Workflow service over a two-step workflow assigned to fixed users"""
+    db_session.add_all([
+        Document(id="doc-1", title="Bylaw", content={"ops": []}, document_type="bylaw"),
+        Workflow(id="wf-1", name="Bylaw Approval", document_type="bylaw", status=WorkflowStatus.ACTIVE),
+        WorkflowStep(id="step-1", workflow_id="wf-1", name="Review", step_type=WorkflowStepType.APPROVAL,
+                     step_order=1, required_users=["reviewer"]),
+        WorkflowStep(id="step-2", workflow_id="wf-1", name="Final", step_type=WorkflowStepType.APPROVAL,
+                     step_order=2, required_users=["chair"])
+    ])
+    db_session.commit()
+    return WorkflowService(db_session)
+
+
+def _decide(service, instance, user_id, action):
+    step_instance = next(si for si in instance.step_instances if si.assigned_to == user_id and not si.completed_at)
+    assert service.process_approval(step_instance.id, ApprovalAction(action=action), user_id)
+
+
+class TestWorkflowMetricRollups:
+    """Test rollups maintained by workflow transitions"""
+
+    def test_transitions_update_rollups(self, db_session, workflow_service):
+        approved = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, approved, "reviewer", "approve")
+        _decide(workflow_service, approved, "chair", "approve")
+
+        rejected = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, rejected, "reviewer", "reject")
+
+        rollups = {
+            (row.scope, row.scope_key): row
+            for row in db_session.query(WorkflowMetricRollup).all()
+        }
+        workflow = rollups[("workflow", "wf-1")]
+        assert (workflow.started_count, workflow.completed_count, workflow.rejected_count) == (2, 1, 1)
+        assert workflow.duration_count == 1
+
+        review = rollups[("step", "step-1")]
+        assert review.label == "Review"
+        assert (review.started_count, review.approved_count, review.rejected_count) == (2, 1, 1)
+        assert review.duration_min_hours <= review.duration_max_hours
+
+        assert rollups[("user", "chair")].approved_count == 1
+        assert sum(row.started_count for key, row in rollups.items() if key[0] == "hour") == 2
+
+    def test_analytics_read_from_rollups(self, workflow_service):
+        instance = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, instance, "reviewer", "approve")
+        _decide(workflow_service, instance, "chair", "approve")
+        rejected = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, rejected, "reviewer", "reject")
+
+        analytics = workflow_service.get_workflow_analytics()
+        assert analytics["completed_instances"] == 1
+        assert analytics["approval_rates"]["overall_approval_rate"] == pytest.approx(200 / 3)
+        assert analytics["approval_rates"]["step_approval_rates"] == {"Review": 50, "Final": 100}
+        assert analytics["user_performance"]["workload_distribution"] == {"reviewer": 2, "chair": 1}
+
+        report = workflow_service.generate_workflow_report(
+            datetime.utcnow() - timedelta(days=1), datetime.utcnow()
+        )
+        assert report["executive_summary"]["total_instances"] == 2
+        assert report["executive_summary"]["completion_rate"] == 50
+        assert report["trend_analysis"]["daily_initiation_trends"] == {str(datetime.utcnow().date()): 2}
+
+    def test_dashboard_and_report_agree(self, workflow_service):
+        instance = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, instance, "reviewer", "approve")
+        rejected = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, rejected, "reviewer", "reject")
+
+        analytics = workflow_service.get_workflow_analytics()
+        report = workflow_service.generate_workflow_report(
+            datetime.utcnow() - timedelta(days=1), datetime.utcnow()
+        )
+        approval_rates = workflow_service.get_approval_rate_analytics()
+        user_performance = workflow_service.get_user_performance_metrics()
+
+        assert approval_rates == analytics["approval_rates"]
+        assert approval_rates["delegation_rate"] == 0
+        assert user_performance == analytics["user_performance"] == report["user_insights"]
+        assert user_performance["workload_distribution"] == {"reviewer": 2, "chair": 1}
+        assert workflow_service.get_bottleneck_analysis() == report["bottleneck_analysis"]
+
+    def test_rebuild_matches_incremental_rollups(self, db_session, workflow_service):
+        instance = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, instance, "reviewer", "approve")
+        _decide(workflow_service, instance, "chair", "reject")
+
+        def snapshot():
+            return sorted(
+                (row.scope, row.scope_key, row.started_count, row.completed_count,
+                 row.approved_count, row.rejected_count, row.duration_count)
+                for row in db_session.query(WorkflowMetricRollup).filter(WorkflowMetricRollup.scope != "hour").all()
+            )
+
+        incremental = snapshot()
+        WorkflowMetricsService(db_session).rebuild()
+        assert snapshot() == incremental
+
+    def test_backfill_covers_existing_history(self, db_session, workflow_service):
+        instance = workflow_service.start_workflow("doc-1", "wf-1", initiated_by="author")
+        _decide(workflow_service, instance, "reviewer", "approve")
+        _decide(workflow_service, instance, "chair", "approve")
+        # History recorded before the rollups existed
+        db_session.query(WorkflowMetricSketchBin).delete()
+        db_session.query(WorkflowMetricRollup).delete()
+        db_session.commit()
+
+        assert backfill_workflow_metrics(db_session)
+        assert workflow_service.get_workflow_analytics()["completed_instances"] == 1
+        assert workflow_service.get_user_performance_metrics()["workload_distribution"] == {"reviewer": 1, "chair": 1}
+
+        # Rollups that already exist are left alone
+        assert not backfill_workflow_metrics(db_session)
+
+    def test_backfill_skips_empty_history(self, db_session):
+        assert not backfill_workflow_metrics(db_session)
+        assert db_session.query(WorkflowMetricRollup).count() == 0
+
+    def test_slow_steps_use_sketch_quantiles(self, db_session):
+        metrics = WorkflowMetricsService(db_session)
+        step = WorkflowStep(id="step-1", workflow_id="wf-1", name="Review")
+        decided_at = datetime.utcnow()
+        for hours in (30, 40, 50, 200):
+            metrics.record_step_decision("wf-1", step, "reviewer", True,
+                                         decided_at - timedelta(hours=hours), decided_at)
+        db_session.commit()
+
+        slow, = metrics.slow_steps()
+        assert slow["instance_count"] == 4
+        assert slow["average_time_hours"] == pytest.approx(80)
+        assert slow["p50_time_hours"] == pytest.approx(50, rel=SKETCH_RELATIVE_ACCURACY)
+        assert slow["p95_time_hours"] == pytest.approx(200, rel=SKETCH_RELATIVE_ACCURACY)
+
+
+class TestDurationSketch:
+    """Test the log-bucketed duration sketch"""
+
+    @pytest.mark.parametrize("hours", [0.01, 0.5, 3, 24, 500])
+    def test_bin_value_within_relative_accuracy(self, hours):
+        assert sketch_value(sketch_bin(hours)) == pytest.approx(hours, rel=SKETCH_RELATIVE_ACCURACY)
+
+    def test_quantiles_from_merged_bins(self):
+        bins = {}
+        for hours in range(1, 101):
+            bins[sketch_bin(hours)] = bins.get(sketch_bin(hours), 0) + 1
+
+        quantiles = sketch_quantiles(bins, (0.5, 0.9))
+        assert quantiles[0.5] == pytest.approx(51, rel=SKETCH_RELATIVE_ACCURACY)
+        assert quantiles[0.9] == pytest.approx(91, rel=SKETCH_RELATIVE_ACCURACY)
+        assert sketch_quantiles({}, (0.5,)) == {0.5: 0}